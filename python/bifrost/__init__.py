@@ -47,7 +47,7 @@ __status__     = "Development"
 
 # TODO: Decide how to organise the namespace
 import core, memory, affinity, ring, block, address, udp_socket
-import pipeline
+import pipeline, tuning, tracing
 import device
 from ndarray import ndarray, asarray, empty_like, empty, zeros_like, zeros
 import views
@@ -33,18 +33,32 @@ from .reverse import reverse, ReverseBlock
 from .fft import fft, FftBlock
 from .fftshift import fftshift, FftShiftBlock
 from .fdmt import fdmt, FdmtBlock
-from .detect import detect, DetectBlock
+from .detect import detect, DetectBlock, detect_integrate, DetectIntegrateBlock
 from .guppi_raw import read_guppi_raw, GuppiRawSourceBlock
 from .print_header import print_header, PrintHeaderBlock
 from .sigproc import read_sigproc, SigprocSourceBlock
 from .sigproc import write_sigproc, SigprocSinkBlock
 from .scrunch import scrunch, ScrunchBlock
+from .reduce import reduce, ReduceBlock
 from .accumulate import accumulate, AccumulateBlock
 from .binary_io import BinaryFileReadBlock, BinaryFileWriteBlock
 from .unpack import unpack, UnpackBlock
 from .quantize import quantize, QuantizeBlock
 from .wav import read_wav, WavSourceBlock
 from .wav import write_wav, WavSinkBlock
+from .recording import read_recording, RecordingSourceBlock
+from .recording import write_recording, RecordingSinkBlock
+from .numpy_function import numpy_function, NumpyFunctionBlock
+from .kurtosis import spectral_kurtosis, SpectralKurtosisBlock
+from .fold import fold, FoldBlock
+from .dedisperse import dedisperse, DedisperseBlock
+from .single_pulse import single_pulse_search, SinglePulseSearchBlock
+from .periodicity import periodicity_search, PeriodicitySearchBlock
+from .normalize import normalize, NormalizeBlock
+from .pfb import pfb, PfbBlock
+from .gridding import grid_visibilities, GridVisibilitiesBlock
+from .archive import read_archive, ArchiveSourceBlock
+from .archive import write_archive, ArchiveSinkBlock
 
 try: # Avoid error if portaudio library not installed
     from .audio import read_audio, AudioSourceBlock
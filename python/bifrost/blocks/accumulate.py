@@ -27,56 +27,141 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 """
-A simple block that accepts 1 frame at a time and accumulates them
-nframe times before outputting the accumulated result.
+A block that integrates frames along the frame axis, outputting one frame
+for every nframe input frames.
 """
 
 from __future__ import absolute_import
 
 import bifrost as bf
+import bifrost.reduce
 from bifrost.pipeline import TransformBlock
+from bifrost.DataType import DataType
+from bifrost.ndarray import copy_array
 
 from copy import deepcopy
+import numpy as np
 
 class AccumulateBlock(TransformBlock):
-    def __init__(self, iring, nframe, dtype=None, gulp_nframe=1,
-             *args, **kwargs):
-        assert(gulp_nframe == 1)
-        super(AccumulateBlock, self).__init__(iring, gulp_nframe=1,
-                                              *args, **kwargs)
+    def __init__(self, iring, nframe, dtype=None,
+                 *args, **kwargs):
+        super(AccumulateBlock, self).__init__(iring, *args, **kwargs)
         self.nframe = nframe
         self.dtype  = dtype
+        self.space  = self.orings[0].space
     def define_valid_input_spaces(self):
         """Return set of valid spaces (or 'any') for each input"""
-        return ('cuda',)
+        return ('system', 'cuda')
+    def define_output_nframes(self, input_nframe):
+        """Return output nframe for each output, given input_nframes.
+        """
+        # Note: At most one output frame can be completed by frames carried
+        #         over from previous gulps.
+        return (input_nframe - 1) // self.nframe + 1
     def on_sequence(self, iseq):
         ihdr = iseq.header
         itensor = ihdr['_tensor']
         ohdr = deepcopy(ihdr)
         otensor = ohdr['_tensor']
+        self.frame_axis = itensor['shape'].index(-1)
         if 'scales' in otensor:
-            frame_axis = otensor['shape'].index(-1)
-            otensor['scales'][frame_axis][1] *= self.nframe
+            otensor['scales'][self.frame_axis][1] *= self.nframe
         if self.dtype is not None:
             otensor['dtype'] = self.dtype
-        self.frame_count = 0
+        self.system = bf.memory.space_accessible(self.space, ['system'])
+        if self.system:
+            # The native reduction accumulates in [c]f32
+            itype = DataType(itensor['dtype'])
+            otype = DataType(otensor['dtype'])
+            accum_dtype = 'cf32' if itype.is_complex else 'f32'
+            if otype.is_complex and not otype.is_floating_point:
+                raise NotImplementedError("Accumulating to complex integer "
+                                          "types is only supported in CUDA "
+                                          "space")
+        else:
+            accum_dtype = otensor['dtype']
+        self._init_accumulator(otensor, accum_dtype)
         return ohdr
+    def _init_accumulator(self, otensor, accum_dtype):
+        """Allocates the buffer that holds the partial sum of an output frame
+        across gulps"""
+        self.accum_dtype = accum_dtype
+        self.direct = (accum_dtype == str(otensor['dtype']))
+        accum_shape = list(otensor['shape'])
+        accum_shape[self.frame_axis] = 1
+        self.accum = bf.ndarray(shape=accum_shape, dtype=accum_dtype,
+                                space=self.space)
+        self.frame_count = 0
+    def _frames(self, data, begin, end):
+        return data[(slice(None),) * self.frame_axis + (slice(begin, end),)]
+    def _integrate(self, idata, odata, accumulate):
+        """Sums groups of consecutive input frames into each output frame"""
+        if self.system:
+            bf.reduce.reduce(idata, odata, 'sum', accumulate)
+            return
+        fa = self.frame_axis
+        inds = ['i%i' % d for d in xrange(odata.ndim)]
+        iinds = list(inds)
+        iinds[fa] = '%s*n + k' % inds[fa]
+        func = """
+        b_type acc = accumulate ? b(%s) : b_type(0);
+        for( int k=0; k<n; ++k ) {
+            acc += (b_type)a(%s);
+        }
+        b(%s) = acc;
+        """ % (','.join(inds), ','.join(iinds), ','.join(inds))
+        bf.map(func, odata.shape, *inds, a=idata, b=odata,
+               n=idata.shape[fa] // odata.shape[fa],
+               accumulate=int(accumulate))
+    def _store(self, src, dst):
+        if self.system:
+            np.copyto(dst, src, casting='unsafe')
+        else:
+            copy_array(dst, src)
     def on_data(self, ispan, ospan):
         idata = ispan.data
         odata = ospan.data
-        beta = 0. if self.frame_count == 0 else 1.
-        bf.map("b = beta * b + (b_type)a", a=idata, b=odata, beta=beta)
-        self.frame_count += 1
-        if self.frame_count == self.nframe:
-            ncommit = 1
-            self.frame_count = 0
-        else:
-            ncommit = 0
+        nframe = ispan.nframe
+        begin = 0
+        ncommit = 0
+        if self.frame_count > 0 and nframe > 0:
+            # Continue the output frame carried over from previous gulps
+            begin = min(self.nframe - self.frame_count, nframe)
+            self._integrate(self._frames(idata, 0, begin), self.accum, True)
+            self.frame_count += begin
+            if self.frame_count == self.nframe:
+                self._store(self.accum, self._frames(odata, 0, 1))
+                self.frame_count = 0
+                ncommit = 1
+        # Integrate all complete output frames in one call
+        nfull = (nframe - begin) // self.nframe
+        if nfull > 0:
+            end = begin + nfull * self.nframe
+            full_idata = self._frames(idata, begin, end)
+            full_odata = self._frames(odata, ncommit, ncommit + nfull)
+            if self.direct:
+                self._integrate(full_idata, full_odata, False)
+            else:
+                tmp = bf.ndarray(shape=full_odata.shape,
+                                 dtype=self.accum_dtype, space=self.space)
+                self._integrate(full_idata, tmp, False)
+                self._store(tmp, full_odata)
+            begin = end
+            ncommit += nfull
+        # Start a new partial sum from any remaining frames
+        if begin < nframe:
+            self._integrate(self._frames(idata, begin, nframe), self.accum,
+                            False)
+            self.frame_count = nframe - begin
         return ncommit
 
 def accumulate(iring, nframe, dtype=None,
                *args, **kwargs):
-    """Accumulate `nframe` frames of data, one at a time, before outputting.
+    """Accumulate (sum) every `nframe` frames of data into one output frame.
+
+    Gulps may contain any number of frames; partial sums are carried across
+    gulp boundaries, and any incomplete output frame at the end of a sequence
+    is dropped.
 
     Attributes
     ----------
@@ -85,7 +170,8 @@ def accumulate(iring, nframe, dtype=None,
     nframe : int
         Number of frames to accumulate before outputting.
     dtype : string
-        Output datatype. If None, input datatype is used.
+        Output datatype. If None, input datatype is used. In system space,
+        complex integer output types are not supported.
     *args
         Arguments to `bifrost.pipeline.TransformBlock`.
     **kwargs
@@ -93,8 +179,8 @@ def accumulate(iring, nframe, dtype=None,
 
     Tensor semantics
     ----------------
-    Input:  [..., 'time', ...], dtype = any, space = CUDA
-    Output: [..., 'time'/nframe, ...], dtype = any, space = CUDA
+    Input:  [..., 'time', ...], dtype = any, space = SYSTEM or CUDA
+    Output: [..., 'time'/nframe, ...], dtype = any, space = SYSTEM or CUDA
 
     Returns
     -------
@@ -0,0 +1,416 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import bifrost.bitshuffle
+from bifrost.pipeline import SourceBlock, SinkBlock
+from bifrost.DataType import DataType
+from bifrost.proclog import ProcLog
+from bifrost.blocks.recording import _frame_info, _byte_view
+
+from multiprocessing.pool import ThreadPool
+import multiprocessing
+import numpy as np
+import struct
+import time
+import glob
+import json
+import zlib
+import os
+
+try: # Avoid error if lz4 is not installed
+    import lz4.block
+except ImportError:
+    lz4 = None
+
+# Archive file layout (one file per sequence):
+#   magic (8 bytes), descriptor size (uint64), descriptor (JSON, holding the
+#   sequence header and the compression settings), followed by one record
+#   per chunk: frame offset (int64), nframe (int64), raw size (uint64),
+#   compressed size (uint64) and then the compressed chunk. A chunk holds
+#   its frames in C order, i.e., [ringlet..., frame, frame element...], bit-
+#   shuffled if enabled. When the sequence ends, the chunk index is appended:
+#   one entry per chunk of frame offset, nframe, raw size, compressed size
+#   and file position of the record (all 64-bit), then the index position,
+#   the no. chunks and the index magic. Files without an index (e.g., from a
+#   pipeline that was killed) are read by scanning the records.
+ARCHIVE_MAGIC       = 'BFARCHIV'
+ARCHIVE_INDEX_MAGIC = 'BFARCIDX'
+ARCHIVE_EXTENSION   = '.bfarc'
+ARCHIVE_CODECS      = ('zlib', 'lz4', 'none')
+_CHUNK_DESC         = struct.Struct('<qqQQ')
+_INDEX_ENTRY        = struct.Struct('<qqQQQ')
+_INDEX_FOOTER       = struct.Struct('<QQ8s')
+
+def _shuffle_itemsize(dtype):
+    """Returns the size in bytes of the scalars to bit-shuffle"""
+    return max(DataType(dtype).as_real().itemsize_bits // 8, 1)
+
+def _compress(data, codec, level):
+    if codec == 'zlib':
+        return zlib.compress(buffer(data), level)
+    elif codec == 'lz4':
+        return lz4.block.compress(buffer(data), store_size=False)
+    else:
+        return data.tostring()
+
+def _decompress(data, nbyte, codec):
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    elif codec == 'lz4':
+        return lz4.block.decompress(data, uncompressed_size=nbyte)
+    else:
+        return data
+
+class ArchiveFile(object):
+    """Reads a sequence written by ArchiveSinkBlock
+
+    Args:
+        filename (str): Name of the archive file
+        nthread (int): No. threads with which to decompress chunks
+
+    The header attribute holds the sequence header, and the index attribute
+    holds (frame_offset, nframe, nbyte, nbyte_compressed, file_position) for
+    every chunk.
+    """
+    def __init__(self, filename, nthread=1):
+        self.file = open(filename, 'rb')
+        if self.file.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            raise IOError("Not a bifrost archive: %s" % filename)
+        desc_size, = struct.unpack('<Q', self.file.read(8))
+        desc = json.loads(self.file.read(desc_size))
+        self.header     = desc['header']
+        self.codec      = desc['codec']
+        self.bitshuffle = desc['bitshuffle']
+        self.itemsize   = desc['itemsize']
+        if self.codec == 'lz4' and lz4 is None:
+            raise ImportError("The lz4 module is needed to read %s" % filename)
+        self.ringlet_shape, self.frame_nbyte = _frame_info(self.header)
+        self.nringlet = int(np.prod(self.ringlet_shape))
+        self.index = self._read_index()
+        if self.index is None:
+            self.index = self._scan_records(self.file.tell())
+        self.nthread = nthread
+        self.pool = ThreadPool(nthread) if nthread > 1 else None
+        self.seek(0)
+    def _read_index(self):
+        data_begin = self.file.tell()
+        file_size = os.fstat(self.file.fileno()).st_size
+        if file_size - data_begin < _INDEX_FOOTER.size:
+            return None
+        self.file.seek(-_INDEX_FOOTER.size, 2)
+        index_pos, nchunk, magic = _INDEX_FOOTER.unpack(
+            self.file.read(_INDEX_FOOTER.size))
+        self.file.seek(data_begin)
+        if magic != ARCHIVE_INDEX_MAGIC:
+            return None
+        self.file.seek(index_pos)
+        data = self.file.read(nchunk * _INDEX_ENTRY.size)
+        self.file.seek(data_begin)
+        return [_INDEX_ENTRY.unpack_from(data, i * _INDEX_ENTRY.size)
+                for i in xrange(nchunk)]
+    def _scan_records(self, pos):
+        file_size = os.fstat(self.file.fileno()).st_size
+        index = []
+        while pos + _CHUNK_DESC.size <= file_size:
+            self.file.seek(pos)
+            frame_offset, nframe, nbyte, nbyte_compressed = \
+                _CHUNK_DESC.unpack(self.file.read(_CHUNK_DESC.size))
+            if pos + _CHUNK_DESC.size + nbyte_compressed > file_size:
+                break # Ignore a truncated final record
+            index.append((frame_offset, nframe, nbyte, nbyte_compressed, pos))
+            pos += _CHUNK_DESC.size + nbyte_compressed
+        return index
+    def __enter__(self):
+        return self
+    def __exit__(self, type, value, tb):
+        self.close()
+    def close(self):
+        self.file.close()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+    @property
+    def nframe(self):
+        return sum(entry[1] for entry in self.index)
+    @property
+    def nbyte(self):
+        return sum(entry[2] for entry in self.index)
+    @property
+    def nbyte_compressed(self):
+        return sum(entry[3] for entry in self.index)
+    def seek(self, chunk):
+        """Positions the reader at the start of the given chunk"""
+        self._chunk = chunk
+        self._chunk_data = None
+        self._chunk_frame = 0
+    def _decode(self, args):
+        """Decompresses (and un-shuffles) one chunk, returning it with shape
+        [ringlet..., frame, frame_nbyte]"""
+        (_, nframe, nbyte, _, _), data = args
+        data = np.frombuffer(_decompress(data, nbyte, self.codec),
+                             dtype=np.uint8)
+        if len(data) != nbyte:
+            raise IOError("Archive chunk is corrupt")
+        if self.bitshuffle:
+            shuffled, data = data, np.empty_like(data)
+            bifrost.bitshuffle.bitunshuffle(shuffled, data, self.itemsize)
+        return data.reshape(self.ringlet_shape + [nframe, self.frame_nbyte])
+    def read(self, odata):
+        """Reads frames into odata (a byte view as returned by _byte_view)
+        across chunks, returning the no. frames read"""
+        frame_axis = len(self.ringlet_shape)
+        nframe_max = odata.shape[frame_axis]
+        # Find the chunks needed to fill odata, and decode any not yet
+        #   decoded in parallel
+        chunks = []
+        nframe = -self._chunk_frame
+        while nframe < nframe_max and self._chunk + len(chunks) < len(self.index):
+            nframe += self.index[self._chunk + len(chunks)][1]
+            chunks.append(self._chunk + len(chunks))
+        todo = chunks[1:] if self._chunk_data is not None else chunks
+        args = []
+        for chunk in todo:
+            entry = self.index[chunk]
+            self.file.seek(entry[4] + _CHUNK_DESC.size)
+            args.append((entry, self.file.read(entry[3])))
+        if self.pool is not None and len(args) > 1:
+            decoded = self.pool.map(self._decode, args)
+        else:
+            decoded = map(self._decode, args)
+        if self._chunk_data is not None:
+            decoded.insert(0, self._chunk_data)
+        nframe = 0
+        for chunk_data in decoded:
+            chunk_nframe = chunk_data.shape[frame_axis]
+            n = min(nframe_max - nframe, chunk_nframe - self._chunk_frame)
+            oidx = (slice(None),) * frame_axis + (slice(nframe, nframe + n),)
+            iidx = (slice(None),) * frame_axis + (
+                slice(self._chunk_frame, self._chunk_frame + n),)
+            odata[oidx] = chunk_data[iidx].reshape(odata[oidx].shape)
+            nframe += n
+            self._chunk_frame += n
+            if self._chunk_frame == chunk_nframe:
+                self.seek(self._chunk + 1)
+            else:
+                self._chunk_data = chunk_data
+        return nframe
+
+class ArchiveSourceBlock(SourceBlock):
+    def __init__(self, filenames, gulp_nframe, nthread=None, *args, **kwargs):
+        super(ArchiveSourceBlock, self).__init__(filenames, gulp_nframe,
+                                                 *args, **kwargs)
+        if nthread is None:
+            nthread = multiprocessing.cpu_count()
+        self.nthread = nthread
+    def create_reader(self, sourcename):
+        return ArchiveFile(sourcename, self.nthread)
+    def on_sequence(self, reader, sourcename):
+        self.frame_axis = len(reader.ringlet_shape)
+        return [reader.header]
+    def on_data(self, reader, ospans):
+        ospan = ospans[0]
+        nframe = reader.read(_byte_view(ospan.data, self.frame_axis))
+        return [nframe]
+
+def read_archive(filenames, gulp_nframe, nthread=None, *args, **kwargs):
+    """Read sequences archived by ``write_archive``.
+
+    Args:
+        filenames (list or str): List of archive files, or a directory
+            containing them (which are read in the order written).
+        gulp_nframe (int): No. frames to read at a time.
+        nthread (int): No. threads with which to decompress the chunks of
+            each gulp. Defaults to the number of CPU cores.
+        *args: Arguments to ``bifrost.pipeline.SourceBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.SourceBlock``.
+
+    **Tensor semantics**::
+
+        Output: As archived, space = SYSTEM
+
+    Returns:
+        ArchiveSourceBlock: A new block instance.
+
+    Note:
+        The original sequence headers are reproduced exactly, and the
+        archived frames are output contiguously.
+    """
+    if isinstance(filenames, basestring):
+        filenames = sorted(glob.glob(os.path.join(filenames,
+                                                  '*' + ARCHIVE_EXTENSION)))
+    return ArchiveSourceBlock(filenames, gulp_nframe, nthread, *args, **kwargs)
+
+class ArchiveSinkBlock(SinkBlock):
+    def __init__(self, iring, path=None, chunk_nbyte=1 << 20, codec='zlib',
+                 level=1, bitshuffle=True, nthread=None, *args, **kwargs):
+        super(ArchiveSinkBlock, self).__init__(iring, *args, **kwargs)
+        if codec not in ARCHIVE_CODECS:
+            raise ValueError("Unknown codec: %s" % codec)
+        if codec == 'lz4' and lz4 is None:
+            raise ImportError("The lz4 codec needs the lz4 module")
+        if path is None:
+            path = ''
+        if nthread is None:
+            nthread = multiprocessing.cpu_count()
+        self.path        = path
+        self.chunk_nbyte = chunk_nbyte
+        self.codec       = codec
+        self.level       = level
+        self.bitshuffle  = bitshuffle
+        self.nthread     = nthread
+        self.pool        = None
+        self.nsequence   = 0
+        self.ofile       = None
+        self.nbyte             = 0
+        self.nbyte_compressed  = 0
+        self.compress_time     = 0.
+        self.stats_proclog = ProcLog(self.name + "/archive")
+    def define_valid_input_spaces(self):
+        return ('system',)
+    def on_sequence(self, iseq):
+        ihdr = iseq.header
+        self.frame_axis = ihdr['_tensor']['shape'].index(-1)
+        ringlet_shape, frame_nbyte = _frame_info(ihdr)
+        self.chunk_nframe = max(self.chunk_nbyte //
+                                (int(np.prod(ringlet_shape)) * frame_nbyte),
+                                1)
+        self.itemsize = _shuffle_itemsize(ihdr['_tensor']['dtype'])
+        filename = os.path.join(self.path, 'sequence%06i%s' %
+                                (self.nsequence, ARCHIVE_EXTENSION))
+        self.nsequence += 1
+        desc_str = json.dumps({'header':     ihdr,
+                               'codec':      self.codec,
+                               'bitshuffle': self.bitshuffle,
+                               'itemsize':   self.itemsize})
+        self.ofile = open(filename, 'wb')
+        self.ofile.write(ARCHIVE_MAGIC)
+        self.ofile.write(struct.pack('<Q', len(desc_str)))
+        self.ofile.write(desc_str)
+        self.index = []
+        if self.nthread > 1:
+            self.pool = ThreadPool(self.nthread)
+    def on_sequence_end(self, iseq):
+        index_pos = self.ofile.tell()
+        for entry in self.index:
+            self.ofile.write(_INDEX_ENTRY.pack(*entry))
+        self.ofile.write(_INDEX_FOOTER.pack(index_pos, len(self.index),
+                                            ARCHIVE_INDEX_MAGIC))
+        self.ofile.close()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+    def _encode(self, data):
+        """Shuffles and compresses one chunk, returning the compressed data
+        and the time taken"""
+        start_time = time.time()
+        data = np.ascontiguousarray(data).reshape(-1)
+        if self.bitshuffle:
+            shuffled = np.empty_like(data)
+            bifrost.bitshuffle.bitshuffle(data, shuffled, self.itemsize)
+            data = shuffled
+        return _compress(data, self.codec, self.level), time.time() - start_time
+    def on_data(self, ispan):
+        data = _byte_view(ispan.data, self.frame_axis)
+        nframe = ispan.nframe
+        bounds = range(0, nframe, self.chunk_nframe) + [nframe]
+        chunks = [data[(slice(None),) * self.frame_axis + (slice(begin, end),)]
+                  for begin, end in zip(bounds[:-1], bounds[1:])]
+        if self.pool is not None and len(chunks) > 1:
+            encoded = self.pool.map(self._encode, chunks)
+        else:
+            encoded = map(self._encode, chunks)
+        for begin, end, chunk, (cdata, ctime) in zip(bounds[:-1], bounds[1:],
+                                                     chunks, encoded):
+            entry = (ispan.frame_offset + begin, end - begin, chunk.size,
+                     len(cdata), self.ofile.tell())
+            self.ofile.write(_CHUNK_DESC.pack(*entry[:4]))
+            self.ofile.write(cdata)
+            self.index.append(entry)
+            self.nbyte            += chunk.size
+            self.nbyte_compressed += len(cdata)
+            self.compress_time    += ctime
+        self.stats_proclog.update({
+            'nbyte':             self.nbyte,
+            'nbyte_compressed':  self.nbyte_compressed,
+            'compression_ratio': self.compression_ratio,
+            'mbps_per_thread':   self.mbps_per_thread})
+    @property
+    def compression_ratio(self):
+        """The ratio of raw to compressed data size so far"""
+        return float(self.nbyte) / max(self.nbyte_compressed, 1)
+    @property
+    def mbps_per_thread(self):
+        """The rate at which each thread compresses data, in MB/s"""
+        return self.nbyte / 1e6 / max(self.compress_time, 1e-9)
+
+def write_archive(iring, path=None, chunk_nbyte=1 << 20, codec='zlib', level=1,
+                  bitshuffle=True, nthread=None, *args, **kwargs):
+    """Write the sequences in a ring (headers and data) to compressed,
+    chunked archive files.
+
+    Each span is split into chunks, which are bit-shuffled and compressed
+    losslessly by a pool of threads, so that archiving keeps up with
+    streams that are faster than a disk. The compression ratio and the
+    compression rate per thread are available as the block's
+    ``compression_ratio`` and ``mbps_per_thread`` attributes, and are
+    summarised in its 'archive' ProcLog.
+
+    Args:
+        iring (Ring or Block): Input data source.
+        path (str): Directory in which to write the archive files.
+        chunk_nbyte (int): Approximate size of each chunk, in bytes. Chunks
+            hold a whole number of frames.
+        codec (str): Compression codec; one of 'zlib', 'lz4' (if the lz4
+            module is installed) or 'none'.
+        level (int): zlib compression level (1 is the fastest).
+        bitshuffle (bool): If True, the bits of the data are grouped into
+            bit planes before compression. This usually improves the
+            compression of multi-byte data (e.g., f32 or i16), but not
+            of 8-bit data.
+        nthread (int): No. threads with which to compress the chunks of each
+            span. Defaults to the number of CPU cores.
+        *args: Arguments to ``bifrost.pipeline.SinkBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.SinkBlock``.
+
+    **Tensor semantics**::
+
+        Input: Any, space = SYSTEM
+        Output: One archive file per sequence, named sequenceNNNNNN.bfarc
+
+    Returns:
+        ArchiveSinkBlock: A new block instance.
+
+    Note:
+        Each file holds the sequence header and compression settings as
+        JSON, followed by the compressed chunks and an index of them. Use
+        ``read_archive`` (or ``ArchiveFile``) to read them back.
+    """
+    return ArchiveSinkBlock(iring, path, chunk_nbyte, codec, level, bitshuffle,
+                            nthread, *args, **kwargs)
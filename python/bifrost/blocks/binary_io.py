@@ -31,6 +31,7 @@
 
 Basic file I/O blocks for reading and writing data.
 """
+import os
 import numpy as np 
 import time
 import bifrost as bf
@@ -115,20 +116,26 @@ class BinaryFileWriteBlock(bfp.SinkBlock):
     
     Args:
         file_ext (str): Output file extension. Defaults to '.out'
+        path (str): Directory to write output files to. Defaults to the
+          current directory.
     
     Notes:
         output filename is generated from the header 'name' keyword + file_ext
     """
-    def __init__(self, iring, file_ext='out', *args, **kwargs):
+    def __init__(self, iring, file_ext='out', path=None, *args, **kwargs):
         super(BinaryFileWriteBlock, self).__init__(iring, *args, **kwargs)
+        if path is None:
+            path = ''
         self.current_fileobj = None
         self.file_ext = file_ext
+        self.path = path
     
     def on_sequence(self, iseq):
         if self.current_fileobj is not None:
             self.current_fileobj.close()
             
-        new_filename = iseq.header['name'] + '.' + self.file_ext
+        new_filename = os.path.join(self.path,
+                                    iseq.header['name'] + '.' + self.file_ext)
         self.current_fileobj = open(new_filename, 'w')
     
     def on_data(self, ispan):
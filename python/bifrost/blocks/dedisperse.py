@@ -0,0 +1,205 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import
+
+import bifrost as bf
+import bifrost.dedisperse
+from bifrost.pipeline import TransformBlock
+from bifrost.units import convert_units
+
+from copy import deepcopy
+import numpy as np
+
+class DedisperseBlock(TransformBlock):
+    def __init__(self, iring, max_dm, min_dm=0., dm_step=None, nsubband=32,
+                 *args, **kwargs):
+        super(DedisperseBlock, self).__init__(iring, *args, **kwargs)
+        self.max_dm   = max_dm
+        self.min_dm   = min_dm
+        self.dm_step  = dm_step
+        self.nsubband = nsubband
+        self.kdm      = 4.148741601e3 # MHz**2 cm**3 s / pc
+        self.dm_units = 'pc cm^-3'
+    def define_valid_input_spaces(self):
+        """Return set of valid spaces (or 'any') for each input"""
+        return ('system',)
+    def _init_delays(self, freqs, dt):
+        """Computes the delays (in samples) of both dedispersion stages, and
+        returns the spacing of the trial DMs"""
+        nchan = len(freqs)
+        # Delay per unit DM of each channel relative to the top of the band
+        kdelay = self.kdm / dt * (freqs**-2 - freqs.max()**-2)
+        dm_step = self.dm_step
+        if dm_step is None:
+            # Note: Neighbouring trials differ by one sample of delay across
+            #         the band
+            dm_step = 1. / kdelay.max() if kdelay.max() > 0 else 1.
+        ndm = max(int(np.ceil((self.max_dm - self.min_dm) / dm_step)), 1)
+        dms = self.min_dm + dm_step * np.arange(ndm)
+        subbands = np.array_split(np.arange(nchan),
+                                  min(self.nsubband, nchan))
+        # Delays of the channels relative to the top of their subband
+        kdelay_top = np.array([kdelay[chans].min() for chans in subbands])
+        kdelay_sub = np.concatenate([kdelay[chans] - kdelay[chans].min()
+                                     for chans in subbands])
+        # Each group of trials shares one stage-1 (subband) trial, chosen so
+        #   that no channel is misaligned by more than half a sample.
+        kdelay_sub_max = kdelay_sub.max()
+        if kdelay_sub_max * dm_step > 0:
+            ngroup = max(int(1. / (kdelay_sub_max * dm_step)), 1)
+        else:
+            ngroup = ndm
+        groups = [slice(g, min(g + ngroup, ndm))
+                  for g in xrange(0, ndm, ngroup)]
+        sub_dms = np.array([dms[group].mean() for group in groups])
+        self.delays1 = np.round(sub_dms[:, None] *
+                                kdelay_sub[None, :]).astype(np.int32)
+        self.delays2 = np.round(dms[:, None] *
+                                kdelay_top[None, :]).astype(np.int32)
+        self.subbands = [slice(chans[0], chans[-1] + 1) for chans in subbands]
+        self.groups   = groups
+        self.ndm      = ndm
+        self.max_delay1 = int(self.delays1.max())
+        self.max_delay2 = int(self.delays2.max())
+        self.max_delay  = self.max_delay1 + self.max_delay2
+        return dm_step
+    def on_sequence(self, iseq):
+        ihdr = iseq.header
+        itensor = ihdr['_tensor']
+        if str(itensor['dtype']) != 'f32':
+            raise TypeError("Input data must be f32")
+        if list(itensor['labels']) != ['time', 'pol', 'freq']:
+            raise ValueError("Expected input axes ['time', 'pol', 'freq']")
+        npol     = itensor['shape' ][1]
+        nchan    = itensor['shape' ][2]
+        t0_, dt_ = itensor['scales'][0]
+        f0_, df_ = itensor['scales'][2]
+        dt = convert_units(dt_, itensor['units'][0], 's')
+        f0 = convert_units(f0_, itensor['units'][2], 'MHz')
+        df = convert_units(df_, itensor['units'][2], 'MHz')
+        dm_step = self._init_delays(f0 + df * np.arange(nchan), dt)
+        gulp_nframe = self.gulp_nframe or ihdr['gulp_nframe']
+        nframe = gulp_nframe + self.max_delay
+        # Note: The channels are transposed to contiguous time series, and
+        #         the subband sums keep the stage-2 overlap
+        self.chan_data = bf.ndarray(shape=(npol, nchan, nframe),
+                                    dtype='f32', space='system')
+        self.sub_data  = bf.ndarray(shape=(npol, len(self.groups),
+                                           len(self.subbands),
+                                           nframe - self.max_delay1),
+                                    dtype='f32', space='system')
+        ohdr = deepcopy(ihdr)
+        if 'refdm' in ihdr:
+            refdm = convert_units(ihdr['refdm'], ihdr['refdm_units'],
+                                  self.dm_units)
+        else:
+            refdm = 0.
+        units  = itensor['units']
+        scales = itensor['scales']
+        otensor = ohdr['_tensor']
+        otensor['dtype']  = 'f32'
+        otensor['shape']  = [self.ndm, -1, npol]
+        otensor['labels'] = ['dispersion', 'time', 'pol']
+        otensor['scales'] = [(refdm + self.min_dm, dm_step), scales[0],
+                             scales[1]]
+        otensor['units']  = [self.dm_units, units[0], units[1]]
+        ohdr['max_dm']       = self.max_dm
+        ohdr['max_dm_units'] = self.dm_units
+        ohdr['cfreq']        = f0_ + 0.5 * (nchan - 1) * df_
+        ohdr['cfreq_units']  = units[2]
+        ohdr['bw']           = nchan * df_
+        ohdr['bw_units']     = units[2]
+        return ohdr, slice(0, gulp_nframe + self.max_delay, gulp_nframe)
+    def on_data(self, ispan, ospan):
+        if ispan.nframe <= self.max_delay:
+            # Cannot fully process any frames
+            return 0
+        nframe  = ispan.nframe
+        nout    = nframe - self.max_delay
+        nsub    = nout + self.max_delay2
+        idata   = ispan.data
+        odata   = ospan.data
+        npol    = idata.shape[1]
+        chan_data = self.chan_data[..., :nframe]
+        chan_data.view(np.ndarray)[...] = \
+            idata.view(np.ndarray).transpose(1, 2, 0)
+        for p in xrange(npol):
+            # Stage 1: Dedisperse each subband at a coarse set of trials
+            sub_data = self.sub_data[p, ..., :nsub]
+            for s, chans in enumerate(self.subbands):
+                bf.dedisperse.dedisperse(chan_data[p, chans],
+                                         self.delays1[:, chans],
+                                         sub_data[:, s])
+            # Stage 2: Combine the subbands of each group at its fine trials
+            for g, group in enumerate(self.groups):
+                bf.dedisperse.dedisperse(sub_data[g],
+                                         self.delays2[group],
+                                         odata[group, :nout, p])
+        return nout
+
+def dedisperse(iring, max_dm, min_dm=0., dm_step=None, nsubband=32,
+               *args, **kwargs):
+    """Apply incoherent dedispersion over a range of trial DMs using the
+    two-stage subband algorithm.
+
+    The channels within each subband are first dedispersed at a coarse set
+    of trial DMs, and the subbands are then combined at each of the fine
+    trial DMs. This uses the CPU, and is usually faster than brute-force
+    dedispersion by a factor similar to the number of subbands.
+
+    Args:
+        iring (Ring or Block): Input data source.
+        max_dm (float): Max dispersion measure to search up to
+            (in units of pc/cm^3).
+        min_dm (float): Min dispersion measure to search from.
+        dm_step (float): Spacing of the trial DMs. Defaults to the DM step
+            that changes the delay across the band by one sample.
+        nsubband (int): Number of subbands. Setting this to the number of
+            channels gives exact brute-force dedispersion.
+        *args: Arguments to ``bifrost.pipeline.TransformBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.TransformBlock``.
+
+    **Tensor semantics**::
+
+        Input:  ['time', 'pol', 'freq'],       dtype = f32, space = SYSTEM
+        Output: ['dispersion', 'time', 'pol'], dtype = f32, space = SYSTEM
+
+    Returns:
+        DedisperseBlock: A new block instance.
+
+    Note:
+        Delays are relative to the highest frequency in the band. Each gulp
+        overlaps the next by the maximum delay, so the block outputs
+        nothing until that many frames have been received. The subband
+        delays are rounded independently of the subband offsets, so
+        channels may be misaligned by up to one sample relative to
+        brute-force dedispersion.
+    """
+    return DedisperseBlock(iring, max_dm, min_dm, dm_step, nsubband,
+                           *args, **kwargs)
@@ -29,11 +29,49 @@
 from __future__ import absolute_import
 
 import bifrost as bf
+import bifrost.detect
 from bifrost.pipeline import TransformBlock
 from bifrost.DataType import DataType
+from bifrost.blocks.accumulate import AccumulateBlock
 
 from copy import deepcopy
 
+def _detect_header(ihdr, mode, specified_axis):
+    """Returns the output header of a detection, along with the
+    polarization axis and its length"""
+    itensor = ihdr['_tensor']
+    itype = DataType(itensor['dtype'])
+    if not itype.is_complex:
+        raise TypeError("Input data must be complex")
+    axis = specified_axis
+    if 'labels' not in itensor.keys() and axis is None:
+        raise TypeError("Polarization (pol) index must be labelled, or axis must be set manually")
+    elif (axis is None and
+        mode != 'scalar' and
+        'pol' in itensor['labels']):
+        axis = itensor['labels'].index('pol')
+    elif isinstance(axis, basestring):
+        axis = itensor['labels'].index(axis)
+    # Note: axis may be None here, which indicates single-pol mode
+    ohdr = deepcopy(ihdr)
+    otensor = ohdr['_tensor']
+    if axis is not None:
+        npol = otensor['shape'][axis]
+        if npol not in [1,2]:
+            raise ValueError("Axis must have length 1 or 2")
+        if mode == 'stokes' and npol == 2:
+            otensor['shape'][axis] = 4
+        if 'labels' in otensor:
+            otensor['labels'][axis] = 'pol'#mode # TODO: Check this
+    else:
+        npol = 1
+    if mode == 'jones' and npol == 2:
+        otype = itype
+    else:
+        otype = itype.as_real()
+    otensor['dtype'] = otype.as_floating_point()
+    return ohdr, axis, npol
+
 class DetectBlock(TransformBlock):
     def __init__(self, iring, mode, axis=None,
                  *args, **kwargs):
@@ -44,38 +82,8 @@ class DetectBlock(TransformBlock):
         """Return set of valid spaces (or 'any') for each input"""
         return ('cuda',)
     def on_sequence(self, iseq):
-        ihdr = iseq.header
-        itensor = ihdr['_tensor']
-        itype = DataType(itensor['dtype'])
-        if not itype.is_complex:
-            raise TypeError("Input data must be complex")
-        self.axis = self.specified_axis
-        if 'labels' not in itensor.keys() and self.axis is None:
-            raise TypeError("Polarization (pol) index must be labelled, or axis must be set manually")
-        elif (self.axis is None and
-            self.mode != 'scalar' and
-            'pol' in itensor['labels']):
-            self.axis = itensor['labels'].index('pol')
-        elif isinstance(self.axis, basestring):
-            self.axis = itensor['labels'].index(self.axis)
-        # Note: axis may be None here, which indicates single-pol mode
-        ohdr = deepcopy(ihdr)
-        otensor = ohdr['_tensor']
-        if self.axis is not None:
-            self.npol = otensor['shape'][self.axis]
-            if self.npol not in [1,2]:
-                raise ValueError("Axis must have length 1 or 2")
-            if self.mode == 'stokes' and self.npol == 2:
-                otensor['shape'][self.axis] = 4
-            if 'labels' in otensor:
-                otensor['labels'][self.axis] = 'pol'#self.mode # TODO: Check this
-        else:
-            self.npol = 1
-        if self.mode == 'jones' and self.npol == 2:
-            otype = itype
-        else:
-            otype = itype.as_real()
-        otensor['dtype'] = otype.as_floating_point()
+        ohdr, self.axis, self.npol = _detect_header(iseq.header, self.mode,
+                                                    self.specified_axis)
         return ohdr
     def on_data(self, ispan, ospan):
         idata = ispan.data
@@ -138,3 +146,117 @@ def detect(iring, mode, axis=None, *args, **kwargs):
         DetectBlock: A new block instance.
     """
     return DetectBlock(iring, mode, axis, *args, **kwargs)
+
+class DetectIntegrateBlock(AccumulateBlock):
+    def __init__(self, iring, mode, nframe, axis=None,
+                 *args, **kwargs):
+        super(DetectIntegrateBlock, self).__init__(iring, nframe, None,
+                                                   *args, **kwargs)
+        self.specified_axis = axis
+        self.mode = mode.lower()
+    def on_sequence(self, iseq):
+        ohdr, self.axis, self.npol = _detect_header(iseq.header, self.mode,
+                                                    self.specified_axis)
+        otensor = ohdr['_tensor']
+        self.frame_axis = otensor['shape'].index(-1)
+        if 'scales' in otensor:
+            otensor['scales'][self.frame_axis][1] *= self.nframe
+        self.system = bf.memory.space_accessible(self.space, ['system'])
+        odtype = str(otensor['dtype'])
+        if self.system and odtype not in ('f32', 'cf32'):
+            raise NotImplementedError("Detecting to 64-bit types is only "
+                                      "supported in CUDA space")
+        self._init_accumulator(otensor, odtype)
+        return ohdr
+    def _integrate(self, idata, odata, accumulate):
+        """Detects and sums groups of consecutive input frames into each
+        output frame"""
+        mode = self.mode if self.npol == 2 else 'scalar'
+        if self.system:
+            bf.detect.detect(idata, odata, mode, self.axis, accumulate)
+            return
+        fa = self.frame_axis
+        shape = list(odata.shape)
+        inds  = ['i%i' % d for d in xrange(odata.ndim)]
+        iinds = list(inds)
+        iinds[fa] = '%s*n + k' % inds[fa]
+        if mode == 'scalar':
+            func = """
+            b_type acc = accumulate ? b(%s) : b_type(0);
+            for( int k=0; k<n; ++k ) {
+                acc += Complex<b_type>(a(%s)).mag2();
+            }
+            b(%s) = acc;
+            """ % (','.join(inds), ','.join(iinds), ','.join(inds))
+        else:
+            inds[self.axis]  = '%i'
+            iinds[self.axis] = '%i'
+            o_ = [','.join(inds)  % i for i in xrange(4)]
+            a_ = [','.join(iinds) % i for i in xrange(2)]
+            del shape[self.axis]
+            del inds[self.axis]
+            if mode == 'jones':
+                func = """
+                b_type xx_yy = accumulate ? b(%s) : b_type(0);
+                b_type xy    = accumulate ? b(%s) : b_type(0);
+                for( int k=0; k<n; ++k ) {
+                    b_type x = a(%s);
+                    b_type y = a(%s);
+                    xx_yy += b_type(x.mag2(), y.mag2());
+                    xy    += x*y.conj();
+                }
+                b(%s) = xx_yy;
+                b(%s) = xy;
+                """ % (o_[0], o_[1], a_[0], a_[1], o_[0], o_[1])
+            elif mode == 'stokes':
+                func = """
+                b_type si = accumulate ? b(%s) : b_type(0);
+                b_type sq = accumulate ? b(%s) : b_type(0);
+                b_type su = accumulate ? b(%s) : b_type(0);
+                b_type sv = accumulate ? b(%s) : b_type(0);
+                for( int k=0; k<n; ++k ) {
+                    Complex<b_type> x = a(%s);
+                    Complex<b_type> y = a(%s);
+                    auto xx = x.mag2();
+                    auto yy = y.mag2();
+                    auto xy = x*y.conj();
+                    si += xx + yy;
+                    sq += xx - yy;
+                    su +=  2*xy.real;
+                    sv += -2*xy.imag;
+                }
+                b(%s) = si;
+                b(%s) = sq;
+                b(%s) = su;
+                b(%s) = sv;
+                """ % (o_[0], o_[1], o_[2], o_[3], a_[0], a_[1],
+                       o_[0], o_[1], o_[2], o_[3])
+        bf.map(func, shape, *inds, a=idata, b=odata,
+               n=idata.shape[fa] // odata.shape[fa],
+               accumulate=int(accumulate))
+
+def detect_integrate(iring, mode, nframe, axis=None, *args, **kwargs):
+    """Apply square-law detection and integrate every `nframe` frames.
+
+    This is equivalent to ``accumulate(detect(iring, mode, axis), nframe)``,
+    but runs in a single pass without writing the full-rate detected data
+    to an intermediate ring.
+
+    Args:
+        iring (Ring or Block): Input data source.
+        mode (string): Polarization products to form; see ``detect``.
+        nframe (int): Number of frames to integrate into each output frame.
+        axis: Integer or string specifying the polarization axis. Defaults to
+                'pol'. Not used if mode = 'scalar'.
+        *args: Arguments to ``bifrost.pipeline.TransformBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.TransformBlock``.
+
+    **Tensor semantics**::
+
+        Input:  [..., 'time', ..., 'pol', ...], dtype = any complex, space = SYSTEM or CUDA
+        Output: [..., 'time'/nframe, ..., 'pol', ...], dtype = real or complex, space = SYSTEM or CUDA
+
+    Returns:
+        DetectIntegrateBlock: A new block instance.
+    """
+    return DetectIntegrateBlock(iring, mode, nframe, axis, *args, **kwargs)
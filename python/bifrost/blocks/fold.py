@@ -0,0 +1,201 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import
+
+import bifrost as bf
+import bifrost.fold
+from bifrost.pipeline import TransformBlock
+from bifrost.units import convert_units
+
+from copy import deepcopy
+import numpy as np
+
+class FoldBlock(TransformBlock):
+    def __init__(self, iring, period, nbin, dm=0., subint=1., epoch=None,
+                 *args, **kwargs):
+        super(FoldBlock, self).__init__(iring, *args, **kwargs)
+        if period <= 0:
+            raise ValueError("Period must be positive")
+        self.period   = period
+        self.nbin     = nbin
+        self.dm       = dm
+        self.subint   = subint
+        self.epoch    = epoch
+        self.kdm      = 4.148741601e3 # MHz**2 cm**3 s / pc
+        self.dm_units = 'pc cm^-3'
+    def define_valid_input_spaces(self):
+        """Return set of valid spaces (or 'any') for each input"""
+        return ('system',)
+    def define_output_nframes(self, input_nframe):
+        """Return output nframe for each output, given input_nframes.
+        """
+        # Note: At most one output frame can be completed by frames carried
+        #         over from previous gulps.
+        return (input_nframe - 1) // self.nframe_subint + 1
+    def on_sequence(self, iseq):
+        ihdr = iseq.header
+        itensor = ihdr['_tensor']
+        if str(itensor['dtype']) != 'f32':
+            raise TypeError("Input data must be f32")
+        labels = list(itensor['labels'])
+        chan_label = 'freq' if 'freq' in labels else 'dispersion'
+        if (len(labels) != 3 or 'time' not in labels or
+            'pol' not in labels or chan_label not in labels):
+            raise ValueError("Expected input axes 'time', 'pol' and 'freq' "
+                             "or 'dispersion', not " + str(labels))
+        time_axis = labels.index('time')
+        pol_axis  = labels.index('pol')
+        chan_axis = labels.index(chan_label)
+        if itensor['shape'][time_axis] != -1:
+            raise ValueError("Expected 'time' to be the frame axis")
+        self.axes = (time_axis, pol_axis, chan_axis)
+        npol  = itensor['shape'][pol_axis]
+        nchan = itensor['shape'][chan_axis]
+        t0_, dt_ = itensor['scales'][time_axis]
+        t0 = convert_units(t0_, itensor['units'][time_axis], 's')
+        dt = convert_units(dt_, itensor['units'][time_axis], 's')
+        self.nframe_subint = max(int(round(self.subint / dt)), 1)
+        self.dphase = dt / self.period
+        # Note: Phases are tracked relative to the epoch to preserve precision
+        epoch = t0 if self.epoch is None else self.epoch
+        self.start_phase = ((t0 - epoch) / self.period) % 1.
+        delays = np.zeros(nchan)
+        if chan_label == 'freq':
+            f0_, df_ = itensor['scales'][chan_axis]
+            f0 = convert_units(f0_, itensor['units'][chan_axis], 'MHz')
+            df = convert_units(df_, itensor['units'][chan_axis], 'MHz')
+            freqs = f0 + df * np.arange(nchan)
+            # Note: Delays are relative to the highest frequency in the band
+            fref = max(freqs[0], freqs[-1])
+            delays = self.kdm * self.dm * (freqs**-2 - fref**-2)
+        elif self.dm != 0:
+            raise ValueError("Dedispersed input cannot be folded at a "
+                             "different DM")
+        self.delay_phase = delays / self.period
+        self.phase = bf.ndarray(shape=(nchan,), dtype='f64', space='system')
+        self.accum = bf.zeros(shape=(npol, nchan, self.nbin), dtype='f32',
+                              space='system')
+        self.hits  = bf.zeros(shape=(nchan, self.nbin), dtype='u32',
+                              space='system')
+        self.frame_count = 0
+
+        ohdr = deepcopy(ihdr)
+        otensor = ohdr['_tensor']
+        units  = itensor.get('units',  [None] * 3)
+        scales = itensor.get('scales', [None] * 3)
+        otensor['dtype']  = 'f32'
+        otensor['shape']  = [-1, npol, nchan, self.nbin]
+        otensor['labels'] = ['time', 'pol', chan_label, 'phase']
+        otensor['scales'] = [[t0_, dt_ * self.nframe_subint],
+                             scales[pol_axis], scales[chan_axis],
+                             [0., 1. / self.nbin]]
+        otensor['units']  = [units[time_axis], units[pol_axis],
+                             units[chan_axis], None]
+        if chan_label == 'freq':
+            ohdr['refdm']       = self.dm
+            ohdr['refdm_units'] = self.dm_units
+        ohdr['npuls'] = int(round(self.nframe_subint * self.dphase))
+        ohdr['period']       = self.period
+        ohdr['period_units'] = 's'
+        return ohdr
+    def _fold(self, idata, frame_offset):
+        """Folds frames into the accumulator, starting at the given frame
+        offset from the beginning of the sequence"""
+        phase = (self.start_phase + (frame_offset * self.dphase) % 1. -
+                 self.delay_phase)
+        self.phase[...] = phase
+        bf.fold.fold(idata, self.phase, self.dphase, self.accum, self.hits)
+    def _emit(self, odata):
+        """Stores the mean profile of each bin and resets the accumulator"""
+        accum = self.accum.view(np.ndarray)
+        hits  = self.hits.view(np.ndarray)
+        np.divide(accum, np.maximum(hits, 1), out=odata.view(np.ndarray))
+        accum[...] = 0
+        hits[...]  = 0
+    def on_data(self, ispan, ospan):
+        idata = ispan.data.transpose(self.axes)
+        odata = ospan.data
+        nframe = ispan.nframe
+        begin = 0
+        ncommit = 0
+        while begin < nframe:
+            end = min(begin + self.nframe_subint - self.frame_count, nframe)
+            self._fold(idata[begin:end], ispan.frame_offset + begin)
+            self.frame_count += end - begin
+            if self.frame_count == self.nframe_subint:
+                self._emit(odata[ncommit])
+                self.frame_count = 0
+                ncommit += 1
+            begin = end
+        return ncommit
+
+def fold(iring, period, nbin, dm=0., subint=1., epoch=None,
+         *args, **kwargs):
+    """Fold a multi-channel time series at a fixed period into sub-integrated
+    pulse profiles.
+
+    Each channel is folded into ``nbin`` phase bins after removing its
+    dispersion delay, and the mean profile of every ``subint`` seconds of
+    data is output as one frame, in the 'pulseprofile' layout written by
+    ``bifrost.blocks.write_sigproc`` (which writes the profiles of
+    dedispersed input to one file per dispersion measure trial).
+
+    Args:
+        iring (Ring or Block): Input data source.
+        period (float): Folding period (s).
+        nbin (int): Number of phase bins.
+        dm (float): Dispersion measure (pc cm^-3) used to align the phases of
+            the channels. Must be 0 for dedispersed input.
+        subint (float): Length of each output sub-integration (s). It is
+            rounded to a whole number of input frames.
+        epoch (float): Time (s), in the reference of the input's time axis,
+            at which the phase is zero. Defaults to the start of each
+            sequence.
+        *args: Arguments to ``bifrost.pipeline.TransformBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.TransformBlock``.
+
+    **Tensor semantics**::
+
+        Input:  ['time', 'pol', 'freq'], dtype = f32, space = SYSTEM
+        Output: ['time', 'pol', 'freq', 'phase'], dtype = f32, space = SYSTEM
+
+        Input:  ['dispersion', 'time', 'pol'], dtype = f32, space = SYSTEM
+        Output: ['time', 'pol', 'dispersion', 'phase'], dtype = f32,
+                space = SYSTEM
+
+    Returns:
+        FoldBlock: A new block instance.
+
+    Note:
+        The input axes may be in any order. Delays are relative to the
+        highest frequency in the band, and bins that no samples fell in are
+        output as zero. Any incomplete sub-integration at the end of a
+        sequence is dropped.
+    """
+    return FoldBlock(iring, period, nbin, dm, subint, epoch, *args, **kwargs)
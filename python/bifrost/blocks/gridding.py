@@ -0,0 +1,166 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import bifrost as bf
+import bifrost.gridding
+from bifrost.pipeline import TransformBlock
+from bifrost.units import convert_units
+
+from copy import deepcopy
+import numpy as np
+
+class GridVisibilitiesBlock(TransformBlock):
+    def __init__(self, iring, ngrid, cell_size=None, support=7,
+                 noversample=64, uvw=None, *args, **kwargs):
+        super(GridVisibilitiesBlock, self).__init__(iring, *args, **kwargs)
+        if ngrid <= support:
+            raise ValueError("Grid must be larger than the kernel support")
+        self.ngrid       = ngrid
+        self.cell_size   = cell_size
+        self.kernel      = bf.ndarray(bf.gridding.kaiser_bessel_kernel(
+                                          support, noversample),
+                                      space='system')
+        self.support     = support
+        self.uvw         = uvw
+        self.light_speed = 299792458. # m/s
+    def define_valid_input_spaces(self):
+        """Return set of valid spaces (or 'any') for each input"""
+        return ('system',)
+    def on_sequence(self, iseq):
+        ihdr = iseq.header
+        itensor = ihdr['_tensor']
+        if str(itensor['dtype']) != 'cf32':
+            raise TypeError("Input data must be cf32")
+        labels = itensor['labels']
+        if itensor['shape'][0] != -1:
+            raise KeyError("Frame axis must be the first axis")
+        if sorted(labels[1:]) not in (['baseline', 'freq'],
+                                      ['baseline', 'freq', 'pol']):
+            raise KeyError("Input axes must be time, baseline, freq and "
+                           "(optionally) pol")
+        self.axes = [labels.index('baseline') - 1, labels.index('freq') - 1]
+        if 'pol' in labels:
+            self.axes.append(labels.index('pol') - 1)
+        nbaseline = itensor['shape'][labels.index('baseline')]
+        ifreq = labels.index('freq')
+        nchan = itensor['shape'][ifreq]
+        f0_, df_ = itensor['scales'][ifreq]
+        f0 = convert_units(f0_, itensor['units'][ifreq], 'Hz')
+        df = convert_units(df_, itensor['units'][ifreq], 'Hz')
+        freqs = f0 + df * np.arange(nchan)
+        uvw = self.uvw if self.uvw is not None else ihdr.get('uvw')
+        if uvw is None:
+            raise KeyError("Sequence header must contain 'uvw' unless it is "
+                           "given to the block")
+        uvw = np.array(uvw, dtype=np.float64)
+        if uvw.shape != (nbaseline, 3):
+            raise ValueError("uvw must have shape (%i, 3)" % nbaseline)
+        # Note: (u,v) are in wavelengths; w is ignored
+        uv = uvw[:, None, :2] * freqs[None, :, None] / self.light_speed
+        cell_size = self.cell_size
+        if cell_size is None:
+            # Fit the longest baseline (and its kernel) inside the grid
+            uvmax = np.nanmax(np.abs(uv))
+            cell_size = uvmax / (self.ngrid // 2 - self.support) \
+                        if uvmax > 0 else 1.
+        self.uv = bf.ndarray(uv / cell_size + self.ngrid // 2,
+                             dtype='f32', space='system')
+        
+        npol = itensor['shape'][labels.index('pol')] if 'pol' in labels else 1
+        iunits  = itensor['units']
+        iscales = itensor['scales']
+        ipol = labels.index('pol') if 'pol' in labels else None
+        uvscale = [-(self.ngrid // 2) * cell_size, cell_size]
+        ohdr = deepcopy(ihdr)
+        ohdr.pop('uvw', None)
+        otensor = ohdr['_tensor']
+        otensor['shape']  = [-1, npol, self.ngrid, self.ngrid]
+        otensor['labels'] = ['time', 'pol', 'v', 'u']
+        otensor['scales'] = [iscales[0],
+                             iscales[ipol] if ipol is not None else None,
+                             uvscale, uvscale]
+        otensor['units']  = [iunits[0],
+                             iunits[ipol] if ipol is not None else None,
+                             None, None]
+        ohdr['cell_size'] = cell_size
+        return ohdr
+    def on_data(self, ispan, ospan):
+        idata = ispan.data.view(np.ndarray)
+        odata = ospan.data.view(np.ndarray)
+        for t in xrange(ispan.nframe):
+            vis = idata[t].transpose(self.axes)
+            if vis.ndim == 2:
+                vis = vis[..., None]
+            bf.gridding.grid(vis, self.uv, self.kernel, odata[t])
+
+def grid_visibilities(iring, ngrid, cell_size=None, support=7, noversample=64,
+                      uvw=None, *args, **kwargs):
+    """Convolve visibilities onto a regular uv grid, giving one grid per
+    integration.
+
+    Each visibility is gridded with an oversampled Kaiser-Bessel
+    anti-aliasing kernel at the (u,v) position given by its baseline's
+    coordinates and its frequency. The CPU scatter is split into strips of
+    grid rows over which the visibilities are sorted, so no atomic
+    operations are needed. The image is the inverse 2D FFT of the grid
+    (e.g., using bifrost.blocks.fft with axes ['v', 'u']).
+
+    Args:
+        iring (Ring or Block): Input data source.
+        ngrid (int): Number of grid cells along each of u and v.
+        cell_size (float): Size of a grid cell, in wavelengths. Defaults to
+            the size that just fits the longest baseline at the highest
+            frequency.
+        support (int): Width of the gridding kernel, in cells.
+        noversample (int): Number of sub-cell offsets at which the kernel is
+            tabulated.
+        uvw (array): Baseline coordinates [baseline, (u,v,w)] in metres.
+            Defaults to the 'uvw' entry of the sequence header.
+        *args: Arguments to ``bifrost.pipeline.TransformBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.TransformBlock``.
+
+    **Tensor semantics**::
+
+        Input:  ['time', 'baseline', 'freq', 'pol'], dtype = cf32,
+                space = SYSTEM (the axes may be in any order after time,
+                and the pol axis is optional)
+        Output: ['time', 'pol', 'v', 'u'], dtype = cf32, space = SYSTEM
+
+    Returns:
+        GridVisibilitiesBlock: A new block instance.
+
+    Note:
+        The grid is centred on cell (ngrid//2, ngrid//2), and the cell size
+        is stored in the 'cell_size' header entry. The w term is ignored,
+        and the Hermitian conjugate visibilities are not gridded. Kernel
+        cells that fall outside the grid are dropped, and visibilities with
+        a NaN uvw are skipped.
+    """
+    return GridVisibilitiesBlock(iring, ngrid, cell_size, support, noversample,
+                                 uvw, *args, **kwargs)
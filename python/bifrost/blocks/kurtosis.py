@@ -0,0 +1,135 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import
+
+import bifrost as bf
+import bifrost.kurtosis
+from bifrost.pipeline import TransformBlock
+from bifrost.proclog import ProcLog
+
+from copy import deepcopy
+import numpy as np
+
+def _frame_slice(data, frame_axis, begin, end):
+    return data[(slice(None),)*frame_axis + (slice(begin, end),)]
+
+class SpectralKurtosisBlock(TransformBlock):
+    def __init__(self, iring, nframe_window, nsigma=3., nd=1., lower=None,
+                 upper=None, replacement=0., *args, **kwargs):
+        super(SpectralKurtosisBlock, self).__init__(iring, *args, **kwargs)
+        if nframe_window < 2:
+            raise ValueError("Windows must contain at least 2 frames")
+        self.nframe_window = nframe_window
+        self.nd = nd
+        default_lower, default_upper = bf.kurtosis.spectral_kurtosis_bounds(
+            nframe_window, nd, nsigma)
+        self.lower = default_lower if lower is None else lower
+        self.upper = default_upper if upper is None else upper
+        self.replacement = replacement
+        self.flag_proclog = ProcLog(self.name + "/kurtosis")
+    def define_valid_input_spaces(self):
+        """Return set of valid spaces (or 'any') for each input"""
+        return ('system',)
+    def on_sequence(self, iseq):
+        ihdr = iseq.header
+        itensor = ihdr['_tensor']
+        if str(itensor['dtype']) != 'f32':
+            raise TypeError("Input data must be f32 power")
+        self.frame_axis = itensor['shape'].index(-1)
+        gulp_nframe = self.gulp_nframe or ihdr['gulp_nframe']
+        if gulp_nframe % self.nframe_window != 0:
+            raise ValueError("Window size does not divide gulp size")
+        sk_shape = list(itensor['shape'])
+        sk_shape[self.frame_axis] = gulp_nframe // self.nframe_window
+        self.sk = bf.ndarray(shape=sk_shape, dtype='f32', space='system')
+        self.flagged_fraction = None
+        return deepcopy(ihdr)
+    def on_data(self, ispan, ospan):
+        idata = ispan.data
+        odata = ospan.data
+        nwindow = ispan.nframe // self.nframe_window
+        nframe  = nwindow * self.nframe_window
+        nflagged = 0
+        if nwindow:
+            sk = _frame_slice(self.sk, self.frame_axis, 0, nwindow)
+            bf.kurtosis.spectral_kurtosis(
+                _frame_slice(idata, self.frame_axis, 0, nframe), sk,
+                _frame_slice(odata, self.frame_axis, 0, nframe),
+                self.nd, self.lower, self.upper, self.replacement)
+            nflagged = np.count_nonzero((sk < self.lower) | (sk > self.upper))
+        if nframe < ispan.nframe:
+            # Note: Frames that do not fill a window are passed through
+            _frame_slice(odata, self.frame_axis, nframe, ispan.nframe)[...] = \
+                _frame_slice(idata, self.frame_axis, nframe, ispan.nframe)
+        nsk = nwindow * (self.sk.size // self.sk.shape[self.frame_axis])
+        self.flagged_fraction = nflagged / float(nsk) if nsk else 0.
+        self.flag_proclog.update({'nwindow':          nsk,
+                                  'nflagged':         nflagged,
+                                  'flagged_fraction': self.flagged_fraction})
+
+def spectral_kurtosis(iring, nframe_window, nsigma=3., nd=1., lower=None,
+                      upper=None, replacement=0., *args, **kwargs):
+    """Flag RFI using the generalized spectral kurtosis of windows of frames.
+
+    The kurtosis of each element (e.g., channel) is computed over windows of
+    ``nframe_window`` consecutive frames, and windows whose kurtosis falls
+    outside the bounds are replaced in the output (Nita & Gary 2010).
+
+    Args:
+        iring (Ring or Block): Input data source.
+        nframe_window (int): Number of frames in each window.
+        nsigma (float): Distance of the default bounds from the expected
+            kurtosis of 1, in units of the estimator's standard deviation.
+        nd (float): Number of spectra averaged into each input sample times
+            the shape parameter of their distribution (1 for the power of
+            complex voltages).
+        lower (float): Lower bound on the kurtosis, overriding nsigma.
+        upper (float): Upper bound on the kurtosis, overriding nsigma.
+        replacement (float): Value written to flagged samples.
+        *args: Arguments to ``bifrost.pipeline.TransformBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.TransformBlock``.
+
+    **Tensor semantics**::
+
+        Input:  [..., time, ...], dtype = f32, space = SYSTEM
+        Output: [..., time, ...], dtype = f32, space = SYSTEM
+
+    Returns:
+        SpectralKurtosisBlock: A new block instance.
+
+    Note:
+        The default bounds assume the kurtosis is normally distributed, but
+        it is positively skewed for short windows, so the upper bound flags
+        more clean data than the lower one. The fraction of windows flagged
+        in the latest gulp is available as the block's ``flagged_fraction``
+        attribute, and in its 'kurtosis' ProcLog. Frames at the end of a
+        sequence that do not fill a window are not flagged.
+    """
+    return SpectralKurtosisBlock(iring, nframe_window, nsigma, nd, lower,
+                                 upper, replacement, *args, **kwargs)
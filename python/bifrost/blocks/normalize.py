@@ -0,0 +1,127 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import
+
+import bifrost as bf
+import bifrost.normalize
+from bifrost.pipeline import TransformBlock
+
+from copy import deepcopy
+import numpy as np
+
+class NormalizeBlock(TransformBlock):
+    def __init__(self, iring, nframe_window, robust=True, *args, **kwargs):
+        super(NormalizeBlock, self).__init__(iring, *args, **kwargs)
+        if nframe_window < 1:
+            raise ValueError("Window must contain at least 1 frame")
+        self.alpha  = 1. / nframe_window
+        self.robust = robust
+    def define_valid_input_spaces(self):
+        """Return set of valid spaces (or 'any') for each input"""
+        return ('system',)
+    def on_sequence(self, iseq):
+        ihdr = iseq.header
+        itensor = ihdr['_tensor']
+        if str(itensor['dtype']) != 'f32':
+            raise TypeError("Input data must be f32")
+        self.frame_axis = itensor['shape'].index(-1)
+        state_shape = list(itensor['shape'])
+        del state_shape[self.frame_axis]
+        self.center = bf.ndarray(shape=state_shape, dtype='f32',
+                                 space='system')
+        self.scale  = bf.ndarray(shape=state_shape, dtype='f32',
+                                 space='system')
+        self.initialized = False
+        return deepcopy(ihdr)
+    def _init_state(self, idata):
+        """Initialises the estimates from the first gulp of a sequence"""
+        idata = idata.view(np.ndarray)
+        center = np.median(idata, axis=self.frame_axis)
+        if self.robust:
+            dev = np.abs(idata - np.expand_dims(center, self.frame_axis))
+            scale = 1.4826 * np.median(dev, axis=self.frame_axis)
+        else:
+            center = idata.mean(axis=self.frame_axis)
+            scale  = idata.std(axis=self.frame_axis)
+        self.center.view(np.ndarray)[...] = center
+        self.scale.view(np.ndarray)[...]  = scale
+        self.initialized = True
+    def on_data(self, ispan, ospan):
+        idata = ispan.data.view(np.ndarray)
+        odata = ospan.data.view(np.ndarray)
+        nframe = ispan.nframe
+        if nframe == 0:
+            return
+        if not self.initialized:
+            self._init_state(idata)
+        center = self.center.view(np.ndarray)
+        scale  = self.scale.view(np.ndarray)
+        # Note: Each slice before the frame axis is a separate set of
+        #         [time, series] series
+        for idx in np.ndindex(*idata.shape[:self.frame_axis]):
+            bf.normalize.running_normalize(idata[idx].reshape(nframe, -1),
+                                           odata[idx].reshape(nframe, -1),
+                                           center[idx].reshape(-1),
+                                           scale[idx].reshape(-1),
+                                           self.alpha, self.robust)
+
+def normalize(iring, nframe_window, robust=True, *args, **kwargs):
+    """Subtract a running baseline from each element (e.g., channel) and
+    divide by its running RMS.
+
+    The estimates are updated after every frame with a time constant of
+    ``nframe_window`` frames, at a constant cost per sample, and are
+    carried across gulps. Each frame is normalised by the estimates from
+    the frames before it.
+
+    Args:
+        iring (Ring or Block): Input data source.
+        nframe_window (int): Time constant (in frames) of the running
+            estimates.
+        robust (bool): If True, track the median and the mean absolute
+            deviation (with deviations clipped at 3 times the RMS) instead of
+            the mean and variance, so that pulses and RFI have little effect
+            on the baseline.
+        *args: Arguments to ``bifrost.pipeline.TransformBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.TransformBlock``.
+
+    **Tensor semantics**::
+
+        Input:  [..., time, ...], dtype = f32, space = SYSTEM
+        Output: [..., time, ...], dtype = f32, space = SYSTEM
+
+    Returns:
+        NormalizeBlock: A new block instance.
+
+    Note:
+        The estimates are initialised from the median and MAD (or the mean
+        and standard deviation) of the first gulp of each sequence.
+        Elements with zero RMS are output as zero.
+    """
+    return NormalizeBlock(iring, nframe_window, robust, *args, **kwargs)
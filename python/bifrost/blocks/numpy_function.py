@@ -0,0 +1,156 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import
+
+import numpy as np
+from bifrost.pipeline import MultiTransformBlock
+
+from copy import deepcopy
+from multiprocessing.pool import ThreadPool
+
+def _frame_slice(data, frame_axis, begin, end):
+    """Returns a view of data restricted to frames [begin,end)"""
+    return data[(slice(None),)*frame_axis + (slice(begin, end),)]
+
+class NumpyFunctionBlock(MultiTransformBlock):
+    def __init__(self, irings, func, ohdr_func=None, noutput=None, nthread=1,
+                 *args, **kwargs):
+        if not isinstance(irings, (list, tuple)):
+            irings = [irings]
+        if noutput is None:
+            noutput = len(irings)
+        if ohdr_func is None and noutput != len(irings):
+            raise ValueError("ohdr_func must be given when the number of "
+                             "outputs differs from the number of inputs")
+        super(NumpyFunctionBlock, self).__init__(irings, *args, **kwargs)
+        self.func      = func
+        self.ohdr_func = ohdr_func
+        self.orings    = [self.create_ring(space='system')
+                          for _ in xrange(noutput)]
+        self.nthread   = nthread
+        self.pool      = None
+    def _define_valid_input_spaces(self):
+        return [('system',)] * len(self.irings)
+    def define_output_nframes(self, input_nframes):
+        return [input_nframes[0]] * len(self.orings)
+    def on_sequence(self, iseqs):
+        iheaders = [deepcopy(iseq.header) for iseq in iseqs]
+        if self.ohdr_func is None:
+            oheaders = iheaders
+        else:
+            oheaders = self.ohdr_func(iheaders)
+            if isinstance(oheaders, dict):
+                oheaders = [oheaders]
+        if len(oheaders) != len(self.orings):
+            raise ValueError("ohdr_func returned %i headers for %i outputs" %
+                             (len(oheaders), len(self.orings)))
+        self.iframe_axes = [ihdr['_tensor']['shape'].index(-1)
+                            for ihdr in iheaders]
+        self.oframe_axes = [ohdr['_tensor']['shape'].index(-1)
+                            for ohdr in oheaders]
+        if self.nthread > 1:
+            self.pool = ThreadPool(self.nthread)
+        return oheaders, None
+    def on_sequence_end(self, iseqs):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+    def _call(self, idatas, odatas):
+        if len(odatas) == 0:
+            self.func(*idatas)
+        elif len(odatas) == 1:
+            self.func(*idatas, out=odatas[0])
+        else:
+            self.func(*idatas, out=tuple(odatas))
+    def _call_chunk(self, args):
+        self._call(*args)
+    def on_data(self, ispans, ospans):
+        nframe = ispans[0].nframe
+        # Note: The functions see plain numpy views of the span memory, and
+        #         write their results directly into the output spans.
+        idatas = [_frame_slice(ispan.data.view(np.ndarray), axis,
+                               0, ispan.nframe)
+                  for ispan, axis in zip(ispans, self.iframe_axes)]
+        odatas = [_frame_slice(ospan.data.view(np.ndarray), axis, 0, nframe)
+                  for ospan, axis in zip(ospans, self.oframe_axes)]
+        if self.pool is None or nframe < self.nthread:
+            self._call(idatas, odatas)
+        else:
+            # Split the gulp into contiguous blocks of frames, one per thread
+            bounds = np.linspace(0, nframe, self.nthread+1).astype(int)
+            chunks = [([_frame_slice(data, axis, begin, end)
+                        for data, axis in zip(idatas, self.iframe_axes)],
+                       [_frame_slice(data, axis, begin, end)
+                        for data, axis in zip(odatas, self.oframe_axes)])
+                      for begin, end in zip(bounds[:-1], bounds[1:])]
+            self.pool.map(self._call_chunk, chunks)
+        return [nframe] * len(ospans)
+
+def numpy_function(irings, func, ohdr_func=None, noutput=None, nthread=1,
+                   *args, **kwargs):
+    """Apply a numpy function to each gulp of data, writing the result
+    directly into the output spans.
+
+    The function is called as ``func(*idata, out=odata)``, where idata
+    are numpy views of the input spans and odata is a view of the output
+    span (or a tuple of views if there are several outputs), in the same
+    way as a numpy ufunc. No arrays are allocated or copied per gulp
+    unless the function itself does so. If there are no outputs, the
+    function is called as ``func(*idata)``.
+
+    Args:
+        irings (Ring, Block or list): Input data source(s).
+        func (callable): Function writing its results into ``out``. When
+            nthread > 1, it must treat each frame independently.
+        ohdr_func (callable): Function taking the list of input headers and
+            returning the output header (or list of headers). Defaults to
+            copying the input headers, for functions that preserve the
+            shape and dtype of their inputs.
+        noutput (int): Number of outputs. Defaults to the number of inputs.
+        nthread (int): Number of threads among which to split each gulp
+            (along the frame axis). This only helps for functions that
+            release the GIL, such as most numpy ufuncs.
+        *args: Arguments to ``bifrost.pipeline.MultiTransformBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.MultiTransformBlock``.
+
+    **Tensor semantics**::
+
+        Input:  [...], dtype = any, space = SYSTEM (for each input)
+        Output: [...], dtype = any, space = SYSTEM (for each output)
+
+    Returns:
+        NumpyFunctionBlock: A new block instance.
+
+    Note:
+        All inputs must be read in gulps of the same number of frames, and
+        each output gulp has this same number of frames.
+    """
+    return NumpyFunctionBlock(irings, func, ohdr_func, noutput, nthread,
+                              *args, **kwargs)
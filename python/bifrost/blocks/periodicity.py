@@ -0,0 +1,202 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import
+
+import bifrost as bf
+import bifrost.harmonic
+from bifrost.pipeline import TransformBlock
+from bifrost.proclog import ProcLog
+from bifrost.units import convert_units
+
+from copy import deepcopy
+import numpy as np
+
+CANDIDATE_PROPERTIES = ['dm', 'time', 'frequency', 'nharmonic', 'sigma']
+
+class PeriodicitySearchBlock(TransformBlock):
+    def __init__(self, iring, nfft, max_nharmonic=16, ncandidate=10,
+                 threshold=None, *args, **kwargs):
+        super(PeriodicitySearchBlock, self).__init__(iring, *args, **kwargs)
+        if max_nharmonic < 1 or max_nharmonic & (max_nharmonic - 1):
+            raise ValueError("max_nharmonic must be a power of 2")
+        self.nfft          = nfft
+        self.max_nharmonic = max_nharmonic
+        self.ncandidate    = ncandidate
+        self.threshold     = threshold
+        self.search_proclog = ProcLog(self.name + "/search")
+    def define_valid_input_spaces(self):
+        """Return set of valid spaces (or 'any') for each input"""
+        return ('system',)
+    def define_output_nframes(self, input_nframe):
+        """Return output nframe for each output, given input_nframes.
+        """
+        return self.ndm * self.ncandidate
+    def on_sequence(self, iseq):
+        ihdr = iseq.header
+        itensor = ihdr['_tensor']
+        if str(itensor['dtype']) != 'f32':
+            raise TypeError("Input data must be f32")
+        labels = list(itensor['labels'])
+        if 'dispersion' not in labels or 'time' not in labels:
+            raise ValueError("Expected input axes 'dispersion' and 'time', "
+                             "not " + str(labels))
+        dm_axis   = labels.index('dispersion')
+        time_axis = labels.index('time')
+        self.axes = [dm_axis, time_axis]
+        for axis in xrange(len(labels)):
+            if axis not in self.axes:
+                if itensor['shape'][axis] != 1:
+                    raise ValueError("Expected a single polarization, not "
+                                     "'%s' of length %i" %
+                                     (labels[axis], itensor['shape'][axis]))
+                self.axes.append(axis)
+        if itensor['shape'][time_axis] != -1:
+            raise ValueError("Expected 'time' to be the frame axis")
+        self.ndm = itensor['shape'][dm_axis]
+        self.dm0, self.ddm = itensor['scales'][dm_axis]
+        self.t0,  self.dt  = itensor['scales'][time_axis]
+        dt = convert_units(self.dt, itensor['units'][time_axis], 's')
+        self.df = 1. / (self.nfft * dt)
+        nfreq = self.nfft // 2 + 1
+        self.power     = bf.ndarray(shape=(self.ndm, nfreq), dtype='f32',
+                                    space='system')
+        self.sigma     = bf.ndarray(shape=(self.ndm, nfreq), dtype='f32',
+                                    space='system')
+        self.nharmonic = bf.ndarray(shape=(self.ndm, nfreq), dtype='i32',
+                                    space='system')
+        ohdr = deepcopy(ihdr)
+        otensor = ohdr['_tensor']
+        otensor['dtype']  = 'f64'
+        otensor['shape']  = [-1, len(CANDIDATE_PROPERTIES)]
+        otensor['labels'] = ['candidate', 'property']
+        otensor['scales'] = [None, None]
+        otensor['units']  = [None, None]
+        ohdr['candidate_properties'] = CANDIDATE_PROPERTIES
+        ohdr['candidate_units'] = [itensor['units'][dm_axis],
+                                   itensor['units'][time_axis],
+                                   'Hz', None, None]
+        ohdr['nfft'] = self.nfft
+        # Note: Each gulp is one (non-overlapping) segment
+        return ohdr, slice(0, self.nfft, self.nfft)
+    def _compute_power(self, idata):
+        """Computes the power spectra, normalised to a mean of 1 for noise"""
+        spectra = np.fft.rfft(idata, axis=1)
+        power = self.power.view(np.ndarray)
+        power[...] = spectra.real**2 + spectra.imag**2
+        # Note: The median of exponentially-distributed (noise) powers is
+        #         ln(2) times their mean, and is robust to strong signals
+        median = np.median(power[:, 1:], axis=1)
+        median[median == 0] = 1
+        power /= (median / np.log(2))[:, None]
+    def _find_candidates(self):
+        """Returns the (dm index, frequency bin) of the top candidates of
+        each DM, ignoring frequencies that are not local peaks"""
+        sigma = self.sigma.view(np.ndarray)
+        padded = np.pad(sigma, ((0, 0), (1, 1)), 'constant',
+                        constant_values=-np.inf)
+        peaks = np.where((sigma >= padded[:, :-2]) & (sigma > padded[:, 2:]),
+                         sigma, -np.inf)
+        peaks[:, 0] = -np.inf # Ignore the DC bin
+        ncandidate = min(self.ncandidate, peaks.shape[1])
+        bins = np.argpartition(-peaks, ncandidate - 1, axis=1)[:, :ncandidate]
+        dms = np.arange(self.ndm)[:, None].repeat(ncandidate, axis=1)
+        dms, bins = dms.ravel(), bins.ravel()
+        keep = peaks[dms, bins] > -np.inf
+        if self.threshold is not None:
+            keep &= peaks[dms, bins] >= self.threshold
+        dms, bins = dms[keep], bins[keep]
+        order = np.lexsort((-sigma[dms, bins], dms))
+        return dms[order], bins[order]
+    def on_data(self, ispan, ospan):
+        if ispan.nframe < self.nfft:
+            # Note: Incomplete segments at the end of a sequence are ignored
+            return 0
+        idata = ispan.data.transpose(self.axes)
+        idata = idata.reshape(idata.shape[:2]).view(np.ndarray)
+        self._compute_power(idata)
+        bf.harmonic.harmonic_sum(self.power, self.sigma, self.nharmonic,
+                                 self.max_nharmonic)
+        dms, bins = self._find_candidates()
+        ncand = len(dms)
+        odata = ospan.data.view(np.ndarray)
+        odata[:ncand, 0] = self.dm0 + dms * self.ddm
+        odata[:ncand, 1] = self.t0 + ispan.frame_offset * self.dt
+        odata[:ncand, 2] = bins * self.df
+        odata[:ncand, 3] = self.nharmonic.view(np.ndarray)[dms, bins]
+        odata[:ncand, 4] = self.sigma.view(np.ndarray)[dms, bins]
+        max_sigma = float(odata[:ncand, 4].max()) if ncand else 0.
+        self.search_proclog.update({'ncandidate': ncand,
+                                    'max_sigma':  max_sigma})
+        return ncand
+
+def periodicity_search(iring, nfft, max_nharmonic=16, ncandidate=10,
+                       threshold=None, *args, **kwargs):
+    """Search dedispersed time series for periodic signals using power
+    spectra and incoherent harmonic summing.
+
+    Each DM trial is divided into segments of ``nfft`` frames, and the power
+    spectrum of each segment is normalised by its median. The powers of the
+    harmonics of each fundamental frequency are summed for 1, 2, 4, ... up to
+    ``max_nharmonic`` harmonics, and the most significant peaks of each DM
+    trial are output as candidates.
+
+    Args:
+        iring (Ring or Block): Input data source.
+        nfft (int): Number of frames in each segment.
+        max_nharmonic (int): Maximum number of harmonics to sum (a power of
+            2, typically 16 or 32).
+        ncandidate (int): Number of candidates output per DM trial for each
+            segment.
+        threshold (float): Minimum significance (in Gaussian sigma) of a
+            candidate. If None, the top ``ncandidate`` peaks are always
+            output.
+        *args: Arguments to ``bifrost.pipeline.TransformBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.TransformBlock``.
+
+    **Tensor semantics**::
+
+        Input:  ['dispersion', 'time', 'pol'], dtype = f32, space = SYSTEM
+        Output: ['candidate', 'property'], dtype = f64, space = SYSTEM
+
+    Returns:
+        PeriodicitySearchBlock: A new block instance.
+
+    Note:
+        The input axes may be in any order, and the 'pol' axis, if any, must
+        have length 1. The properties of each candidate are its DM, the
+        start time of its segment, its fundamental frequency (Hz), the number
+        of harmonics summed and its significance, as listed in the
+        'candidate_properties' header entry. Candidates are ordered by DM and
+        then by decreasing significance. The significance assumes white
+        noise, so red noise should be removed first (e.g., by subtracting a
+        running baseline). Any incomplete segment at the end of a sequence
+        is ignored.
+    """
+    return PeriodicitySearchBlock(iring, nfft, max_nharmonic, ncandidate,
+                                  threshold, *args, **kwargs)
@@ -0,0 +1,191 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import bifrost as bf
+import bifrost.pfb
+from bifrost.pipeline import TransformBlock
+from bifrost.units import transform_units
+
+from copy import deepcopy
+import numpy as np
+
+def _prototype_filter(nbranch, ntap, window):
+    """Returns the windowed-sinc prototype filter as an [ntap, nbranch]
+    array, normalised to unit DC gain in each branch"""
+    n = np.arange(ntap * nbranch)
+    h = np.sinc((n - 0.5 * (len(n) - 1)) / float(nbranch))
+    if window is not None:
+        h *= getattr(np, window)(len(n))
+    h *= nbranch / h.sum()
+    return h.reshape(ntap, nbranch).astype(np.float32)
+
+class PfbBlock(TransformBlock):
+    def __init__(self, iring, axis, ntap=4, window='hamming', fft=True,
+                 axis_label=None, apply_fftshift=False, *args, **kwargs):
+        super(PfbBlock, self).__init__(iring, *args, **kwargs)
+        if ntap < 1:
+            raise ValueError("Filter must have at least 1 tap")
+        if window not in (None, 'hamming', 'hanning', 'blackman',
+                          'bartlett'):
+            raise ValueError("Unknown window: %s" % window)
+        if apply_fftshift and not fft:
+            raise ValueError("apply_fftshift requires fft=True")
+        self.specified_axis = axis
+        self.ntap           = ntap
+        self.window         = window
+        self.fft            = fft
+        self.axis_label     = axis_label
+        self.apply_fftshift = apply_fftshift
+    def define_valid_input_spaces(self):
+        """Return set of valid spaces (or 'any') for each input"""
+        return ('system',)
+    def on_sequence(self, iseq):
+        ihdr = iseq.header
+        itensor = ihdr['_tensor']
+        itype = str(itensor['dtype'])
+        if itype not in ('f32', 'cf32'):
+            raise TypeError("Input data must be f32 or cf32")
+        self.frame_axis = itensor['shape'].index(-1)
+        axis = self.specified_axis
+        if isinstance(axis, basestring):
+            axis = itensor['labels'].index(axis)
+        if axis <= self.frame_axis:
+            raise ValueError("Channelised axis must follow the frame axis; "
+                           "split the frame axis first")
+        self.axis = axis
+        nbranch = itensor['shape'][axis]
+        self.coeffs = bf.ndarray(_prototype_filter(nbranch, self.ntap,
+                                                   self.window),
+                                 space='system')
+        self.real_input = itype == 'f32'
+        if self.apply_fftshift and self.real_input:
+            raise ValueError("apply_fftshift is only supported for complex "
+                             "input")
+        
+        ohdr = deepcopy(ihdr)
+        otensor = ohdr['_tensor']
+        if self.fft:
+            otensor['dtype'] = 'cf32'
+            if self.real_input:
+                otensor['shape'][axis] = nbranch // 2 + 1
+            units = otensor.get('units')
+            if units is not None and units[axis] is not None:
+                units[axis] = transform_units(units[axis], -1)
+            scales = otensor.get('scales')
+            if scales is not None and scales[axis] is not None:
+                scales[axis] = [0, 1. / (scales[axis][1] * nbranch)]
+        if 'labels' in otensor and self.axis_label is not None:
+            otensor['labels'][axis] = self.axis_label
+        gulp_nframe = self.gulp_nframe or ihdr['gulp_nframe']
+        return ohdr, slice(0, gulp_nframe + self.ntap - 1, gulp_nframe)
+    def _filter(self, idata, odata):
+        """Applies the FIR filter to each set of [time, branch] series"""
+        axis = self.axis - self.frame_axis
+        nframe = idata.shape[self.frame_axis]
+        nout   = odata.shape[self.frame_axis]
+        nbranch = idata.shape[self.axis]
+        # Note: Each slice before the frame axis and between the frame and
+        #         channelised axes is separate; the axes after it are
+        #         contiguous and are merged
+        for idx in np.ndindex(*idata.shape[:self.frame_axis]):
+            for jdx in np.ndindex(*idata.shape[self.frame_axis + 1:
+                                               self.axis]):
+                sub = idx + (slice(None),) + jdx
+                bf.pfb.pfb_fir(idata[sub].reshape(nframe, nbranch, -1),
+                               self.coeffs,
+                               odata[sub].reshape(nout, nbranch, -1))
+    def on_data(self, ispan, ospan):
+        if ispan.nframe < self.ntap:
+            # Cannot fully process any frames
+            return 0
+        nout  = ispan.nframe - self.ntap + 1
+        idata = ispan.data.view(np.ndarray)
+        odata = ospan.data.view(np.ndarray)
+        frames = (slice(None),) * self.frame_axis + (slice(0, nout),)
+        if not self.fft:
+            self._filter(idata, odata[frames])
+            return nout
+        # TODO: Use bifrost.fft.Fft for this stage once it supports the
+        #         system space
+        fdata = np.empty(idata[frames].shape, dtype=idata.dtype)
+        self._filter(idata, fdata)
+        if self.real_input:
+            fdata = np.fft.rfft(fdata, axis=self.axis)
+        else:
+            fdata = np.fft.fft(fdata, axis=self.axis)
+            if self.apply_fftshift:
+                fdata = np.fft.fftshift(fdata, axes=self.axis)
+        odata[frames] = fdata
+        return nout
+
+def pfb(iring, axis, ntap=4, window='hamming', fft=True, axis_label=None,
+        apply_fftshift=False, *args, **kwargs):
+    """Channelise the data using a polyphase filterbank (PFB).
+
+    Each frame holds one block of samples along ``axis`` (usually made by
+    splitting the time axis using bifrost.views.split_axis). The frames are
+    filtered by a windowed-sinc FIR filter spanning ``ntap`` frames, which
+    gives flatter channels with far less leakage between them than a plain
+    FFT, and then Fourier transformed along ``axis``.
+
+    Args:
+        iring (Ring or Block): Input data source.
+        axis (int or str): Axis (or label) of the samples to channelise.
+        ntap (int): Number of taps (frames) of the FIR filter.
+        window (str): Window applied to the sinc filter; one of
+            'hamming', 'hanning', 'blackman', 'bartlett', or None.
+        fft (bool): If False, output the filtered frames without Fourier
+            transforming them, e.g., so that the transform can be done on
+            the GPU using bifrost.blocks.fft.
+        axis_label (str): New label for the channelised axis. If None, the
+            label is copied from the input.
+        apply_fftshift (bool): If True, the zero-frequency channel is shifted
+            to the center of the axis. Requires complex input and
+            fft=True.
+        *args: Arguments to ``bifrost.pipeline.TransformBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.TransformBlock``.
+
+    **Tensor semantics**::
+
+        Input:  [..., time, ..., branch, ...], dtype = f32 or cf32,
+                space = SYSTEM
+        Output: [..., time, ..., freq, ...], dtype = cf32, space = SYSTEM
+
+    Returns:
+        PfbBlock: A new block instance.
+
+    Note:
+        Output frame t is made from input frames t to t+ntap-1, so each gulp
+        overlaps the next by ntap-1 frames and the first ntap-1 frames do
+        not produce output. Real input gives nbranch//2+1 channels, as for
+        bifrost.blocks.fft. The filter is normalised to unit DC gain in each
+        branch, and the transform is unnormalised.
+    """
+    return PfbBlock(iring, axis, ntap, window, fft, axis_label,
+                    apply_fftshift, *args, **kwargs)
@@ -32,15 +32,28 @@ import bifrost as bf
 import bifrost.quantize
 from bifrost.pipeline import TransformBlock
 from bifrost.DataType import DataType
+from bifrost.proclog import ProcLog
 
 from copy import deepcopy
+import numpy as np
+
+# Output RMS (in units of the integer step) targeted when auto-scaling. The 2-
+#   and 4-bit values minimise the quantization noise of Gaussian data; wider
+#   types clip at 4 sigma.
+AUTO_TARGET_RMS = {2: 0.82, 4: 3.0}
 
 class QuantizeBlock(TransformBlock):
-    def __init__(self, iring, dtype, scale=1.,
-                 *args, **kwargs):
+    def __init__(self, iring, dtype, scale=1., axis=None, target_rms=None,
+                 decay=0.9, *args, **kwargs):
         super(QuantizeBlock, self).__init__(iring, *args, **kwargs)
         self.dtype = dtype
         self.scale = scale
+        self.auto_scale = isinstance(scale, basestring) and scale == 'auto'
+        self.axis = axis
+        self.target_rms = target_rms
+        self.decay = decay
+        if self.auto_scale:
+            self.stats_proclog = ProcLog(self.name + "/quantize")
     def define_valid_input_spaces(self):
         """Return set of valid spaces (or 'any') for each input"""
         return ('system',)
@@ -56,19 +69,80 @@ class QuantizeBlock(TransformBlock):
         else:
             otype = self.dtype
         ohdr['_tensor']['dtype'] = otype
+        if self.auto_scale:
+            self._init_auto_scale(ihdr, DataType(otype))
         return ohdr
+    def _init_auto_scale(self, ihdr, otype):
+        shape = ihdr['_tensor']['shape']
+        if self.axis is None:
+            self.axis_index = None
+            self.nchan = 1
+        else:
+            if isinstance(self.axis, basestring):
+                self.axis_index = ihdr['_tensor']['labels'].index(self.axis)
+            else:
+                self.axis_index = self.axis
+            self.nchan = shape[self.axis_index]
+            if self.nchan == -1:
+                raise ValueError("Cannot auto-scale along the frame axis")
+        if self.target_rms is None:
+            nbit = otype.itemsize_bits // (1 + otype.is_complex)
+            maxval = 2**(nbit - otype.is_signed) - 1
+            self.target_rms = AUTO_TARGET_RMS.get(nbit, maxval / 4.)
+        self.mean_sq = None
+        self.scales = None
+        self.clip_fraction = None
     def on_data(self, ispan, ospan):
         idata = ispan.data
         odata = ospan.data
-        bf.quantize.quantize(idata, odata, self.scale)
+        if not self.auto_scale:
+            bf.quantize.quantize(idata, odata, self.scale)
+            return
+        if idata.size == 0:
+            # Note: Empty gulps carry no statistics to update the scales with
+            return
+        # Note: The scales for each gulp are derived from the running mean
+        #         square of the previous gulps, and the statistics of this
+        #         gulp are gathered while it is quantized.
+        sumsq = np.zeros(self.nchan, dtype=np.float64)
+        nclip = np.zeros(self.nchan, dtype=np.uint64)
+        ncomponent = idata.size * (1 + self.itype.is_complex) // self.nchan
+        if self.mean_sq is None:
+            bf.quantize.quantize(idata, None, axis=self.axis_index,
+                                 sumsq=sumsq)
+            self.mean_sq = sumsq / ncomponent
+            sumsq[:] = 0
+        rms = np.sqrt(self.mean_sq)
+        scales = self.target_rms / np.where(rms > 0, rms, self.target_rms)
+        bf.quantize.quantize(idata, odata, scales, self.axis_index,
+                             sumsq, nclip)
+        self.mean_sq = (self.decay * self.mean_sq +
+                        (1 - self.decay) * sumsq / ncomponent)
+        self.scales = scales
+        self.clip_fraction = nclip / float(ncomponent)
+        self.stats_proclog.update({'nchan':             self.nchan,
+                                   'scale_min':         scales.min(),
+                                   'scale_max':         scales.max(),
+                                   'scale_mean':        scales.mean(),
+                                   'clip_fraction':     self.clip_fraction.mean(),
+                                   'clip_fraction_max': self.clip_fraction.max()})
 
-def quantize(iring, dtype, scale=1., *args, **kwargs):
+def quantize(iring, dtype, scale=1., axis=None, target_rms=None, decay=0.9,
+             *args, **kwargs):
     """Apply a requantization of bit depth for the data.
 
     Args:
         iring (Ring or Block): Input data source.
         dtype: Output data type or number of bits.
-        scale (float): Scale factor to apply before quantizing.
+        scale (float or str): Scale factor to apply before quantizing, or
+            'auto' to derive the scale for each gulp from a running RMS of
+            the input.
+        axis (str or int): Axis along which each channel is given its own
+            scale when auto-scaling. If None, a single scale is used.
+        target_rms (float): Output RMS to scale to when auto-scaling. Defaults
+            to a value suited to the output bit depth.
+        decay (float): Weight given to the running mean square of previous
+            gulps when updating it with a new gulp.
         *args: Arguments to ``bifrost.pipeline.TransformBlock``.
         **kwargs: Keyword Arguments to ``bifrost.pipeline.TransformBlock``.
 
@@ -79,5 +153,12 @@ def quantize(iring, dtype, scale=1., *args, **kwargs):
 
     Returns:
         QuantizeBlock: A new block instance.
+
+    Note:
+        When auto-scaling, the scales change from gulp to gulp. The latest
+        per-channel scales and clip fractions are available as the block's
+        ``scales`` and ``clip_fraction`` attributes, and are summarised in
+        its 'quantize' ProcLog.
     """
-    return QuantizeBlock(iring, dtype, *args, **kwargs)
+    return QuantizeBlock(iring, dtype, scale, axis, target_rms, decay,
+                         *args, **kwargs)
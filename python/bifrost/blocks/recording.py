@@ -0,0 +1,254 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import
+
+from bifrost.pipeline import SourceBlock, SinkBlock
+from bifrost.DataType import DataType
+
+import numpy as np
+import struct
+import time
+import glob
+import json
+import os
+
+# Recording file layout (one file per sequence):
+#   magic (8 bytes), header size (uint64), sequence header (JSON), followed
+#   by one record per span: frame offset (int64), nframe (int64), capture
+#   time (float64, seconds since the epoch) and then the span's frames in
+#   C order, i.e., [ringlet..., frame, frame element...].
+RECORDING_MAGIC      = 'BFRECORD'
+RECORDING_EXTENSION  = '.bfrec'
+_RECORD_DESC         = struct.Struct('<qqd')
+
+def _frame_info(header):
+    """Returns the ringlet shape and no. bytes per frame (per ringlet)"""
+    shape = header['_tensor']['shape']
+    frame_axis = shape.index(-1)
+    nbit = DataType(header['_tensor']['dtype']).itemsize_bits
+    frame_nelement = int(np.prod(shape[frame_axis+1:]))
+    return shape[:frame_axis], frame_nelement * nbit // 8
+
+def _byte_view(data, frame_axis):
+    """Returns a uint8 view of data with frames of shape [..., frame_nbyte]"""
+    data = np.asarray(data)
+    if data.ndim == frame_axis + 1:
+        data = data.reshape(data.shape + (1,))
+    return data.view(np.uint8)
+
+class RecordingFile(object):
+    """Reads a sequence recorded by RecordingSinkBlock
+
+    Args:
+        filename (str): Name of the recording file
+
+    The index attribute holds (frame_offset, nframe, capture_time,
+    byte_offset) for every recorded span, where byte_offset is the position
+    of the span's data in the file.
+    """
+    def __init__(self, filename):
+        self.file = open(filename, 'rb')
+        if self.file.read(len(RECORDING_MAGIC)) != RECORDING_MAGIC:
+            raise IOError("Not a bifrost recording: %s" % filename)
+        header_size, = struct.unpack('<Q', self.file.read(8))
+        self.header = json.loads(self.file.read(header_size))
+        self.ringlet_shape, self.frame_nbyte = _frame_info(self.header)
+        self.nringlet = int(np.prod(self.ringlet_shape))
+        self.index = []
+        while True:
+            desc = self.file.read(_RECORD_DESC.size)
+            if len(desc) < _RECORD_DESC.size:
+                break
+            frame_offset, nframe, capture_time = _RECORD_DESC.unpack(desc)
+            nbyte = self.nringlet * nframe * self.frame_nbyte
+            byte_offset = self.file.tell()
+            if byte_offset + nbyte > os.fstat(self.file.fileno()).st_size:
+                break # Ignore a truncated final record
+            self.index.append((frame_offset, nframe, capture_time, byte_offset))
+            self.file.seek(nbyte, 1)
+        self.seek(0)
+    def __enter__(self):
+        return self
+    def __exit__(self, type, value, tb):
+        self.close()
+    def close(self):
+        self.file.close()
+    @property
+    def nframe(self):
+        return sum(nframe for _, nframe, _, _ in self.index)
+    def seek(self, record):
+        """Positions the reader at the start of the given record"""
+        self._record = record
+        self._record_data = None
+        self._record_frame = 0
+    def read(self, odata):
+        """Reads frames into odata (a byte view as returned by _byte_view)
+        across records, returning the no. frames read and the capture time of
+        the last record read from (or None at the end of the recording)"""
+        frame_axis = len(self.ringlet_shape)
+        nframe_max = odata.shape[frame_axis]
+        nframe = 0
+        capture_time = None
+        while nframe < nframe_max and self._record < len(self.index):
+            _, record_nframe, capture_time, byte_offset = self.index[self._record]
+            n = min(nframe_max - nframe, record_nframe - self._record_frame)
+            oidx = (slice(None),) * frame_axis + (slice(nframe, nframe + n),)
+            if self.nringlet == 1:
+                # Frames are contiguous in both the file and the output
+                self.file.seek(byte_offset + self._record_frame * self.frame_nbyte)
+                if self.file.readinto(odata[oidx]) != n * self.frame_nbyte:
+                    raise IOError("Recording file is truncated")
+            else:
+                if self._record_data is None:
+                    self.file.seek(byte_offset)
+                    nbyte = self.nringlet * record_nframe * self.frame_nbyte
+                    data = np.fromfile(self.file, dtype=np.uint8, count=nbyte)
+                    self._record_data = data.reshape(
+                        self.ringlet_shape + [record_nframe, self.frame_nbyte])
+                iidx = (slice(None),) * frame_axis + (
+                    slice(self._record_frame, self._record_frame + n),)
+                odata[oidx] = self._record_data[iidx].reshape(odata[oidx].shape)
+            nframe += n
+            self._record_frame += n
+            if self._record_frame == record_nframe:
+                self.seek(self._record + 1)
+        return nframe, capture_time
+
+class RecordingSourceBlock(SourceBlock):
+    def __init__(self, filenames, gulp_nframe, rate=None, *args, **kwargs):
+        super(RecordingSourceBlock, self).__init__(filenames, gulp_nframe,
+                                                   *args, **kwargs)
+        self.rate = rate
+        self.start_time = None
+    def create_reader(self, sourcename):
+        return RecordingFile(sourcename)
+    def on_sequence(self, reader, sourcename):
+        ohdr = reader.header
+        self.frame_axis = len(reader.ringlet_shape)
+        if self.start_time is None and len(reader.index):
+            # Note: Pacing is relative to the first recorded span of the
+            #         first sequence, so gaps between sequences are replayed
+            #         as well.
+            self.start_time = time.time()
+            self.capture_time0 = reader.index[0][2]
+        return [ohdr]
+    def on_data(self, reader, ospans):
+        ospan = ospans[0]
+        nframe, capture_time = reader.read(_byte_view(ospan.data,
+                                                      self.frame_axis))
+        if self.rate is not None and capture_time is not None:
+            delay = ((capture_time - self.capture_time0) / self.rate -
+                     (time.time() - self.start_time))
+            if delay > 0:
+                time.sleep(delay)
+        return [nframe]
+
+def read_recording(filenames, gulp_nframe, rate=None, *args, **kwargs):
+    """Replay sequences recorded by ``write_recording``.
+
+    Args:
+        filenames (list or str): List of recording files, or a directory
+            containing them (which are replayed in the order recorded).
+        gulp_nframe (int): No. frames to read at a time.
+        rate (float): If None (the default), data are replayed as fast as
+            possible. Otherwise, spans are released at ``rate`` times the
+            rate at which they were originally captured (i.e., 1.0 replays
+            in real time).
+        *args: Arguments to ``bifrost.pipeline.SourceBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.SourceBlock``.
+
+    **Tensor semantics**::
+
+        Output: As recorded, space = SYSTEM
+
+    Returns:
+        RecordingSourceBlock: A new block instance.
+
+    Note:
+        The original sequence headers (including name and time_tag) are
+        reproduced exactly. Frames that the recorder missed (e.g., because
+        it read without a guarantee) are not reproduced; the recorded frames
+        are replayed contiguously.
+    """
+    if isinstance(filenames, basestring):
+        filenames = sorted(glob.glob(os.path.join(filenames,
+                                                  '*' + RECORDING_EXTENSION)))
+    return RecordingSourceBlock(filenames, gulp_nframe, rate, *args, **kwargs)
+
+class RecordingSinkBlock(SinkBlock):
+    def __init__(self, iring, path=None, *args, **kwargs):
+        super(RecordingSinkBlock, self).__init__(iring, *args, **kwargs)
+        if path is None:
+            path = ''
+        self.path = path
+        self.nsequence = 0
+        self.ofile = None
+    def define_valid_input_spaces(self):
+        return ('system',)
+    def on_sequence(self, iseq):
+        ihdr = iseq.header
+        self.frame_axis = ihdr['_tensor']['shape'].index(-1)
+        filename = os.path.join(self.path, 'sequence%06i%s' %
+                                (self.nsequence, RECORDING_EXTENSION))
+        self.nsequence += 1
+        header_str = json.dumps(ihdr)
+        self.ofile = open(filename, 'wb')
+        self.ofile.write(RECORDING_MAGIC)
+        self.ofile.write(struct.pack('<Q', len(header_str)))
+        self.ofile.write(header_str)
+    def on_sequence_end(self, iseq):
+        self.ofile.close()
+    def on_data(self, ispan):
+        self.ofile.write(_RECORD_DESC.pack(ispan.frame_offset, ispan.nframe,
+                                           time.time()))
+        _byte_view(ispan.data, self.frame_axis).tofile(self.ofile)
+
+def write_recording(iring, path=None, *args, **kwargs):
+    """Record the sequences in a ring (headers and data) to disk.
+
+    Args:
+        iring (Ring or Block): Input data source.
+        path (str): Directory in which to write the recording files.
+        *args: Arguments to ``bifrost.pipeline.SinkBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.SinkBlock``.
+
+    **Tensor semantics**::
+
+        Input: Any, space = SYSTEM
+        Output: One recording file per sequence, named sequenceNNNNNN.bfrec
+
+    Returns:
+        RecordingSinkBlock: A new block instance.
+
+    Note:
+        Each file holds the sequence header as JSON followed by the spans,
+        each prefixed with its frame offset, size and capture time. Use
+        ``read_recording`` (or ``RecordingFile``) to read them back.
+    """
+    return RecordingSinkBlock(iring, path, *args, **kwargs)
@@ -0,0 +1,127 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import
+
+import bifrost as bf
+import bifrost.reduce
+from bifrost.pipeline import TransformBlock
+from bifrost.DataType import DataType
+
+from copy import deepcopy
+
+class ReduceBlock(TransformBlock):
+    def __init__(self, iring, axis, factor=None, op='sum',
+                 *args, **kwargs):
+        super(ReduceBlock, self).__init__(iring, *args, **kwargs)
+        if op not in bf.reduce.REDUCE_MAP:
+            raise ValueError("Invalid reduce op: " + str(op))
+        self.specified_axis   = axis
+        self.specified_factor = factor
+        self.op = op
+    def define_valid_input_spaces(self):
+        """Return set of valid spaces (or 'any') for each input"""
+        return ('system',)
+    def define_output_nframes(self, input_nframe):
+        """Return output nframe for each output, given input_nframes.
+        """
+        if self.frame_axis == self.axis:
+            return input_nframe // self.factor
+        return input_nframe
+    def on_sequence(self, iseq):
+        ihdr = iseq.header
+        itensor = ihdr['_tensor']
+        ohdr = deepcopy(ihdr)
+        otensor = ohdr['_tensor']
+        if isinstance(self.specified_axis, basestring):
+            self.axis = itensor['labels'].index(self.specified_axis)
+        else:
+            self.axis = self.specified_axis
+        self.frame_axis = itensor['shape'].index(-1)
+        if self.specified_factor is None:
+            if self.axis == self.frame_axis:
+                raise ValueError("Reduce factor must be given for the frame axis")
+            self.factor = itensor['shape'][self.axis]
+        else:
+            self.factor = self.specified_factor
+        if self.axis == self.frame_axis:
+            gulp_nframe = self.gulp_nframe or ihdr['gulp_nframe']
+            if gulp_nframe % self.factor != 0:
+                raise ValueError("Reduce factor does not divide gulp size")
+        else:
+            if itensor['shape'][self.axis] % self.factor != 0:
+                raise ValueError("Reduce factor does not divide axis length")
+            otensor['shape'][self.axis] //= self.factor
+        if 'scales' in itensor and itensor['scales'][self.axis] is not None:
+            otensor['scales'][self.axis][1] *= self.factor
+        itype = DataType(itensor['dtype'])
+        if itype.is_complex and not self.op.startswith('pwr'):
+            otensor['dtype'] = 'cf32'
+        else:
+            otensor['dtype'] = 'f32'
+        return ohdr
+    def on_data(self, ispan, ospan):
+        idata = ispan.data
+        odata = ospan.data
+        out_nframe = ospan.nframe
+        if self.axis == self.frame_axis:
+            if out_nframe == 0:
+                return 0
+            # Note: The last span of a sequence may not be a multiple of
+            #         factor, and its incomplete output frame is dropped.
+            frames = (slice(None),) * self.frame_axis
+            idata = idata[frames + (slice(0, out_nframe * self.factor),)]
+        bf.reduce.reduce(idata, odata, self.op)
+        return out_nframe
+
+def reduce(iring, axis, factor=None, op='sum', *args, **kwargs):
+    """Reduce data along an axis by factor using op.
+
+    Args:
+        iring (Ring or Block): Input data source.
+        axis (int or str): The axis to reduce. Can be an integer index
+                           or a string label.
+        factor (int): The factor by which to reduce the axis. Defaults to
+                      the whole axis, except for the frame axis, for which
+                      it must be given.
+        op (str): The operation with which to reduce the data: 'sum', 'mean',
+                  'min', 'max', or the power (|x|**2) equivalents 'pwrsum',
+                  'pwrmean', 'pwrmin' and 'pwrmax'.
+        *args: Arguments to ``bifrost.pipeline.TransformBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.TransformBlock``.
+
+    **Tensor semantics**::
+
+        Input:  [..., N, ...], dtype = any (complex) real/integer type, space = SYSTEM
+        Output: [..., N / factor, ...], dtype = f32 (cf32 for complex input
+                with a non-power op), space = SYSTEM
+
+    Returns:
+        ReduceBlock: A new block instance.
+    """
+    return ReduceBlock(iring, axis, factor, op, *args, **kwargs)
@@ -30,6 +30,8 @@
 
 from __future__ import absolute_import
 
+import bifrost as bf
+import bifrost.reduce
 from bifrost.pipeline import TransformBlock
 
 from copy import deepcopy
@@ -51,13 +53,18 @@ class ScrunchBlock(TransformBlock):
     def on_sequence(self, iseq):
         ohdr = deepcopy(iseq.header)
         ohdr['_tensor']['scales'][0][1] *= self.factor
+        # Note: The native reduction only outputs [c]f32
+        self.native = ohdr['_tensor']['dtype'] in ('f32', 'cf32')
         return ohdr
     def on_data(self, ispan, ospan):
         in_nframe = ispan.nframe
         out_nframe = in_nframe // self.factor
         idata = ispan.data
         odata = ospan.data
-        odata[...] = idata.reshape((out_nframe,self.factor)+idata.shape[1:]).mean(axis=1, dtype=odata.dtype)
+        if self.native:
+            bf.reduce.reduce(idata, odata, 'mean')
+        else:
+            odata[...] = idata.reshape((out_nframe,self.factor)+idata.shape[1:]).mean(axis=1, dtype=odata.dtype)
         return out_nframe
 
 def scrunch(iring, factor, *args, **kwargs):
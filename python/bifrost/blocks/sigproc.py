@@ -258,8 +258,8 @@ class SigprocSinkBlock(SinkBlock):
                 self.ofile = open(filename, 'wb')
                 sigproc.write_header(sigproc_hdr, self.ofile)
             elif ndim == 3:
-                if axnames[-3] != 'dispersion measure':
-                    raise ValueError("Expected first axis to be 'dispersion measure'")
+                if axnames[-3] not in ('dispersion', 'dispersion measure'):
+                    raise ValueError("Expected first axis to be 'dispersion'")
                 ndm = shape[-3]
                 dm0 = scales[-3][0]
                 ddm = scales[-3][1]
@@ -289,6 +289,34 @@ class SigprocSinkBlock(SinkBlock):
                                                      ihdr['refdm_units'],
                                                      'pc cm^-3')
             _copy_item_if_exists(sigproc_hdr, ihdr, 'npuls')
+            self.dms = None
+            self.filename = filename
+            self.sigproc_hdr = sigproc_hdr
+            self.t0 = scales[-4][0]
+            self.dt = scales[-4][1]
+
+        elif ndim == 4 and axnames[-3:] == ('pol', 'dispersion', 'phase'):
+            self.data_format = 'pulseprofile'
+            assert(dtype.is_real)
+            sigproc_hdr['data_type'] = 2
+            sigproc_hdr['nifs']   = shape[-3]
+            sigproc_hdr['nchans'] = 1
+            sigproc_hdr['nbins']  = shape[-1]
+            sigproc_hdr['tstart'] = _unix2mjd(scales[-4][0])
+            sigproc_hdr['tsamp']  = convert_units(scales[-4][1], units[-4], 's')
+            if 'cfreq' in ihdr and 'bw' in ihdr:
+                sigproc_hdr['fch1'] = convert_units(ihdr['cfreq'],
+                                                    ihdr['cfreq_units'],
+                                                    'MHz')
+                sigproc_hdr['foff'] = convert_units(ihdr['bw'],
+                                                    ihdr['bw_units'],
+                                                    'MHz')
+            _copy_item_if_exists(sigproc_hdr, ihdr, 'npuls')
+            ndm = shape[-2]
+            dm0 = scales[-2][0]
+            ddm = scales[-2][1]
+            dms = [dm0+ddm*d for d in xrange(ndm)]
+            self.dms = [convert_units(dm, units[-2], 'pc cm^-3') for dm in dms]
             self.filename = filename
             self.sigproc_hdr = sigproc_hdr
             self.t0 = scales[-4][0]
@@ -321,11 +349,20 @@ class SigprocSinkBlock(SinkBlock):
                     idata[d].tofile(self.ofiles[d])
         elif self.data_format == 'pulseprofile':
             time_unix = self.t0 + ispan.frame_offset * self.dt
-            filename = self.filename + '.%017.6f.tim' % time_unix
-            with open(filename, 'wb') as ofile:
-                self.sigproc_hdr['tstart'] += self.sigproc_hdr['tsamp']
-                sigproc.write_header(self.sigproc_hdr, ofile)
-                idata.tofile(ofile)
+            self.sigproc_hdr['tstart'] += self.sigproc_hdr['tsamp']
+            if self.dms is None:
+                filename = self.filename + '.%017.6f.tim' % time_unix
+                with open(filename, 'wb') as ofile:
+                    sigproc.write_header(self.sigproc_hdr, ofile)
+                    idata.tofile(ofile)
+            else:
+                for d, dm in enumerate(self.dms):
+                    filename = (self.filename +
+                                '.%09.2f.%017.6f.tim' % (dm, time_unix))
+                    with open(filename, 'wb') as ofile:
+                        self.sigproc_hdr['refdm'] = dm
+                        sigproc.write_header(self.sigproc_hdr, ofile)
+                        idata[..., d, :].tofile(ofile)
         else:
             raise ValueError("Internal error: Unknown data format!")
 
@@ -352,9 +389,12 @@ def write_sigproc(iring, path=None, *args, **kwargs):
         Input:  [dispersion, time, pol], dtype = any, space = SYSTEM
         Output: Time series, one file per dispersion measure trial
 
-        Input:  [pol, freq, phase], dtype = any, space = SYSTEM
+        Input:  [time, pol, freq, phase], dtype = any, space = SYSTEM
         Output: Pulse profile, one file per frame
 
+        Input:  [time, pol, dispersion, phase], dtype = any, space = SYSTEM
+        Output: Pulse profile, one file per frame per dispersion measure trial
+
     Returns:
         SigprocSinkBlock: A new block instance.
     """
@@ -0,0 +1,234 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import
+
+import bifrost as bf
+import bifrost.boxcar
+from bifrost.pipeline import TransformBlock
+from bifrost.proclog import ProcLog
+
+from copy import deepcopy
+import numpy as np
+
+CANDIDATE_PROPERTIES = ['dm', 'time', 'width', 'snr']
+
+def _find_runs(dms, times):
+    """Returns the start and end indices of the runs of consecutive times
+    with the same DM in the sorted (dm, time) pairs"""
+    starts = np.ones(len(dms), dtype=bool)
+    starts[1:] = (dms[1:] != dms[:-1]) | (times[1:] != times[:-1] + 1)
+    begins = np.flatnonzero(starts)
+    ends   = np.r_[begins[1:], len(dms)]
+    return begins, ends
+
+class SinglePulseSearchBlock(TransformBlock):
+    def __init__(self, iring, threshold=6., widths=None, max_ncandidate=1024,
+                 *args, **kwargs):
+        super(SinglePulseSearchBlock, self).__init__(iring, *args, **kwargs)
+        if widths is None:
+            widths = [2**i for i in xrange(7)]
+        self.widths = np.array(sorted(widths), dtype=np.int32)
+        if self.widths[0] < 1:
+            raise ValueError("Boxcar widths must be positive")
+        self.threshold = threshold
+        self.max_ncandidate = max_ncandidate
+        self.overlap = int(self.widths[-1]) - 1
+        self.search_proclog = ProcLog(self.name + "/search")
+    def define_valid_input_spaces(self):
+        """Return set of valid spaces (or 'any') for each input"""
+        return ('system',)
+    def define_output_nframes(self, input_nframe):
+        """Return output nframe for each output, given input_nframes.
+        """
+        return self.max_ncandidate
+    def on_sequence(self, iseq):
+        ihdr = iseq.header
+        itensor = ihdr['_tensor']
+        if str(itensor['dtype']) != 'f32':
+            raise TypeError("Input data must be f32")
+        labels = list(itensor['labels'])
+        if 'dispersion' not in labels or 'time' not in labels:
+            raise ValueError("Expected input axes 'dispersion' and 'time', "
+                             "not " + str(labels))
+        dm_axis   = labels.index('dispersion')
+        time_axis = labels.index('time')
+        self.axes = [dm_axis, time_axis]
+        for axis in xrange(len(labels)):
+            if axis not in self.axes:
+                if itensor['shape'][axis] != 1:
+                    raise ValueError("Expected a single polarization, not "
+                                     "'%s' of length %i" %
+                                     (labels[axis], itensor['shape'][axis]))
+                self.axes.append(axis)
+        if itensor['shape'][time_axis] != -1:
+            raise ValueError("Expected 'time' to be the frame axis")
+        ndm = itensor['shape'][dm_axis]
+        self.dm0, self.ddm = itensor['scales'][dm_axis]
+        self.t0,  self.dt  = itensor['scales'][time_axis]
+        gulp_nframe = self.gulp_nframe or ihdr['gulp_nframe']
+        self.snr    = bf.ndarray(shape=(ndm, gulp_nframe), dtype='f32',
+                                 space='system')
+        self.iwidth = bf.ndarray(shape=(ndm, gulp_nframe), dtype='i32',
+                                 space='system')
+        # Note: Runs of candidates that reach the end of a gulp are held
+        #         until it is known whether they continue into the next
+        self.pending = {}
+        ohdr = deepcopy(ihdr)
+        otensor = ohdr['_tensor']
+        otensor['dtype']  = 'f64'
+        otensor['shape']  = [-1, len(CANDIDATE_PROPERTIES)]
+        otensor['labels'] = ['candidate', 'property']
+        otensor['scales'] = [None, None]
+        otensor['units']  = [None, None]
+        ohdr['candidate_properties'] = CANDIDATE_PROPERTIES
+        ohdr['candidate_units'] = [itensor['units'][dm_axis],
+                                   itensor['units'][time_axis],
+                                   itensor['units'][time_axis],
+                                   None]
+        ohdr['threshold'] = self.threshold
+        return ohdr, slice(0, gulp_nframe + self.overlap, gulp_nframe)
+    def _find_candidates(self, nout, frame_offset):
+        """Returns the peak (dm index, sample, width index, S/N) of each run
+        of samples above the threshold, merging runs that continue from the
+        previous gulp"""
+        snr = self.snr[:, :nout].view(np.ndarray)
+        dms, times = np.nonzero(snr > self.threshold)
+        begins, ends = _find_runs(dms, times)
+        snrs = snr[dms, times]
+        peaks = np.array([b + np.argmax(snrs[b:e])
+                          for b, e in zip(begins, ends)], dtype=int)
+        if len(peaks):
+            pdms   = dms[peaks]
+            ptimes = times[peaks]
+            cands = zip(pdms, ptimes + frame_offset,
+                        self.iwidth.view(np.ndarray)[pdms, ptimes],
+                        snrs[peaks])
+        else:
+            cands = []
+        pending = {}
+        for i, (b, e) in enumerate(zip(begins, ends)):
+            dm = dms[b]
+            if times[b] == 0 and dm in self.pending:
+                prev = self.pending.pop(dm)
+                if prev[3] >= cands[i][3]:
+                    cands[i] = prev
+            if times[e-1] == nout - 1:
+                pending[dm] = cands[i]
+                cands[i] = None
+        cands = [cand for cand in cands if cand is not None]
+        cands.extend(self.pending.values())
+        self.pending = pending
+        return cands
+    def on_data(self, ispan, ospan):
+        nframe = ispan.nframe
+        if nframe <= self.overlap:
+            # Cannot fully process any frames
+            cands = []
+        else:
+            nout = nframe - self.overlap
+            idata = ispan.data.transpose(self.axes)
+            idata = idata.reshape(idata.shape[:2])
+            bf.boxcar.boxcar_filter(idata, self.widths, self.snr[:, :nout],
+                                    self.iwidth[:, :nout])
+            cands = self._find_candidates(nout, ispan.frame_offset)
+        return self._write_candidates(cands, ospan)
+    def define_flush_nframes(self):
+        """Return the number of candidates still pending at the end of the
+        sequence"""
+        return min(len(self.pending), self.max_ncandidate)
+    def on_flush(self, ospan):
+        # Note: The runs still pending cannot continue past the end of the
+        #         sequence
+        cands = self.pending.values()
+        self.pending = {}
+        return self._write_candidates(cands, ospan)
+    def _write_candidates(self, cands, ospan):
+        """Writes up to max_ncandidate of cands to ospan, keeping the ones
+        with the highest S/N, and returns the number written"""
+        ndropped = max(len(cands) - self.max_ncandidate, 0)
+        if ndropped:
+            cands = sorted(cands, key=lambda cand: -cand[3])
+            cands = cands[:self.max_ncandidate]
+        cands.sort(key=lambda cand: (cand[1], cand[0]))
+        ncand = len(cands)
+        if ncand:
+            dm, sample, iwidth, snr = [np.array(x) for x in zip(*cands)]
+            odata = ospan.data.view(np.ndarray)
+            odata[:ncand, 0] = self.dm0 + dm * self.ddm
+            odata[:ncand, 1] = self.t0 + sample * self.dt
+            odata[:ncand, 2] = self.widths[iwidth] * self.dt
+            odata[:ncand, 3] = snr
+        self.search_proclog.update({'ncandidate': ncand,
+                                    'ndropped':   ndropped,
+                                    'threshold':  self.threshold})
+        return ncand
+
+def single_pulse_search(iring, threshold=6., widths=None, max_ncandidate=1024,
+                        *args, **kwargs):
+    """Search a DM-time plane for single pulses using boxcar filters.
+
+    Each DM trial is normalised by its median and median absolute deviation
+    in each gulp, and filtered with boxcars of each width. Every run of
+    consecutive samples whose peak S/N exceeds the threshold gives one
+    candidate at the sample and width of its peak.
+
+    Args:
+        iring (Ring or Block): Input data source.
+        threshold (float): Minimum S/N of a candidate.
+        widths (list): Boxcar widths (in samples). Defaults to powers of 2
+            from 1 to 64.
+        max_ncandidate (int): Maximum number of candidates output per gulp.
+            If there are more, the ones with the lowest S/N are dropped.
+        *args: Arguments to ``bifrost.pipeline.TransformBlock``.
+        **kwargs: Keyword Arguments to ``bifrost.pipeline.TransformBlock``.
+
+    **Tensor semantics**::
+
+        Input:  ['dispersion', 'time', 'pol'], dtype = f32, space = SYSTEM
+        Output: ['candidate', 'property'], dtype = f64, space = SYSTEM
+
+    Returns:
+        SinglePulseSearchBlock: A new block instance.
+
+    Note:
+        The input axes may be in any order (e.g., the ['pol', 'dispersion',
+        'time'] output of ``fdmt``), and the 'pol' axis, if any, must have
+        length 1. The properties of each candidate are its DM, the time of
+        the start of its boxcar, its width (in the units of the time axis)
+        and its S/N, as listed in the 'candidate_properties' header entry.
+        Candidates are ordered by time and then DM within each gulp, and a
+        run that reaches the end of a gulp is output with the next gulp, or
+        once the sequence ends. Each gulp overlaps the next by the maximum
+        width minus one, and pulses within that many frames of the end of a
+        sequence are not searched.
+        The number of candidates in the latest gulp is recorded in the
+        block's 'search' ProcLog.
+    """
+    return SinglePulseSearchBlock(iring, threshold, widths, max_ncandidate,
+                                  *args, **kwargs)
@@ -73,7 +73,7 @@ def unpack(iring, dtype, *args, **kwargs):
 
     **Tensor semantics**::
 
-        Input:  [...], dtype = one of: i/u2, i/u4, ci2, ci4, space = SYSTEM
+        Input:  [...], dtype = one of: i/u2, i/u4, ci2, ci4, i8, ci8, space = SYSTEM
         Output: [...], dtype = i8 or ci8 (matching input), space = SYSTEM
 
     Returns:
@@ -0,0 +1,58 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from libbifrost import _bf, _check, _get, _fast_call
+from ndarray import asarray
+
+DETECT_MAP = {
+	'scalar': _bf.BF_DETECT_SCALAR,
+	'jones':  _bf.BF_DETECT_JONES,
+	'stokes': _bf.BF_DETECT_STOKES
+}
+
+def detect(idata, odata, mode, axis=None, accumulate=False):
+	"""Forms polarisation products and integrates them along one axis.
+	
+	``mode`` is one of 'scalar' (x.x*), 'jones' (x.x* + 1j*y.y*, x.y*) or
+	'stokes' (I, Q, U, V), and ``axis`` is the polarisation axis of
+	``idata`` (unused in scalar mode). The integrated axis is the one whose
+	length differs between ``idata`` and ``odata``. If ``accumulate`` is
+	True, the existing contents of ``odata`` are included in the integration.
+	"""
+	if mode not in DETECT_MAP:
+		raise ValueError("Invalid detect mode: " + str(mode))
+	if axis is None:
+		if mode != 'scalar':
+			raise ValueError("The polarisation axis must be given in %s mode" % mode)
+		axis = -1
+	_fast_call(_bf.Detect, asarray(idata).as_BFarray(),
+	                       asarray(odata).as_BFarray(),
+	                       DETECT_MAP[mode],
+	                       axis,
+	                       accumulate)
+	return odata
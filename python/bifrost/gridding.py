@@ -0,0 +1,63 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from libbifrost import _bf, _check
+from ndarray import asarray
+import numpy as np
+
+def kaiser_bessel_kernel(support, noversample, beta=None):
+	"""Returns a Kaiser-Bessel anti-aliasing kernel of ``support`` cells
+	sampled at ``noversample`` sub-cell offsets, as an [noversample,
+	support] f32 array for use with ``grid``. Each row is normalised to unit
+	sum. The default ``beta`` suits a grid oversampled by a factor of 2.
+	"""
+	if beta is None:
+		beta = 2.34 * support
+	offsets = np.arange(noversample) / float(noversample)
+	# Position of each cell relative to the visibility
+	x = np.arange(support)[None, :] - (support - 1) // 2 - offsets[:, None]
+	r = np.clip(2 * x / float(support), -1, 1)
+	# Note: Older versions of np.i0 squeeze their output
+	kernel = np.i0(beta * np.sqrt(1 - r**2)).reshape(r.shape)
+	kernel /= kernel.sum(axis=1)[:, None]
+	return kernel.astype(np.float32)
+
+def grid(vis, uv, kernel, grid, accumulate=False):
+	"""Convolves the visibilities ``vis`` [baseline, chan, pol] at the
+	positions ``uv`` [baseline, chan, 2] (in grid cells) onto ``grid``
+	[pol, v, u] using ``kernel`` [oversample, support].
+	
+	Visibilities with a NaN position are skipped. If ``accumulate`` is
+	False, the grid is overwritten.
+	"""
+	_check(_bf.GridVisibilities(asarray(vis).as_BFarray(),
+	                            asarray(uv).as_BFarray(),
+	                            asarray(kernel).as_BFarray(),
+	                            asarray(grid).as_BFarray(),
+	                            accumulate))
+	return grid
@@ -0,0 +1,65 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from libbifrost import _bf, _check
+from ndarray import asarray
+import numpy as np
+
+def spectral_kurtosis_bounds(m, nd=1., nsigma=3.):
+	"""Returns the (lower, upper) bounds on the spectral kurtosis of windows
+	of ``m`` samples that are ``nsigma`` standard deviations from its expected
+	value of 1, using the variance of the estimator (Nita & Gary 2010)."""
+	if m < 2:
+		raise ValueError("Windows must contain at least 2 samples")
+	mnd = m * nd
+	var = 2. * nd * (nd + 1) * m**2 / ((m - 1) * (mnd + 2) * (mnd + 3))
+	return 1 - nsigma * np.sqrt(var), 1 + nsigma * np.sqrt(var)
+
+def spectral_kurtosis(idata, sk, odata=None, nd=1., lower=None, upper=None,
+                      replacement=0.):
+	"""Computes the generalized spectral kurtosis of windows of power samples.
+	
+	The windows lie along the axis whose length differs between ``idata``
+	and ``sk``. If ``odata`` is given, each window is copied into it, or set
+	to ``replacement`` if its kurtosis is below ``lower`` or above ``upper``
+	(which default to 3-sigma bounds). ``odata`` may be ``idata``.
+	"""
+	idata = asarray(idata)
+	sk = asarray(sk)
+	if lower is None or upper is None:
+		axes = [i for i in xrange(idata.ndim) if idata.shape[i] != sk.shape[i]]
+		m = idata.shape[axes[0]] // sk.shape[axes[0]] if axes else 1
+		default_lower, default_upper = spectral_kurtosis_bounds(m, nd)
+		lower = default_lower if lower is None else lower
+		upper = default_upper if upper is None else upper
+	odata_bf = asarray(odata).as_BFarray() if odata is not None else None
+	_check(_bf.SpectralKurtosis(idata.as_BFarray(),
+	                            sk.as_BFarray(),
+	                            odata_bf,
+	                            nd, lower, upper, replacement))
+	return sk
@@ -104,6 +104,27 @@ def _load_bifrost_lib():
 _bf = _load_bifrost_lib() # Internal access to library
 bf = _bf                  # External access to library
 
+def _resolve_all_objs(lib):
+	"""Builds every binding the headers define, so that later accesses
+	only read PyCLibrary's caches."""
+	for typ in ['values', 'functions', 'types', 'structs', 'unions', 'enums']:
+		for name in lib._defs_[typ]:
+			if ' ' in name:
+				# Skip 'struct X'-style typedef keys; they are not
+				#   accessible by attribute and fail to resolve.
+				continue
+			try:
+				lib(typ, name)
+			except KeyError:
+				pass # E.g., functions compiled out of this build
+
+# PYCLIBRARY ISSUE: CLibrary builds functions, values and types lazily on
+#   first access, which is not thread-safe. Blocks touch _bf from their own
+#   threads, and racing first accesses fail with "NameError: objs" or use
+#   half-built ctypes structs (and segfault), so everything is resolved once
+#   here at import.
+_resolve_all_objs(_bf)
+
 # Internal helper functions below
 
 #def _array(typ, size_or_vals):
@@ -30,15 +30,16 @@
 import threading
 import time
 import signal
-from copy import copy
+from copy import copy, deepcopy
 from collections import defaultdict
 from contextlib2 import ExitStack
 import traceback
 
 import bifrost as bf
-from bifrost.ring2 import Ring, ring_view
+from bifrost.ring2 import Ring, ring_view, SequenceBase, SpanBase
 from temp_storage import TempStorage
 from bifrost.proclog import ProcLog
+from bifrost import tracing
 
 def izip(*iterables):
 	while True:
@@ -175,6 +176,9 @@ def join_all(threads, timeout):
 			return alive_threads
 		alive_threads[0].join(available_time)
 
+# BlockScope settings that may be overridden via Pipeline.run(config=...)
+TUNABLE_SETTINGS = ('gulp_nframe', 'buffer_nframe', 'buffer_factor')
+
 class Pipeline(BlockScope):
 	instance_count = 0
 	def __init__(self, name=None, **kwargs):
@@ -186,10 +190,28 @@ class Pipeline(BlockScope):
 		self.shutdown_timeout = 5.
 	def as_default(self):
 		return PipelineContext(self)
-	def run(self):
-		# Launch blocks as threads
-		self.threads = [threading.Thread(target=block.run, name=block.name)
-		                for block in self.blocks]
+	def apply_config(self, config):
+		"""Overrides block settings using a dict of the form
+		{block_name: {'gulp_nframe': ..., 'buffer_factor': ...}}, as
+		returned by bifrost.tuning.tune.
+		"""
+		blocks_by_name = dict((block.name, block) for block in self.blocks)
+		for name, settings in config.items():
+			if name not in blocks_by_name:
+				raise KeyError("Pipeline has no block named '%s'" % name)
+			block = blocks_by_name[name]
+			for key, value in settings.items():
+				if key not in TUNABLE_SETTINGS:
+					raise KeyError("Block setting '%s' is not one of: %s" %
+					               (key, str(TUNABLE_SETTINGS)))
+				setattr(block, '_'+key, value)
+	def run(self, config=None):
+		if config is not None:
+			self.apply_config(config)
+		# Launch blocks as threads, with each chain of fused blocks sharing
+		#   a single thread.
+		self.threads = [threading.Thread(target=runner.run, name=runner.name)
+		                for runner in self._get_runners()]
 		for thread in self.threads:
 			thread.daemon = True
 			thread.start()
@@ -198,6 +220,21 @@ class Pipeline(BlockScope):
 			# Note: Doing it this way allows signals to be caught here
 			while thread.is_alive():
 				thread.join(timeout=2**30)
+		tracing.dump()
+	def _get_runners(self):
+		"""Returns the blocks and FusedBlockChains that each need a thread"""
+		for block in self.blocks:
+			block.cache_scope_hierarchy()
+		chains = find_fused_chains(self.blocks)
+		chain_heads = dict((id(chain[0]), chain) for chain in chains)
+		chained = set(id(block) for chain in chains for block in chain)
+		runners = []
+		for block in self.blocks:
+			if id(block) in chain_heads:
+				runners.append(FusedBlockChain(chain_heads[id(block)]))
+			elif id(block) not in chained:
+				runners.append(block)
+		return runners
 	def shutdown(self):
 		for block in self.blocks:
 			block.shutdown()
@@ -205,6 +242,7 @@ class Pipeline(BlockScope):
 		for thread in self.threads:
 			if thread.is_alive():
 				print "WARNING: Thread %s did not shut down on time and will be killed" % thread.name
+		tracing.dump()
 	def shutdown_on_signals(self, signals=None):
 		if signals is None:
 			signals = [signal.SIGHUP,
@@ -231,6 +269,65 @@ class Pipeline(BlockScope):
 thread_local.pipeline_stack.append(Pipeline())
 thread_local.blockscope_stack.append(get_default_pipeline())
 
+def bind_cores(core):
+	"""Binds the calling thread to a core, or to the first of a list of cores
+	with the OpenMP threads it launches bound to the whole list.
+	
+	Returns a dict describing the binding for use in a 'bind' ProcLog.
+	"""
+	if core is None:
+		return {'ncore': 1, 'core0': bf.affinity.get_core()}
+	if isinstance(core, int):
+		bf.affinity.set_core(core)
+		return {'ncore': 1, 'core0': bf.affinity.get_core()}
+	bf.affinity.set_core(core[0])
+	bf.affinity.set_openmp_cores(core)
+	bind_info = {'ncore': len(core)}
+	for i, c in enumerate(core):
+		bind_info['core%i' % i] = c
+	return bind_info
+
+def _base_ring(ring):
+	while ring.base is not None:
+		ring = ring.base
+	return ring
+
+def find_fused_chains(blocks):
+	"""Returns lists of TransformBlocks that can be run in a single thread
+	
+	Consecutive TransformBlocks are chained when they share a
+	BlockScope(fuse=True) ancestor and the downstream block is the only
+	reader of the upstream block's output ring.
+	"""
+	nreader = defaultdict(lambda: 0)
+	for block in blocks:
+		for iring in block.irings:
+			nreader[id(_base_ring(iring))] += 1
+	def can_fuse(src, dst):
+		return (isinstance(src, TransformBlock) and
+		        isinstance(dst, TransformBlock) and
+		        dst.iring.owner is src and
+		        src.is_fused_with(dst) and
+		        nreader[id(_base_ring(src.orings[0]))] == 1)
+	downstream = {}
+	has_upstream = set()
+	for dst in blocks:
+		if not isinstance(dst, TransformBlock):
+			continue
+		src = dst.iring.owner
+		if src is not None and can_fuse(src, dst):
+			downstream[id(src)] = dst
+			has_upstream.add(id(dst))
+	chains = []
+	for block in blocks:
+		if id(block) in has_upstream or id(block) not in downstream:
+			continue
+		chain = [block]
+		while id(chain[-1]) in downstream:
+			chain.append(downstream[id(chain[-1])])
+		chains.append(chain)
+	return chains
+
 def get_ring(block_or_ring):
 	try:
 		return block_or_ring.orings[0]
@@ -281,6 +378,7 @@ class Block(BlockScope):
 		self.shutdown_event = threading.Event()
 		self.bind_proclog = ProcLog(self.name+"/bind")
 		self.in_proclog = ProcLog(self.name+"/in")
+		self.out_proclog = ProcLog(self.name+"/out")
 		
 		rnames = {'nring': len(self.irings)}
 		for i,r in enumerate(self.irings):
@@ -290,15 +388,18 @@ class Block(BlockScope):
 		
 	def shutdown(self):
 		self.shutdown_event.set()
+	def update_out_proclog(self):
+		# Note: This is deferred until run() because subclass constructors
+		#         may replace self.orings.
+		rnames = {'nring': len(self.orings)}
+		for i,r in enumerate(self.orings):
+			rnames['ring%i' % i] = r.name
+		self.out_proclog.update(rnames)
 	def create_ring(self, *args, **kwargs):
 		return Ring(*args, owner=self, **kwargs)
 	def run(self):
-		#bf.affinity.set_openmp_cores(cpus) # TODO
-		core = self.core
-		if core is not None:
-			bf.affinity.set_core(core if isinstance(core, int) else core[0])
-		self.bind_proclog.update({'ncore': 1,
-		                          'core0': bf.affinity.get_core()})
+		self.bind_proclog.update(bind_cores(self.core))
+		self.update_out_proclog()
 		if self.gpu is not None:
 			bf.device.set_device(self.gpu)
 		self.cache_scope_hierarchy()
@@ -351,12 +452,6 @@ class SourceBlock(Block):
 		self.orings = [self.create_ring(space=default_space)]
 		self._seq_count = 0
 		self.perf_proclog = ProcLog(self.name+"/perf")
-		self.out_proclog = ProcLog(self.name+"/out")
-		
-		rnames = {'nring': len(self.orings)}
-		for i,r in enumerate(self.orings):
-			rnames['ring%i' % i] = r.name
-		self.out_proclog.update(rnames) 
 		
 	def main(self, orings):
 		for sourcename in self.sourcenames:
@@ -368,6 +463,7 @@ class SourceBlock(Block):
 					if 'time_tag' not in ohdr:
 						ohdr['time_tag'] = self._seq_count
 				self._seq_count += 1
+				trace = tracing.get_buffer()
 				with ExitStack() as oseq_stack:
 					oseqs = self.begin_sequences(oseq_stack, orings, oheaders, igulp_nframes=[])
 					while not self.shutdown_event.is_set():
@@ -376,9 +472,17 @@ class SourceBlock(Block):
 							ospans = self.reserve_spans(ospan_stack, oseqs, ispans=[])
 							cur_time = time.time()
 							reserve_time = cur_time - prev_time
+							if trace is not None:
+								frame_offset = ospans[0].frame_offset if ospans else -1
+								trace.record('reserve', self.name, prev_time,
+								             cur_time, frame_offset)
 							prev_time = cur_time
 							ostrides = self.on_data(ireader, ospans)
 							bf.device.stream_synchronize()
+							if trace is not None:
+								process_end_time = time.time()
+								trace.record('process', self.name, prev_time,
+								             process_end_time, frame_offset)
 							for ospan, ostride in zip(ospans, ostrides):
 								ospan.commit(ostride)
 							# TODO: Is this an OK way to detect end-of-data?
@@ -386,11 +490,15 @@ class SourceBlock(Block):
 								break
 						cur_time = time.time()
 						process_time = cur_time - prev_time
+						if trace is not None:
+							trace.record('commit', self.name, process_end_time,
+							             cur_time, frame_offset)
 						prev_time = cur_time
 						self.perf_proclog.update({
 							'acquire_time': -1,
 							'reserve_time': reserve_time,
-							'process_time': process_time})
+							'process_time': process_time,
+							'nframe':       ostrides[0] if ostrides else 0})
 	def define_output_nframes(self, _):
 		"""Return output nframe for each output, given input_nframes.
 		"""
@@ -418,79 +526,63 @@ def _span_slice(soft_slice):
 	             soft_slice.step or (soft_slice.stop - start))
 
 class MultiTransformBlock(Block):
-	def __init__(self, irings_, guarantee=True, *args, **kwargs):
+	def __init__(self, irings_, guarantee=True, skip_to_latest=False,
+	             *args, **kwargs):
 		super(MultiTransformBlock, self).__init__(irings_, *args, **kwargs)
 		# Note: Must use self.irings rather than irings_ because they may
 		#         actually be Block instances.
-		self.guarantee = guarantee
+		# Note: Blocks that skip to the latest data (e.g., live monitors)
+		#         never hold back the writer.
+		self.skip_to_latest = skip_to_latest
+		self.guarantee = guarantee and not skip_to_latest
 		self.orings = [self.create_ring(space=iring.space)
 		               for iring in self.irings]
 		self._seq_count = 0
 		self.perf_proclog = ProcLog(self.name+"/perf")
 		self.sequence_proclogs = [ProcLog(self.name+"/sequence%i"%i)
 		                          for i in xrange(len(self.irings))]
-		self.out_proclog = ProcLog(self.name+"/out")
-		
-		rnames = {'nring': len(self.orings)}
-		for i,r in enumerate(self.orings):
-			rnames['ring%i' % i] = r.name
-		self.out_proclog.update(rnames)
+		if not self.guarantee:
+			self.spill_proclogs = [ProcLog(self.name+"/spill%i"%i)
+			                       for i in xrange(len(self.irings))]
+		if self.skip_to_latest:
+			self.latest_proclogs = [ProcLog(self.name+"/latest%i"%i)
+			                        for i in xrange(len(self.irings))]
+			self._nframe_read    = [0] * len(self.irings)
+			self._nframe_skipped = [0] * len(self.irings)
 		
 	def main(self, orings):
 		for iseqs in izip(*[iring.read(guarantee=self.guarantee)
 		                    for iring in self.irings]):
 			if self.shutdown_event.is_set():
 				break
-			for i, iseq in enumerate(iseqs):
-				self.sequence_proclogs[i].update(iseq.header)
-			oheaders, islices = self._on_sequence(iseqs)
-			for ohdr in oheaders:
-				if 'time_tag' not in ohdr:
-					ohdr['time_tag'] = self._seq_count
-			self._seq_count += 1
-			
-			# Allow passing None to mean slice(gulp_nframe)
-			if islices is None:
-				islices = [None]*len(self.irings)
-			default_igulp_nframes = [self.gulp_nframe or iseq.header['gulp_nframe']
-			                        for iseq in iseqs]
-			islices = [islice or slice(igulp_nframe)
-			           for (islice,igulp_nframe) in
-			           zip(islices,default_igulp_nframes)]
-			
-			islices = [_span_slice(slice_) for slice_ in islices]
-			for iseq, islice in zip(iseqs, islices):
-				if self.buffer_factor is None:
-					src_block = iseq.ring.owner
-					if src_block is not None and self.is_fused_with(src_block):
-						buffer_factor = 1
-					else:
-						buffer_factor = None
-				else:
-					buffer_factor = self.buffer_factor
-				iseq.resize(gulp_nframe=(islice.stop - islice.start),
-				            buf_nframe=self.buffer_nframe,
-				            buffer_factor=buffer_factor)
+			oheaders, islices = self._begin_input_sequences(iseqs)
+			self._resize_input_sequences(iseqs, islices)
 			
 			igulp_nframes = [islice.stop - islice.start for islice in islices]
 			
+			trace = tracing.get_buffer()
 			with ExitStack() as oseq_stack:
 				oseqs = self.begin_sequences(oseq_stack, orings, oheaders, igulp_nframes)
 				prev_time = time.time()
-				for ispans in izip(*[iseq.read(islice.stop - islice.start,
-				                              islice.step,
-				                              islice.start)
+				for ispans in izip(*[self._read_spans(iseq, islice)
 				                    for (iseq,islice)
 				                    in zip(iseqs,islices)]):
 					if self.shutdown_event.is_set():
 						break
 					cur_time = time.time()
 					acquire_time = cur_time - prev_time
+					if trace is not None:
+						frame_offset = ispans[0].frame_offset
+						trace.record('acquire', self.name, prev_time, cur_time,
+						             frame_offset)
 					prev_time = cur_time
 					with ExitStack() as ospan_stack:
 						ospans = self.reserve_spans(ospan_stack, oseqs, ispans)
 						cur_time = time.time()
 						reserve_time = cur_time - prev_time
+						if trace is not None:
+							trace.record('reserve', self.name, prev_time, cur_time,
+							             frame_offset)
 						prev_time = cur_time
 						# *TODO: See if can fuse together multiple on_data calls here before
 						#          calling stream_synchronize().
@@ -498,6 +590,10 @@ class MultiTransformBlock(Block):
 						ostrides = self._on_data(ispans, ospans)
 						# TODO: // Default to not spinning the CPU: cudaSetDeviceFlags(cudaDeviceScheduleBlockingSync);
 						bf.device.stream_synchronize()
+						if trace is not None:
+							process_end_time = time.time()
+							trace.record('process', self.name, prev_time,
+							             process_end_time, frame_offset)
 						# Allow returning None to indicate complete consumption
 						if ostrides is None:
 							ostrides = [ospan.nframe for ospan in ospans]
@@ -507,22 +603,108 @@ class MultiTransformBlock(Block):
 							ospan.commit(ostride)
 					cur_time = time.time()
 					process_time = cur_time - prev_time
+					if trace is not None:
+						trace.record('commit', self.name, process_end_time,
+						             cur_time, frame_offset)
 					prev_time = cur_time
 					self.perf_proclog.update({
 						'acquire_time': acquire_time,
 						'reserve_time': reserve_time,
-						'process_time': process_time})
+						'process_time': process_time,
+						'nframe':       ispans[0].nframe})
+					if not self.guarantee:
+						self._update_spill_proclogs()
+					if self.skip_to_latest:
+						self._update_latest_proclogs(ispans)
+				if not self.shutdown_event.is_set():
+					self._flush_sequences(oseqs)
 			self._on_sequence_end(iseqs)
+	def _flush_sequences(self, oseqs):
+		"""Lets the block output what it held back until the end of its input
+		sequences, before the output sequences end"""
+		onframes = self._define_flush_nframes()
+		if not any(onframes):
+			return
+		with ExitStack() as ospan_stack:
+			ospans = [ospan_stack.enter_context(oseq.reserve(onframe))
+			          for (oseq,onframe) in zip(oseqs,onframes)]
+			ostrides = self._on_flush(ospans)
+			bf.device.stream_synchronize()
+			if ostrides is None:
+				ostrides = [ospan.nframe for ospan in ospans]
+			ostrides = [ostride if ostride is not None else ospan.nframe
+			            for (ostride,ospan) in zip(ostrides,ospans)]
+			for ospan, ostride in zip(ospans, ostrides):
+				ospan.commit(ostride)
+	def _read_spans(self, iseq, islice):
+		if self.skip_to_latest:
+			return iseq.read_latest(islice.stop - islice.start)
+		return iseq.read(islice.stop - islice.start, islice.step, islice.start)
+	def _update_latest_proclogs(self, ispans):
+		for i, (ispan, proclog) in enumerate(zip(ispans, self.latest_proclogs)):
+			self._nframe_read[i]    += ispan.nframe
+			self._nframe_skipped[i] += ispan.nframe_skipped
+			proclog.update({'nframe_read':    self._nframe_read[i],
+			                'nframe_skipped': self._nframe_skipped[i]})
+	def _update_spill_proclogs(self):
+		# Note: Only unguaranteed readers can fall behind and read spilled data
+		for iring, proclog in zip(self.irings, self.spill_proclogs):
+			spill_info = iring.spill_info
+			if spill_info is not None:
+				proclog.update(spill_info)
+	def _begin_input_sequences(self, iseqs):
+		for i, iseq in enumerate(iseqs):
+			self.sequence_proclogs[i].update(iseq.header)
+		oheaders, islices = self._on_sequence(iseqs)
+		for ohdr in oheaders:
+			if 'time_tag' not in ohdr:
+				ohdr['time_tag'] = self._seq_count
+		self._seq_count += 1
+		
+		# Allow passing None to mean slice(gulp_nframe)
+		if islices is None:
+			islices = [None]*len(self.irings)
+		default_igulp_nframes = [self.gulp_nframe or iseq.header['gulp_nframe']
+		                        for iseq in iseqs]
+		islices = [islice or slice(igulp_nframe)
+		           for (islice,igulp_nframe) in
+		           zip(islices,default_igulp_nframes)]
+		
+		islices = [_span_slice(slice_) for slice_ in islices]
+		return oheaders, islices
+	def _resize_input_sequences(self, iseqs, islices):
+		for iseq, islice in zip(iseqs, islices):
+			if self.buffer_factor is None:
+				src_block = iseq.ring.owner
+				if src_block is not None and self.is_fused_with(src_block):
+					buffer_factor = 1
+				else:
+					buffer_factor = None
+			else:
+				buffer_factor = self.buffer_factor
+			iseq.resize(gulp_nframe=(islice.stop - islice.start),
+			            buf_nframe=self.buffer_nframe,
+			            buffer_factor=buffer_factor)
 	def _on_sequence(self, iseqs):
 		return self.on_sequence(iseqs)
 	def _on_sequence_end(self, iseqs):
 		return self.on_sequence_end(iseqs)
 	def _on_data(self, ispans, ospans):
 		return self.on_data(ispans, ospans)
+	def _define_flush_nframes(self):
+		return self.define_flush_nframes()
+	def _on_flush(self, ospans):
+		return self.on_flush(ospans)
 	def define_output_nframes(self, input_nframes):
 		"""Return output nframe for each output, given input_nframes.
 		"""
 		return input_nframes
+	def define_flush_nframes(self):
+		"""Return the number of frames (at most one gulp) still to be output
+		for each output at the end of the input sequences. If any are
+		non-zero, on_flush is called to write them.
+		"""
+		return [0]*len(self.orings)
 	def on_sequence(self, iseqs):
 		"""Return: oheaders (one per output) and islices (one per input)
 		"""
@@ -534,6 +716,11 @@ class MultiTransformBlock(Block):
 		"""Process data from from ispans to ospans and return the number of
 		frames to commit for each output (or None to commit complete spans)."""
 		raise NotImplementedError
+	def on_flush(self, ospans):
+		"""Write the output held back until the end of the input sequences to
+		ospans and return the number of frames to commit for each output (or
+		None to commit complete spans)."""
+		raise NotImplementedError
 
 class TransformBlock(MultiTransformBlock):
 	def __init__(self, iring, *args, **kwargs):
@@ -575,6 +762,20 @@ class TransformBlock(MultiTransformBlock):
 		"""Return the number of output frames to commit, or None to commit all
 		"""
 		raise NotImplementedError
+	def _define_flush_nframes(self):
+		return [self.define_flush_nframes()]
+	def define_flush_nframes(self):
+		"""Return the number of frames (at most one gulp) still to be output
+		at the end of the input sequence, which on_flush then writes
+		"""
+		return 0
+	def _on_flush(self, ospans):
+		return [self.on_flush(ospans[0])]
+	def on_flush(self, ospan):
+		"""Write the output held back until the end of the input sequence and
+		return the number of frames to commit, or None to commit all
+		"""
+		raise NotImplementedError
 
 # TODO: Need something like on_sequence_end to allow closing open files etc.
 class SinkBlock(MultiTransformBlock):
@@ -604,6 +805,245 @@ class SinkBlock(MultiTransformBlock):
 	def _on_data(self, ispans, ospans):
 		self.on_data(ispans[0])
 		return []
+	def _define_flush_nframes(self):
+		return []
 	def on_data(self, ispan):
 		"""Return nothing"""
 		raise NotImplementedError
+
+class _FusedSequence(SequenceBase):
+	"""Stands in for a ReadSequence between blocks in a FusedBlockChain"""
+	def __init__(self, ring, header):
+		SequenceBase.__init__(self, ring)
+		self._header = header
+	@property
+	def name(self):
+		return self._header['name']
+	@property
+	def time_tag(self):
+		return self._header['time_tag']
+	@property
+	def header(self):
+		return self._header
+
+class _FusedSpan(SpanBase):
+	"""Stands in for a ring span by wrapping part of a scratch buffer"""
+	def __init__(self, sequence, data, frame_offset, nframe, writeable):
+		SpanBase.__init__(self, sequence.ring, sequence, writeable)
+		self._data = data
+		self._frame_offset = frame_offset
+		self._nframe = nframe
+		self.commit_nframe = nframe
+	@property
+	def frame_offset(self):
+		return self._frame_offset
+	@property
+	def nframe(self):
+		return self._nframe
+	def commit(self, nframe):
+		self.commit_nframe = nframe
+
+class FusedBlockChain(object):
+	"""Runs a linear chain of fused TransformBlocks in a single thread
+	
+	Each gulp read by the first block is passed through the whole chain
+	via small per-block scratch buffers, and only the last block writes
+	to its output ring. This removes the thread hand-offs and intermediate
+	rings between the blocks, as well as all but one stream_synchronize()
+	per gulp.
+	
+	Note: Blocks after the first must consume their input in whole gulps
+	        (i.e., without overlap), and see a short gulp whenever the
+	        block before them commits fewer frames than it was given.
+	"""
+	def __init__(self, blocks):
+		self.blocks = blocks
+		self.name = '+'.join([block.name for block in blocks])
+		self._active_block = blocks[0]
+	def shutdown(self):
+		for block in self.blocks:
+			block.shutdown()
+	def run(self):
+		head, tail = self.blocks[0], self.blocks[-1]
+		bind_info = bind_cores(head.core)
+		for block in self.blocks:
+			block.bind_proclog.update(bind_info)
+			block.update_out_proclog()
+			block.cache_scope_hierarchy()
+		if head.gpu is not None:
+			bf.device.set_device(head.gpu)
+		with ExitStack() as oring_stack:
+			active_orings = tail.begin_writing(oring_stack, tail.orings)
+			try:
+				self.main(active_orings)
+			except Exception:
+				print "From block instantiated here:"
+				print self._active_block.init_trace
+				raise
+	def _begin_fused_sequences(self, iseq, ohdr, igulp_nframe):
+		"""Propagates headers down the chain and allocates scratch buffers
+		
+		Returns the input sequence, input gulp size and frame-axis index
+		of each block, the scratch buffers between them, and the output
+		header of the last block.
+		"""
+		iseqs, igulp_nframes, frame_axes, scratch = [iseq], [igulp_nframe], [], []
+		for src, dst in zip(self.blocks[:-1], self.blocks[1:]):
+			ogulp_nframe = src._define_output_nframes([igulp_nframe])[0]
+			ohdr['gulp_nframe'] = ogulp_nframe
+			# Mimic the round trip through a ring's JSON header
+			hdr = deepcopy(ohdr)
+			hdr['_tensor']['dtype'] = str(hdr['_tensor']['dtype'])
+			if dst.iring.header_transform is not None:
+				hdr = dst.iring.header_transform(hdr)
+			fseq = _FusedSequence(dst.iring, hdr)
+			tensor = fseq.tensor
+			shape = (tensor['ringlet_shape'] + [ogulp_nframe] +
+			         tensor['frame_shape'])
+			scratch.append(bf.ndarray(shape=shape,
+			                          dtype=hdr['_tensor']['dtype'],
+			                          space=src.orings[0].space))
+			frame_axes.append(len(tensor['ringlet_shape']))
+			self._active_block = dst
+			oheaders, islices = dst._begin_input_sequences([fseq])
+			islice = islices[0]
+			if islice != slice(0, ogulp_nframe, ogulp_nframe):
+				raise ValueError("Block %s cannot be fused with %s: its input "
+				                 "must be read in whole gulps of %i frames" %
+				                 (dst.name, src.name, ogulp_nframe))
+			iseqs.append(fseq)
+			igulp_nframes.append(ogulp_nframe)
+			igulp_nframe = ogulp_nframe
+			ohdr = oheaders[0]
+		return iseqs, igulp_nframes, frame_axes, scratch, ohdr
+	def main(self, orings):
+		head, tail = self.blocks[0], self.blocks[-1]
+		for iseq in head.iring.read(guarantee=head.guarantee):
+			if head.shutdown_event.is_set():
+				break
+			self._active_block = head
+			oheaders, islices = head._begin_input_sequences([iseq])
+			head._resize_input_sequences([iseq], islices)
+			islice = islices[0]
+			igulp_nframe = islice.stop - islice.start
+			iseqs, igulp_nframes, frame_axes, scratch, ohdr = \
+			    self._begin_fused_sequences(iseq, oheaders[0], igulp_nframe)
+			self._frame_offsets = [0] * len(scratch)
+			trace = tracing.get_buffer()
+			with ExitStack() as oseq_stack:
+				oseqs = tail.begin_sequences(oseq_stack, orings, [ohdr],
+				                             igulp_nframes[-1:])
+				prev_time = time.time()
+				for ispan in head._read_spans(iseq, islice):
+					if head.shutdown_event.is_set():
+						break
+					cur_time = time.time()
+					acquire_time = cur_time - prev_time
+					if trace is not None:
+						trace.record('acquire', head.name, prev_time, cur_time,
+						             ispan.frame_offset)
+					self._process_gulp(ispan, iseqs, frame_axes, scratch,
+					                   oseqs, acquire_time, trace)
+					if not head.guarantee:
+						head._update_spill_proclogs()
+					if head.skip_to_latest:
+						head._update_latest_proclogs([ispan])
+					prev_time = time.time()
+				if not head.shutdown_event.is_set():
+					self._flush_gulps(iseqs, frame_axes, scratch, oseqs, trace)
+			for block, seq in zip(self.blocks, iseqs):
+				self._active_block = block
+				block._on_sequence_end([seq])
+	def _flush_gulps(self, iseqs, frame_axes, scratch, oseqs, trace):
+		"""Lets each block output what it held back until the end of the
+		sequence, passing it through the rest of the chain"""
+		for i, block in enumerate(self.blocks[:-1]):
+			self._active_block = block
+			nframe = block._define_flush_nframes()[0]
+			if not nframe:
+				continue
+			idx = (slice(None),)*frame_axes[i] + (slice(0, nframe),)
+			ospan = _FusedSpan(iseqs[i+1], scratch[i][idx],
+			                   self._frame_offsets[i], nframe, writeable=True)
+			nframe_commit = block._on_flush([ospan])[0]
+			if nframe_commit is None:
+				nframe_commit = ospan.commit_nframe
+			bf.device.stream_synchronize()
+			if nframe_commit == 0:
+				continue
+			idx = (slice(None),)*frame_axes[i] + (slice(0, nframe_commit),)
+			data = scratch[i][idx]
+			data.flags['WRITEABLE'] = False
+			ispan = _FusedSpan(iseqs[i+1], data,
+			                   self._frame_offsets[i], nframe_commit,
+			                   writeable=False)
+			self._frame_offsets[i] += nframe_commit
+			self._process_gulp(ispan, iseqs, frame_axes, scratch, oseqs,
+			                   0, trace, first=i+1)
+		self._active_block = self.blocks[-1]
+		self.blocks[-1]._flush_sequences(oseqs)
+	def _process_gulp(self, ispan, iseqs, frame_axes, scratch, oseqs,
+	                  acquire_time, trace, first=0):
+		tail = self.blocks[-1]
+		for i in xrange(first, len(self.blocks)-1):
+			block = self.blocks[i]
+			self._active_block = block
+			prev_time = time.time()
+			ogulp_nframe = block._define_output_nframes([ispan.nframe])[0]
+			idx = (slice(None),)*frame_axes[i] + (slice(0, ogulp_nframe),)
+			ospan = _FusedSpan(iseqs[i+1], scratch[i][idx],
+			                   self._frame_offsets[i], ogulp_nframe,
+			                   writeable=True)
+			nframe_commit = block._on_data([ispan], [ospan])[0]
+			if nframe_commit is None:
+				nframe_commit = ospan.commit_nframe
+			cur_time = time.time()
+			if trace is not None:
+				trace.record('process', block.name, prev_time, cur_time,
+				             ispan.frame_offset)
+			block.perf_proclog.update({
+				'acquire_time': acquire_time,
+				'reserve_time': 0,
+				'process_time': cur_time - prev_time,
+				'nframe':       ispan.nframe})
+			acquire_time = 0
+			if nframe_commit == 0:
+				# Nothing for the rest of the chain to do this gulp
+				bf.device.stream_synchronize()
+				return
+			idx = (slice(None),)*frame_axes[i] + (slice(0, nframe_commit),)
+			data = scratch[i][idx]
+			data.flags['WRITEABLE'] = False
+			ispan = _FusedSpan(iseqs[i+1], data,
+			                   self._frame_offsets[i], nframe_commit,
+			                   writeable=False)
+			self._frame_offsets[i] += nframe_commit
+		self._active_block = tail
+		prev_time = time.time()
+		with ExitStack() as ospan_stack:
+			ospans = tail.reserve_spans(ospan_stack, oseqs, [ispan])
+			cur_time = time.time()
+			reserve_time = cur_time - prev_time
+			if trace is not None:
+				trace.record('reserve', tail.name, prev_time, cur_time,
+				             ispan.frame_offset)
+			prev_time = cur_time
+			ostrides = tail._on_data([ispan], ospans)
+			bf.device.stream_synchronize()
+			if trace is not None:
+				process_end_time = time.time()
+				trace.record('process', tail.name, prev_time,
+				             process_end_time, ispan.frame_offset)
+			ostrides = [ostride if ostride is not None else ospan.nframe
+			            for (ostride,ospan) in zip(ostrides,ospans)]
+			for ospan, ostride in zip(ospans, ostrides):
+				ospan.commit(ostride)
+		cur_time = time.time()
+		if trace is not None:
+			trace.record('commit', tail.name, process_end_time, cur_time,
+			             ispan.frame_offset)
+		tail.perf_proclog.update({
+			'acquire_time': acquire_time,
+			'reserve_time': reserve_time,
+			'process_time': cur_time - prev_time,
+			'nframe':       ispan.nframe})
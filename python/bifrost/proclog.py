@@ -30,7 +30,6 @@
 from libbifrost import _bf, _check, _get, _string2space, _space2string
 
 import os
-import glob
 import ctypes
 import numpy as np
 
@@ -114,14 +113,20 @@ def load_by_pid(pid):
 		raise RuntimeError("Cannot find log directory associated with PID %s" % pid)
 		
 	# Find the relevant files
-	filenames = glob.glob(os.path.join(baseDir, '*', '*'))
-	
+	# Note: Block names may themselves contain '/' (e.g., when nested inside
+	#         a Pipeline), so the whole tree is searched.
+	filenames = []
+	for dirName, _, fileNames in os.walk(baseDir):
+		if dirName == baseDir:
+			continue
+		filenames.extend([os.path.join(dirName, name) for name in fileNames])
+		
 	# Load
 	contents = {}
 	for filename in filenames:
 		## Extract the block and logfile names
 		logName = os.path.basename(filename)
-		blockName = os.path.basename( os.path.dirname(filename) )
+		blockName = os.path.relpath(os.path.dirname(filename), baseDir)
 		
 		## Load the file's contents
 		subContents = load_by_filename(filename)
@@ -28,11 +28,37 @@
 
 from libbifrost import _bf, _check, _get, _fast_call
 from ndarray import asarray
+import numpy as np
 
-def quantize(src, dst, scale=1.):
+def quantize(src, dst, scale=1., axis=None, sumsq=None, nclip=None):
+	"""Scales, clips and quantizes floating-point values to integers.
+	
+	If ``axis`` is given, ``scale`` may be an array with one scale factor per
+	channel along that axis. If ``sumsq`` (f64) or ``nclip`` (u64) arrays are
+	given, the per-channel sum of squares of the input components and number
+	of clipped components are added to them in the same pass. ``dst`` may be
+	None to only gather ``sumsq``.
+	"""
+	if axis is None and sumsq is None and nclip is None:
+		src_bf = asarray(src).as_BFarray()
+		dst_bf = asarray(dst).as_BFarray()
+		_fast_call(_bf.Quantize, src_bf,
+		                    dst_bf,
+		                    scale)
+		return dst
+	if axis is None:
+		axis = -1
+	elif axis < 0:
+		axis += len(src.shape)
+	nchan = src.shape[axis] if axis >= 0 else 1
+	scales = np.broadcast_to(np.asarray(scale, dtype=np.float64), (nchan,))
+	scales = np.ascontiguousarray(scales)
 	src_bf = asarray(src).as_BFarray()
-	dst_bf = asarray(dst).as_BFarray()
-	_fast_call(_bf.Quantize, src_bf,
-	                    dst_bf,
-	                    scale)
+	dst_bf = asarray(dst).as_BFarray() if dst is not None else None
+	_check(_bf.QuantizeChannels(src_bf,
+	                            dst_bf,
+	                            asarray(scales).as_BFarray(),
+	                            axis,
+	                            asarray(sumsq).as_BFarray() if sumsq is not None else None,
+	                            asarray(nclip).as_BFarray() if nclip is not None else None))
 	return dst
@@ -0,0 +1,59 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from libbifrost import _bf, _check, _get, _fast_call
+from ndarray import asarray
+
+REDUCE_MAP = {
+	'sum':     _bf.BF_REDUCE_SUM,
+	'mean':    _bf.BF_REDUCE_MEAN,
+	'min':     _bf.BF_REDUCE_MIN,
+	'max':     _bf.BF_REDUCE_MAX,
+	'pwrsum':  _bf.BF_REDUCE_POWER_SUM,
+	'pwrmean': _bf.BF_REDUCE_POWER_MEAN,
+	'pwrmin':  _bf.BF_REDUCE_POWER_MIN,
+	'pwrmax':  _bf.BF_REDUCE_POWER_MAX
+}
+
+def reduce(idata, odata, op='sum', accumulate=False):
+	"""Reduces groups of consecutive values along one axis.
+	
+	The reduced axis is the one whose length differs between ``idata`` and
+	``odata``, and each output value reduces ``idata.shape[axis] //
+	odata.shape[axis]`` input values. ``op`` is one of 'sum', 'mean', 'min',
+	'max' or their power (``|x|**2``) equivalents 'pwrsum', 'pwrmean',
+	'pwrmin' and 'pwrmax'. If ``accumulate`` is True, the existing contents of
+	``odata`` are included in the reduction (not supported for the mean ops).
+	"""
+	if op not in REDUCE_MAP:
+		raise ValueError("Invalid reduce op: " + str(op))
+	_fast_call(_bf.Reduce, asarray(idata).as_BFarray(),
+	                       asarray(odata).as_BFarray(),
+	                       REDUCE_MAP[op],
+	                       accumulate)
+	return odata
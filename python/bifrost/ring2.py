@@ -96,6 +96,49 @@ class Ring(object):
 	@property
 	def name(self):
 		return _get(_bf.RingGetName(self.obj))
+	@property
+	def nbyte(self):
+		"""Number of bytes currently allocated for the ring's buffer"""
+		_check(_bf.RingLock(self.obj))
+		try:
+			stride   = _get(_bf.RingLockedGetStride(self.obj))
+			nringlet = _get(_bf.RingLockedGetNRinglet(self.obj))
+			mirrored = _get(_bf.RingLockedGetMirrored(self.obj))
+		finally:
+			_check(_bf.RingUnlock(self.obj))
+		if mirrored:
+			# Note: The second half of each ringlet maps the same memory
+			stride //= 2
+		return stride * nringlet
+	@property
+	def mirrored(self):
+		"""Whether the ring's buffer is mirror-mapped in virtual memory, such
+		that spans that wrap around the end of the buffer need no copying"""
+		_check(_bf.RingLock(self.obj))
+		try:
+			return bool(_get(_bf.RingLockedGetMirrored(self.obj)))
+		finally:
+			_check(_bf.RingUnlock(self.obj))
+	def enable_spill(self, path, max_nbyte=0):
+		"""Spill data that unguaranteed readers have yet to read to the file
+		at path before it is overwritten, so that lagging readers can catch up
+		from disk without blocking the writer. At most max_nbyte bytes are
+		held on disk (0 means no limit)."""
+		_check(_bf.RingSetSpill(self.obj, path, max_nbyte))
+	def disable_spill(self):
+		_check(_bf.RingSetSpill(self.obj, None, 0))
+	@property
+	def spill_info(self):
+		"""Dict of spill-to-disk statistics, or None if spilling is disabled"""
+		info = _bf.BFspill_info()
+		_check(_bf.RingGetSpillInfo(self.obj, info))
+		if not info.enabled:
+			return None
+		return {'nbyte_spilled':   int(info.nbyte_spilled),
+		        'nbyte_recovered': int(info.nbyte_recovered),
+		        'nbyte_dropped':   int(info.nbyte_dropped),
+		        'nbyte_stored':    int(info.nbyte_stored),
+		        'reader_lag':      int(info.reader_lag)}
 	def begin_writing(self):
 		return RingWriter(self)
 	def _begin_writing(self):
@@ -104,13 +147,24 @@ class Ring(object):
 		_check( _bf.RingEndWriting(self.obj) );
 	def open_sequence(self, name, guarantee=True):
 		return ReadSequence(self, name=name, guarantee=guarantee)
+	def open_sequence_at(self, time_tag, guarantee=True):
+		"""Opens the sequence containing time_tag, i.e., the last sequence
+		that began at or before it. This is a lookup in the ring's ordered
+		time_tag index rather than a walk through the sequences."""
+		return ReadSequence(self, which='at', time_tag=time_tag,
+		                    guarantee=guarantee)
+	def open_sequence_before(self, time_tag, guarantee=True):
+		"""Opens the last sequence that began strictly before time_tag"""
+		return ReadSequence(self, which='before', time_tag=time_tag,
+		                    guarantee=guarantee)
 	def open_latest_sequence(self, guarantee=True):
 		return ReadSequence(self, which='latest', guarantee=guarantee)
 	def open_earliest_sequence(self, guarantee=True):
 		return ReadSequence(self, which='earliest', guarantee=guarantee)
 	# TODO: Alternative name?
-	def read(self, whence='earliest', guarantee=True):
+	def read(self, whence='earliest', guarantee=True, time_tag=None):
 		with ReadSequence(self, which=whence, guarantee=guarantee,
+		                  time_tag=time_tag,
 		                  header_transform=self.header_transform) as cur_seq:
 			while True:
 				yield cur_seq
@@ -154,6 +208,10 @@ class SequenceBase(object):
 	def header_size(self):
 		return _get(_bf.RingSequenceGetHeaderSize(self._base_obj))
 	@property
+	def size(self):
+		"""Number of bytes (per ringlet) committed to the sequence so far"""
+		return _get(_bf.RingSequenceGetSize(self._base_obj))
+	@property
 	def _header_ptr(self):
 		return _get(_bf.RingSequenceGetHeader(self._base_obj))
 	@property
@@ -232,7 +290,7 @@ class WriteSequence(SequenceBase):
 		return WriteSpan(self.ring, self, nframe)
 
 class ReadSequence(SequenceBase):
-	def __init__(self, ring, which='specific', name="",
+	def __init__(self, ring, which='specific', name="", time_tag=None,
 	             other_obj=None, guarantee=True,
 	             header_transform=None):
 		SequenceBase.__init__(self, ring)
@@ -248,8 +306,16 @@ class ReadSequence(SequenceBase):
 		elif which == 'earliest':
 			self.obj = _get(_bf.RingSequenceOpenEarliest(ring=ring.obj,
 			                                             guarantee=guarantee), retarg=0)
+		elif which == 'at':
+			self.obj = _get(_bf.RingSequenceOpenAt(ring=ring.obj,
+			                                       time_tag=time_tag,
+			                                       guarantee=guarantee), retarg=0)
+		elif which == 'before':
+			self.obj = _get(_bf.RingSequenceOpenBefore(ring=ring.obj,
+			                                           time_tag=time_tag,
+			                                           guarantee=guarantee), retarg=0)
 		else:
-			raise ValueError("Invalid 'which' parameter; must be one of: 'specific', 'latest', 'earliest'")
+			raise ValueError("Invalid 'which' parameter; must be one of: 'specific', 'latest', 'earliest', 'at', 'before'")
 		
 	def __enter__(self):
 		return self
@@ -265,6 +331,21 @@ class ReadSequence(SequenceBase):
 		self._tensor = None
 	def acquire(self, frame_offset, nframe):
 		return ReadSpan(self, frame_offset, nframe)
+	def frame_offset_at(self, time, units=None):
+		"""Returns the offset from the start of the sequence of the frame
+		containing the given time, according to the scale of the frame axis.
+		The time is in the units of the frame axis unless units is given."""
+		tensor = self.header['_tensor']
+		frame_axis = tensor['shape'].index(-1)
+		start, step = tensor['scales'][frame_axis]
+		if units is not None:
+			from units import convert_units
+			time = convert_units(time, units, tensor['units'][frame_axis])
+		if time < start:
+			raise ValueError("Time %s is before the start of the sequence" % time)
+		# Note: The tolerance avoids rounding down times that fall exactly on
+		#         the start of a frame.
+		return int(np.floor((time - start) / float(step) + 1e-9))
 	def read(self, nframe, stride=None, begin=0):
 		if stride is None:
 			stride = nframe
@@ -273,6 +354,23 @@ class ReadSequence(SequenceBase):
 			with self.acquire(offset, nframe) as ispan:
 				yield ispan
 			offset += stride
+	def read_latest(self, nframe):
+		"""Yields spans of the most recently committed nframe frames, skipping
+		any frames committed since the previous span without error (as
+		needed by monitoring blocks that only care about the freshest data).
+		Each span's nframe_skipped attribute gives the number of frames
+		skipped before it. Intended for sequences opened with guarantee=False,
+		so that the reader never holds back the writer."""
+		frame_nbyte = self.tensor['frame_nbyte']
+		offset = 0
+		while True:
+			# Note: If fewer than nframe new frames have been committed, this
+			#         blocks in acquire until they have (or the sequence ends).
+			latest = max(offset, self.size // frame_nbyte - nframe)
+			with self.acquire(latest, nframe) as ispan:
+				ispan.nframe_skipped = latest - offset
+				yield ispan
+			offset = latest + nframe
 	def resize(self, gulp_nframe, buf_nframe=None, buffer_factor=None):
 		if buf_nframe is None:
 			if buffer_factor is None:
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Opt-in per-gulp tracing of pipeline blocks
+
+When enabled, every acquire/reserve/process/commit interval of each block
+is recorded into a fixed-size buffer owned by the recording thread. The
+buffers are written out as a Chrome trace-event JSON file (viewable in
+chrome://tracing or https://ui.perfetto.dev) when the pipeline finishes
+or is shut down.
+
+Example::
+
+    bf.tracing.enable('pipeline_trace.json')
+    with bf.Pipeline() as pipeline:
+        ...
+        pipeline.run()
+"""
+
+import os
+import time
+import signal
+import threading
+
+try:
+	import simplejson as json
+except ImportError:
+	print "WARNING: Install simplejson for better performance"
+	import json
+
+class TraceBuffer(object):
+	"""Fixed-capacity ring of events recorded by a single thread
+	
+	Only the owning thread writes to the buffer, so no locking is needed;
+	once full, the oldest events are overwritten.
+	"""
+	def __init__(self, thread_name, thread_id, capacity):
+		self.thread_name = thread_name
+		self.thread_id   = thread_id
+		self.capacity    = capacity
+		self.events      = [None] * capacity
+		self.nevent      = 0
+	def record(self, name, block_name, start, stop, frame_offset):
+		self.events[self.nevent % self.capacity] = (name, block_name,
+		                                            start, stop, frame_offset)
+		self.nevent += 1
+	def __iter__(self):
+		if self.nevent <= self.capacity:
+			return iter(self.events[:self.nevent])
+		split = self.nevent % self.capacity
+		return iter(self.events[split:] + self.events[:split])
+
+_lock = threading.Lock()
+_thread_local = threading.local()
+_buffers = []
+_filename = None
+_capacity = 0
+# Incremented by enable() so that threads discard buffers from earlier traces
+_generation = 0
+
+def enable(filename, capacity=1<<16):
+	"""Start recording block activity, to be dumped to the given file
+	
+	Args:
+	    filename (str): Path of the trace-event JSON file to write.
+	    capacity (int): Maximum number of events retained per thread.
+	"""
+	global _filename, _capacity, _generation
+	with _lock:
+		_filename = filename
+		_capacity = capacity
+		_generation += 1
+		del _buffers[:]
+
+def disable():
+	"""Stop recording block activity"""
+	global _filename
+	with _lock:
+		_filename = None
+		del _buffers[:]
+
+def is_enabled():
+	return _filename is not None
+
+def get_buffer():
+	"""Returns the calling thread's TraceBuffer, or None if tracing is
+	disabled"""
+	if _filename is None:
+		return None
+	if getattr(_thread_local, 'generation', None) != _generation:
+		thread = threading.current_thread()
+		buf = TraceBuffer(thread.name, thread.ident, _capacity)
+		with _lock:
+			_buffers.append(buf)
+		_thread_local.buffer = buf
+		_thread_local.generation = _generation
+	return _thread_local.buffer
+
+def dump(filename=None):
+	"""Writes all recorded events to a trace-event JSON file
+	
+	Args:
+	    filename (str): Output path. Defaults to the path passed to enable().
+	"""
+	filename = filename or _filename
+	if filename is None:
+		return
+	pid = os.getpid()
+	with _lock:
+		buffers = list(_buffers)
+	events = []
+	for buf in buffers:
+		events.append({'name': 'thread_name', 'ph': 'M',
+		               'pid': pid, 'tid': buf.thread_id,
+		               'args': {'name': buf.thread_name}})
+		for name, block_name, start, stop, frame_offset in buf:
+			events.append({'name': name, 'cat': block_name, 'ph': 'X',
+			               'ts':  start * 1e6,
+			               'dur': (stop - start) * 1e6,
+			               'pid': pid, 'tid': buf.thread_id,
+			               'args': {'block': block_name,
+			                        'frame_offset': frame_offset}})
+	with open(filename, 'w') as f:
+		json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+def dump_on_signal(signum=signal.SIGUSR1):
+	"""Installs a signal handler that dumps the trace without stopping"""
+	signal.signal(signum, lambda signum, frame: dump())
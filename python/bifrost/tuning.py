@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Automatic tuning of pipeline gulp sizes and buffer factors
+
+Example::
+
+    def build():
+        data = my_bounded_source(..., gulp_nframe=256)
+        data = bf.blocks.copy(data, space='cuda')
+        ...
+    config = bf.tuning.tune(build, memory_budget=2**30, verbose=True)
+    with bf.Pipeline() as pipeline:
+        build()
+        pipeline.run(config=config)
+"""
+
+import os
+import gc
+import time
+import threading
+from collections import defaultdict
+
+from pipeline import Pipeline, Block, SourceBlock, MultiTransformBlock
+from proclog import load_by_pid
+
+class _PerfSampler(threading.Thread):
+	"""Periodically accumulates the perf ProcLogs of a set of blocks"""
+	def __init__(self, names, interval):
+		super(_PerfSampler, self).__init__(name='PerfSampler')
+		self.daemon = True
+		self.names = names
+		self.interval = interval
+		self.stop_event = threading.Event()
+		self.sums   = dict((name, defaultdict(lambda: 0.)) for name in names)
+		self.counts = dict((name, 0) for name in names)
+	def run(self):
+		while not self.stop_event.wait(self.interval):
+			self.sample()
+		self.sample()
+	def sample(self):
+		try:
+			logs = load_by_pid(os.getpid())
+		except (RuntimeError, IOError, OSError):
+			# Logs may be removed from under us while blocks shut down
+			return
+		for name in self.names:
+			perf = logs.get(name, {}).get('perf', {})
+			if not perf:
+				continue
+			for key, value in perf.items():
+				if key.endswith('_time') and value >= 0:
+					self.sums[name][key] += value
+			self.counts[name] += 1
+	def stop(self):
+		self.stop_event.set()
+		self.join()
+	def means(self):
+		return dict((name, dict((key, total / self.counts[name])
+		                        for key, total in self.sums[name].items()))
+		            for name in self.names if self.counts[name])
+
+class Trial(object):
+	"""The measured outcome of running a pipeline with one set of settings"""
+	def __init__(self, gulp_nframe, buffer_factor):
+		self.gulp_nframe   = gulp_nframe
+		self.buffer_factor = buffer_factor
+		self.run_time      = float('inf')
+		self.ring_nbyte    = 0
+		self.block_times   = {}
+	@property
+	def bottleneck(self):
+		"""Name of the block with the largest mean process_time"""
+		if not self.block_times:
+			return None
+		return max(self.block_times,
+		           key=lambda name: self.block_times[name].get('process_time', 0))
+	def __str__(self):
+		return ("gulp_nframe=%s buffer_factor=%s: %.3f s, %.1f MiB, bottleneck %s" %
+		        (self.gulp_nframe, self.buffer_factor, self.run_time,
+		         self.ring_nbyte / float(1<<20), self.bottleneck))
+
+def _dispose(pipeline):
+	"""Breaks the reference cycles between a finished pipeline's blocks and
+	rings so that their memory is released before the next trial."""
+	for block in pipeline.blocks:
+		parent = block._parent_scope
+		if parent is not None and block in parent._children:
+			parent._children.remove(block)
+		for ring in block.orings:
+			ring.owner = None
+		block.orings = []
+		block.irings = []
+	pipeline.blocks = []
+	gc.collect()
+
+def _build(build, instance_counts):
+	"""Calls build() such that blocks receive the same names every time"""
+	Block.instance_counts.clear()
+	Block.instance_counts.update(instance_counts)
+	with Pipeline() as pipeline:
+		build()
+	return pipeline
+
+def _run_trial(build, instance_counts, names, gulp_nframe, buffer_factor,
+               nrepeat, poll_interval):
+	trial = Trial(gulp_nframe, buffer_factor)
+	for _ in xrange(nrepeat):
+		pipeline = _build(build, instance_counts)
+		if [block.name for block in pipeline.blocks] != names:
+			raise ValueError("build() must create the same blocks each time")
+		for block in pipeline.blocks:
+			if isinstance(block, SourceBlock) and gulp_nframe is not None:
+				block._gulp_nframe = gulp_nframe
+			elif isinstance(block, MultiTransformBlock) and buffer_factor is not None:
+				block._buffer_factor = buffer_factor
+		sampler = _PerfSampler(names, poll_interval)
+		sampler.start()
+		start_time = time.time()
+		pipeline.run()
+		run_time = time.time() - start_time
+		sampler.stop()
+		if run_time < trial.run_time:
+			trial.run_time = run_time
+			trial.ring_nbyte = sum([ring.nbyte for block in pipeline.blocks
+			                        for ring in block.orings])
+			trial.block_times = sampler.means()
+		_dispose(pipeline)
+	return trial
+
+def _select(trials, memory_budget, tolerance):
+	"""Returns the trial using the least memory among those within
+	tolerance of the fastest trial that fits in the memory budget."""
+	feasible = [trial for trial in trials
+	            if memory_budget is None or trial.ring_nbyte <= memory_budget]
+	if not feasible:
+		return None
+	fastest = min([trial.run_time for trial in feasible])
+	candidates = [trial for trial in feasible
+	              if trial.run_time <= fastest * (1 + tolerance)]
+	return min(candidates, key=lambda trial: trial.ring_nbyte)
+
+def tune(build, gulp_nframes=None, buffer_factors=(1, 2, 3, 4),
+         memory_budget=None, nrepeat=1, tolerance=0.05, poll_interval=0.05,
+         verbose=False):
+	"""Search for the gulp sizes and buffer factors that run a pipeline fastest
+	
+	The pipeline is constructed and run to completion once per trial, so
+	``build`` must read a bounded (or synthetic) input. Trials first vary
+	the gulp_nframe of the source blocks (the other blocks follow the gulp
+	size in their input headers), and then the buffer_factor of all
+	reading blocks. Settings whose rings exceed ``memory_budget`` are
+	rejected.
+	
+	Args:
+	    build (function): A function with no arguments that constructs the
+	        blocks of the pipeline inside the current default pipeline.
+	        It must create the same blocks in the same order each time it is
+	        called.
+	    gulp_nframes (list): Candidate source gulp sizes. Defaults to
+	        the first source's own gulp size scaled by 1/4, 1/2, 1, 2 and 4.
+	    buffer_factors (list): Candidate buffer factors for reading blocks.
+	    memory_budget (int): Maximum total size of all ring buffers in bytes.
+	    nrepeat (int): Number of runs per trial; the fastest is used.
+	    tolerance (float): Fractional slowdown that will be accepted in
+	        exchange for using less memory.
+	    poll_interval (float): Seconds between samples of the perf ProcLogs.
+	    verbose (bool): If True, print the outcome of each trial.
+	
+	Returns:
+	    dict: A configuration of the form {block_name: {setting: value}}
+	        that may be passed to ``Pipeline.run(config=...)``.
+	"""
+	# Note: Block names depend on how many blocks have been created so far,
+	#         so the counts are rewound before every build. This makes the
+	#         names in the returned config match the next call to build().
+	instance_counts = dict(Block.instance_counts)
+	try:
+		return _search(build, instance_counts, gulp_nframes, buffer_factors,
+		               memory_budget, nrepeat, tolerance, poll_interval,
+		               verbose)
+	finally:
+		Block.instance_counts.clear()
+		Block.instance_counts.update(instance_counts)
+
+def _search(build, instance_counts, gulp_nframes, buffer_factors,
+            memory_budget, nrepeat, tolerance, poll_interval, verbose):
+	# Dry-run build to discover the blocks and their default settings
+	pipeline = _build(build, instance_counts)
+	names = [block.name for block in pipeline.blocks]
+	source_names = [block.name for block in pipeline.blocks
+	                if isinstance(block, SourceBlock)]
+	reader_names = [block.name for block in pipeline.blocks
+	                if isinstance(block, MultiTransformBlock)]
+	if not source_names:
+		raise ValueError("build() did not create any SourceBlocks")
+	default_gulp_nframe = [block.gulp_nframe for block in pipeline.blocks
+	                       if isinstance(block, SourceBlock)][0]
+	_dispose(pipeline)
+	if gulp_nframes is None:
+		gulp_nframes = [int(default_gulp_nframe * scale)
+		                for scale in (0.25, 0.5, 1, 2, 4)
+		                if int(default_gulp_nframe * scale) >= 1]
+	
+	def run_trial(gulp_nframe, buffer_factor):
+		trial = _run_trial(build, instance_counts, names,
+		                   gulp_nframe, buffer_factor, nrepeat, poll_interval)
+		if verbose:
+			print trial
+		return trial
+	
+	gulp_trials = []
+	for gulp_nframe in sorted(gulp_nframes):
+		gulp_trials.append(run_trial(gulp_nframe, None))
+		# Memory use only grows with gulp size, so stop once over budget
+		if (memory_budget is not None and
+		    gulp_trials[-1].ring_nbyte > memory_budget):
+			break
+	best = _select(gulp_trials, memory_budget, tolerance)
+	if best is None:
+		raise ValueError("No gulp size fits within the memory budget")
+	buffer_trials = [run_trial(best.gulp_nframe, buffer_factor)
+	                 for buffer_factor in buffer_factors]
+	best_buffered = _select(buffer_trials, memory_budget, tolerance)
+	if (best_buffered is not None and
+	    best_buffered.run_time < best.run_time * (1 + tolerance)):
+		best = best_buffered
+	if verbose:
+		print "Selected", best
+	
+	config = {}
+	for name in source_names:
+		config[name] = {'gulp_nframe': best.gulp_nframe}
+	if best.buffer_factor is not None:
+		for name in reader_names:
+			config[name] = {'buffer_factor': best.buffer_factor}
+	return config
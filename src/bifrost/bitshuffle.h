@@ -0,0 +1,73 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/*! \file bitshuffle.h
+ *  \brief A function for transposing the bits of an array's elements
+ */
+
+#ifndef BF_BITSHUFFLE_H_INCLUDE_GUARD_
+#define BF_BITSHUFFLE_H_INCLUDE_GUARD_
+
+#include <bifrost/common.h>
+#include <bifrost/array.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*! \p bfBitshuffle regroups the bits of an array of elements so that
+ *    each output byte holds the same bit of 8 consecutive elements
+ *
+ *  The array is processed in blocks of about 8 kB. Each output block
+ *    consists of the 8 x \p itemsize bit planes of its elements, one after
+ *    the other, each containing one bit per element. This usually makes
+ *    noise-like data much more compressible, as the high bits of
+ *    neighbouring elements are mostly equal (or equal to each other). Any
+ *    elements left over after the last group of 8 are copied unchanged to
+ *    the end of the output.
+ *
+ *  \param in       Input array of shape [nbyte] and datatype u8, where
+ *                    nbyte is a multiple of \p itemsize
+ *  \param out      Output array of the same shape and datatype u8. Must not
+ *                    overlap \p in.
+ *  \param itemsize The size of each element, in bytes
+ *  \param inverse  Whether to undo the shuffle instead of applying it
+ *  \note  This runs on the calling thread only, so that separate chunks can
+ *           be shuffled concurrently by a pool of threads
+*/
+BFstatus bfBitshuffle(BFarray const* in,
+                      BFarray const* out,
+                      int            itemsize,
+                      BFbool         inverse);
+
+#ifdef __cplusplus
+} // extern "C"
+#endif
+
+#endif // BF_BITSHUFFLE_H_INCLUDE_GUARD_
@@ -0,0 +1,76 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/*! \file boxcar.h
+ *  \brief A function for boxcar matched filtering of time series
+ */
+
+#ifndef BF_BOXCAR_H_INCLUDE_GUARD_
+#define BF_BOXCAR_H_INCLUDE_GUARD_
+
+#include <bifrost/common.h>
+#include <bifrost/array.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*! \p bfBoxcarFilter computes the peak signal-to-noise ratio of a set of
+ *    boxcar filters applied to each of a batch of time series
+ *
+ *  Each series is normalised by its median and by the standard deviation
+ *    estimated from its median absolute deviation (MAD), which are robust
+ *    to the presence of pulses. The sum of each boxcar is then computed
+ *    from running prefix sums, so the cost is independent of its width.
+ *    For series b and start sample t, snr[b,t] is the maximum over the
+ *    widths w of (sum_{i<w} in[b,t+i] - w*median) / (sigma*sqrt(w)).
+ *    The arrays may be strided or padded.
+ *
+ *  \param in     Input array of shape [nbatch, ntime_in] and datatype f32.
+ *                  The statistics are computed over all ntime_in samples.
+ *  \param widths Array of shape [nwidth] and datatype i32 containing the
+ *                  boxcar widths (in samples), which must lie in
+ *                  [1, ntime_in - ntime_out + 1]
+ *  \param snr    Output array of shape [nbatch, ntime_out] and datatype f32
+ *                  containing the peak S/N of the boxcars starting at each
+ *                  sample. Series with zero MAD give zero S/N.
+ *  \param iwidth Output array of shape [nbatch, ntime_out] and datatype i32
+ *                  containing the index into \p widths of the peak, or NULL
+ *  \note  The series are split across the calling thread's OpenMP team
+*/
+BFstatus bfBoxcarFilter(BFarray const* in,
+                        BFarray const* widths,
+                        BFarray const* snr,
+                        BFarray const* iwidth);
+
+#ifdef __cplusplus
+} // extern "C"
+#endif
+
+#endif // BF_BOXCAR_H_INCLUDE_GUARD_
@@ -0,0 +1,69 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/*! \file dedisperse.h
+ *  \brief A function for brute-force incoherent dedispersion
+ */
+
+#ifndef BF_DEDISPERSE_H_INCLUDE_GUARD_
+#define BF_DEDISPERSE_H_INCLUDE_GUARD_
+
+#include <bifrost/common.h>
+#include <bifrost/array.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*! \p bfDedisperse sums delayed channel time series for each of a set of
+ *    dispersion trials
+ *
+ *  For each trial d and output sample t,
+ *    out[d,t] = sum_c in[c, t + delays[d,c]]. The two stages of subband
+ *    dedispersion are both applied using this function. The arrays may be
+ *    strided or padded, but the input should be contiguous in time for
+ *    best performance.
+ *
+ *  \param in     Input array of shape [nchan, ntime_in] and datatype f32
+ *  \param delays Array of shape [ndm, nchan] and datatype i32 containing
+ *                  the delay (in samples) of each channel for each trial.
+ *                  Delays must lie in [0, ntime_in - ntime_out].
+ *  \param out    Output array of shape [ndm, ntime_out] and datatype f32
+ *  \note  Blocks of output samples are split across the calling thread's
+ *           OpenMP team
+*/
+BFstatus bfDedisperse(BFarray const* in,
+                      BFarray const* delays,
+                      BFarray const* out);
+
+#ifdef __cplusplus
+} // extern "C"
+#endif
+
+#endif // BF_DEDISPERSE_H_INCLUDE_GUARD_
@@ -0,0 +1,77 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/*! \file detect.h
+ *  \brief A function for square-law detection and integration of polarisations
+ */
+
+#ifndef BF_DETECT_H_INCLUDE_GUARD_
+#define BF_DETECT_H_INCLUDE_GUARD_
+
+#include <bifrost/common.h>
+#include <bifrost/array.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+typedef enum BFdetect_mode_ {
+	BF_DETECT_SCALAR, // x   -> x.x*
+	BF_DETECT_JONES,  // x,y -> x.x* + 1j*y.y*, x.y*
+	BF_DETECT_STOKES  // x,y -> I, Q, U, V
+} BFdetect_mode;
+
+/*! \p bfDetect forms polarisation products and integrates them along one axis
+ *
+ *  The integrated axis is the one (other than \p pol_axis) whose length
+ *    differs between \p in and \p out, and the integration factor is the
+ *    ratio of the two lengths. The arrays may be strided or padded.
+ *
+ *  \param in         Input array with complex datatype of kind ci or cf
+ *  \param out        Output array with datatype f32 (scalar and stokes modes)
+ *                      or cf32 (jones mode)
+ *  \param mode       Polarisation products to form
+ *  \param pol_axis   Axis of \p in of length 2 containing the polarisations,
+ *                      which has length 2 (jones) or 4 (stokes) in \p out.
+ *                      Ignored in scalar mode, which detects every element.
+ *  \param accumulate If true, the existing contents of \p out are included
+ *                      in the integration instead of being overwritten.
+ *  \note  The work is split across the calling thread's OpenMP team
+*/
+BFstatus bfDetect(BFarray const* in,
+                  BFarray const* out,
+                  BFdetect_mode  mode,
+                  int            pol_axis,
+                  BFbool         accumulate);
+
+#ifdef __cplusplus
+} // extern "C"
+#endif
+
+#endif // BF_DETECT_H_INCLUDE_GUARD_
@@ -0,0 +1,74 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/*! \file fold.h
+ *  \brief A function for folding multi-channel time series into phase bins
+ */
+
+#ifndef BF_FOLD_H_INCLUDE_GUARD_
+#define BF_FOLD_H_INCLUDE_GUARD_
+
+#include <bifrost/common.h>
+#include <bifrost/array.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*! \p bfFold adds each sample of a multi-channel time series into the
+ *    phase bin of a periodic signal that it falls in
+ *
+ *  The phase of each channel starts at its entry in \p phase and advances
+ *    by \p dphase every time sample, so per-channel delays (e.g., due to
+ *    dispersion) are applied by offsetting the starting phases. Sample
+ *    (t, p, c) is added to bin floor(frac(phase[c] + t*dphase)*nbin) of
+ *    \p out, and that bin of \p hits is incremented. The arrays may be
+ *    strided or padded.
+ *
+ *  \param in     Input array of shape [ntime, npol, nchan] and datatype f32
+ *  \param phase  Array of shape [nchan] and datatype f64 containing the
+ *                  phase (in turns) of the first sample of each channel
+ *  \param dphase Phase advance (in turns) per time sample; must be >= 0
+ *  \param out    Accumulator array of shape [npol, nchan, nbin] and
+ *                  datatype f32, into which the input is added
+ *  \param hits   Accumulator array of shape [nchan, nbin] and datatype u32
+ *                  counting the samples added to each bin, or NULL
+ *  \note  The channels are split across the calling thread's OpenMP team
+*/
+BFstatus bfFold(BFarray const* in,
+                BFarray const* phase,
+                double         dphase,
+                BFarray const* out,
+                BFarray const* hits);
+
+#ifdef __cplusplus
+} // extern "C"
+#endif
+
+#endif // BF_FOLD_H_INCLUDE_GUARD_
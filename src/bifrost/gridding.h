@@ -0,0 +1,81 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/*! \file gridding.h
+ *  \brief A function for convolutional gridding of visibilities
+ */
+
+#ifndef BF_GRIDDING_H_INCLUDE_GUARD_
+#define BF_GRIDDING_H_INCLUDE_GUARD_
+
+#include <bifrost/common.h>
+#include <bifrost/array.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*! \p bfGridVisibilities convolves a set of visibilities onto a regular
+ *    uv grid with a separable, oversampled anti-aliasing kernel
+ *
+ *  Each visibility is added to the support x support cells around its
+ *    (u,v) position, weighted by the kernel sampled at the nearest of the
+ *    \p noversample sub-cell offsets in each dimension. The cells of a
+ *    visibility are kernel[oy,j] * kernel[ox,i] for j,i = 0..support-1,
+ *    starting at row floor(v) - (support-1)/2 and column
+ *    floor(u) - (support-1)/2, where o = round(frac(u) * noversample).
+ *    Visibilities are first sorted by their first row so that each thread
+ *    owns a strip of grid rows and no atomic operations are needed.
+ *    Kernel cells that fall outside the grid are dropped, and visibilities
+ *    with a non-finite position are skipped (i.e., flagged). The arrays may
+ *    be strided or padded.
+ *
+ *  \param vis    Input array of shape [nbaseline, nchan, npol] and datatype
+ *                  cf32
+ *  \param uv     Array of shape [nbaseline, nchan, 2] and datatype f32
+ *                  containing the (u,v) position of each visibility in
+ *                  units of grid cells, with cell i centred at position i
+ *  \param kernel Array of shape [noversample, support] and datatype f32
+ *                  containing the 1D kernel for each sub-cell offset
+ *  \param grid   Output array of shape [npol, nv, nu] and datatype cf32
+ *  \param accumulate Whether to add to the existing contents of \p grid
+ *                  instead of overwriting them
+ *  \note  The grid rows are split across the calling thread's OpenMP team
+*/
+BFstatus bfGridVisibilities(BFarray const* vis,
+                            BFarray const* uv,
+                            BFarray const* kernel,
+                            BFarray const* grid,
+                            BFbool         accumulate);
+
+#ifdef __cplusplus
+} // extern "C"
+#endif
+
+#endif // BF_GRIDDING_H_INCLUDE_GUARD_
@@ -0,0 +1,78 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/*! \file harmonic.h
+ *  \brief A function for incoherent harmonic summing of power spectra
+ */
+
+#ifndef BF_HARMONIC_H_INCLUDE_GUARD_
+#define BF_HARMONIC_H_INCLUDE_GUARD_
+
+#include <bifrost/common.h>
+#include <bifrost/array.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*! \p bfHarmonicSum computes the significance of each fundamental
+ *    frequency of a batch of power spectra, summed over 1, 2, 4, ... up to
+ *    \p max_nharmonic harmonics
+ *
+ *  The input powers must be normalised to a mean of 1 for noise, so that
+ *    twice the sum S of h harmonics is chi-squared distributed with 2h
+ *    degrees of freedom. For each fundamental bin k, the harmonics
+ *    k, 2k, ..., hk are summed for each power of two h (up to the last
+ *    bin of the spectrum), and the sum is converted to an equivalent
+ *    Gaussian significance using the Wilson-Hilferty approximation:
+ *    sigma = ((S/h)^(1/3) - (1 - 1/(9h))) / sqrt(1/(9h)). The maximum over
+ *    h is output. The arrays may be strided or padded.
+ *
+ *  \param in            Input power array of shape [nbatch, nfreq] and
+ *                         datatype f32
+ *  \param max_nharmonic The maximum number of harmonics (a power of 2)
+ *  \param sigma         Output array of shape [nbatch, nfreq] and datatype
+ *                         f32 containing the peak significance of each
+ *                         fundamental
+ *  \param nharmonic     Output array of shape [nbatch, nfreq] and datatype
+ *                         i32 containing the number of harmonics of the
+ *                         peak, or NULL
+ *  \note  Blocks of fundamentals are split across the calling thread's
+ *           OpenMP team
+*/
+BFstatus bfHarmonicSum(BFarray const* in,
+                       int            max_nharmonic,
+                       BFarray const* sigma,
+                       BFarray const* nharmonic);
+
+#ifdef __cplusplus
+} // extern "C"
+#endif
+
+#endif // BF_HARMONIC_H_INCLUDE_GUARD_
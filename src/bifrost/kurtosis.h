@@ -0,0 +1,80 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/*! \file kurtosis.h
+ *  \brief A function for spectral kurtosis estimation and RFI flagging
+ */
+
+#ifndef BF_KURTOSIS_H_INCLUDE_GUARD_
+#define BF_KURTOSIS_H_INCLUDE_GUARD_
+
+#include <bifrost/common.h>
+#include <bifrost/array.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*! \p bfSpectralKurtosis computes the generalized spectral kurtosis of
+ *    windows of power samples, and optionally flags the windows whose
+ *    kurtosis lies outside the given bounds (Nita & Gary 2010)
+ *
+ *  The windows lie along the axis whose length differs between \p in and
+ *    \p sk, and the window length M is the ratio of the two lengths. For
+ *    each window, SK = (M*nd + 1)/(M - 1) * (M*S2/S1^2 - 1), where S1 and
+ *    S2 are the sums of the samples and of their squares. The arrays may
+ *    be strided or padded.
+ *
+ *  \param in          Input power array with datatype f32
+ *  \param sk          Output spectral kurtosis array with datatype f32
+ *  \param out         Output array with the same shape as \p in and
+ *                       datatype f32, or NULL to only compute \p sk. Each
+ *                       window is copied from \p in, or set to
+ *                       \p replacement if it is flagged. May be \p in.
+ *  \param nd          The number of spectra averaged into each input sample
+ *                       times the shape parameter of their distribution
+ *                       (1 for the power of complex voltages)
+ *  \param lower       Windows with SK < \p lower are flagged
+ *  \param upper       Windows with SK > \p upper are flagged
+ *  \param replacement Value written to the samples of flagged windows
+ *  \note  The work is split across the calling thread's OpenMP team
+*/
+BFstatus bfSpectralKurtosis(BFarray const* in,
+                            BFarray const* sk,
+                            BFarray const* out,
+                            double         nd,
+                            double         lower,
+                            double         upper,
+                            double         replacement);
+
+#ifdef __cplusplus
+} // extern "C"
+#endif
+
+#endif // BF_KURTOSIS_H_INCLUDE_GUARD_
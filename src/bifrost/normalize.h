@@ -0,0 +1,82 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/*! \file normalize.h
+ *  \brief A function for running baseline subtraction and normalisation
+ */
+
+#ifndef BF_NORMALIZE_H_INCLUDE_GUARD_
+#define BF_NORMALIZE_H_INCLUDE_GUARD_
+
+#include <bifrost/common.h>
+#include <bifrost/array.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*! \p bfRunningNormalize subtracts a running baseline from each of a set
+ *    of time series and divides by a running RMS, at a constant cost per
+ *    sample
+ *
+ *  Each output sample is (in[t,i] - center[i]) / scale[i], using the
+ *    estimates from the preceding samples, after which the estimates are
+ *    updated with a time constant of 1/\p alpha samples. If \p robust is
+ *    false, these are exponential moving averages of the mean and variance.
+ *    Otherwise, the center tracks the median by moving a step proportional
+ *    to the scale towards each sample, and the scale tracks the mean
+ *    absolute deviation with deviations clipped at 3 times the scale, so
+ *    that pulses and RFI have little effect. The arrays may be strided or
+ *    padded.
+ *
+ *  \param in     Input array of shape [ntime, nseries] and datatype f32
+ *  \param out    Output array of the same shape and datatype f32. May be
+ *                  \p in.
+ *  \param center Array of shape [nseries] and datatype f32 containing the
+ *                  baseline of each series, which is updated
+ *  \param scale  Array of shape [nseries] and datatype f32 containing the
+ *                  RMS of each series, which is updated. Series with zero
+ *                  scale are output as zero.
+ *  \param alpha  The update weight of each sample, in (0, 1]
+ *  \param robust Whether to track the median and clipped deviation
+ *                  instead of the mean and variance
+ *  \note  The series are split across the calling thread's OpenMP team
+*/
+BFstatus bfRunningNormalize(BFarray const* in,
+                            BFarray const* out,
+                            BFarray const* center,
+                            BFarray const* scale,
+                            double         alpha,
+                            BFbool         robust);
+
+#ifdef __cplusplus
+} // extern "C"
+#endif
+
+#endif // BF_NORMALIZE_H_INCLUDE_GUARD_
@@ -0,0 +1,71 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/*! \file pfb.h
+ *  \brief A function for the FIR stage of a polyphase filterbank
+ */
+
+#ifndef BF_PFB_H_INCLUDE_GUARD_
+#define BF_PFB_H_INCLUDE_GUARD_
+
+#include <bifrost/common.h>
+#include <bifrost/array.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/*! \p bfPfbFir applies the polyphase FIR filter of a polyphase filterbank
+ *    to a sequence of frames, each containing one sample of every branch
+ *
+ *  out[t,k,j] = sum_p coeffs[p,k] * in[t+p,k,j], where k is the branch
+ *    (i.e., the position within the frame, which becomes the channel after
+ *    a Fourier transform along that axis), and j indexes any further
+ *    independent series (e.g., polarisations). The tap sums are accumulated
+ *    in cache and written once per output frame. The arrays may be strided
+ *    or padded.
+ *
+ *  \param in     Input array of shape [ntime_in, nbranch, ninner] and
+ *                  datatype f32 or cf32
+ *  \param coeffs Array of shape [ntap, nbranch] and datatype f32 containing
+ *                  the filter coefficients, i.e., the prototype filter
+ *                  reshaped to [ntap, nbranch]
+ *  \param out    Output array of shape [ntime_in - ntap + 1, nbranch,
+ *                  ninner] and the same datatype as \p in
+ *  \note  The branches are split across the calling thread's OpenMP team
+*/
+BFstatus bfPfbFir(BFarray const* in,
+                  BFarray const* coeffs,
+                  BFarray const* out);
+
+#ifdef __cplusplus
+} // extern "C"
+#endif
+
+#endif // BF_PFB_H_INCLUDE_GUARD_
@@ -44,7 +44,7 @@ extern "C" {
 /*! \p bfQuantize scales, clips and quantizes floating-point values to integers
  *
  *  \param in    Input array with 32-bit datatype of kind f/cf
- *  \param out   Output array with 8/16/32-bit datatype of kind i/u/ci
+ *  \param out   Output array with 2/4/8/16/32-bit datatype of kind i/u/ci
  *  \param scale Scale factor by which to multiply the input values
  *  \note Unsigned types are clipped to [0,2**nbit)
  *  \note Signed types are clipped to (-2**nbit,2**nbit)
@@ -54,6 +54,29 @@ BFstatus bfQuantize(BFarray const* in,
                     BFarray const* out,
                     double         scale);
 
+/*! \p bfQuantizeChannels is like \p bfQuantize but applies a separate scale
+ *    factor to each channel along \p axis, and can also gather per-channel
+ *    statistics of the input in the same pass
+ *
+ *  \param in     Input array with 32-bit datatype of kind f/cf
+ *  \param out    Output array with 2/4/8/16/32-bit datatype of kind i/u/ci,
+ *                or NULL to only gather statistics
+ *  \param scales Array of nchan f32 or f64 scale factors, or NULL for unity
+ *  \param axis   Channel axis of \p in, or -1 for a single channel
+ *  \param sumsq  Array of nchan f64 values to which the sum of the squares
+ *                of each channel's input (real) components is added, or NULL
+ *  \param nclip  Array of nchan u64 values to which the number of each
+ *                channel's clipped components is added, or NULL. Requires
+ *                \p out and \p sumsq.
+ *  \note 2/4-bit values are packed first value in the most significant bits
+*/
+BFstatus bfQuantizeChannels(BFarray const* in,
+                            BFarray const* out,
+                            BFarray const* scales,
+                            int            axis,
+                            BFarray const* sumsq,
+                            BFarray const* nclip);
+
 #ifdef __cplusplus
 } // extern "C"
 #endif
@@ -0,0 +1,81 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/*! \file reduce.h
+ *  \brief A function for reducing arrays along an axis by an integer factor
+ */
+
+#ifndef BF_REDUCE_H_INCLUDE_GUARD_
+#define BF_REDUCE_H_INCLUDE_GUARD_
+
+#include <bifrost/common.h>
+#include <bifrost/array.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+typedef enum BFreduce_op_ {
+	BF_REDUCE_SUM,
+	BF_REDUCE_MEAN,
+	BF_REDUCE_MIN,
+	BF_REDUCE_MAX,
+	BF_REDUCE_POWER_SUM,
+	BF_REDUCE_POWER_MEAN,
+	BF_REDUCE_POWER_MIN,
+	BF_REDUCE_POWER_MAX
+} BFreduce_op;
+
+/*! \p bfReduce reduces groups of consecutive values along one axis
+ *
+ *  The reduced axis is the one whose length differs between \p in and
+ *    \p out, and the reduction factor is the ratio of the two lengths. All
+ *    other dims must match. The arrays may be strided or padded.
+ *
+ *  \param in  Input array with datatype of kind f/cf/i/ci/u and up to 32 bits
+ *  \param out Output array with datatype f32, or cf32 for complex input with
+ *               a non-power op
+ *  \param op  Reduction to apply. The power ops reduce |x|**2.
+ *  \param accumulate If true, the existing contents of \p out are included
+ *                      in the reduction instead of being overwritten. This
+ *                      allows partial reductions to be carried across calls.
+ *  \note  Min and max require real input or a power op
+ *  \note  The mean ops cannot be combined with \p accumulate
+ *  \note  The work is split across the calling thread's OpenMP team
+*/
+BFstatus bfReduce(BFarray const* in,
+                  BFarray const* out,
+                  BFreduce_op    op,
+                  BFbool         accumulate);
+
+#ifdef __cplusplus
+} // extern "C"
+#endif
+
+#endif // BF_REDUCE_H_INCLUDE_GUARD_
@@ -105,6 +105,36 @@ BFstatus bfRingSetAffinity(BFring ring, int  core);
  */
 BFstatus bfRingGetAffinity(BFring ring, int* core);
 
+/*! \p bfRingSetSpill enables an overflow tier for unguaranteed readers: data
+ *     that is about to be overwritten while an unguaranteed reader still needs
+ *     it is first written sequentially to a file, from which the reader's
+ *     subsequent span acquisitions are transparently filled. The writer is
+ *     never blocked waiting for the reader or the disk: the file is written
+ *     by a background thread, and data is dropped if it falls too far
+ *     behind.
+ * \param path     Path of the spill file (created/truncated). A value of NULL
+ *                 disables spilling and removes the file.
+ * \param max_size Max no. bytes to hold in the spill file (0 means no limit).
+ *                 Data that does not fit is dropped as it would be without
+ *                 spilling.
+ * \note Only rings in host-accessible memory spaces support spilling. While
+ *         spilling is enabled, spans acquired by unguaranteed readers hold a
+ *         copy of the data, as the ring's buffer may be overwritten while
+ *         they are open.
+ */
+BFstatus bfRingSetSpill(BFring ring, const char* path, BFsize max_size);
+typedef struct {
+	BFbool   enabled;
+	BFsize   nbyte_spilled;   // Total bytes written to the spill file
+	BFsize   nbyte_recovered; // Total bytes read back from the spill file
+	BFsize   nbyte_dropped;   // Total bytes not spilled due to max_size or
+	                          //   a backlog of pending writes
+	BFsize   nbyte_stored;    // Bytes currently held in the spill file
+	BFsize   reader_lag;      // Bytes between the head and the slowest
+	                          //   unguaranteed reader
+} BFspill_info;
+BFstatus bfRingGetSpillInfo(BFring ring, BFspill_info* spill_info);
+
 //BFsize   bfRingGetNRinglet(BFring ring);
 // TODO: BFsize bfRingGetSizeBytes
 // TODO: Method that returns tail,head,reserve_head plus all sequences' begin,end
@@ -119,6 +149,9 @@ BFstatus bfRingLockedGetContiguousSpan(BFring ring, BFsize* val);
 BFstatus bfRingLockedGetTotalSpan(BFring ring, BFsize* val);
 BFstatus bfRingLockedGetNRinglet(BFring ring, BFsize* val);
 BFstatus bfRingLockedGetStride(BFring ring, BFsize* val);
+// Returns whether the ring's buffer is mapped twice back-to-back in virtual
+//   memory instead of using a ghost region (stride = 2*total span)
+BFstatus bfRingLockedGetMirrored(BFring ring, BFbool* val);
 
 // Note: These allow one to ensure that processing is completed before
 //         the ring is destroyed. EndWriting effects an end to the
@@ -155,6 +188,13 @@ BFstatus bfRingSequenceOpenAt(BFrsequence* sequence,
                               BFring       ring,
                               BFoffset     time_tag,
                               BFbool       guarantee);
+// Opens the last sequence that began strictly before time_tag (i.e., the
+//   sequence preceding the one that begins at time_tag, if any).
+// Note: The same caveats apply as for bfRingSequenceOpenAt
+BFstatus bfRingSequenceOpenBefore(BFrsequence* sequence,
+                                  BFring       ring,
+                                  BFoffset     time_tag,
+                                  BFbool       guarantee);
 BFstatus bfRingSequenceOpenLatest(BFrsequence* sequence,
                                   BFring       ring,
                                   BFbool       guarantee);
@@ -174,6 +214,9 @@ BFstatus bfRingSequenceGetTimeTag(BFsequence sequence, BFoffset* time_tag);
 BFstatus bfRingSequenceGetHeader(BFsequence sequence, const void** hdr);
 BFstatus bfRingSequenceGetHeaderSize(BFsequence sequence, BFsize* size);
 BFstatus bfRingSequenceGetNRinglet(BFsequence sequence, BFsize* nringlet);
+// Returns the number of bytes (per ringlet) committed to the sequence so far
+//   (or in total, if the sequence has ended)
+BFstatus bfRingSequenceGetSize(BFsequence sequence, BFsize* size);
 
 typedef struct {
 	BFring      ring;
@@ -28,7 +28,7 @@
  */
 
 /*! \file unpack.h
- *  \brief A function for unpacking 1/2/4-bit data to 8-bits
+ *  \brief A function for unpacking 2/4-bit data to 8-bits
  */
 
 #ifndef BF_UNPACK_H_INCLUDE_GUARD_
@@ -41,9 +41,15 @@
 extern "C" {
 #endif
 
-/*! \p bfUnpack unpacks 1/2/4-bit data to 8-bits
+/*! \p bfUnpack unpacks 2/4-bit data to 8-bits
  *
- *  \param in        Input array with 1/2/4-bit datatype of kind i/u/ci
+ *  The work is split across the calling thread's OpenMP team. The outer
+ *    dims of \p in and \p out may be strided or padded, but the inner dim
+ *    must be contiguous (for 2/4-bit data, packed into bytes).
+ *    8-bit input is also accepted, in which case the data are copied and
+ *    conjugated if necessary.
+ *
+ *  \param in        Input array with 2/4/8-bit datatype of kind i/u/ci
  *  \param out       Output array with corresponding 8-bit datatype
  *  \param align_msb If true, the MSB of each input value is aligned with the
  *                   MSB in the output value (i.e., the input value is placed
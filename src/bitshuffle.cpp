@@ -0,0 +1,129 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <bifrost/bitshuffle.h>
+#include "utils.hpp"
+
+#include <algorithm>
+#include <cstring>
+#include <stdint.h>
+
+// Note: Blocks are shuffled separately, so that the similar bit planes of a
+//         block are close enough together for a compressor to match them
+#define BF_BITSHUFFLE_BLOCK_NBYTE 8192
+
+// Transposes an 8x8 matrix of bits stored one row per byte (this is its own
+//   inverse; see Hacker's Delight, section 7-3)
+static inline uint64_t transpose_8x8_bits(uint64_t x) {
+	uint64_t t;
+	t = (x ^ (x >>  7)) & 0x00AA00AA00AA00AAULL; x = x ^ t ^ (t <<  7);
+	t = (x ^ (x >> 14)) & 0x0000CCCC0000CCCCULL; x = x ^ t ^ (t << 14);
+	t = (x ^ (x >> 28)) & 0x00000000F0F0F0F0ULL; x = x ^ t ^ (t << 28);
+	return x;
+}
+
+// Note: Each group of 8 elements forms one byte of each bit plane
+static void bitshuffle(uint8_t const* in, uint8_t* out,
+                       long ngroup, int itemsize) {
+	for( long g=0; g<ngroup; ++g ) {
+		uint8_t const* group = in + g*8*itemsize;
+		for( int j=0; j<itemsize; ++j ) {
+			uint64_t x = 0;
+			for( int k=0; k<8; ++k ) {
+				x |= (uint64_t)group[k*itemsize + j] << (8*k);
+			}
+			x = transpose_8x8_bits(x);
+			uint8_t* planes = out + j*8*ngroup + g;
+			for( int b=0; b<8; ++b ) {
+				planes[b*ngroup] = (uint8_t)(x >> (8*b));
+			}
+		}
+	}
+}
+
+static void bitunshuffle(uint8_t const* in, uint8_t* out,
+                         long ngroup, int itemsize) {
+	for( long g=0; g<ngroup; ++g ) {
+		uint8_t* group = out + g*8*itemsize;
+		for( int j=0; j<itemsize; ++j ) {
+			uint8_t const* planes = in + j*8*ngroup + g;
+			uint64_t x = 0;
+			for( int b=0; b<8; ++b ) {
+				x |= (uint64_t)planes[b*ngroup] << (8*b);
+			}
+			x = transpose_8x8_bits(x);
+			for( int k=0; k<8; ++k ) {
+				group[k*itemsize + j] = (uint8_t)(x >> (8*k));
+			}
+		}
+	}
+}
+
+BFstatus bfBitshuffle(BFarray const* in,
+                      BFarray const* out,
+                      int            itemsize,
+                      BFbool         inverse) {
+	BF_ASSERT(in,  BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(out, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!out->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(in->dtype  == BF_DTYPE_U8, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(out->dtype == BF_DTYPE_U8, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(in->ndim == 1, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(shapes_equal(in, out), BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(itemsize >= 1, BF_STATUS_INVALID_ARGUMENT);
+	long nbyte = in->shape[0];
+	BF_ASSERT(nbyte % itemsize == 0, BF_STATUS_INVALID_SHAPE);
+	// TODO: Support strided arrays
+	BF_ASSERT(in->strides[0]  == 1, BF_STATUS_UNSUPPORTED_STRIDE);
+	BF_ASSERT(out->strides[0] == 1, BF_STATUS_UNSUPPORTED_STRIDE);
+	// TODO: Support CUDA space
+	BF_ASSERT(space_accessible_from(in->space,  BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(out->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	uint8_t const* idata = (uint8_t const*)in->data;
+	uint8_t*       odata = (uint8_t*)out->data;
+	BF_ASSERT(idata != odata, BF_STATUS_INVALID_POINTER);
+	long nelement = nbyte / itemsize;
+	long block_nelement = std::max(BF_BITSHUFFLE_BLOCK_NBYTE / itemsize / 8,
+	                               1) * 8;
+	for( long e0=0; e0<nelement; e0+=block_nelement ) {
+		long ngroup = std::min(block_nelement, nelement - e0) / 8;
+		uint8_t const* iblock = idata + e0*itemsize;
+		uint8_t*       oblock = odata + e0*itemsize;
+		if( inverse ) {
+			bitunshuffle(iblock, oblock, ngroup, itemsize);
+		} else {
+			bitshuffle(iblock, oblock, ngroup, itemsize);
+		}
+	}
+	long nshuffle = nelement / 8 * 8 * itemsize;
+	::memcpy(odata + nshuffle, idata + nshuffle, nbyte - nshuffle);
+	return BF_STATUS_SUCCESS;
+}
@@ -0,0 +1,191 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <bifrost/boxcar.h>
+#include "utils.hpp"
+
+#include <algorithm>
+#include <cmath>
+#include <vector>
+
+// Returns the median of the n values in buf, which is reordered
+inline float median_inplace(float* buf, long n) {
+	std::nth_element(buf, buf + n/2, buf + n);
+	float upper = buf[n/2];
+	if( n % 2 ) {
+		return upper;
+	}
+	// Note: The lower middle value is the largest of the lower half
+	float lower = *std::max_element(buf, buf + n/2);
+	return 0.5f*(lower + upper);
+}
+
+struct BoxcarFunctor {
+	float const* in;
+	int const*   widths;
+	float*       snr;
+	int*         iwidth;
+	long         nwidth;
+	long         ntime_in;
+	long         ntime_out;
+	long         ibs; // Input strides
+	long         its;
+	long         sbs; // S/N strides
+	long         sts;
+	long         wbs; // Width index strides
+	long         wts;
+	// Note: The buffers are reused by each thread across series
+	void operator()(long b, std::vector<float>& buf,
+	                std::vector<double>& prefix,
+	                std::vector<double>& scale) const {
+		float const* irow = in + b*ibs;
+		for( long t=0; t<ntime_in; ++t ) {
+			buf[t] = irow[t*its];
+		}
+		float median = median_inplace(&buf[0], ntime_in);
+		for( long t=0; t<ntime_in; ++t ) {
+			buf[t] = std::abs(buf[t] - median);
+		}
+		// Note: This scales the MAD to the standard deviation of Gaussian noise
+		double sigma = 1.4826 * median_inplace(&buf[0], ntime_in);
+		float* srow = snr + b*sbs;
+		int*   wrow = iwidth ? iwidth + b*wbs : 0;
+		if( sigma == 0 ) {
+			for( long t=0; t<ntime_out; ++t ) {
+				srow[t*sts] = 0;
+				if( wrow ) {
+					wrow[t*wts] = 0;
+				}
+			}
+			return;
+		}
+		prefix[0] = 0;
+		for( long t=0; t<ntime_in; ++t ) {
+			prefix[t+1] = prefix[t] + (irow[t*its] - median);
+		}
+		for( long k=0; k<nwidth; ++k ) {
+			scale[k] = 1. / (sigma * std::sqrt((double)widths[k]));
+		}
+		for( long t=0; t<ntime_out; ++t ) {
+			double best  = -HUGE_VAL;
+			int    ibest = 0;
+			for( long k=0; k<nwidth; ++k ) {
+				double s = (prefix[t + widths[k]] - prefix[t]) * scale[k];
+				if( s > best ) {
+					best  = s;
+					ibest = k;
+				}
+			}
+			srow[t*sts] = best;
+			if( wrow ) {
+				wrow[t*wts] = ibest;
+			}
+		}
+	}
+};
+
+BFstatus bfBoxcarFilter(BFarray const* in,
+                        BFarray const* widths,
+                        BFarray const* snr,
+                        BFarray const* iwidth) {
+	BF_ASSERT(in,     BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(widths, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(snr,    BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!snr->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(in->dtype     == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(widths->dtype == BF_DTYPE_I32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(snr->dtype    == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(in->ndim     == 2, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(widths->ndim == 1, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(snr->ndim    == 2, BF_STATUS_INVALID_SHAPE);
+	long nbatch    = in->shape[0];
+	long ntime_in  = in->shape[1];
+	long ntime_out = snr->shape[1];
+	long nwidth    = widths->shape[0];
+	BF_ASSERT(snr->shape[0] == nbatch,   BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(ntime_out <= ntime_in,     BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(nwidth > 0,                BF_STATUS_INVALID_SHAPE);
+	// TODO: Support CUDA space
+	BF_ASSERT(space_accessible_from(in->space,     BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(widths->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(snr->space,    BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	// TODO: Support endian conversion
+	BF_ASSERT(!in->big_endian == !is_big_endian(), BF_STATUS_UNSUPPORTED);
+	BoxcarFunctor func;
+	func.iwidth = 0;
+	func.wbs    = func.wts = 0;
+	if( iwidth ) {
+		BF_ASSERT(!iwidth->immutable, BF_STATUS_INVALID_POINTER);
+		BF_ASSERT(iwidth->dtype == BF_DTYPE_I32, BF_STATUS_UNSUPPORTED_DTYPE);
+		BF_ASSERT(shapes_equal(iwidth, snr), BF_STATUS_INVALID_SHAPE);
+		BF_ASSERT(space_accessible_from(iwidth->space, BF_SPACE_SYSTEM),
+		          BF_STATUS_UNSUPPORTED_SPACE);
+		func.iwidth = (int*)iwidth->data;
+		func.wbs    = iwidth->strides[0] / sizeof(int);
+		func.wts    = iwidth->strides[1] / sizeof(int);
+	}
+	// Note: The widths are copied so that they can be checked and read
+	//         contiguously
+	std::vector<int> widths_copy(nwidth);
+	long ws = widths->strides[0] / sizeof(int);
+	for( long k=0; k<nwidth; ++k ) {
+		int w = ((int const*)widths->data)[k*ws];
+		BF_ASSERT(w >= 1 && w <= ntime_in - ntime_out + 1,
+		          BF_STATUS_INVALID_ARGUMENT);
+		widths_copy[k] = w;
+	}
+	if( nbatch == 0 || ntime_out == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	func.in        = (float const*)in->data;
+	func.widths    = &widths_copy[0];
+	func.snr       = (float*)snr->data;
+	func.nwidth    = nwidth;
+	func.ntime_in  = ntime_in;
+	func.ntime_out = ntime_out;
+	func.ibs       = in->strides[0]  / sizeof(float);
+	func.its       = in->strides[1]  / sizeof(float);
+	func.sbs       = snr->strides[0] / sizeof(float);
+	func.sts       = snr->strides[1] / sizeof(float);
+	
+#pragma omp parallel if( nbatch > 1 )
+	{
+		std::vector<float>  buf(ntime_in);
+		std::vector<double> prefix(ntime_in + 1);
+		std::vector<double> scale(nwidth);
+#pragma omp for schedule(dynamic)
+		for( long b=0; b<nbatch; ++b ) {
+			func(b, buf, prefix, scale);
+		}
+	}
+	return BF_STATUS_SUCCESS;
+}
@@ -0,0 +1,139 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <bifrost/dedisperse.h>
+#include "utils.hpp"
+
+#include <algorithm>
+
+// Note: Each task sums one block of output samples for one trial, so that
+//         its accumulator stays in L1 cache while the channels are added
+#define BF_DEDISPERSE_BLOCK_SIZE 2048
+
+struct DedisperseFunctor {
+	float const* in;
+	int const*   delays;
+	float*       out;
+	long         nchan;
+	long         ics; // Input strides
+	long         its;
+	long         dds; // Delay strides
+	long         dcs;
+	long         ods; // Output strides
+	long         ots;
+	inline void operator()(long d, long begin, long n) const {
+		float acc[BF_DEDISPERSE_BLOCK_SIZE];
+		for( long i=0; i<n; ++i ) {
+			acc[i] = 0;
+		}
+		int const* drow = delays + d*dds;
+		for( long c=0; c<nchan; ++c ) {
+			float const* irow = in + c*ics + (begin + drow[c*dcs])*its;
+			if( its == 1 ) {
+				// Note: This is the common case and is vectorized
+				for( long i=0; i<n; ++i ) {
+					acc[i] += irow[i];
+				}
+			} else {
+				for( long i=0; i<n; ++i ) {
+					acc[i] += irow[i*its];
+				}
+			}
+		}
+		float* orow = out + d*ods + begin*ots;
+		for( long i=0; i<n; ++i ) {
+			orow[i*ots] = acc[i];
+		}
+	}
+};
+
+BFstatus bfDedisperse(BFarray const* in,
+                      BFarray const* delays,
+                      BFarray const* out) {
+	BF_ASSERT(in,     BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(delays, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(out,    BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!out->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(in->dtype     == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(delays->dtype == BF_DTYPE_I32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(out->dtype    == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(in->ndim     == 2, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(delays->ndim == 2, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(out->ndim    == 2, BF_STATUS_INVALID_SHAPE);
+	long nchan     = in->shape[0];
+	long ntime_in  = in->shape[1];
+	long ndm       = out->shape[0];
+	long ntime_out = out->shape[1];
+	BF_ASSERT(delays->shape[0] == ndm,   BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(delays->shape[1] == nchan, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(ntime_out <= ntime_in, BF_STATUS_INVALID_SHAPE);
+	// TODO: Support CUDA space
+	BF_ASSERT(space_accessible_from(in->space,     BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(delays->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(out->space,    BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	// TODO: Support endian conversion
+	BF_ASSERT(!in->big_endian == !is_big_endian(), BF_STATUS_UNSUPPORTED);
+	DedisperseFunctor func;
+	func.in     = (float const*)in->data;
+	func.delays = (int const*)delays->data;
+	func.out    = (float*)out->data;
+	func.nchan  = nchan;
+	func.ics    = in->strides[0]     / sizeof(float);
+	func.its    = in->strides[1]     / sizeof(float);
+	func.dds    = delays->strides[0] / sizeof(int);
+	func.dcs    = delays->strides[1] / sizeof(int);
+	func.ods    = out->strides[0]    / sizeof(float);
+	func.ots    = out->strides[1]    / sizeof(float);
+	// Note: Out-of-range delays would read past the end of the input
+	long max_delay = ntime_in - ntime_out;
+	for( long d=0; d<ndm; ++d ) {
+		for( long c=0; c<nchan; ++c ) {
+			int delay = func.delays[d*func.dds + c*func.dcs];
+			BF_ASSERT(delay >= 0 && delay <= max_delay,
+			          BF_STATUS_INVALID_ARGUMENT);
+		}
+	}
+	if( ndm == 0 || ntime_out == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	
+	long nblock = div_up(ntime_out, (long)BF_DEDISPERSE_BLOCK_SIZE);
+	long ntask  = ndm * nblock;
+#pragma omp parallel for schedule(static) if( ntask > 1 )
+	for( long t=0; t<ntask; ++t ) {
+		long d     = t / nblock;
+		long begin = (t % nblock) * BF_DEDISPERSE_BLOCK_SIZE;
+		long n     = std::min((long)BF_DEDISPERSE_BLOCK_SIZE, ntime_out - begin);
+		func(d, begin, n);
+	}
+	return BF_STATUS_SUCCESS;
+}
@@ -0,0 +1,200 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <bifrost/detect.h>
+#include <bifrost/reduce.h>
+#include "reduce.hpp"
+#include "utils.hpp"
+
+// Forms the polarisation products of one input row of n elements and adds
+//   them to (or, if INIT, writes them to) one output row
+template<bool INIT>
+inline void detect_update(float& o, float v) {
+	o = INIT ? v : o + v;
+}
+template<typename T, BFdetect_mode MODE, bool INIT>
+inline void detect_row(T const* irow,
+                       float*   optr,
+                       long     n,
+                       long     is,
+                       long     os,
+                       long     ips,
+                       long     ops) {
+	for( long i=0; i<n; ++i ) {
+		T const* x = irow + i*is;
+		T const* y = x + ips;
+		float xr = float(x[0]), xi = float(x[1]);
+		float yr = float(y[0]), yi = float(y[1]);
+		float xx  = xr*xr + xi*xi;
+		float yy  = yr*yr + yi*yi;
+		// x.y*
+		float xyr = xr*yr + xi*yi;
+		float xyi = xi*yr - xr*yi;
+		float* o = optr + i*os;
+		if( MODE == BF_DETECT_STOKES ) {
+			detect_update<INIT>(o[0*ops],  xx + yy);
+			detect_update<INIT>(o[1*ops],  xx - yy);
+			detect_update<INIT>(o[2*ops],  2*xyr);
+			detect_update<INIT>(o[3*ops], -2*xyi);
+		} else { // BF_DETECT_JONES
+			detect_update<INIT>(o[0],     xx);
+			detect_update<INIT>(o[1],     yy);
+			detect_update<INIT>(o[ops],   xyr);
+			detect_update<INIT>(o[ops+1], xyi);
+		}
+	}
+}
+
+template<typename T, BFdetect_mode MODE>
+struct DetectChunkFunctor {
+	T const* in;
+	float*   out;
+	long     factor;
+	long     rs;
+	long     is;
+	long     os;
+	long     ips;
+	long     ops;
+	bool     accumulate;
+	DetectChunkFunctor(T const* in_, float* out_, ReduceLayout const& layout,
+	                   long ips_, long ops_, bool accumulate_)
+		: in(in_), out(out_), factor(layout.factor), rs(layout.reduce_istride),
+		  is(layout.inner_istride), os(layout.inner_ostride),
+		  ips(ips_), ops(ops_), accumulate(accumulate_) {}
+	inline void operator()(long ioffset, long ooffset, long n) const {
+		T const* iptr = in  + ioffset;
+		float*   optr = out + ooffset;
+		for( long k=0; k<factor; ++k ) {
+			if( k == 0 && !accumulate ) {
+				detect_row<T,MODE,true >(iptr, optr, n, is, os, ips, ops);
+			} else {
+				detect_row<T,MODE,false>(iptr + k*rs, optr, n, is, os, ips, ops);
+			}
+		}
+	}
+};
+
+template<typename T>
+BFstatus detect_cpu_type(BFarray const*      in,
+                         BFarray const*      out,
+                         ReduceLayout const& layout,
+                         BFdetect_mode       mode,
+                         long                ips,
+                         long                ops,
+                         bool                accumulate) {
+	T const* idata = (T const*)in->data;
+	float*   odata = (float*)out->data;
+	switch( mode ) {
+	case BF_DETECT_JONES: {
+		typedef DetectChunkFunctor<T,BF_DETECT_JONES> Func;
+		foreach_reduce_chunk_cpu(layout, Func(idata, odata, layout,
+		                                      ips, ops, accumulate));
+		break;
+	}
+	case BF_DETECT_STOKES: {
+		typedef DetectChunkFunctor<T,BF_DETECT_STOKES> Func;
+		foreach_reduce_chunk_cpu(layout, Func(idata, odata, layout,
+		                                      ips, ops, accumulate));
+		break;
+	}
+	default: BF_FAIL("Supported bfDetect mode", BF_STATUS_INVALID_ARGUMENT);
+	}
+	return BF_STATUS_SUCCESS;
+}
+
+// Returns a view of a with the given dim removed
+inline BFarray remove_dim(BFarray const* a, int axis) {
+	BFarray b = *a;
+	for( int d=axis; d<a->ndim-1; ++d ) {
+		b.shape[d]   = a->shape[d+1];
+		b.strides[d] = a->strides[d+1];
+	}
+	--b.ndim;
+	return b;
+}
+
+BFstatus bfDetect(BFarray const* in,
+                  BFarray const* out,
+                  BFdetect_mode  mode,
+                  int            pol_axis,
+                  BFbool         accumulate) {
+	BF_ASSERT(in,  BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(out, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(BF_DTYPE_IS_COMPLEX(in->dtype), BF_STATUS_UNSUPPORTED_DTYPE);
+	if( mode == BF_DETECT_SCALAR ) {
+		return bfReduce(in, out, BF_REDUCE_POWER_SUM, accumulate);
+	}
+	BF_ASSERT(!out->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(in->ndim == out->ndim, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(0 <= pol_axis && pol_axis < in->ndim, BF_STATUS_INVALID_ARGUMENT);
+	BF_ASSERT(in->shape[pol_axis] == 2, BF_STATUS_INVALID_SHAPE);
+	
+	// TODO: Support CUDA space (the Python block uses bfMap there)
+	BF_ASSERT(space_accessible_from(in->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(out->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	switch( mode ) {
+	case BF_DETECT_JONES:
+		BF_ASSERT(out->dtype == BF_DTYPE_CF32, BF_STATUS_UNSUPPORTED_DTYPE);
+		BF_ASSERT(out->shape[pol_axis] == 2,   BF_STATUS_INVALID_SHAPE);
+		break;
+	case BF_DETECT_STOKES:
+		BF_ASSERT(out->dtype == BF_DTYPE_F32,  BF_STATUS_UNSUPPORTED_DTYPE);
+		BF_ASSERT(out->shape[pol_axis] == 4,   BF_STATUS_INVALID_SHAPE);
+		break;
+	default: BF_FAIL("Supported bfDetect mode", BF_STATUS_INVALID_ARGUMENT);
+	}
+	// TODO: Support conjugated input
+	BF_ASSERT(!in->conjugated, BF_STATUS_UNSUPPORTED);
+	BF_ASSERT(BF_DTYPE_NBIT(in->dtype) % 8 == 0, BF_STATUS_UNSUPPORTED_DTYPE);
+	// TODO: Support endian conversion
+	BF_ASSERT(!in->big_endian == !is_big_endian(), BF_STATUS_UNSUPPORTED);
+	
+	long icomp_nbyte = BF_DTYPE_NBIT(in->dtype) / 8 / 2;
+	long ips = in->strides[pol_axis]  / icomp_nbyte;
+	long ops = out->strides[pol_axis] / sizeof(float);
+	BFarray in_nopol  = remove_dim(in,  pol_axis);
+	BFarray out_nopol = remove_dim(out, pol_axis);
+	ReduceLayout layout;
+	BF_ASSERT(get_reduce_layout(&in_nopol, &out_nopol, false, &layout),
+	          BF_STATUS_INVALID_SHAPE);
+	if( shape_size(out->ndim, out->shape) == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	
+	switch( in->dtype ) {
+	case BF_DTYPE_CF32: return detect_cpu_type<float  >(in, out, layout, mode, ips, ops, accumulate);
+	case BF_DTYPE_CF64: return detect_cpu_type<double >(in, out, layout, mode, ips, ops, accumulate);
+	case BF_DTYPE_CI8:  return detect_cpu_type<int8_t >(in, out, layout, mode, ips, ops, accumulate);
+	case BF_DTYPE_CI16: return detect_cpu_type<int16_t>(in, out, layout, mode, ips, ops, accumulate);
+	case BF_DTYPE_CI32: return detect_cpu_type<int32_t>(in, out, layout, mode, ips, ops, accumulate);
+	default: BF_FAIL("Supported bfDetect input dtype", BF_STATUS_UNSUPPORTED_DTYPE);
+	}
+}
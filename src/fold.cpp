@@ -0,0 +1,168 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <bifrost/fold.h>
+#include "utils.hpp"
+
+#include <algorithm>
+#include <cmath>
+
+// Note: Each task folds a chunk of channels, so no two threads ever write
+//         to the same accumulator element
+#define BF_FOLD_CHUNK_SIZE 256
+
+// Folds the channels [begin, begin+n) of all time samples and pols
+struct FoldFunctor {
+	float const*  in;
+	double const* phase;
+	float*        out;
+	unsigned int* hits;
+	double        dphase;
+	long          ntime;
+	long          npol;
+	long          nbin;
+	long          its; // Input strides
+	long          ips;
+	long          ics;
+	long          phs; // Phase stride
+	long          ops; // Output strides
+	long          ocs;
+	long          obs;
+	long          hcs; // Hits strides
+	long          hbs;
+	inline void operator()(long begin, long n) const {
+		double ph[BF_FOLD_CHUNK_SIZE];
+		long   bin[BF_FOLD_CHUNK_SIZE];
+		for( long i=0; i<n; ++i ) {
+			double p = phase[(begin + i)*phs];
+			ph[i] = p - std::floor(p);
+		}
+		// Note: The phases are advanced incrementally instead of being
+		//         recomputed from the sample index
+		for( long t=0; t<ntime; ++t ) {
+			for( long i=0; i<n; ++i ) {
+				long b = (long)(ph[i]*nbin);
+				bin[i] = (b < nbin) ? b : nbin - 1;
+				ph[i] += dphase;
+				if( ph[i] >= 1 ) {
+					ph[i] -= std::floor(ph[i]);
+				}
+			}
+			for( long p=0; p<npol; ++p ) {
+				float const* irow = in  + t*its + p*ips + begin*ics;
+				float*       orow = out + p*ops + begin*ocs;
+				for( long i=0; i<n; ++i ) {
+					orow[i*ocs + bin[i]*obs] += irow[i*ics];
+				}
+			}
+			if( hits ) {
+				unsigned int* hrow = hits + begin*hcs;
+				for( long i=0; i<n; ++i ) {
+					++hrow[i*hcs + bin[i]*hbs];
+				}
+			}
+		}
+	}
+};
+
+BFstatus bfFold(BFarray const* in,
+                BFarray const* phase,
+                double         dphase,
+                BFarray const* out,
+                BFarray const* hits) {
+	BF_ASSERT(in,    BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(phase, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(out,   BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!out->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(in->dtype    == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(phase->dtype == BF_DTYPE_F64, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(out->dtype   == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(in->ndim    == 3, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(phase->ndim == 1, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(out->ndim   == 3, BF_STATUS_INVALID_SHAPE);
+	long ntime = in->shape[0];
+	long npol  = in->shape[1];
+	long nchan = in->shape[2];
+	long nbin  = out->shape[2];
+	BF_ASSERT(phase->shape[0] == nchan, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(out->shape[0]   == npol,  BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(out->shape[1]   == nchan, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(nbin > 0, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(dphase >= 0, BF_STATUS_INVALID_ARGUMENT);
+	// TODO: Support CUDA space
+	BF_ASSERT(space_accessible_from(in->space,    BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(phase->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(out->space,   BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	// TODO: Support endian conversion
+	BF_ASSERT(!in->big_endian == !is_big_endian(), BF_STATUS_UNSUPPORTED);
+	FoldFunctor func;
+	func.hits = 0;
+	func.hcs  = func.hbs = 0;
+	if( hits ) {
+		BF_ASSERT(!hits->immutable, BF_STATUS_INVALID_POINTER);
+		BF_ASSERT(hits->dtype == BF_DTYPE_U32, BF_STATUS_UNSUPPORTED_DTYPE);
+		BF_ASSERT(hits->ndim == 2, BF_STATUS_INVALID_SHAPE);
+		BF_ASSERT(hits->shape[0] == nchan, BF_STATUS_INVALID_SHAPE);
+		BF_ASSERT(hits->shape[1] == nbin,  BF_STATUS_INVALID_SHAPE);
+		BF_ASSERT(space_accessible_from(hits->space, BF_SPACE_SYSTEM),
+		          BF_STATUS_UNSUPPORTED_SPACE);
+		func.hits = (unsigned int*)hits->data;
+		func.hcs  = hits->strides[0] / sizeof(unsigned int);
+		func.hbs  = hits->strides[1] / sizeof(unsigned int);
+	}
+	if( ntime == 0 || npol == 0 || nchan == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	func.in     = (float const*)in->data;
+	func.phase  = (double const*)phase->data;
+	func.out    = (float*)out->data;
+	func.dphase = dphase;
+	func.ntime  = ntime;
+	func.npol   = npol;
+	func.nbin   = nbin;
+	func.its    = in->strides[0] / sizeof(float);
+	func.ips    = in->strides[1] / sizeof(float);
+	func.ics    = in->strides[2] / sizeof(float);
+	func.phs    = phase->strides[0] / sizeof(double);
+	func.ops    = out->strides[0] / sizeof(float);
+	func.ocs    = out->strides[1] / sizeof(float);
+	func.obs    = out->strides[2] / sizeof(float);
+	
+	long ntask = div_up(nchan, (long)BF_FOLD_CHUNK_SIZE);
+#pragma omp parallel for schedule(static) if( ntask > 1 )
+	for( long t=0; t<ntask; ++t ) {
+		long begin = t*BF_FOLD_CHUNK_SIZE;
+		long n     = std::min((long)BF_FOLD_CHUNK_SIZE, nchan - begin);
+		func(begin, n);
+	}
+	return BF_STATUS_SUCCESS;
+}
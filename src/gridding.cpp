@@ -0,0 +1,235 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <bifrost/gridding.h>
+#include "utils.hpp"
+#include "Complex.hpp"
+
+#include <algorithm>
+#include <cmath>
+#include <vector>
+
+// Note: Each task grids onto a strip of rows, which stays in cache while
+//         the visibilities that touch it are added
+#define BF_GRIDDING_STRIP_NROW 16
+
+struct GridFootprint {
+	long voffset; // Offset of the visibility
+	int  row0;    // First row and column of the kernel footprint
+	int  col0;
+	int  oy;      // Kernel oversampling indices
+	int  ox;
+};
+
+struct GridVisibilitiesFunctor {
+	Complex32 const*     vis;
+	float const*         kernel;
+	Complex32*           grid;
+	GridFootprint const* footprints; // Sorted by first row
+	long const*          offsets;    // Start of each first row
+	int                  support;
+	long                 npol;
+	long                 nv;
+	long                 nu;
+	bool                 accumulate;
+	long                 vps; // Visibility stride
+	long                 kos; // Kernel strides
+	long                 kss;
+	long                 gps; // Grid strides
+	long                 gvs;
+	long                 gus;
+	inline void operator()(long r0, long r1) const {
+		if( !accumulate ) {
+			for( long p=0; p<npol; ++p ) {
+				for( long r=r0; r<r1; ++r ) {
+					Complex32* grow = grid + p*gps + r*gvs;
+					for( long c=0; c<nu; ++c ) {
+						grow[c*gus] = Complex32(0, 0);
+					}
+				}
+			}
+		}
+		// Note: Footprints that start up to support-1 rows above the strip
+		//         also overlap it; offsets are indexed by row0 + support - 1
+		long begin = offsets[r0];
+		long end   = offsets[r1 + support - 1];
+		for( long n=begin; n<end; ++n ) {
+			GridFootprint fp = footprints[n];
+			Complex32 const* v  = vis + fp.voffset;
+			float const*     ky = kernel + fp.oy*kos;
+			float const*     kx = kernel + fp.ox*kos;
+			long rbeg = std::max((long)fp.row0, r0);
+			long rend = std::min((long)fp.row0 + support, r1);
+			long kbeg = std::max(-fp.col0, 0);
+			long kend = std::min((long)support, nu - fp.col0);
+			for( long p=0; p<npol; ++p ) {
+				Complex32 vp = v[p*vps];
+				for( long r=rbeg; r<rend; ++r ) {
+					Complex32  w    = vp * ky[(r - fp.row0)*kss];
+					Complex32* grow = grid + p*gps + r*gvs + fp.col0*gus;
+					for( long k=kbeg; k<kend; ++k ) {
+						grow[k*gus] += w * kx[k*kss];
+					}
+				}
+			}
+		}
+	}
+};
+
+BFstatus bfGridVisibilities(BFarray const* vis,
+                            BFarray const* uv,
+                            BFarray const* kernel,
+                            BFarray const* grid,
+                            BFbool         accumulate) {
+	BF_ASSERT(vis,    BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(uv,     BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(kernel, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(grid,   BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!grid->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(vis->dtype    == BF_DTYPE_CF32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(uv->dtype     == BF_DTYPE_F32,  BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(kernel->dtype == BF_DTYPE_F32,  BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(grid->dtype   == BF_DTYPE_CF32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(vis->ndim    == 3, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(uv->ndim     == 3, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(kernel->ndim == 2, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(grid->ndim   == 3, BF_STATUS_INVALID_SHAPE);
+	long nbaseline = vis->shape[0];
+	long nchan     = vis->shape[1];
+	long npol      = vis->shape[2];
+	long noversample = kernel->shape[0];
+	long support     = kernel->shape[1];
+	long nv = grid->shape[1];
+	long nu = grid->shape[2];
+	BF_ASSERT(uv->shape[0] == nbaseline, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(uv->shape[1] == nchan,     BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(uv->shape[2] == 2,         BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(grid->shape[0] == npol,    BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(noversample >= 1 && support >= 1, BF_STATUS_INVALID_SHAPE);
+	// TODO: Support CUDA space
+	BF_ASSERT(space_accessible_from(vis->space,    BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(uv->space,     BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(kernel->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(grid->space,   BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	// TODO: Support endian conversion
+	BF_ASSERT(!vis->big_endian == !is_big_endian(), BF_STATUS_UNSUPPORTED);
+	if( npol == 0 || nv == 0 || nu == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	long nvis = nbaseline*nchan;
+	float const* uvdata = (float const*)uv->data;
+	long ubs = uv->strides[0] / sizeof(float);
+	long ucs = uv->strides[1] / sizeof(float);
+	long uus = uv->strides[2] / sizeof(float);
+	long vbs = vis->strides[0] / sizeof(Complex32);
+	long vcs = vis->strides[1] / sizeof(Complex32);
+	
+	// Find the footprint of each visibility and counting-sort them by their
+	//   first row; footprints entirely outside the grid are dropped
+	long nkey = nv + support;
+	std::vector<GridFootprint> footprints(nvis);
+	std::vector<long>          keys(nvis);
+	std::vector<long>          offsets(nkey + 1, 0);
+	for( long i=0; i<nvis; ++i ) {
+		long b = i / nchan;
+		long c = i % nchan;
+		float const* pos = uvdata + b*ubs + c*ucs;
+		float u = pos[0];
+		float v = pos[uus];
+		keys[i] = -1;
+		if( !std::isfinite(u) || !std::isfinite(v) ) {
+			continue;
+		}
+		float fu = std::floor(u);
+		float fv = std::floor(v);
+		long  ox = (long)((u - fu)*noversample + 0.5f);
+		long  oy = (long)((v - fv)*noversample + 0.5f);
+		if( ox == noversample ) { ox = 0; fu += 1; }
+		if( oy == noversample ) { oy = 0; fv += 1; }
+		float row0 = fv - (support - 1)/2;
+		float col0 = fu - (support - 1)/2;
+		if( row0 <= -support || row0 >= nv ||
+		    col0 <= -support || col0 >= nu ) {
+			continue;
+		}
+		GridFootprint& fp = footprints[i];
+		fp.voffset = b*vbs + c*vcs;
+		fp.row0 = (int)row0;
+		fp.col0 = (int)col0;
+		fp.oy   = oy;
+		fp.ox   = ox;
+		keys[i] = fp.row0 + support - 1;
+		++offsets[keys[i] + 1];
+	}
+	for( long k=0; k<nkey; ++k ) {
+		offsets[k + 1] += offsets[k];
+	}
+	std::vector<GridFootprint> sorted(offsets[nkey]);
+	{
+		std::vector<long> next(offsets.begin(), offsets.end() - 1);
+		for( long i=0; i<nvis; ++i ) {
+			if( keys[i] >= 0 ) {
+				sorted[next[keys[i]]++] = footprints[i];
+			}
+		}
+	}
+	
+	GridVisibilitiesFunctor func;
+	func.vis        = (Complex32 const*)vis->data;
+	func.kernel     = (float const*)kernel->data;
+	func.grid       = (Complex32*)grid->data;
+	func.footprints = sorted.empty() ? 0 : &sorted[0];
+	func.offsets    = &offsets[0];
+	func.support    = support;
+	func.npol       = npol;
+	func.nv         = nv;
+	func.nu         = nu;
+	func.accumulate = accumulate;
+	func.vps        = vis->strides[2]    / sizeof(Complex32);
+	func.kos        = kernel->strides[0] / sizeof(float);
+	func.kss        = kernel->strides[1] / sizeof(float);
+	func.gps        = grid->strides[0]   / sizeof(Complex32);
+	func.gvs        = grid->strides[1]   / sizeof(Complex32);
+	func.gus        = grid->strides[2]   / sizeof(Complex32);
+	
+	long ntask = div_up(nv, (long)BF_GRIDDING_STRIP_NROW);
+	// Note: Visibilities are concentrated near the centre of the grid, so
+	//         the strips are scheduled dynamically
+#pragma omp parallel for schedule(dynamic) if( ntask > 1 )
+	for( long t=0; t<ntask; ++t ) {
+		long r0 = t*BF_GRIDDING_STRIP_NROW;
+		long r1 = std::min(r0 + BF_GRIDDING_STRIP_NROW, nv);
+		func(r0, r1);
+	}
+	return BF_STATUS_SUCCESS;
+}
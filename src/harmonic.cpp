@@ -0,0 +1,177 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <bifrost/harmonic.h>
+#include "utils.hpp"
+
+#include <algorithm>
+#include <cmath>
+#include <cstring>
+
+// Note: Each task sums the harmonics of one block of fundamentals, so the
+//         input read for each harmonic is a compact (stride h) region
+#define BF_HARMONIC_BLOCK_SIZE 1024
+
+// Returns the cube root of x >= 0 to within float precision
+// Note: This is much faster than std::cbrt, which otherwise dominates the
+//         cost, and is vectorized. The initial estimate from the exponent
+//         is refined with two Halley iterations.
+inline float fast_cbrt(float x) {
+	unsigned int bits;
+	std::memcpy(&bits, &x, sizeof(bits));
+	bits = bits/3 + 709921077u;
+	float y;
+	std::memcpy(&y, &bits, sizeof(y));
+	for( int it=0; it<2; ++it ) {
+		float y3 = y*y*y;
+		y *= (y3 + 2*x) / (2*y3 + x);
+	}
+	return y;
+}
+
+struct HarmonicSumFunctor {
+	float const* in;
+	float*       sigma;
+	int*         nharmonic;
+	long         nfreq;
+	int          max_nharmonic;
+	long         ibs; // Input strides
+	long         ifs;
+	long         sbs; // Sigma strides
+	long         sfs;
+	long         hbs; // Harmonic count strides
+	long         hfs;
+	inline void operator()(long b, long begin, long n) const {
+		float  acc[BF_HARMONIC_BLOCK_SIZE];
+		float  best[BF_HARMONIC_BLOCK_SIZE];
+		int    hbest[BF_HARMONIC_BLOCK_SIZE];
+		for( long i=0; i<n; ++i ) {
+			acc[i]   = 0;
+			best[i]  = -HUGE_VALF;
+			hbest[i] = 0;
+		}
+		float const* irow = in + b*ibs;
+		int nsummed = 0;
+		for( int h=1; h<=max_nharmonic; h*=2 ) {
+			// Note: Fundamentals whose h'th harmonic is past the end of the
+			//         spectrum are left at their previous stage
+			long nvalid = std::min(n, div_up(nfreq, (long)h) - begin);
+			if( nvalid <= 0 ) {
+				break;
+			}
+			for( int j=nsummed+1; j<=h; ++j ) {
+				for( long i=0; i<nvalid; ++i ) {
+					acc[i] += irow[(begin + i)*j*ifs];
+				}
+			}
+			nsummed = h;
+			float rh    = 1.f / h;
+			float scale = 1.f / (9*h);
+			float mean  = 1 - scale;
+			float rstd  = 1.f / std::sqrt(scale);
+			for( long i=0; i<nvalid; ++i ) {
+				float s = (fast_cbrt(acc[i] * rh) - mean) * rstd;
+				if( s > best[i] ) {
+					best[i]  = s;
+					hbest[i] = h;
+				}
+			}
+		}
+		float* srow = sigma + b*sbs;
+		for( long i=0; i<n; ++i ) {
+			srow[(begin + i)*sfs] = best[i];
+		}
+		if( nharmonic ) {
+			int* hrow = nharmonic + b*hbs;
+			for( long i=0; i<n; ++i ) {
+				hrow[(begin + i)*hfs] = hbest[i];
+			}
+		}
+	}
+};
+
+BFstatus bfHarmonicSum(BFarray const* in,
+                       int            max_nharmonic,
+                       BFarray const* sigma,
+                       BFarray const* nharmonic) {
+	BF_ASSERT(in,    BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(sigma, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!sigma->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(in->dtype    == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(sigma->dtype == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(in->ndim == 2, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(shapes_equal(in, sigma), BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(max_nharmonic >= 1 && !(max_nharmonic & (max_nharmonic - 1)),
+	          BF_STATUS_INVALID_ARGUMENT);
+	// TODO: Support CUDA space
+	BF_ASSERT(space_accessible_from(in->space,    BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(sigma->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	// TODO: Support endian conversion
+	BF_ASSERT(!in->big_endian == !is_big_endian(), BF_STATUS_UNSUPPORTED);
+	HarmonicSumFunctor func;
+	func.nharmonic = 0;
+	func.hbs       = func.hfs = 0;
+	if( nharmonic ) {
+		BF_ASSERT(!nharmonic->immutable, BF_STATUS_INVALID_POINTER);
+		BF_ASSERT(nharmonic->dtype == BF_DTYPE_I32,
+		          BF_STATUS_UNSUPPORTED_DTYPE);
+		BF_ASSERT(shapes_equal(in, nharmonic), BF_STATUS_INVALID_SHAPE);
+		BF_ASSERT(space_accessible_from(nharmonic->space, BF_SPACE_SYSTEM),
+		          BF_STATUS_UNSUPPORTED_SPACE);
+		func.nharmonic = (int*)nharmonic->data;
+		func.hbs       = nharmonic->strides[0] / sizeof(int);
+		func.hfs       = nharmonic->strides[1] / sizeof(int);
+	}
+	long nbatch = in->shape[0];
+	long nfreq  = in->shape[1];
+	if( nbatch == 0 || nfreq == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	func.in            = (float const*)in->data;
+	func.sigma         = (float*)sigma->data;
+	func.nfreq         = nfreq;
+	func.max_nharmonic = max_nharmonic;
+	func.ibs           = in->strides[0]    / sizeof(float);
+	func.ifs           = in->strides[1]    / sizeof(float);
+	func.sbs           = sigma->strides[0] / sizeof(float);
+	func.sfs           = sigma->strides[1] / sizeof(float);
+	
+	long nblock = div_up(nfreq, (long)BF_HARMONIC_BLOCK_SIZE);
+	long ntask  = nbatch * nblock;
+#pragma omp parallel for schedule(dynamic) if( ntask > 1 )
+	for( long t=0; t<ntask; ++t ) {
+		long b     = t / nblock;
+		long begin = (t % nblock) * BF_HARMONIC_BLOCK_SIZE;
+		long n     = std::min((long)BF_HARMONIC_BLOCK_SIZE, nfreq - begin);
+		func(b, begin, n);
+	}
+	return BF_STATUS_SUCCESS;
+}
@@ -0,0 +1,180 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <bifrost/kurtosis.h>
+#include "reduce.hpp"
+#include "utils.hpp"
+
+// Computes the spectral kurtosis of n windows (each of which spans
+//   'factor' input rows) and copies or flags them into the output
+struct SpectralKurtosisFunctor {
+	float const* in;
+	float*       sk;
+	float*       out;
+	long         factor;
+	long         irs; // Input (row) strides
+	long         is;
+	long         ks;  // Kurtosis stride
+	long         ors; // Output (row) strides
+	long         os;
+	double       scale;
+	float        lower;
+	float        upper;
+	float        replacement;
+	inline void operator()(long ioffset, long koffset, long ooffset,
+	                       long n) const {
+		double s1[BF_REDUCE_CHUNK_SIZE];
+		double s2[BF_REDUCE_CHUNK_SIZE];
+		bool   flagged[BF_REDUCE_CHUNK_SIZE];
+		for( long i=0; i<n; ++i ) {
+			s1[i] = s2[i] = 0;
+		}
+		// Note: Rows are processed in the outer loop for memory locality
+		for( long k=0; k<factor; ++k ) {
+			float const* irow = in + ioffset + k*irs;
+			for( long i=0; i<n; ++i ) {
+				double x = irow[i*is];
+				s1[i] += x;
+				s2[i] += x*x;
+			}
+		}
+		for( long i=0; i<n; ++i ) {
+			// Note: Windows of zeros give NaN, which is not flagged
+			float v = scale*(factor*s2[i]/(s1[i]*s1[i]) - 1);
+			sk[koffset + i*ks] = v;
+			flagged[i] = (v < lower || v > upper);
+		}
+		if( !out ) {
+			return;
+		}
+		for( long k=0; k<factor; ++k ) {
+			float const* irow = in  + ioffset + k*irs;
+			float*       orow = out + ooffset + k*ors;
+			for( long i=0; i<n; ++i ) {
+				orow[i*os] = flagged[i] ? replacement : irow[i*is];
+			}
+		}
+	}
+};
+
+// Returns true if the two layouts describe the same set of tasks
+inline bool layouts_match(ReduceLayout const& a, ReduceLayout const& b) {
+	if( a.ndim != b.ndim || a.inner_len != b.inner_len ) {
+		return false;
+	}
+	for( int e=0; e<a.ndim; ++e ) {
+		if( a.shape[e] != b.shape[e] ) {
+			return false;
+		}
+	}
+	return true;
+}
+
+BFstatus bfSpectralKurtosis(BFarray const* in,
+                            BFarray const* sk,
+                            BFarray const* out,
+                            double         nd,
+                            double         lower,
+                            double         upper,
+                            double         replacement) {
+	BF_ASSERT(in, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(sk, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!sk->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(in->dtype == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(sk->dtype == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(in->ndim == sk->ndim, BF_STATUS_INVALID_SHAPE);
+	// TODO: Support CUDA space
+	BF_ASSERT(space_accessible_from(in->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(sk->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	// TODO: Support endian conversion
+	BF_ASSERT(!in->big_endian == !is_big_endian(), BF_STATUS_UNSUPPORTED);
+	ReduceLayout layout;
+	BF_ASSERT(get_reduce_layout(in, sk, false, &layout),
+	          BF_STATUS_INVALID_SHAPE);
+	// Note: The kurtosis is undefined for windows of a single sample
+	BF_ASSERT(layout.factor > 1, BF_STATUS_INVALID_SHAPE);
+	ReduceLayout olayout = layout;
+	if( out ) {
+		BF_ASSERT(!out->immutable, BF_STATUS_INVALID_POINTER);
+		BF_ASSERT(out->dtype == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+		BF_ASSERT(shapes_equal(in, out), BF_STATUS_INVALID_SHAPE);
+		BF_ASSERT(space_accessible_from(out->space, BF_SPACE_SYSTEM),
+		          BF_STATUS_UNSUPPORTED_SPACE);
+		// Note: The output's strides replace the input's in its layout
+		BF_ASSERT(get_reduce_layout(out, sk, false, &olayout),
+		          BF_STATUS_INVALID_SHAPE);
+		BF_ASSERT(layouts_match(layout, olayout),
+		          BF_STATUS_UNSUPPORTED_STRIDE);
+	}
+	if( shape_size(sk->ndim, sk->shape) == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	long M = layout.factor;
+	SpectralKurtosisFunctor func;
+	func.in          = (float const*)in->data;
+	func.sk          = (float*)sk->data;
+	func.out         = out ? (float*)out->data : 0;
+	func.factor      = M;
+	func.irs         = layout.reduce_istride;
+	func.is          = layout.inner_istride;
+	func.ks          = layout.inner_ostride;
+	func.ors         = olayout.reduce_istride;
+	func.os          = olayout.inner_istride;
+	func.scale       = (M*nd + 1) / (M - 1);
+	func.lower       = lower;
+	func.upper       = upper;
+	func.replacement = replacement;
+	
+	// Note: This is foreach_reduce_chunk_cpu with a third (output) array
+	long nchunk_per_task = div_up(layout.inner_len, (long)BF_REDUCE_CHUNK_SIZE);
+	long ntask = nchunk_per_task;
+	for( int e=0; e<layout.ndim; ++e ) {
+		ntask *= layout.shape[e];
+	}
+#pragma omp parallel for schedule(static) if( ntask > 1 )
+	for( long t=0; t<ntask; ++t ) {
+		long begin = (t % nchunk_per_task) * BF_REDUCE_CHUNK_SIZE;
+		long n     = std::min((long)BF_REDUCE_CHUNK_SIZE, layout.inner_len - begin);
+		long task  = t / nchunk_per_task;
+		long ioffset = begin*layout.inner_istride;
+		long koffset = begin*layout.inner_ostride;
+		long ooffset = begin*olayout.inner_istride;
+		for( int e=0; e<layout.ndim; ++e ) {
+			long ind = task % layout.shape[e];
+			task    /= layout.shape[e];
+			ioffset += ind*layout.istrides[e];
+			koffset += ind*layout.ostrides[e];
+			ooffset += ind*olayout.istrides[e];
+		}
+		func(ioffset, koffset, ooffset, n);
+	}
+	return BF_STATUS_SUCCESS;
+}
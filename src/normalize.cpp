@@ -0,0 +1,165 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <bifrost/normalize.h>
+#include "utils.hpp"
+
+#include <algorithm>
+#include <cmath>
+
+// Note: Each task normalises a chunk of series over all time samples, so
+//         the running estimates stay in registers or L1 cache
+#define BF_NORMALIZE_CHUNK_SIZE 256
+
+// The ratio of the standard deviation to the mean absolute deviation of
+//   Gaussian noise, sqrt(pi/2)
+#define BF_NORMALIZE_MAD_SCALE 1.2533141f
+#define BF_NORMALIZE_CLIP      3.f
+
+struct RunningNormalizeFunctor {
+	float const* in;
+	float*       out;
+	float*       center;
+	float*       scale;
+	float        alpha;
+	bool         robust;
+	long         ntime;
+	long         its; // Input strides
+	long         iss;
+	long         ots; // Output strides
+	long         oss;
+	long         cs;  // State strides
+	long         ss;
+	template<bool ROBUST>
+	inline void normalize(long begin, long n, float* c, float* s) const {
+		for( long t=0; t<ntime; ++t ) {
+			float const* irow = in  + t*its + begin*iss;
+			float*       orow = out + t*ots + begin*oss;
+			for( long i=0; i<n; ++i ) {
+				float dev = irow[i*iss] - c[i];
+				orow[i*oss] = (s[i] > 0) ? dev / s[i] : 0.f;
+				if( ROBUST ) {
+					float step = alpha*BF_NORMALIZE_MAD_SCALE*s[i];
+					c[i] += step*((dev > 0) - (dev < 0));
+					float absdev = std::min(std::abs(dev),
+					                        BF_NORMALIZE_CLIP*s[i]);
+					s[i] += alpha*(BF_NORMALIZE_MAD_SCALE*absdev - s[i]);
+				} else {
+					c[i] += alpha*dev;
+					float var = s[i]*s[i];
+					s[i] = std::sqrt(var + alpha*(dev*dev - var));
+				}
+			}
+		}
+	}
+	inline void operator()(long begin, long n) const {
+		float c[BF_NORMALIZE_CHUNK_SIZE];
+		float s[BF_NORMALIZE_CHUNK_SIZE];
+		for( long i=0; i<n; ++i ) {
+			c[i] = center[(begin + i)*cs];
+			s[i] = scale[(begin + i)*ss];
+		}
+		// Note: The mode is a template parameter so that the inner loop
+		//         has no branches and is vectorized
+		if( robust ) {
+			this->normalize<true>(begin, n, c, s);
+		} else {
+			this->normalize<false>(begin, n, c, s);
+		}
+		for( long i=0; i<n; ++i ) {
+			center[(begin + i)*cs] = c[i];
+			scale[(begin + i)*ss]  = s[i];
+		}
+	}
+};
+
+BFstatus bfRunningNormalize(BFarray const* in,
+                            BFarray const* out,
+                            BFarray const* center,
+                            BFarray const* scale,
+                            double         alpha,
+                            BFbool         robust) {
+	BF_ASSERT(in,     BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(out,    BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(center, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(scale,  BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!out->immutable,    BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!center->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!scale->immutable,  BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(in->dtype     == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(out->dtype    == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(center->dtype == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(scale->dtype  == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(in->ndim     == 2, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(center->ndim == 1, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(scale->ndim  == 1, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(shapes_equal(in, out), BF_STATUS_INVALID_SHAPE);
+	long ntime   = in->shape[0];
+	long nseries = in->shape[1];
+	BF_ASSERT(center->shape[0] == nseries, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(scale->shape[0]  == nseries, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(alpha > 0 && alpha <= 1, BF_STATUS_INVALID_ARGUMENT);
+	// TODO: Support CUDA space
+	BF_ASSERT(space_accessible_from(in->space,     BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(out->space,    BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(center->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(scale->space,  BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	// TODO: Support endian conversion
+	BF_ASSERT(!in->big_endian == !is_big_endian(), BF_STATUS_UNSUPPORTED);
+	if( ntime == 0 || nseries == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	RunningNormalizeFunctor func;
+	func.in     = (float const*)in->data;
+	func.out    = (float*)out->data;
+	func.center = (float*)center->data;
+	func.scale  = (float*)scale->data;
+	func.alpha  = alpha;
+	func.robust = robust;
+	func.ntime  = ntime;
+	func.its    = in->strides[0]     / sizeof(float);
+	func.iss    = in->strides[1]     / sizeof(float);
+	func.ots    = out->strides[0]    / sizeof(float);
+	func.oss    = out->strides[1]    / sizeof(float);
+	func.cs     = center->strides[0] / sizeof(float);
+	func.ss     = scale->strides[0]  / sizeof(float);
+	
+	long ntask = div_up(nseries, (long)BF_NORMALIZE_CHUNK_SIZE);
+#pragma omp parallel for schedule(static) if( ntask > 1 )
+	for( long t=0; t<ntask; ++t ) {
+		long begin = t*BF_NORMALIZE_CHUNK_SIZE;
+		long n     = std::min((long)BF_NORMALIZE_CHUNK_SIZE, nseries - begin);
+		func(begin, n);
+	}
+	return BF_STATUS_SUCCESS;
+}
@@ -0,0 +1,161 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <bifrost/pfb.h>
+#include "utils.hpp"
+#include "Complex.hpp"
+
+#include <algorithm>
+#include <vector>
+
+// Note: Each task filters a chunk of branches over a block of frames, with
+//         the tap sums of one output frame accumulated in L1 cache
+#define BF_PFB_CHUNK_SIZE 1024 // Samples (branches x inner)
+#define BF_PFB_FRAME_BLOCK 256
+
+template<typename T>
+struct PfbFirFunctor {
+	T const*     in;
+	float const* coeffs;
+	T*           out;
+	long         ntap;
+	long         ninner;
+	long         its; // Input strides
+	long         ibs;
+	long         iis;
+	long         cts; // Coefficient strides
+	long         cbs;
+	long         ots; // Output strides
+	long         obs;
+	long         ois;
+	inline void operator()(long t0, long nt, long b0, long nb, T* acc) const {
+		long nacc = nb*ninner;
+		for( long t=t0; t<t0+nt; ++t ) {
+			for( long i=0; i<nacc; ++i ) {
+				acc[i] = T(0);
+			}
+			for( long p=0; p<ntap; ++p ) {
+				T const*     iframe = in     + (t + p)*its + b0*ibs;
+				float const* h      = coeffs + p*cts       + b0*cbs;
+				for( long b=0; b<nb; ++b ) {
+					float    hb   = h[b*cbs];
+					T const* irow = iframe + b*ibs;
+					T*       arow = acc    + b*ninner;
+					for( long j=0; j<ninner; ++j ) {
+						arow[j] += irow[j*iis] * hb;
+					}
+				}
+			}
+			T* oframe = out + t*ots + b0*obs;
+			for( long b=0; b<nb; ++b ) {
+				for( long j=0; j<ninner; ++j ) {
+					oframe[b*obs + j*ois] = acc[b*ninner + j];
+				}
+			}
+		}
+	}
+};
+
+template<typename T>
+BFstatus pfb_fir_cpu_type(BFarray const* in,
+                          BFarray const* coeffs,
+                          BFarray const* out) {
+	long ntime   = out->shape[0];
+	long nbranch = in->shape[1];
+	long ninner  = in->shape[2];
+	PfbFirFunctor<T> func;
+	func.in     = (T const*)in->data;
+	func.coeffs = (float const*)coeffs->data;
+	func.out    = (T*)out->data;
+	func.ntap   = coeffs->shape[0];
+	func.ninner = ninner;
+	func.its    = in->strides[0]     / sizeof(T);
+	func.ibs    = in->strides[1]     / sizeof(T);
+	func.iis    = in->strides[2]     / sizeof(T);
+	func.cts    = coeffs->strides[0] / sizeof(float);
+	func.cbs    = coeffs->strides[1] / sizeof(float);
+	func.ots    = out->strides[0]    / sizeof(T);
+	func.obs    = out->strides[1]    / sizeof(T);
+	func.ois    = out->strides[2]    / sizeof(T);
+	
+	long chunk  = std::max(BF_PFB_CHUNK_SIZE / ninner, 1L);
+	long nbtask = div_up(nbranch, chunk);
+	long nttask = div_up(ntime, (long)BF_PFB_FRAME_BLOCK);
+	long ntask  = nbtask*nttask;
+#pragma omp parallel for schedule(static) if( ntask > 1 )
+	for( long task=0; task<ntask; ++task ) {
+		long t0 = (task / nbtask)*BF_PFB_FRAME_BLOCK;
+		long b0 = (task % nbtask)*chunk;
+		long nt = std::min((long)BF_PFB_FRAME_BLOCK, ntime - t0);
+		long nb = std::min(chunk, nbranch - b0);
+		std::vector<T> acc(nb*ninner);
+		func(t0, nt, b0, nb, &acc[0]);
+	}
+	return BF_STATUS_SUCCESS;
+}
+
+BFstatus bfPfbFir(BFarray const* in,
+                  BFarray const* coeffs,
+                  BFarray const* out) {
+	BF_ASSERT(in,     BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(coeffs, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(out,    BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!out->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(in->dtype == BF_DTYPE_F32 ||
+	          in->dtype == BF_DTYPE_CF32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(out->dtype    == in->dtype,    BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(coeffs->dtype == BF_DTYPE_F32, BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(in->ndim     == 3, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(out->ndim    == 3, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(coeffs->ndim == 2, BF_STATUS_INVALID_SHAPE);
+	long ntap = coeffs->shape[0];
+	BF_ASSERT(ntap >= 1, BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(coeffs->shape[1] == in->shape[1], BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(out->shape[0] == in->shape[0] - ntap + 1,
+	          BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(out->shape[1] == in->shape[1], BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(out->shape[2] == in->shape[2], BF_STATUS_INVALID_SHAPE);
+	// TODO: Support CUDA space
+	BF_ASSERT(space_accessible_from(in->space,     BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(coeffs->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(out->space,    BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	// TODO: Support endian conversion
+	BF_ASSERT(!in->big_endian == !is_big_endian(), BF_STATUS_UNSUPPORTED);
+	if( out->shape[0] == 0 || out->shape[1] == 0 || out->shape[2] == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	switch( in->dtype ) {
+	case BF_DTYPE_F32:  return pfb_fir_cpu_type<float    >(in, coeffs, out);
+	case BF_DTYPE_CF32: return pfb_fir_cpu_type<Complex32>(in, coeffs, out);
+	default: BF_FAIL("Supported dtype", BF_STATUS_UNSUPPORTED_DTYPE);
+	}
+}
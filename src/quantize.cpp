@@ -32,12 +32,19 @@
 
 #include <limits>
 #include <cmath>
+#include <vector>
 
 #include <iostream>
 
 using std::max;
 using std::min;
 
+// Number of input components handed to each OpenMP thread per unit of work
+#define BF_QUANTIZE_CHUNK_SIZE (1<<14)
+// Per-channel runs shorter than this are processed a whole row at a time,
+//   with the scale factors expanded to one per component.
+#define BF_QUANTIZE_MIN_RUN    64
+
 // Note: maxval is always the max representable integer value
 //         E.g., 8-bit => 127 (signed), 255 (unsigned)
 //       minval is either -maxval (signed) or 0 (unsigned)
@@ -57,159 +64,429 @@ inline F clip(F x) {
 	return min(max(x,F(minval<I>())),F(maxval<I>()));
 }
 
-inline int8_t clip_4bit(int8_t x) {
-	return min(max(x,int8_t(-7)),int8_t(7));
-}
-
 template<typename IType, typename SType, typename OType>
 inline void quantize(IType ival, SType scale, OType& oval) {
-	//std::cout << (int)minval<OType>() << ", " << (int)maxval<OType>() << std::endl;
-	//std::cout << scale << std::endl;
-	//std::cout << ival
-	//          << " --> " << ival*scale
-	//          << " --> " << clip<OType>(ival*scale)
-	//          << " --> " << rint(clip<OType>(ival*scale))
-	//          << " --> " << (int)OType(rint(clip<OType>(ival*scale)))
-	//          << std::endl;
 	oval = OType(rint(clip<OType>(ival*scale)));
 }
 
-template<typename IType, typename SType, typename OType>
+// Scale factors for a run of components
+template<typename F>
+struct ConstantScale {
+	F scale;
+	ConstantScale(F scale_) : scale(scale_) {}
+	inline F operator[](long i) const { return scale; }
+};
+template<typename F>
+struct ComponentScale {
+	F const* scales;
+	ComponentScale(F const* scales_) : scales(scales_) {}
+	inline F operator[](long i) const { return scales[i]; }
+};
+
+// Quantizes values to full-width integer types
+template<typename OType, typename F>
 struct QuantizeFunctor {
-	SType scale;
-	bool  byteswap_in;
-	bool  byteswap_out;
-	QuantizeFunctor(SType scale_, bool byteswap_in_, bool byteswap_out_)
-		: scale(scale_),
-		  byteswap_in(byteswap_in_),
-		  byteswap_out(byteswap_out_) {}
-	void operator()(IType ival, OType& oval) const {
-		if( byteswap_in ) {
-			byteswap(ival, &ival);
-		}
-		quantize(ival, scale, oval);
+	typedef F ftype;
+	enum { PACK = 1 };
+	OType* out;
+	bool   byteswap_out;
+	QuantizeFunctor(void* out_, bool byteswap_out_)
+		: out((OType*)out_), byteswap_out(byteswap_out_) {}
+	static F lower() { return F(minval<OType>()) - F(0.5); }
+	static F upper() { return F(maxval<OType>()) + F(0.5); }
+	template<typename Scale>
+	void operator()(float const* in, long offset, long n, Scale scale) const {
+		OType* optr = out + offset;
+		for( long i=0; i<n; ++i ) {
+			quantize(in[i], scale[i], optr[i]);
+		}
 		if( byteswap_out ) {
-			byteswap(oval, &oval);
+			for( long i=0; i<n; ++i ) {
+				byteswap(optr[i], &optr[i]);
+			}
+		}
+	}
+};
+
+// Quantizes values to signed NBIT-bit integers, packing 8/NBIT values into
+//   each byte with the first value in the most significant bits.
+template<int NBIT>
+struct QuantizePackedFunctor {
+	typedef float ftype;
+	enum { PACK = 8 / NBIT };
+	uint8_t* out;
+	QuantizePackedFunctor(void* out_, bool byteswap_out)
+		: out((uint8_t*)out_) {}
+	static float limit() { return float((1<<(NBIT-1)) - 1); }
+	static float lower() { return -limit() - 0.5f; }
+	static float upper() { return  limit() + 0.5f; }
+	template<typename Scale>
+	void operator()(float const* in, long offset, long n, Scale scale) const {
+		uint8_t* optr = out + offset / PACK;
+		float lim = limit();
+		for( long j=0; j<n/PACK; ++j ) {
+			int oval = 0;
+			for( int k=0; k<PACK; ++k ) {
+				long i = j*PACK + k;
+				int  q = int(rint(min(max(in[i]*scale[i], -lim), lim)));
+				oval |= (q & ((1<<NBIT)-1)) << (8-NBIT*(k+1));
+			}
+			optr[j] = uint8_t(oval);
 		}
 	}
 };
 
-template<typename T, typename U, typename Func, typename Size>
-void foreach_simple_cpu(T const* in,
-                        U*       out,
-                        Size     nelement,
-                        Func     func) {
-	for( Size i=0; i<nelement; ++i ) {
-		func(in[i], out[i]);
-		//std::cout << std::hex << (int)in[i] << " --> " << (int)out[i] << std::endl;
+// Adds the sum of squares of the input values and the number of values that
+//   will be clipped to the run's totals.
+template<typename F, typename Scale>
+inline void accumulate_run_stats(float const* in,
+                                 long         n,
+                                 Scale        scale,
+                                 F            lower,
+                                 F            upper,
+                                 double*      sumsq,
+                                 uint64_t*    nclip) {
+	float    run_sumsq = 0;
+	uint64_t run_nclip = 0;
+#pragma omp simd reduction(+:run_sumsq,run_nclip)
+	for( long i=0; i<n; ++i ) {
+		float x = in[i];
+		F     y = x*scale[i];
+		run_sumsq += x*x;
+		run_nclip += (y <= lower) | (y >= upper);
+	}
+	*sumsq += run_sumsq;
+	if( nclip ) {
+		*nclip += run_nclip;
+	}
+}
+// As above, but for a row of components with their own totals
+template<typename F, typename Scale>
+inline void accumulate_component_stats(float const* in,
+                                       long         n,
+                                       Scale        scale,
+                                       F            lower,
+                                       F            upper,
+                                       double*      sumsq,
+                                       uint64_t*    nclip) {
+	for( long i=0; i<n; ++i ) {
+		float x = in[i];
+		F     y = x*scale[i];
+		sumsq[i] += x*x;
+		if( nclip ) {
+			nclip[i] += (y <= lower) | (y >= upper);
+		}
 	}
 }
 
-template<typename T, typename Func, typename Size>
-void foreach_simple_cpu_4bit(T const* in,
-                             int8_t*       out,
-                             Size     nelement,
-                             Func     func) {
-	T tempR;
-	T tempI;
-	int8_t tempO;
-	for( Size i=0; i<nelement; i+=2 ) {
-		tempR = in[i+0];
-		tempI = in[i+1];
-		if(func.byteswap_in) {
-			byteswap(tempR, &tempR);
-			byteswap(tempI, &tempI);
-		}
-		//std::cout << tempR << ", " << tempI << " --> " << rint(clip_4bit(tempR)) << ", " << rint(clip_4bit(tempI)) << '\n';
-		tempO = (((int8_t(rint(clip_4bit(tempR*func.scale)))*16)     ) & 0xF0) | \
-			    (((int8_t(rint(clip_4bit(tempI*func.scale)))*16) >> 4) & 0x0F);
-		if(func.byteswap_out) {
-			byteswap(tempO, &tempO);
-		}
-		out[i/2] = tempO;
+// Describes the input as [nouter, nchan, ninner] real components, where each
+//   channel has its own scale factor.
+struct QuantizeLayout {
+	long nouter;
+	long nchan;
+	long ninner;
+};
+
+inline float const* byteswap_input(float const* in, long n, float* buf) {
+	for( long i=0; i<n; ++i ) {
+		byteswap(in[i], &buf[i]);
 	}
+	return buf;
 }
 
-BFstatus bfQuantize(BFarray const* in,
-                    BFarray const* out,
-                    double         scale) {
-	BF_ASSERT(in,  BF_STATUS_INVALID_POINTER);
-	BF_ASSERT(out, BF_STATUS_INVALID_POINTER);
-	BF_ASSERT(!out->immutable, BF_STATUS_INVALID_POINTER);
-	BF_ASSERT(shapes_equal(in, out), BF_STATUS_INVALID_SHAPE);
-	BF_ASSERT(BF_DTYPE_IS_COMPLEX( in->dtype) ==
-	          BF_DTYPE_IS_COMPLEX(out->dtype),
-	          BF_STATUS_INVALID_DTYPE);
-	BF_ASSERT(BF_DTYPE_IS_COMPLEX(in->dtype) || !in->conjugated,
-	          BF_STATUS_INVALID_DTYPE);
-	BF_ASSERT(BF_DTYPE_IS_COMPLEX(out->dtype) || !in->conjugated,
-	          BF_STATUS_INVALID_DTYPE);
-	
-	// TODO: Support conjugation
-	BF_ASSERT((!BF_DTYPE_IS_COMPLEX(in->dtype)) ||
-	          (in->conjugated == out->conjugated),
-	          BF_STATUS_UNSUPPORTED);
-	
-	// TODO: Support padded arrays
-	BF_ASSERT(is_contiguous(in),  BF_STATUS_UNSUPPORTED_STRIDE);
-	BF_ASSERT(is_contiguous(out), BF_STATUS_UNSUPPORTED_STRIDE);
-	
-	// TODO: Support CUDA space
-	BF_ASSERT(space_accessible_from(in->space, BF_SPACE_SYSTEM),
-	          BF_STATUS_UNSUPPORTED_SPACE);
-	BF_ASSERT(space_accessible_from(out->space, BF_SPACE_SYSTEM),
-	          BF_STATUS_UNSUPPORTED_SPACE);
-	
-	size_t nelement = num_contiguous_elements(in);
+// Quantizes the input in chunks using an OpenMP team, optionally also
+//   accumulating per-channel statistics into sumsq and nclip.
+//   Note: The team is bound to the calling block's cores by the pipeline.
+template<typename Func>
+void foreach_chunk_cpu(float const*          in,
+                       QuantizeLayout        layout,
+                       double const*         scales,
+                       bool                  byteswap_in,
+                       double*               sumsq,
+                       uint64_t*             nclip,
+                       Func                  func,
+                       bool                  quantize=true) {
+	typedef typename Func::ftype F;
+	F lower = Func::lower();
+	F upper = Func::upper();
+	if( layout.nchan == 1 ) {
+		// Merge everything into a single run
+		layout.ninner *= layout.nouter;
+		layout.nouter  = 1;
+	}
+	long nchan  = layout.nchan;
+	long ninner = layout.ninner;
+	bool use_runs = (ninner >= BF_QUANTIZE_MIN_RUN && ninner % Func::PACK == 0);
+	if( use_runs ) {
+		long nchunk_per_run = div_up(ninner, (long)BF_QUANTIZE_CHUNK_SIZE);
+		long nchunk = layout.nouter * nchan * nchunk_per_run;
+#pragma omp parallel if( nchunk > 1 )
+		{
+			std::vector<double>   thread_sumsq(sumsq ? nchan : 0, 0.);
+			std::vector<uint64_t> thread_nclip(nclip ? nchan : 0, 0);
+			std::vector<float>    buf(byteswap_in ? BF_QUANTIZE_CHUNK_SIZE : 0);
+#pragma omp for schedule(static)
+			for( long c=0; c<nchunk; ++c ) {
+				long run   = c / nchunk_per_run;
+				long chan  = run % nchan;
+				long begin = (c % nchunk_per_run) * BF_QUANTIZE_CHUNK_SIZE;
+				long n     = min((long)BF_QUANTIZE_CHUNK_SIZE, ninner - begin);
+				long offset = run*ninner + begin;
+				float const* iptr = in + offset;
+				if( byteswap_in ) {
+					iptr = byteswap_input(iptr, n, &buf[0]);
+				}
+				ConstantScale<F> scale(scales ? F(scales[chan]) : F(1));
+				if( sumsq ) {
+					accumulate_run_stats(iptr, n, scale, lower, upper,
+					                     &thread_sumsq[chan],
+					                     nclip ? &thread_nclip[chan] : 0);
+				}
+				if( quantize ) {
+					func(iptr, offset, n, scale);
+				}
+			}
+#pragma omp critical (bfQuantize_stats)
+			for( long chan=0; chan<(long)thread_sumsq.size(); ++chan ) {
+				sumsq[chan] += thread_sumsq[chan];
+				if( nclip ) {
+					nclip[chan] += thread_nclip[chan];
+				}
+			}
+		}
+	} else {
+		long nrow_comp = nchan * ninner;
+		std::vector<F> row_scales(nrow_comp);
+		for( long i=0; i<nrow_comp; ++i ) {
+			row_scales[i] = scales ? F(scales[i / ninner]) : F(1);
+		}
+		long nrow_per_chunk = max(BF_QUANTIZE_CHUNK_SIZE / nrow_comp, 1l);
+		long nchunk = div_up(layout.nouter, nrow_per_chunk);
+#pragma omp parallel if( nchunk > 1 )
+		{
+			std::vector<double>   thread_sumsq(sumsq ? nrow_comp : 0, 0.);
+			std::vector<uint64_t> thread_nclip(nclip ? nrow_comp : 0, 0);
+			std::vector<float>    buf(byteswap_in ? nrow_comp : 0);
+			ComponentScale<F>     scale(&row_scales[0]);
+#pragma omp for schedule(static)
+			for( long c=0; c<nchunk; ++c ) {
+				long row_end = min((c+1)*nrow_per_chunk, layout.nouter);
+				for( long row=c*nrow_per_chunk; row<row_end; ++row ) {
+					long offset = row*nrow_comp;
+					float const* iptr = in + offset;
+					if( byteswap_in ) {
+						iptr = byteswap_input(iptr, nrow_comp, &buf[0]);
+					}
+					if( sumsq ) {
+						accumulate_component_stats(iptr, nrow_comp, scale,
+						                           lower, upper,
+						                           &thread_sumsq[0],
+						                           nclip ? &thread_nclip[0] : 0);
+					}
+					if( quantize ) {
+						func(iptr, offset, nrow_comp, scale);
+					}
+				}
+			}
+#pragma omp critical (bfQuantize_stats)
+			for( long i=0; i<(long)thread_sumsq.size(); ++i ) {
+				sumsq[i / ninner] += thread_sumsq[i];
+				if( nclip ) {
+					nclip[i / ninner] += thread_nclip[i];
+				}
+			}
+		}
+	}
+}
+
+BFstatus quantize_cpu(BFarray const* in,
+                      BFarray const* out,
+                      QuantizeLayout layout,
+                      double const*  scales,
+                      double*        sumsq,
+                      uint64_t*      nclip) {
 	bool byteswap_in  = ( in->big_endian != is_big_endian());
-	bool byteswap_out = (out->big_endian != is_big_endian());
+	bool byteswap_out = out && (out->big_endian != is_big_endian());
+	bool quantize = (out != 0);
+	BFdtype otype = out ? out->dtype : BF_DTYPE_F32;
+	void*   odata = out ? out->data  : 0;
 	
-#define CALL_FOREACH_SIMPLE_CPU_QUANTIZE(itype,stype,otype) \
-	foreach_simple_cpu((itype*)in->data, \
-	                   (otype*)out->data, \
-	                   nelement, \
-	                   QuantizeFunctor<itype,stype,otype> \
-	                   (scale,byteswap_in,byteswap_out))
+	// Packed values must not straddle rows of channels
+	int  nbit = otype & BF_DTYPE_NBIT_BITS;
+	long pack = (nbit < 8) ? 8 / nbit : 1;
+	BF_ASSERT((layout.nouter*layout.nchan*layout.ninner) % pack == 0,
+	          BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(layout.nchan == 1 || (layout.nchan*layout.ninner) % pack == 0,
+	          BF_STATUS_INVALID_SHAPE);
+	
+#define CALL_FOREACH_CHUNK_CPU_QUANTIZE(func) \
+	foreach_chunk_cpu((float*)in->data, layout, scales, byteswap_in, \
+	                  sumsq, nclip, func(odata, byteswap_out), quantize)
 	
 	// **TODO: Need CF32 --> CI* separately to support conjugation
 	if( in->dtype == BF_DTYPE_F32 || in->dtype == BF_DTYPE_CF32 ) {
 		// TODO: Support T-->T with endian conversion (like quantize but with identity func instead)
-		switch( out->dtype ) {
-		case BF_DTYPE_CI4: nelement *= 2;
+		switch( otype ) {
+		case BF_DTYPE_F32: {
+			// Statistics only
+			BF_ASSERT(!nclip, BF_STATUS_INVALID_POINTER);
+			typedef QuantizeFunctor<float, float> Func;
+			CALL_FOREACH_CHUNK_CPU_QUANTIZE(Func); break;
+		}
+		case BF_DTYPE_CI2:
+		case BF_DTYPE_I2: {
+			typedef QuantizePackedFunctor<2> Func;
+			CALL_FOREACH_CHUNK_CPU_QUANTIZE(Func); break;
+		}
+		case BF_DTYPE_CI4:
 		case BF_DTYPE_I4: {
-			BF_ASSERT(nelement % 2 == 0, BF_STATUS_INVALID_SHAPE);
-			foreach_simple_cpu_4bit((float*)in->data, \
-			                        (int8_t*)out->data, \
-			                        nelement, \
-			                        QuantizeFunctor<float,float,uint8_t> \
-			                        (scale,byteswap_in,byteswap_out)); break;
-		}
-		case BF_DTYPE_CI8: nelement *= 2;
+			typedef QuantizePackedFunctor<4> Func;
+			CALL_FOREACH_CHUNK_CPU_QUANTIZE(Func); break;
+		}
+		case BF_DTYPE_CI8:
 		case BF_DTYPE_I8: {
-			CALL_FOREACH_SIMPLE_CPU_QUANTIZE(float,float,int8_t); break;
+			typedef QuantizeFunctor<int8_t, float> Func;
+			CALL_FOREACH_CHUNK_CPU_QUANTIZE(Func); break;
 		}
-		case BF_DTYPE_CI16: nelement *= 2;
+		case BF_DTYPE_CI16:
 		case BF_DTYPE_I16: {
-			CALL_FOREACH_SIMPLE_CPU_QUANTIZE(float,float,int16_t); break;
+			typedef QuantizeFunctor<int16_t, float> Func;
+			CALL_FOREACH_CHUNK_CPU_QUANTIZE(Func); break;
 		}
-		case BF_DTYPE_CI32: nelement *= 2;
+		case BF_DTYPE_CI32:
 		case BF_DTYPE_I32: {
-			CALL_FOREACH_SIMPLE_CPU_QUANTIZE(float,double,int32_t); break;
+			typedef QuantizeFunctor<int32_t, double> Func;
+			CALL_FOREACH_CHUNK_CPU_QUANTIZE(Func); break;
 		}
 		case BF_DTYPE_U8: {
-			CALL_FOREACH_SIMPLE_CPU_QUANTIZE(float,float,uint8_t); break;
+			typedef QuantizeFunctor<uint8_t, float> Func;
+			CALL_FOREACH_CHUNK_CPU_QUANTIZE(Func); break;
 		}
 		case BF_DTYPE_U16: {
-			CALL_FOREACH_SIMPLE_CPU_QUANTIZE(float,float,uint16_t); break;
+			typedef QuantizeFunctor<uint16_t, float> Func;
+			CALL_FOREACH_CHUNK_CPU_QUANTIZE(Func); break;
 		}
 		case BF_DTYPE_U32: {
-			CALL_FOREACH_SIMPLE_CPU_QUANTIZE(float,double,uint32_t); break;
+			typedef QuantizeFunctor<uint32_t, double> Func;
+			CALL_FOREACH_CHUNK_CPU_QUANTIZE(Func); break;
 		}
 		default: BF_FAIL("Supported bfQuantize output dtype", BF_STATUS_UNSUPPORTED_DTYPE);
 		}
 	} else {
 		BF_FAIL("Supported bfQuantize input dtype", BF_STATUS_UNSUPPORTED_DTYPE);
 	}
-#undef CALL_FOREACH_SIMPLE_CPU_QUANTIZE
+#undef CALL_FOREACH_CHUNK_CPU_QUANTIZE
+	return BF_STATUS_SUCCESS;
+}
+
+BFstatus check_quantize_arrays(BFarray const* in,
+                               BFarray const* out) {
+	BF_ASSERT(in,  BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!out || !out->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!out || shapes_equal(in, out), BF_STATUS_INVALID_SHAPE);
+	BF_ASSERT(!out ||
+	          BF_DTYPE_IS_COMPLEX( in->dtype) ==
+	          BF_DTYPE_IS_COMPLEX(out->dtype),
+	          BF_STATUS_INVALID_DTYPE);
+	BF_ASSERT(BF_DTYPE_IS_COMPLEX(in->dtype) || !in->conjugated,
+	          BF_STATUS_INVALID_DTYPE);
+	
+	// TODO: Support conjugation
+	BF_ASSERT(!out ||
+	          (!BF_DTYPE_IS_COMPLEX(in->dtype)) ||
+	          (in->conjugated == out->conjugated),
+	          BF_STATUS_UNSUPPORTED);
+	
+	// TODO: Support padded arrays
+	BF_ASSERT(is_contiguous(in),          BF_STATUS_UNSUPPORTED_STRIDE);
+	BF_ASSERT(!out || is_contiguous_packed(out), BF_STATUS_UNSUPPORTED_STRIDE);
+	
+	// TODO: Support CUDA space
+	BF_ASSERT(space_accessible_from(in->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(!out || space_accessible_from(out->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
 	return BF_STATUS_SUCCESS;
 }
+
+BFstatus bfQuantize(BFarray const* in,
+                    BFarray const* out,
+                    double         scale) {
+	BF_ASSERT(out, BF_STATUS_INVALID_POINTER);
+	BFstatus ret = check_quantize_arrays(in, out);
+	if( ret != BF_STATUS_SUCCESS ) {
+		return ret;
+	}
+	if( shape_size(in->ndim, in->shape) == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	QuantizeLayout layout;
+	layout.nouter = 1;
+	layout.nchan  = 1;
+	layout.ninner = shape_size(in->ndim, in->shape) *
+	                (1 + BF_DTYPE_IS_COMPLEX(in->dtype));
+	return quantize_cpu(in, out, layout, &scale, 0, 0);
+}
+
+BFstatus bfQuantizeChannels(BFarray const* in,
+                            BFarray const* out,
+                            BFarray const* scales,
+                            int            axis,
+                            BFarray const* sumsq,
+                            BFarray const* nclip) {
+	BFstatus ret = check_quantize_arrays(in, out);
+	if( ret != BF_STATUS_SUCCESS ) {
+		return ret;
+	}
+	BF_ASSERT(axis >= -1 && axis < in->ndim, BF_STATUS_INVALID_ARGUMENT);
+	BF_ASSERT(out || sumsq, BF_STATUS_INVALID_POINTER);
+	QuantizeLayout layout;
+	layout.nouter = 1;
+	layout.nchan  = 1;
+	layout.ninner = 1 + BF_DTYPE_IS_COMPLEX(in->dtype);
+	for( int d=0; d<in->ndim; ++d ) {
+		if( d < axis ) {
+			layout.nouter *= in->shape[d];
+		} else if( d == axis ) {
+			layout.nchan   = in->shape[d];
+		} else {
+			layout.ninner *= in->shape[d];
+		}
+	}
+	long nchan = layout.nchan;
+	// Note: Statistics arrays are accumulated into, not overwritten
+	BFarray const* chan_arrays[3] = {scales, sumsq, nclip};
+	for( int a=0; a<3; ++a ) {
+		BFarray const* arr = chan_arrays[a];
+		if( !arr ) {
+			continue;
+		}
+		BF_ASSERT(shape_size(arr->ndim, arr->shape) == nchan,
+		          BF_STATUS_INVALID_SHAPE);
+		BF_ASSERT(is_contiguous(arr), BF_STATUS_UNSUPPORTED_STRIDE);
+		BF_ASSERT(space_accessible_from(arr->space, BF_SPACE_SYSTEM),
+		          BF_STATUS_UNSUPPORTED_SPACE);
+	}
+	BF_ASSERT(!sumsq || sumsq->dtype == BF_DTYPE_F64, BF_STATUS_INVALID_DTYPE);
+	BF_ASSERT(!sumsq || !sumsq->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!nclip || nclip->dtype == BF_DTYPE_U64, BF_STATUS_INVALID_DTYPE);
+	BF_ASSERT(!nclip || !nclip->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!nclip || sumsq, BF_STATUS_INVALID_POINTER);
+	std::vector<double> chan_scales(nchan, 1.);
+	if( scales ) {
+		BF_ASSERT(scales->dtype == BF_DTYPE_F32 ||
+		          scales->dtype == BF_DTYPE_F64,
+		          BF_STATUS_INVALID_DTYPE);
+		for( long c=0; c<nchan; ++c ) {
+			chan_scales[c] = (scales->dtype == BF_DTYPE_F32 ?
+			                  ((float*)scales->data)[c] :
+			                  ((double*)scales->data)[c]);
+		}
+	}
+	if( shape_size(in->ndim, in->shape) == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	return quantize_cpu(in, out, layout, &chan_scales[0],
+	                    sumsq ? (double*)sumsq->data : 0,
+	                    nclip ? (uint64_t*)nclip->data : 0);
+}
@@ -0,0 +1,250 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <bifrost/reduce.h>
+#include "reduce.hpp"
+#include "utils.hpp"
+
+#include <limits>
+
+using std::max;
+using std::min;
+
+// Loads a value to be reduced
+template<typename T>
+struct LoadReal {
+	enum { NCOMPONENT = 1 };
+	static inline float load(T const* x) { return float(x[0]); }
+};
+template<typename T>
+struct LoadPower {
+	enum { NCOMPONENT = 1 };
+	static inline float load(T const* x) { float v = float(x[0]); return v*v; }
+};
+template<typename T>
+struct LoadComplexPower {
+	enum { NCOMPONENT = 2 };
+	static inline float load(T const* x) {
+		float re = float(x[0]);
+		float im = float(x[1]);
+		return re*re + im*im;
+	}
+};
+
+struct ReduceSum {
+	static inline float update(float acc, float x) { return acc + x; }
+	static inline float finalize(float acc, long n) { return acc; }
+};
+struct ReduceMean {
+	static inline float update(float acc, float x) { return acc + x; }
+	static inline float finalize(float acc, long n) { return acc / n; }
+};
+struct ReduceMin {
+	static inline float update(float acc, float x) { return min(acc, x); }
+	static inline float finalize(float acc, long n) { return acc; }
+};
+struct ReduceMax {
+	static inline float update(float acc, float x) { return max(acc, x); }
+	static inline float finalize(float acc, long n) { return acc; }
+};
+
+// Reduces 'factor' input rows of n elements into one output row
+//   Note: Accumulates directly into the output
+template<typename T, typename Loader, typename Op, bool CONTIGUOUS>
+inline void reduce_rows(T const* iptr,
+                        float*   optr,
+                        long     n,
+                        long     factor,
+                        long     rs,
+                        long     is,
+                        long     os,
+                        bool     accumulate) {
+	if( CONTIGUOUS ) {
+		is = Loader::NCOMPONENT;
+		os = 1;
+	}
+	if( accumulate ) {
+		for( long i=0; i<n; ++i ) {
+			optr[i*os] = Op::update(optr[i*os], Loader::load(iptr + i*is));
+		}
+	} else {
+		for( long i=0; i<n; ++i ) {
+			optr[i*os] = Loader::load(iptr + i*is);
+		}
+	}
+	for( long k=1; k<factor; ++k ) {
+		T const* irow = iptr + k*rs;
+		for( long i=0; i<n; ++i ) {
+			optr[i*os] = Op::update(optr[i*os], Loader::load(irow + i*is));
+		}
+	}
+	for( long i=0; i<n; ++i ) {
+		optr[i*os] = Op::finalize(optr[i*os], factor);
+	}
+}
+
+template<typename T, typename Loader, typename Op>
+struct ReduceChunkFunctor {
+	T const* in;
+	float*   out;
+	long     factor;
+	long     rs;
+	long     is;
+	long     os;
+	bool     accumulate;
+	ReduceChunkFunctor(T const* in_, float* out_, ReduceLayout const& layout,
+	                   bool accumulate_)
+		: in(in_), out(out_), factor(layout.factor), rs(layout.reduce_istride),
+		  is(layout.inner_istride), os(layout.inner_ostride),
+		  accumulate(accumulate_) {}
+	inline void operator()(long ioffset, long ooffset, long n) const {
+		T const* iptr = in  + ioffset;
+		float*   optr = out + ooffset;
+		if( n == 1 ) {
+			float acc = Loader::load(iptr);
+			if( accumulate ) {
+				acc = Op::update(optr[0], acc);
+			}
+			for( long k=1; k<factor; ++k ) {
+				acc = Op::update(acc, Loader::load(iptr + k*rs));
+			}
+			optr[0] = Op::finalize(acc, factor);
+		} else if( is == Loader::NCOMPONENT && os == 1 ) {
+			reduce_rows<T,Loader,Op,true >(iptr, optr, n, factor, rs, is, os,
+			                               accumulate);
+		} else {
+			reduce_rows<T,Loader,Op,false>(iptr, optr, n, factor, rs, is, os,
+			                               accumulate);
+		}
+	}
+};
+
+template<typename T, typename Loader, typename Op>
+void reduce_cpu(T const*            in,
+                float*              out,
+                ReduceLayout const& layout,
+                bool                accumulate) {
+	foreach_reduce_chunk_cpu(layout,
+	                         ReduceChunkFunctor<T,Loader,Op>(in, out, layout,
+	                                                         accumulate));
+}
+
+template<typename T, typename Loader>
+BFstatus reduce_cpu_op(BFarray const*      in,
+                       BFarray const*      out,
+                       ReduceLayout const& layout,
+                       BFreduce_op         op,
+                       bool                accumulate) {
+	T const* idata = (T const*)in->data;
+	float*   odata = (float*)out->data;
+	switch( op ) {
+	case BF_REDUCE_SUM:
+	case BF_REDUCE_POWER_SUM:  reduce_cpu<T,Loader,ReduceSum >(idata, odata, layout, accumulate); break;
+	case BF_REDUCE_MEAN:
+	case BF_REDUCE_POWER_MEAN: reduce_cpu<T,Loader,ReduceMean>(idata, odata, layout, accumulate); break;
+	case BF_REDUCE_MIN:
+	case BF_REDUCE_POWER_MIN:  reduce_cpu<T,Loader,ReduceMin >(idata, odata, layout, accumulate); break;
+	case BF_REDUCE_MAX:
+	case BF_REDUCE_POWER_MAX:  reduce_cpu<T,Loader,ReduceMax >(idata, odata, layout, accumulate); break;
+	default: BF_FAIL("Supported bfReduce op", BF_STATUS_INVALID_ARGUMENT);
+	}
+	return BF_STATUS_SUCCESS;
+}
+
+template<typename T>
+BFstatus reduce_cpu_type(BFarray const*      in,
+                         BFarray const*      out,
+                         ReduceLayout const& layout,
+                         BFreduce_op         op,
+                         bool                accumulate) {
+	bool power = (op == BF_REDUCE_POWER_SUM  || op == BF_REDUCE_POWER_MEAN ||
+	              op == BF_REDUCE_POWER_MIN  || op == BF_REDUCE_POWER_MAX);
+	if( !power ) {
+		return reduce_cpu_op<T,LoadReal<T> >(in, out, layout, op, accumulate);
+	} else if( BF_DTYPE_IS_COMPLEX(in->dtype) ) {
+		return reduce_cpu_op<T,LoadComplexPower<T> >(in, out, layout, op, accumulate);
+	} else {
+		return reduce_cpu_op<T,LoadPower<T> >(in, out, layout, op, accumulate);
+	}
+}
+
+BFstatus bfReduce(BFarray const* in,
+                  BFarray const* out,
+                  BFreduce_op    op,
+                  BFbool         accumulate) {
+	BF_ASSERT(in,  BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(out, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(!out->immutable, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(in->ndim == out->ndim, BF_STATUS_INVALID_SHAPE);
+	
+	// TODO: Support CUDA space
+	BF_ASSERT(space_accessible_from(in->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	BF_ASSERT(space_accessible_from(out->space, BF_SPACE_SYSTEM),
+	          BF_STATUS_UNSUPPORTED_SPACE);
+	
+	bool power = (op == BF_REDUCE_POWER_SUM  || op == BF_REDUCE_POWER_MEAN ||
+	              op == BF_REDUCE_POWER_MIN  || op == BF_REDUCE_POWER_MAX);
+	bool complex_out = BF_DTYPE_IS_COMPLEX(in->dtype) && !power;
+	BF_ASSERT(out->dtype == (complex_out ? BF_DTYPE_CF32 : BF_DTYPE_F32),
+	          BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(!complex_out || (op != BF_REDUCE_MIN && op != BF_REDUCE_MAX),
+	          BF_STATUS_UNSUPPORTED_DTYPE);
+	BF_ASSERT(!accumulate || (op != BF_REDUCE_MEAN && op != BF_REDUCE_POWER_MEAN),
+	          BF_STATUS_INVALID_ARGUMENT);
+	// TODO: Support conjugated input for the non-power ops
+	BF_ASSERT(!complex_out || !in->conjugated, BF_STATUS_UNSUPPORTED);
+	BF_ASSERT(BF_DTYPE_NBIT(in->dtype) % 8 == 0, BF_STATUS_UNSUPPORTED_DTYPE);
+	// TODO: Support endian conversion
+	BF_ASSERT(!in->big_endian == !is_big_endian(), BF_STATUS_UNSUPPORTED);
+	
+	ReduceLayout layout;
+	BF_ASSERT(get_reduce_layout(in, out, complex_out, &layout),
+	          BF_STATUS_INVALID_SHAPE);
+	if( shape_size(out->ndim, out->shape) == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	
+	switch( in->dtype ) {
+	case BF_DTYPE_F32:
+	case BF_DTYPE_CF32: return reduce_cpu_type<float   >(in, out, layout, op, accumulate);
+	case BF_DTYPE_F64:
+	case BF_DTYPE_CF64: return reduce_cpu_type<double  >(in, out, layout, op, accumulate);
+	case BF_DTYPE_I8:
+	case BF_DTYPE_CI8:  return reduce_cpu_type<int8_t  >(in, out, layout, op, accumulate);
+	case BF_DTYPE_I16:
+	case BF_DTYPE_CI16: return reduce_cpu_type<int16_t >(in, out, layout, op, accumulate);
+	case BF_DTYPE_I32:
+	case BF_DTYPE_CI32: return reduce_cpu_type<int32_t >(in, out, layout, op, accumulate);
+	case BF_DTYPE_U8:   return reduce_cpu_type<uint8_t >(in, out, layout, op, accumulate);
+	case BF_DTYPE_U16:  return reduce_cpu_type<uint16_t>(in, out, layout, op, accumulate);
+	case BF_DTYPE_U32:  return reduce_cpu_type<uint32_t>(in, out, layout, op, accumulate);
+	default: BF_FAIL("Supported bfReduce input dtype", BF_STATUS_UNSUPPORTED_DTYPE);
+	}
+}
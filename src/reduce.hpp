@@ -0,0 +1,157 @@
+/*
+ * Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+ * Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions
+ * are met:
+ * * Redistributions of source code must retain the above copyright
+ *   notice, this list of conditions and the following disclaimer.
+ * * Redistributions in binary form must reproduce the above copyright
+ *   notice, this list of conditions and the following disclaimer in the
+ *   documentation and/or other materials provided with the distribution.
+ * * Neither the name of The Bifrost Authors nor the names of its
+ *   contributors may be used to endorse or promote products derived
+ *   from this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+ * EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+ * PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+ * CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+ * EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+ * PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+ * PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+ * OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#pragma once
+
+#include <bifrost/array.h>
+#include "utils.hpp"
+
+// Number of inner elements handed to each OpenMP thread per unit of work
+#define BF_REDUCE_CHUNK_SIZE 4096
+
+// Describes the reduction as a set of independent tasks (the output dims
+//   other than the innermost), each of which reduces 'factor' input rows of
+//   length inner_len into one output row. Strides are in units of the input
+//   component type and of float outputs respectively.
+struct ReduceLayout {
+	int  ndim;
+	long shape[BF_MAX_DIMS+1];
+	long istrides[BF_MAX_DIMS+1];
+	long ostrides[BF_MAX_DIMS+1];
+	long factor;
+	long reduce_istride;
+	long inner_len;
+	long inner_istride;
+	long inner_ostride;
+};
+
+// Returns false if the shapes are incompatible
+inline bool get_reduce_layout(BFarray const* in,
+                              BFarray const* out,
+                              bool           split_complex,
+                              ReduceLayout*  layout) {
+	long icomp_nbyte = BF_DTYPE_NBIT(in->dtype) / 8 /
+	                   (1 + BF_DTYPE_IS_COMPLEX(in->dtype));
+	long ocomp_nbyte = sizeof(float);
+	int  ndim = in->ndim;
+	long shape[BF_MAX_DIMS+1];
+	long istrides[BF_MAX_DIMS+1];
+	long ostrides[BF_MAX_DIMS+1];
+	int  axis = -1;
+	for( int d=0; d<ndim; ++d ) {
+		shape[d]    = out->shape[d];
+		istrides[d] = in->strides[d]  / icomp_nbyte;
+		ostrides[d] = out->strides[d] / ocomp_nbyte;
+		if( in->shape[d] != out->shape[d] ) {
+			if( axis != -1 ||
+			    out->shape[d] == 0 ||
+			    in->shape[d] == 0 ||
+			    in->shape[d] % out->shape[d] != 0 ) {
+				return false;
+			}
+			axis = d;
+		}
+	}
+	if( split_complex ) {
+		// Treat the real and imag components as an extra inner dim
+		shape[ndim]    = 2;
+		istrides[ndim] = 1;
+		ostrides[ndim] = 1;
+		++ndim;
+	}
+	layout->factor         = (axis == -1) ? 1 : in->shape[axis] / out->shape[axis];
+	layout->reduce_istride = (axis == -1) ? 0 : istrides[axis];
+	if( axis != -1 ) {
+		// Each output step along the axis spans 'factor' input steps
+		istrides[axis] *= layout->factor;
+	}
+	// The innermost dim after the reduced axis is processed in the inner loop,
+	//   merged with any dims that are contiguous with it.
+	layout->inner_len     = 1;
+	layout->inner_istride = 0;
+	layout->inner_ostride = 0;
+	int d = ndim - 1;
+	for( ; d>axis; --d ) {
+		if( shape[d] == 1 ) {
+			continue;
+		}
+		if( layout->inner_len == 1 ) {
+			layout->inner_len     = shape[d];
+			layout->inner_istride = istrides[d];
+			layout->inner_ostride = ostrides[d];
+		} else if( istrides[d] == layout->inner_istride*layout->inner_len &&
+		           ostrides[d] == layout->inner_ostride*layout->inner_len ) {
+			layout->inner_len *= shape[d];
+		} else {
+			break;
+		}
+	}
+	layout->ndim = 0;
+	for( ; d>=0; --d ) {
+		if( shape[d] == 1 ) {
+			continue;
+		}
+		// Note: Task dims are stored innermost first
+		layout->shape[layout->ndim]    = shape[d];
+		layout->istrides[layout->ndim] = istrides[d];
+		layout->ostrides[layout->ndim] = ostrides[d];
+		++layout->ndim;
+	}
+	return true;
+}
+
+// Calls func(ioffset, ooffset, n) on chunks of up to BF_REDUCE_CHUNK_SIZE
+//   inner elements, splitting them across the calling thread's OpenMP team.
+//   Offsets are in the units of the layout's strides.
+template<typename Func>
+void foreach_reduce_chunk_cpu(ReduceLayout const& layout,
+                              Func                func) {
+	long is = layout.inner_istride;
+	long os = layout.inner_ostride;
+	long nchunk_per_task = div_up(layout.inner_len, (long)BF_REDUCE_CHUNK_SIZE);
+	long ntask = nchunk_per_task;
+	for( int e=0; e<layout.ndim; ++e ) {
+		ntask *= layout.shape[e];
+	}
+#pragma omp parallel for schedule(static) if( ntask > 1 )
+	for( long t=0; t<ntask; ++t ) {
+		long begin = (t % nchunk_per_task) * BF_REDUCE_CHUNK_SIZE;
+		long n     = std::min((long)BF_REDUCE_CHUNK_SIZE, layout.inner_len - begin);
+		long task  = t / nchunk_per_task;
+		long ioffset = begin*is;
+		long ooffset = begin*os;
+		for( int e=0; e<layout.ndim; ++e ) {
+			long ind = task % layout.shape[e];
+			task    /= layout.shape[e];
+			ioffset += ind*layout.istrides[e];
+			ooffset += ind*layout.ostrides[e];
+		}
+		func(ioffset, ooffset, n);
+	}
+}
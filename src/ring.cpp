@@ -80,6 +80,15 @@ BFstatus bfRingGetAffinity(BFring ring, int* core) {
 	BF_ASSERT(core,  BF_STATUS_INVALID_POINTER);
 	BF_TRY_RETURN(*core = ring->core());
 }
+BFstatus bfRingSetSpill(BFring ring, const char* path, BFsize max_size) {
+	BF_ASSERT(ring, BF_STATUS_INVALID_HANDLE);
+	BF_TRY_RETURN(ring->set_spill(path, max_size));
+}
+BFstatus bfRingGetSpillInfo(BFring ring, BFspill_info* spill_info) {
+	BF_ASSERT(ring,       BF_STATUS_INVALID_HANDLE);
+	BF_ASSERT(spill_info, BF_STATUS_INVALID_POINTER);
+	BF_TRY_RETURN(ring->get_spill_info(spill_info));
+}
 BFstatus bfRingLock(BFring ring) {
 	BF_ASSERT(ring, BF_STATUS_INVALID_HANDLE);
 	BF_TRY_RETURN(ring->lock());
@@ -113,6 +122,11 @@ BFstatus   bfRingLockedGetStride(BFring ring, BFsize* size) {
 	BF_TRY_RETURN_ELSE(*size = ring->locked_stride(),
 	                   *size = 0);
 }
+BFstatus   bfRingLockedGetMirrored(BFring ring, BFbool* mirrored) {
+	BF_ASSERT(ring, BF_STATUS_INVALID_HANDLE);
+	BF_TRY_RETURN_ELSE(*mirrored = ring->locked_mirrored(),
+	                   *mirrored = 0);
+}
 
 BFstatus bfRingBeginWriting(BFring ring) {
 	BF_ASSERT(ring, BF_STATUS_INVALID_HANDLE);
@@ -192,6 +206,17 @@ BFstatus bfRingSequenceOpenAt(BFrsequence* sequence,
 	                                                    guarantee),
 	                   *sequence = 0);
 }
+BFstatus bfRingSequenceOpenBefore(BFrsequence* sequence,
+                                  BFring       ring,
+                                  BFoffset     time_tag,
+                                  BFbool       guarantee) {
+	BF_ASSERT(sequence, BF_STATUS_INVALID_POINTER);
+	BF_ASSERT(ring,     BF_STATUS_INVALID_HANDLE);
+	BF_ASSERT(time_tag!=BFoffset(-1), BF_STATUS_INVALID_ARGUMENT);
+	BF_TRY_RETURN_ELSE(*sequence = new BFrsequence_impl(ring->get_sequence_before(time_tag),
+	                                                    guarantee),
+	                   *sequence = 0);
+}
 BFstatus bfRingSequenceOpenLatest(BFrsequence* sequence,
                                   BFring       ring,
                                   BFbool       guarantee) {
@@ -307,6 +332,12 @@ BFstatus bfRingSequenceGetNRinglet(BFsequence sequence, BFsize* n) {
 	BF_TRY_RETURN_ELSE(*n = sequence->nringlet(),
 	                   *n = 0);
 }
+BFstatus bfRingSequenceGetSize(BFsequence sequence, BFsize* size) {
+	BF_ASSERT(sequence, BF_STATUS_INVALID_HANDLE);
+	BF_ASSERT(size,     BF_STATUS_INVALID_POINTER);
+	BF_TRY_RETURN_ELSE(*size = sequence->size(),
+	                   *size = 0);
+}
 
 BFstatus   bfRingSpanReserve(BFwspan*    span,
                              //BFwsequence sequence,
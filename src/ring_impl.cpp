@@ -57,6 +57,69 @@
 #include <numa.h>
 #endif
 
+#include <sys/mman.h>
+#include <sys/syscall.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <cstdlib>
+#include <cstring>
+
+// Spilled data waiting to be written to disk is dropped beyond this many
+//   bytes (or the size of the ring, if larger)
+#define BF_RING_SPILL_MAX_PENDING (64 << 20)
+
+// Returns false if mirrored ring buffers have been disabled by setting the
+//   environment variable BIFROST_RING_MIRROR=0
+inline bool ring_mirror_enabled() {
+	const char* val = std::getenv("BIFROST_RING_MIRROR");
+	return !(val && std::strcmp(val, "0") == 0);
+}
+
+// Allocates nringlet buffers of span bytes that are each mapped twice
+//   back-to-back in virtual memory, such that any span up to span bytes is
+//   contiguous without the need for a ghost region. The ringlet stride is
+//   2*span. Returns nullptr if the mapping could not be created.
+inline void* mirror_alloc(BFsize span, BFsize nringlet) {
+#ifdef SYS_memfd_create
+	if( span % ::sysconf(_SC_PAGESIZE) != 0 ) {
+		return nullptr;
+	}
+	int fd = ::syscall(SYS_memfd_create, "bifrost_ring", 0);
+	if( fd == -1 ) {
+		return nullptr;
+	}
+	BFsize nbyte = span*nringlet;
+	if( ::ftruncate(fd, nbyte) != 0 ) {
+		::close(fd);
+		return nullptr;
+	}
+	// Reserve the whole address range first, then map each ringlet into it
+	uint8_t* base = (uint8_t*)::mmap(nullptr, 2*nbyte, PROT_NONE,
+	                                 MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+	if( base == MAP_FAILED ) {
+		::close(fd);
+		return nullptr;
+	}
+	for( BFsize r=0; r<nringlet; ++r ) {
+		for( int copy=0; copy<2; ++copy ) {
+			void* addr = ::mmap(base + (2*r + copy)*span, span,
+			                    PROT_READ | PROT_WRITE, MAP_SHARED | MAP_FIXED,
+			                    fd, r*span);
+			if( addr == MAP_FAILED ) {
+				::munmap(base, 2*nbyte);
+				::close(fd);
+				return nullptr;
+			}
+		}
+	}
+	// Note: The mappings keep the memory alive after the fd is closed
+	::close(fd);
+	return base;
+#else
+	return nullptr;
+#endif
+}
+
 // This implements a lock with the condition that no reads or writes
 //   can be open while it is held.
 class RingReallocLock {
@@ -86,13 +149,16 @@ public:
 };
 
 BFring_impl::BFring_impl(const char* name, BFspace space)
-	: _name(name), _space(space), _buf(nullptr),
+	: _name(name), _space(space), _buf(nullptr), _mirrored(false),
 	  _ghost_span(0), _span(0), _stride(0), _nringlet(0), _offset0(0),
 	  _tail(0), _head(0), _reserve_head(0),
 	  _ghost_dirty(false),
 	  _writing_begun(false), _writing_ended(false), _eod(0),
 	  _nread_open(0), _nwrite_open(0), _nrealloc_pending(0),
-	  _core(-1) {
+	  _core(-1),
+	  _spill_fd(-1), _spill_max_size(0), _spill_file_size(0),
+	  _spill_nbyte_pending(0), _spill_stop(false),
+	  _nbyte_spilled(0), _nbyte_recovered(0), _nbyte_dropped(0) {
 
 #if defined BF_CUDA_ENABLED && BF_CUDA_ENABLED
 	BF_ASSERT_EXCEPTION(space==BF_SPACE_SYSTEM       ||
@@ -108,9 +174,258 @@ BFring_impl::BFring_impl(const char* name, BFspace space)
 BFring_impl::~BFring_impl() {
 	// TODO: Should check if anything is still open here?
 	if( _buf ) {
+		this->_free_buf();
+	}
+	unique_lock_type lock(_mutex);
+	this->_close_spill(lock);
+}
+void BFring_impl::_free_buf() {
+	if( _mirrored ) {
+		::munmap(_buf, _stride*_nringlet);
+	} else {
 		bfFree(_buf, _space);
 	}
 }
+void BFring_impl::set_spill(const char* path, BFsize max_size) {
+	unique_lock_type lock(_mutex);
+	BF_ASSERT_EXCEPTION(space_accessible_from(_space, BF_SPACE_SYSTEM),
+	                    BF_STATUS_UNSUPPORTED_SPACE);
+	this->_close_spill(lock);
+	if( !path ) {
+		return;
+	}
+	_spill_fd = ::open(path, O_RDWR | O_CREAT | O_TRUNC, 0644);
+	BF_ASSERT_EXCEPTION(_spill_fd != -1, BF_STATUS_INVALID_ARGUMENT);
+	_spill_path     = path;
+	_spill_max_size = max_size;
+	_spill_stop     = false;
+	_spill_thread   = std::thread(&BFring_impl::_spill_loop, this);
+}
+void BFring_impl::get_spill_info(BFspill_info* info) {
+	lock_guard_type lock(_mutex);
+	info->enabled         = (_spill_fd != -1);
+	info->nbyte_spilled   = _nbyte_spilled;
+	info->nbyte_recovered = _nbyte_recovered;
+	info->nbyte_dropped   = _nbyte_dropped;
+	info->nbyte_stored    = 0;
+	for( auto const& entry : _spill_index ) {
+		info->nbyte_stored += entry.second.size*_nringlet;
+	}
+	info->reader_lag = (_readers.empty() ? 0 :
+	                    std::max(BFdelta(_head - _readers.begin()->first),
+	                             BFdelta(0)));
+}
+BFsize BFring_impl::sequence_size(BFsequence_sptr sequence) {
+	lock_guard_type lock(_mutex);
+	BFoffset end = _head;
+	if( sequence->is_finished() ) {
+		end = std::min(end, sequence->end());
+	}
+	return std::max(BFdelta(end - sequence->begin()), BFdelta(0));
+}
+void BFring_impl::_close_spill(unique_lock_type& lock) {
+	if( _spill_fd == -1 ) {
+		return;
+	}
+	// Note: Writes that are still queued are discarded along with the file
+	_spill_stop = true;
+	_spill_condition.notify_all();
+	lock.unlock();
+	_spill_thread.join();
+	lock.lock();
+	for( auto const& write : _spill_queue ) {
+		std::free(write.data);
+	}
+	_spill_queue.clear();
+	_spill_nbyte_pending = 0;
+	::close(_spill_fd);
+	::unlink(_spill_path.c_str());
+	_spill_fd = -1;
+	_spill_file_size = 0;
+	_spill_index.clear();
+}
+// Stages a copy of the data that is about to be overwritten by the span
+//   [begin, begin+size) for writing to the spill file, omitting anything
+//   that all unguaranteed readers have already read (or that is already
+//   spilled). The write itself is done by the spill thread, so that no I/O
+//   is done while the ring is locked.
+void BFring_impl::_spill(BFoffset begin, BFsize size) {
+	if( BFoffset(begin + size - _offset0) <= _span ) {
+		// Nothing has been written here yet
+		return;
+	}
+	BFoffset spill_end   = begin + size - _span;
+	BFoffset spill_begin = (BFoffset(begin - _offset0) < _span ?
+	                        _offset0 : begin - _span);
+	BFoffset earliest_reader = _readers.begin()->first;
+	if( BFdelta(earliest_reader - spill_begin) > 0 ) {
+		spill_begin = earliest_reader;
+	}
+	if( !_spill_index.empty() ) {
+		SpillChunk const& last = _spill_index.rbegin()->second;
+		BFoffset spilled_end = _spill_index.rbegin()->first + last.size;
+		if( BFdelta(spilled_end - spill_begin) > 0 ) {
+			spill_begin = spilled_end;
+		}
+	}
+	if( BFdelta(spill_end - spill_begin) <= 0 ) {
+		return;
+	}
+	BFsize nbyte = spill_end - spill_begin;
+	if( _spill_max_size &&
+	    _spill_file_size + nbyte*_nringlet > _spill_max_size ) {
+		_nbyte_dropped += nbyte*_nringlet;
+		return;
+	}
+	// Note: The writer is never stalled by the disk; if the spill thread
+	//         falls too far behind, the data are dropped instead.
+	BFsize max_pending = std::max(BFsize(_span*_nringlet),
+	                              BFsize(BF_RING_SPILL_MAX_PENDING));
+	if( _spill_nbyte_pending + nbyte*_nringlet > max_pending ) {
+		_nbyte_dropped += nbyte*_nringlet;
+		return;
+	}
+	pointer staged = (pointer)std::malloc(nbyte*_nringlet);
+	BF_ASSERT_EXCEPTION(staged, BF_STATUS_MEM_ALLOC_FAILED);
+	// Note: Chunks store each ringlet contiguously, one after the other
+	for( BFsize r=0; r<_nringlet; ++r ) {
+		BFoffset offset    = spill_begin;
+		BFsize   remaining = nbyte;
+		pointer  dst       = staged + r*nbyte;
+		while( remaining ) {
+			// Note: This avoids reading the ghost region, which may be stale
+			BFoffset buf_offset = _buf_offset(offset);
+			BFsize   n = std::min(remaining, BFsize(_span - buf_offset));
+			::memcpy(dst, _buf + r*_stride + buf_offset, n);
+			dst       += n;
+			offset    += n;
+			remaining -= n;
+		}
+	}
+	SpillChunk chunk = {_spill_file_size, nbyte, staged};
+	SpillWrite write = {spill_begin, _spill_file_size, nbyte*_nringlet, staged};
+	_spill_index.insert(std::make_pair(spill_begin, chunk));
+	_spill_queue.push_back(write);
+	_spill_file_size     += nbyte*_nringlet;
+	_spill_nbyte_pending += nbyte*_nringlet;
+	_nbyte_spilled       += nbyte*_nringlet;
+	_spill_condition.notify_all();
+}
+// Writes staged chunks to the spill file (in order) without holding the lock
+void BFring_impl::_spill_loop() {
+	unique_lock_type lock(_mutex);
+	while( true ) {
+		_spill_condition.wait(lock, [&]() {
+				return _spill_stop || !_spill_queue.empty();
+			});
+		if( _spill_stop ) {
+			break;
+		}
+		SpillWrite write = _spill_queue.front();
+		// Note: Chunks that have already been trimmed need not be written
+		auto iter = _spill_index.find(write.begin);
+		if( iter != _spill_index.end() && iter->second.staged == write.data ) {
+			lock.unlock();
+			ssize_t nwritten = ::pwrite(_spill_fd, write.data, write.nbyte,
+			                            write.file_offset);
+			lock.lock();
+			iter = _spill_index.find(write.begin);
+			if( iter != _spill_index.end() &&
+			    iter->second.staged == write.data ) {
+				if( nwritten == (ssize_t)write.nbyte ) {
+					iter->second.staged = nullptr;
+				} else {
+					_spill_index.erase(iter);
+					_nbyte_dropped += write.nbyte;
+				}
+			}
+		}
+		_spill_queue.pop_front();
+		_spill_nbyte_pending -= write.nbyte;
+		std::free(write.data);
+	}
+}
+// Returns whether the span [begin, end) is held contiguously in the spill file
+bool BFring_impl::_spill_covers(BFoffset begin, BFoffset end) const {
+	auto iter = _spill_index.upper_bound(begin);
+	if( iter == _spill_index.begin() ) {
+		return false;
+	}
+	--iter;
+	BFoffset covered_end = iter->first;
+	for( ; iter!=_spill_index.end() && iter->first == covered_end; ++iter ) {
+		covered_end += iter->second.size;
+		if( BFdelta(covered_end - end) >= 0 ) {
+			return true;
+		}
+	}
+	return false;
+}
+// Reads the span [begin, begin+size) of each ringlet from the spill file
+//   (or from the staged copies of chunks not yet written) into dst, which
+//   has a ringlet stride of stride bytes.
+// Note: The lock is released while reading from the file. The chunks cannot
+//         be trimmed meanwhile, as the caller's read position precedes them.
+void BFring_impl::_spill_read(BFoffset begin, BFsize size,
+                              pointer dst, BFsize stride,
+                              unique_lock_type& lock) {
+	struct FileRead {
+		pointer  dst;
+		BFsize   nbyte;
+		BFoffset file_offset;
+	};
+	std::vector<FileRead> file_reads;
+	auto iter = _spill_index.upper_bound(begin);
+	--iter;
+	BFoffset offset = begin;
+	while( size ) {
+		BFoffset chunk_begin = iter->first;
+		SpillChunk const& chunk = iter->second;
+		BFsize skip = offset - chunk_begin;
+		BFsize n    = std::min(size, BFsize(chunk.size - skip));
+		for( BFsize r=0; r<_nringlet; ++r ) {
+			if( chunk.staged ) {
+				::memcpy(dst + r*stride, chunk.staged + r*chunk.size + skip, n);
+			} else {
+				FileRead read = {dst + r*stride, n,
+				                 chunk.file_offset + r*chunk.size + skip};
+				file_reads.push_back(read);
+			}
+		}
+		dst    += n;
+		offset += n;
+		size   -= n;
+		++iter;
+	}
+	if( file_reads.empty() ) {
+		return;
+	}
+	lock.unlock();
+	bool ok = true;
+	for( auto const& read : file_reads ) {
+		ssize_t nread = ::pread(_spill_fd, read.dst, read.nbyte,
+		                        read.file_offset);
+		ok = ok && (nread == (ssize_t)read.nbyte);
+	}
+	lock.lock();
+	BF_ASSERT_EXCEPTION(ok, BF_STATUS_MEM_OP_FAILED);
+}
+// Discards spilled data that all unguaranteed readers have moved past, and
+//   rewinds the spill file once it is empty.
+void BFring_impl::_trim_spill() {
+	while( !_spill_index.empty() ) {
+		auto first = _spill_index.begin();
+		BFoffset chunk_end = first->first + first->second.size;
+		if( !_readers.empty() &&
+		    BFdelta(chunk_end - _readers.begin()->first) > 0 ) {
+			break;
+		}
+		_spill_index.erase(first);
+	}
+	if( _spill_index.empty() ) {
+		_spill_file_size = 0;
+	}
+}
 void BFring_impl::resize(BFsize contiguous_span,
                          BFsize total_span,
                          BFsize nringlet) {
@@ -141,11 +456,24 @@ void BFring_impl::resize(BFsize contiguous_span,
 	// TODO: Not sure if this is a good idea or not
 	//new_ghost_span = round_up_pow2(new_ghost_span);
 	new_ghost_span = round_up(new_ghost_span, bfGetAlignment());
-	BFsize  new_stride = new_span + new_ghost_span;
+	// System-space buffers are mirror-mapped where possible, which removes
+	//   the need to copy to and from the ghost region
+	bool    new_mirrored = false;
+	pointer new_buf      = nullptr;
+	if( _space == BF_SPACE_SYSTEM && ring_mirror_enabled() ) {
+		BFsize mirror_span = std::max(new_span, (BFsize)::sysconf(_SC_PAGESIZE));
+		if( new_ghost_span <= mirror_span ) {
+			new_buf = (pointer)mirror_alloc(mirror_span, new_nringlet);
+			if( new_buf ) {
+				new_mirrored = true;
+				new_span     = mirror_span;
+			}
+		}
+	}
+	BFsize  new_stride = new_mirrored ? 2*new_span : new_span + new_ghost_span;
 	BFsize  new_nbyte  = new_stride*new_nringlet;
 	//pointer new_buf    = (pointer)bfMalloc(new_nbyte, _space);
 	//std::cout << "new_buf = " << (void*)new_buf << std::endl; // HACK TESTING
-	pointer new_buf = nullptr;
 	//std::cout << "contig_span:    " << contiguous_span << std::endl;
 	//std::cout << "total_span:     " << total_span << std::endl;
 	//std::cout << "new_span:       " << new_span << std::endl;
@@ -153,8 +481,10 @@ void BFring_impl::resize(BFsize contiguous_span,
 	//std::cout << "new_nringlet:   " << new_nringlet << std::endl;
 	//std::cout << "new_stride:     " << new_stride << std::endl;
 	//std::cout << "Allocating " << new_nbyte << std::endl;
-	BF_ASSERT_EXCEPTION(bfMalloc((void**)&new_buf, new_nbyte, _space) == BF_STATUS_SUCCESS,
-	                    BF_STATUS_MEM_ALLOC_FAILED);
+	if( !new_mirrored ) {
+		BF_ASSERT_EXCEPTION(bfMalloc((void**)&new_buf, new_nbyte, _space) == BF_STATUS_SUCCESS,
+		                    BF_STATUS_MEM_ALLOC_FAILED);
+	}
 #if BF_NUMA_ENABLED
 	if( _core != -1 ) {
 		BF_ASSERT_EXCEPTION(numa_available() != -1, BF_STATUS_UNSUPPORTED);
@@ -182,19 +512,22 @@ void BFring_impl::resize(BFsize contiguous_span,
 			           _span - _buf_offset(_tail), _nringlet);
 			_offset0 = _head - _buf_offset(_head); // TODO: Check this for sign/overflow issues
 		}
-		// Copy old ghost region to new buffer
-		bfMemcpy2D(new_buf + new_span, new_stride, _space,
-		           _buf    +    _span,    _stride, _space,
-		           _ghost_span, _nringlet);
-		// Copy the part of the beg corresponding to the extra ghost space
-		bfMemcpy2D(new_buf + new_span + _ghost_span, new_stride, _space,
-		           _buf + _ghost_span,                  _stride, _space,
-		           std::min(new_ghost_span, _span) - _ghost_span, _nringlet);
-		_ghost_dirty = true; // TODO: Is this the right thing to do?
-		bfFree(_buf, _space);
+		if( !new_mirrored ) {
+			// Copy old ghost region to new buffer
+			bfMemcpy2D(new_buf + new_span, new_stride, _space,
+			           _buf    +    _span,    _stride, _space,
+			           _ghost_span, _nringlet);
+			// Copy the part of the beg corresponding to the extra ghost space
+			bfMemcpy2D(new_buf + new_span + _ghost_span, new_stride, _space,
+			           _buf + _ghost_span,                  _stride, _space,
+			           std::min(new_ghost_span, _span) - _ghost_span, _nringlet);
+			_ghost_dirty = true; // TODO: Is this the right thing to do?
+		}
+		this->_free_buf();
 		bfStreamSynchronize();
 	}
 	_buf        = new_buf;
+	_mirrored   = new_mirrored;
 	_ghost_span = new_ghost_span;
 	_span       = new_span;
 	_stride     = new_stride;
@@ -239,6 +572,10 @@ BFring_impl::pointer BFring_impl::_buf_pointer(BFoffset offset) const {
 	return _buf + _buf_offset(offset);
 }
 void BFring_impl::_ghost_write(BFoffset offset, BFsize span) {
+	if( _mirrored ) {
+		// The mirror mapping keeps both copies consistent
+		return;
+	}
 	BFoffset buf_offset_beg = _buf_offset(offset);
 	BFoffset buf_offset_end = _buf_offset(offset + span);
 	if( buf_offset_end < buf_offset_beg ) {
@@ -252,6 +589,9 @@ void BFring_impl::_ghost_write(BFoffset offset, BFsize span) {
 	}
 }
 void BFring_impl::_ghost_read(BFoffset offset, BFsize span) {
+	if( _mirrored ) {
+		return;
+	}
 	BFoffset buf_offset_beg = _buf_offset(offset);
 	BFoffset buf_offset_end = _buf_offset(offset + span);
 	if( buf_offset_end < buf_offset_beg ) {
@@ -333,28 +673,35 @@ void BFring_impl::open_sequence(BFsequence_sptr sequence,
 	BF_ASSERT_EXCEPTION(!sequence->is_finished() ||
 	                    BFoffset(_head - sequence->end()) <= BFoffset(_head - _tail),
 	                    BF_STATUS_INVALID_ARGUMENT);
+	if( BFoffset(_head - sequence->begin()) > BFoffset(_head - _tail) ) {
+		// Sequence starts before tail
+		*guarantee_begin = _tail;
+	}
+	else {
+		*guarantee_begin = sequence->begin();
+	}
 	if( guarantee ) {
-		if( BFoffset(_head - sequence->begin()) > BFoffset(_head - _tail) ) {
-			// Sequence starts before tail
-			*guarantee_begin = _tail;
-		}
-		else {
-			*guarantee_begin = sequence->begin();
-		}
 		//_guarantees.insert(*guarantee_begin);
 		this->_add_guarantee(*guarantee_begin);
 	}
+	else {
+		this->_add_reader(*guarantee_begin);
+	}
 }
 void BFring_impl::close_sequence(BFsequence_sptr sequence,
                                  BFbool          guarantee,
                                  BFoffset        guarantee_begin) {
+	lock_guard_type lock(_mutex);
 	if( guarantee ) {
-		lock_guard_type lock(_mutex);
 		this->_remove_guarantee(guarantee_begin);
 		//auto iter = _guarantees.find(guarantee_begin);
 		//BF_ASSERT_EXCEPTION(iter != _guarantees.end(), BF_STATUS_INTERNAL_ERROR);
 		//_guarantees.erase(iter);
 	}
+	else {
+		this->_remove_reader(guarantee_begin);
+		this->_trim_spill();
+	}
 }
 BFsequence_sptr BFring_impl::get_sequence(const char* name) {
 	lock_guard_type lock(_mutex);
@@ -379,6 +726,14 @@ BFsequence_sptr BFring_impl::get_sequence_at(BFoffset time_tag) {
 	                    BF_STATUS_INVALID_ARGUMENT);
 	return (--iter)->second;
 }
+BFsequence_sptr BFring_impl::get_sequence_before(BFoffset time_tag) {
+	lock_guard_type lock(_mutex);
+	// Note: The same caveats apply as for get_sequence_at
+	auto iter = _sequence_time_tag_map.lower_bound(time_tag);
+	BF_ASSERT_EXCEPTION(iter != _sequence_time_tag_map.begin(),
+	                    BF_STATUS_INVALID_ARGUMENT);
+	return (--iter)->second;
+}
 BFsequence_sptr BFring_impl::get_latest_sequence() {
 	unique_lock_type lock(_mutex);
 	// Wait until a sequence has been opened or writing has ended
@@ -493,6 +848,10 @@ void BFring_impl::reserve_span(BFsize size, BFoffset* begin, void** data) {
 	*begin = _reserve_head;
 	_reserve_head += size;
 	this->_pull_tail(lock); // Must be called whenever _reserve_head is increased
+	if( _spill_fd != -1 && !_readers.empty() ) {
+		// Save what unguaranteed readers still need before it is overwritten
+		this->_spill(*begin, size);
+	}
 	/*
 	_write_condition.wait(lock, [&]() {
 			return ((_guarantees.empty() ||
@@ -577,7 +936,8 @@ void BFring_impl::acquire_span(BFrsequence rsequence,
                                BFoffset    offset, // Relative to sequence beg
                                BFsize*     size_,
                                BFoffset*   begin_,
-                               void**      data_) {
+                               void**      data_,
+                               void**      spill_buf_) {
 	BF_ASSERT_EXCEPTION(rsequence,             BF_STATUS_INVALID_HANDLE);
 	BF_ASSERT_EXCEPTION(size_,                 BF_STATUS_INVALID_POINTER);
 	BF_ASSERT_EXCEPTION(begin_,                BF_STATUS_INVALID_POINTER);
@@ -591,17 +951,21 @@ void BFring_impl::acquire_span(BFrsequence rsequence,
 	BFoffset requested_begin = sequence->begin() + offset;
 	BFoffset requested_end   = requested_begin + *size_;
 	
-	if( rsequence->guaranteed() ) {
-		BFoffset guarantee_begin = rsequence->guarantee_begin();
-		if( BFdelta(requested_begin - guarantee_begin) > BFdelta(0) ) {
-			// Move the guarantee forward to the beginning of this span
-			// Note: This is (only) important when reading starts in the middle
-			//         of a sequence (e.g., a triggered dump); otherwise the
-			//         guarantee is probably already here.
+	BFoffset guarantee_begin = rsequence->guarantee_begin();
+	if( BFdelta(requested_begin - guarantee_begin) > BFdelta(0) ) {
+		// Move the guarantee forward to the beginning of this span
+		// Note: This is (only) important when reading starts in the middle
+		//         of a sequence (e.g., a triggered dump); otherwise the
+		//         guarantee is probably already here.
+		if( rsequence->guaranteed() ) {
 			this->_remove_guarantee(guarantee_begin);
 			this->_add_guarantee(requested_begin);
-			rsequence->set_guarantee_begin(requested_begin);
 		}
+		else {
+			this->_remove_reader(guarantee_begin);
+			this->_add_reader(requested_begin);
+		}
+		rsequence->set_guarantee_begin(requested_begin);
 	}
 	
 	// This function returns whatever part of the requested span is available
@@ -624,31 +988,77 @@ void BFring_impl::acquire_span(BFrsequence rsequence,
 	// Note: This results in size being 0 if the requested span has been
 	//         completely overwritten.
 	BFsize   size  = std::max(BFdelta(requested_end - begin), BFdelta(0));
+	// Recover any overwritten part of the span from the spill file
+	bool     spilling   = (_spill_fd != -1 && !rsequence->guaranteed());
+	BFsize   spill_size = 0;
+	if( spilling && BFdelta(begin - requested_begin) > 0 ) {
+		spill_size = std::min(BFsize(begin - requested_begin), *size_);
+		if( this->_spill_covers(requested_begin,
+		                        requested_begin + spill_size) ) {
+			begin = requested_begin;
+			size  = *size_;
+		}
+		else {
+			spill_size = 0;
+		}
+	}
 	
 	if( sequence->is_finished() ) {
 		BF_ASSERT_EXCEPTION(begin < sequence->end(),
 		                    BF_STATUS_END_OF_DATA);
 		size = std::min(size, BFsize(sequence->end() - begin));
+		spill_size = std::min(spill_size, size);
 	}
 	*begin_ = begin;
 	*size_  = size;
 	
 	++_nread_open;
-	_ghost_read(begin, size);
-	*data_ = _buf_pointer(begin);
+	if( !spilling || !size ) {
+		*spill_buf_ = nullptr;
+		_ghost_read(begin, size);
+		*data_ = _buf_pointer(begin);
+		return;
+	}
+	// Assemble the span in a separate buffer from the spill file and the ring
+	// Note: The part from the ring is copied too, as the writer is free to
+	//         overwrite it (after spilling it) while the span is open.
+	pointer buf = (pointer)std::malloc(size*_nringlet);
+	BF_ASSERT_EXCEPTION(buf, BF_STATUS_MEM_ALLOC_FAILED);
+	// Note: The part from the ring is copied first, as reading the spill
+	//         file releases the lock.
+	BFsize ring_size = size - spill_size;
+	if( ring_size ) {
+		BFoffset ring_begin = begin + spill_size;
+		_ghost_read(ring_begin, ring_size);
+		for( BFsize r=0; r<_nringlet; ++r ) {
+			::memcpy(buf + r*size + spill_size,
+			         _buf_pointer(ring_begin) + r*_stride, ring_size);
+		}
+	}
+	if( spill_size ) {
+		this->_spill_read(begin, spill_size, buf, size, lock);
+	}
+	_nbyte_recovered += spill_size*_nringlet;
+	*spill_buf_ = buf;
+	*data_      = buf;
 }
 void BFring_impl::release_span(BFrsequence sequence,
                                BFoffset    begin,
                                BFsize      size) {
 	unique_lock_type lock(_mutex);
 	
+	// Move the guarantee (or read position) to the end of this span
+	BFoffset new_begin = begin + size;
 	if( sequence->guaranteed() ) {
-		// Move the guarantee to the end of this span
 		this->_remove_guarantee(sequence->guarantee_begin());
-		BFoffset new_begin = begin + size;
 		this->_add_guarantee(new_begin);
-		sequence->set_guarantee_begin(new_begin);
 	}
+	else {
+		this->_remove_reader(sequence->guarantee_begin());
+		this->_add_reader(new_begin);
+		this->_trim_spill();
+	}
+	sequence->set_guarantee_begin(new_begin);
 	
 	--_nread_open;
 	_realloc_condition.notify_all();
@@ -659,11 +1069,13 @@ BFrspan_impl::BFrspan_impl(BFrsequence sequence,
                            BFsize      requested_size)
 	: BFspan_impl(sequence->ring(), requested_size),
 	  _sequence(sequence), _begin(0),
-	  _data(nullptr) {
+	  _data(nullptr), _spill_buf(nullptr) {
 	BFsize returned_size = requested_size;
-	this->ring()->acquire_span(sequence, offset, &returned_size, &_begin, &_data);
+	this->ring()->acquire_span(sequence, offset, &returned_size, &_begin, &_data,
+	                           &_spill_buf);
 	this->set_base_size(returned_size);
 }
 BFrspan_impl::~BFrspan_impl() {
 	this->ring()->release_span(_sequence, _begin, this->size());
+	std::free(_spill_buf);
 }
@@ -45,7 +45,9 @@
 #include <map>
 #include <queue>
 #include <set>
+#include <deque>
 #include <memory>
+#include <thread>
 
 #ifndef BF_NUMA_ENABLED
 #define BF_NUMA_ENABLED 0
@@ -81,6 +83,7 @@ class BFring_impl {
 	typedef uint8_t*             pointer;
 	typedef uint8_t const* const_pointer;
 	pointer        _buf;
+	bool           _mirrored;
 	
 	BFsize         _ghost_span;
 	BFsize         _span;
@@ -124,6 +127,36 @@ class BFring_impl {
 	//typedef std::multiset<guarantee_value_type> guarantee_set;
 	typedef std::map<BFoffset,BFsize> guarantee_set; // offset-->count
 	guarantee_set _guarantees;
+	// Read positions of unguaranteed readers (offset-->count)
+	guarantee_set _readers;
+	
+	// Spill-to-disk overflow for unguaranteed readers
+	struct SpillChunk {
+		BFoffset file_offset;
+		BFsize   size;   // Per ringlet
+		pointer  staged; // Copy of the data until it has been written
+	};
+	// A chunk waiting to be written to the spill file by the spill thread
+	struct SpillWrite {
+		BFoffset begin;
+		BFoffset file_offset;
+		BFsize   nbyte;  // All ringlets
+		pointer  data;
+	};
+	typedef std::map<BFoffset,SpillChunk> spill_index; // offset-->chunk
+	int            _spill_fd;
+	std::string    _spill_path;
+	BFsize         _spill_max_size;
+	BFsize         _spill_file_size;
+	spill_index    _spill_index;
+	std::deque<SpillWrite> _spill_queue;
+	BFsize         _spill_nbyte_pending;
+	bool           _spill_stop;
+	std::thread    _spill_thread;
+	condition_type _spill_condition;
+	BFsize         _nbyte_spilled;
+	BFsize         _nbyte_recovered;
+	BFsize         _nbyte_dropped;
 	
 	BFoffset _wrap_offset(BFoffset offset) const;
 	//BFoffset _advance_offset(BFoffset offset, BFdelta amount) const;
@@ -133,6 +166,14 @@ class BFring_impl {
 	void _ghost_read( BFoffset offset, BFsize size);
 	void _copy_to_ghost(  BFoffset buf_offset, BFsize span);
 	void _copy_from_ghost(BFoffset buf_offset, BFsize span);
+	void _free_buf();
+	void _spill(BFoffset begin, BFsize size);
+	bool _spill_covers(BFoffset begin, BFoffset end) const;
+	void _spill_read(BFoffset begin, BFsize size, pointer dst, BFsize stride,
+	                 unique_lock_type& lock);
+	void _spill_loop();
+	void _trim_spill();
+	void _close_spill(unique_lock_type& lock);
 	void _pull_tail(unique_lock_type& lock);
 	inline void _add_guarantee(BFoffset offset) {
 		auto iter = _guarantees.find(offset);
@@ -156,6 +197,18 @@ class BFring_impl {
 	inline BFoffset _get_earliest_guarantee() {
 		return _guarantees.begin()->first;
 	}
+	inline void _add_reader(BFoffset offset) {
+		++_readers[offset];
+	}
+	inline void _remove_reader(BFoffset offset) {
+		auto iter = _readers.find(offset);
+		if( iter == _readers.end() ) {
+			throw BFexception(BF_STATUS_INTERNAL_ERROR);
+		}
+		if( !--iter->second ) {
+			_readers.erase(iter);
+		}
+	}
 	void open_sequence(BFsequence_sptr sequence,
 	                   BFbool          guarantee,
 	                   BFoffset*       guarantee_begin);
@@ -178,6 +231,9 @@ public:
 	inline BFspace space()    const { return _space; }
 	inline void set_core(int core)  { _core = core; }
 	inline int      core()    const { return _core; }
+	void set_spill(const char* path, BFsize max_size);
+	void get_spill_info(BFspill_info* info);
+	BFsize sequence_size(BFsequence_sptr sequence);
 	//inline BFsize nringlet() const { return _nringlet; }
 	inline void   lock()   { _mutex.lock(); }
 	inline void   unlock() { _mutex.unlock(); }
@@ -186,6 +242,7 @@ public:
 	inline BFsize locked_total_span()      const { return _span; }
 	inline BFsize locked_nringlet()        const { return _nringlet; }
 	inline BFsize locked_stride()          const { return _stride; }
+	inline bool   locked_mirrored()        const { return _mirrored; }
 	// TODO: Add getters for debugging/monitoring queries
 	//         such as positions of tail, head etc. in buffer.
 	
@@ -201,6 +258,7 @@ public:
 	                               BFoffset    offset_from_head=0);
 	BFsequence_sptr get_sequence(const char* name);
 	BFsequence_sptr get_sequence_at(BFoffset time_tag);
+	BFsequence_sptr get_sequence_before(BFoffset time_tag);
 	BFsequence_sptr get_latest_sequence();
 	BFsequence_sptr get_earliest_sequence();
 	
@@ -212,7 +270,8 @@ public:
 	                  BFoffset    offset,
 	                  BFsize*     size,
 	                  BFoffset*   begin,
-	                  void**      data);
+	                  void**      data,
+	                  void**      spill_buf);
 	void release_span(BFrsequence sequence,
 	                  BFoffset    begin,
 	                  BFsize      size);
@@ -321,6 +380,7 @@ public:
 	inline BFsize      header_size() const { return _sequence->header_size(); }
 	inline BFsize      nringlet()    const { return _sequence->nringlet(); }
 	inline BFoffset    begin()       const { return _sequence->begin(); }
+	inline BFsize      size()              { return this->ring()->sequence_size(_sequence); }
 };
 class BFwsequence_impl : public BFsequence_wrapper {
 	BFoffset _end_offset_from_head;
@@ -351,6 +411,8 @@ public:
 class BFrsequence_impl : public BFsequence_wrapper {
 	friend class BFring_impl;
 	BFbool   _guaranteed;
+	// Note: For unguaranteed sequences this tracks the read position, which
+	//         determines what is spilled to disk (if enabled).
 	BFoffset _guarantee_begin;
 	BFbool   _is_open;
 	void set_guarantee_begin(BFoffset b) { _guarantee_begin = b; }
@@ -443,7 +505,7 @@ public:
 	inline BFring     ring()     const { return _ring; }
 	inline BFsize     size()     const { return _size; }
 	// Note: This is only safe to read while a span is open (preventing resize)
-	inline BFsize     stride()   const {
+	inline virtual BFsize stride() const {
 		BFring_impl::lock_guard_type lock(_ring->_mutex);
 		return _ring->_stride;
 	}
@@ -485,6 +547,8 @@ class BFrspan_impl : public BFspan_impl {
 	BFrsequence     _sequence;
 	BFoffset        _begin;
 	void*           _data;
+	// Holds a copy of the span's data when the ring is spilling to disk
+	void*           _spill_buf;
 	//BFbool          _guaranteed;
 	//void _open_at(BFoffset offset, BFsize size, BFbool guarantee,
 	//              BFring_impl::unique_lock_type& lock);
@@ -503,6 +567,9 @@ public:
 	//void advance(BFdelta delta, BFsize size, BFbool guarantee);
 	//inline virtual BFsequence_sptr sequence() const { return _sequence; }
 	inline virtual void*           data()     const { return _data; }
+	inline virtual BFsize          stride()   const {
+		return _spill_buf ? this->size() : BFspan_impl::stride();
+	}
 	// Note: This is the offset relative to the beginning of the sequence
 	inline virtual BFoffset        offset()   const { return _begin - _sequence->begin(); }
 };
@@ -30,193 +30,294 @@
 #include <bifrost/unpack.h>
 #include "utils.hpp"
 
+#ifdef __SSSE3__
+#include <tmmintrin.h>
+#endif
+
 // sign_extend == true  => output has same value as input  (slower)
 // sign_extend == false => output is scaled by 2**(8-nbit) (faster)
 
-template<int NBIT, typename K, typename T>
-inline void rshift_subwords(T& val) {
-	for( int k=0; k<(int)(sizeof(T)/sizeof(K)); ++k ) {
-		((K*)&val)[k] >>= NBIT;
-	}
-}
-// 2x 4-bit --> 2x 8-bit (unsigned)
-inline void unpack(uint8_t   ival,
-                   uint16_t& oval,
-                   bool      byte_reverse,
-                   bool      align_msb,
-                   bool      conjugate) {
-	// Note: Ignores conjugate
-	if( byte_reverse ) {
-		// ........ABCDEFGH
-		// EFGH....ABCD....
-		oval = ival;
-		oval = (oval | (oval << 12)) & 0xF0F0;
-	} else {
-		// ....ABCDEFGH....
-		// ABCD....EFGH....
-		oval = ival << 4;
-		oval = (oval | (oval <<  4)) & 0xF0F0;
-	}
-	if( !align_msb ) {
-		// >>>>ABCD>>>>EFGH
-		oval >>= 4;
-	}
-}
+// Input bytes per unit of work handed to each OpenMP thread
+#define BF_UNPACK_CHUNK_NBYTE (1<<15)
 
-// 4x 2-bit --> 4x 8-bit (unsigned)
-inline void unpack(uint8_t   ival,
-                   uint32_t& oval,
-                   bool      byte_reverse,
-                   bool      align_msb,
-                   bool      conjugate) {
-	// Note: Ignores conjugate
-	// ..................ABCDEFGH......
-	// ......ABCD............EFGH......
-	// AB......CD......EF......GH......
-	oval = ival << 6;
-	oval = (oval | (oval << 12)) & 0x03C003C0;
-	oval = (oval | (oval <<  6)) & 0xC0C0C0C0;
-	if( byte_reverse) {
-		byteswap(oval, &oval);
+// Lookup tables mapping each NBIT-bit input field to its 8-bit output
+//   Each input byte holds 8/NBIT fields, which are written out LSB-first (or
+//   MSB-first when byte reversing). Fields that land in odd output bytes are
+//   imaginary components, which use the 'odd' table to apply conjugation.
+template<int NBIT>
+struct UnpackTables {
+	enum { NFIELD = 8 / NBIT };
+	int8_t  even[16];
+	int8_t  odd[16];
+	uint8_t bytes[256][NFIELD];
+	UnpackTables(bool is_signed,
+	             bool byte_reverse,
+	             bool align_msb,
+	             bool conjugate) {
+		for( int v=0; v<16; ++v ) {
+			int field = v & ((1<<NBIT)-1);
+			int oval  = field << (8-NBIT);
+			if( is_signed ) {
+				oval = (int8_t)oval;
+			}
+			if( !align_msb ) {
+				oval >>= 8-NBIT;
+			}
+			even[v] = (int8_t)oval;
+			// Note: Conjugation is ignored for unsigned types
+			odd[v]  = (int8_t)((is_signed && conjugate) ? -oval : oval);
+		}
+		for( int b=0; b<256; ++b ) {
+			for( int k=0; k<NFIELD; ++k ) {
+				int f = byte_reverse ? NFIELD-1-k : k;
+				int v = (b >> (f*NBIT)) & ((1<<NBIT)-1);
+				bytes[b][k] = (k % 2) ? odd[v] : even[v];
+			}
+		}
 	}
-	if( !align_msb ) {
-		// >>>>>>AB>>>>>>CD>>>>>>EF>>>>>>GH
-		oval >>= 6;
+};
+
+template<int NBIT>
+inline void unpack_bytes_scalar(uint8_t const*            in,
+                                int8_t*                   out,
+                                long                      nbyte,
+                                UnpackTables<NBIT> const& tables) {
+	enum { NFIELD = UnpackTables<NBIT>::NFIELD };
+	for( long i=0; i<nbyte; ++i ) {
+		uint8_t const* ovals = tables.bytes[in[i]];
+		for( int k=0; k<NFIELD; ++k ) {
+			out[i*NFIELD+k] = ovals[k];
+		}
 	}
 }
 
-// 8x 1-bit --> 8x 8-bit (unsigned)
-inline void unpack(uint8_t   ival,
-                   uint64_t& oval,
-                   bool      byte_reverse,
-                   bool      align_msb,
-                   bool      conjugate) {
-	// Note: Ignores conjugate
-	// .................................................ABCDEFGH.......
-	// .....................ABCD............................EFGH.......
-	// .......AB..............CD..............EF..............GH.......
-	// A.......B.......C.......D.......E.......F.......G.......H.......
-	oval = ival << 7;
-	oval = (oval | (oval << 28)) & 0x0000078000000780;
-	oval = (oval | (oval << 14)) & 0x0180018001800180;
-	oval = (oval | (oval <<  7)) & 0x8080808080808080;
-	if( byte_reverse) {
-		byteswap(oval, &oval);
+// Returns the number of input bytes processed
+template<int NBIT>
+inline long unpack_bytes_simd(uint8_t const*            in,
+                              int8_t*                   out,
+                              long                      nbyte,
+                              bool                      byte_reverse,
+                              UnpackTables<NBIT> const& tables);
+
+#ifdef __SSSE3__
+template<>
+inline long unpack_bytes_simd<4>(uint8_t const*         in,
+                                 int8_t*                out,
+                                 long                   nbyte,
+                                 bool                   byte_reverse,
+                                 UnpackTables<4> const& tables) {
+	__m128i const mask = _mm_set1_epi8(0x0F);
+	__m128i const even = _mm_loadu_si128((__m128i const*)tables.even);
+	__m128i const odd  = _mm_loadu_si128((__m128i const*)tables.odd);
+	long i;
+	for( i=0; i+16<=nbyte; i+=16 ) {
+		__m128i v  = _mm_loadu_si128((__m128i const*)&in[i]);
+		__m128i lo = _mm_and_si128(v, mask);
+		__m128i hi = _mm_and_si128(_mm_srli_epi16(v, 4), mask);
+		__m128i a  = _mm_shuffle_epi8(even, byte_reverse ? hi : lo);
+		__m128i b  = _mm_shuffle_epi8(odd,  byte_reverse ? lo : hi);
+		_mm_storeu_si128((__m128i*)&out[2*i+ 0], _mm_unpacklo_epi8(a, b));
+		_mm_storeu_si128((__m128i*)&out[2*i+16], _mm_unpackhi_epi8(a, b));
 	}
-	if( !align_msb ) {
-		// >>>>>>>A>>>>>>>B>>>>>>>C>>>>>>>D
-		oval >>= 7;
+	return i;
+}
+template<>
+inline long unpack_bytes_simd<2>(uint8_t const*         in,
+                                 int8_t*                out,
+                                 long                   nbyte,
+                                 bool                   byte_reverse,
+                                 UnpackTables<2> const& tables) {
+	__m128i const mask = _mm_set1_epi8(0x03);
+	__m128i const even = _mm_loadu_si128((__m128i const*)tables.even);
+	__m128i const odd  = _mm_loadu_si128((__m128i const*)tables.odd);
+	long i;
+	for( i=0; i+16<=nbyte; i+=16 ) {
+		__m128i v = _mm_loadu_si128((__m128i const*)&in[i]);
+		__m128i f[4];
+		for( int k=0; k<4; ++k ) {
+			int s = byte_reverse ? 3-k : k;
+			f[k] = _mm_and_si128(_mm_srli_epi16(v, 2*s), mask);
+		}
+		__m128i a0 = _mm_shuffle_epi8(even, f[0]);
+		__m128i a1 = _mm_shuffle_epi8(odd,  f[1]);
+		__m128i a2 = _mm_shuffle_epi8(even, f[2]);
+		__m128i a3 = _mm_shuffle_epi8(odd,  f[3]);
+		__m128i lo01 = _mm_unpacklo_epi8(a0, a1);
+		__m128i hi01 = _mm_unpackhi_epi8(a0, a1);
+		__m128i lo23 = _mm_unpacklo_epi8(a2, a3);
+		__m128i hi23 = _mm_unpackhi_epi8(a2, a3);
+		_mm_storeu_si128((__m128i*)&out[4*i+ 0], _mm_unpacklo_epi16(lo01, lo23));
+		_mm_storeu_si128((__m128i*)&out[4*i+16], _mm_unpackhi_epi16(lo01, lo23));
+		_mm_storeu_si128((__m128i*)&out[4*i+32], _mm_unpacklo_epi16(hi01, hi23));
+		_mm_storeu_si128((__m128i*)&out[4*i+48], _mm_unpackhi_epi16(hi01, hi23));
 	}
+	return i;
+}
+#else
+template<int NBIT>
+inline long unpack_bytes_simd(uint8_t const*            in,
+                              int8_t*                   out,
+                              long                      nbyte,
+                              bool                      byte_reverse,
+                              UnpackTables<NBIT> const& tables) {
+	return 0;
 }
+#endif
 
-template<typename K, typename T>
-inline void conjugate_subwords(T& val) {
-	for( int k=1; k<(int)(sizeof(T)/sizeof(K)); k+=2 ) {
-		K& val_imag = ((K*)&val)[k];
-		val_imag = -val_imag;
-	}
+template<int NBIT>
+inline void unpack_bytes(uint8_t const*            in,
+                         int8_t*                   out,
+                         long                      nbyte,
+                         bool                      byte_reverse,
+                         UnpackTables<NBIT> const& tables) {
+	enum { NFIELD = UnpackTables<NBIT>::NFIELD };
+	long i = unpack_bytes_simd(in, out, nbyte, byte_reverse, tables);
+	unpack_bytes_scalar(in + i, out + i*NFIELD, nbyte - i, tables);
 }
 
-// 2x 4-bit --> 2x 8-bit (signed)
-inline void unpack(uint8_t  ival,
-                   int16_t& oval,
-                   bool     byte_reverse,
-                   bool     align_msb,
-                   bool     conjugate) {
-	if( byte_reverse ) {
-		// ........ABCDEFGH
-		// EFGH....ABCD....
-		oval = ival;
-		oval = (oval | (oval << 12)) & 0xF0F0;
-	} else {
-		// ....ABCDEFGH....
-		// ABCD....EFGH....
-		oval = ival << 4;
-		oval = (oval | (oval <<  4)) & 0xF0F0;
-	}
-	if( !align_msb ) {
-		// >>>>ABCD>>>>EFGH
-		rshift_subwords<4,int8_t>(oval);
+// 8-bit --> 8-bit, applying conjugation to odd (imaginary) bytes
+inline void unpack_bytes(uint8_t const* in,
+                         int8_t*        out,
+                         long           nbyte,
+                         bool           conjugate) {
+	long i = 0;
+#ifdef __SSSE3__
+	__m128i const signs = conjugate ? _mm_set1_epi16((short)0xFF01) : _mm_set1_epi8(1);
+	for( ; i+16<=nbyte; i+=16 ) {
+		__m128i v = _mm_loadu_si128((__m128i const*)&in[i]);
+		_mm_storeu_si128((__m128i*)&out[i], _mm_sign_epi8(v, signs));
 	}
-	if( conjugate ) {
-		conjugate_subwords<int8_t>(oval);
+#endif
+	for( ; i<nbyte; ++i ) {
+		out[i] = (conjugate && (i % 2)) ? -(int8_t)in[i] : (int8_t)in[i];
 	}
 }
-// 4x 2-bit --> 4x 8-bit (signed)
-inline void unpack(uint8_t  ival,
-                   int32_t& oval,
-                   bool     byte_reverse,
-                   bool     align_msb,
-                   bool     conjugate) {
-	// ..................ABCDEFGH......
-	// ......ABCD............EFGH......
-	// AB......CD......EF......GH......
-	oval = ival << 6;
-	oval = (oval | (oval << 12)) & 0x03C003C0;
-	oval = (oval | (oval <<  6)) & 0xC0C0C0C0;
-	if( byte_reverse) {
-		byteswap(oval, &oval);
-	}
-	if( !align_msb ) {
-		// >>>>>>AB>>>>>>CD>>>>>>EF>>>>>>GH
-		rshift_subwords<6,int8_t>(oval);
+
+// Describes a pair of equally-shaped arrays as a set of rows of contiguous
+//   bytes, indexed by (up to BF_MAX_DIMS) strided outer dims.
+struct UnpackLayout {
+	int  ndim;
+	long shape[BF_MAX_DIMS];
+	long istrides[BF_MAX_DIMS];
+	long ostrides[BF_MAX_DIMS];
+	long irow_nbit;
+	long nrow;
+};
+
+// Merges dims that are contiguous in both arrays. Returns false if the inner
+//   dim is not contiguous.
+// Note: Arrays with nbit < 8 have their inner dim packed into bytes, with
+//         strides given in units of the packed bytes.
+inline bool get_unpack_layout(BFarray const* in,
+                              BFarray const* out,
+                              UnpackLayout*  layout) {
+	int  ndim       = in->ndim;
+	long ielem_nbit  = BF_DTYPE_NBIT(in->dtype);
+	long oelem_nbyte = get_dtype_nbyte(out->dtype);
+	long inner_len   = in->shape[ndim-1];
+	if( inner_len > 1 ) {
+		long istride = (ielem_nbit < 8) ? 1 : ielem_nbit / 8;
+		if( in->strides[ndim-1]  != istride ||
+		    out->strides[ndim-1] != oelem_nbyte ) {
+			return false;
+		}
 	}
-	if( conjugate ) {
-		conjugate_subwords<int8_t>(oval);
+	layout->irow_nbit = inner_len * ielem_nbit;
+	long orow_nbyte   = inner_len * oelem_nbyte;
+	layout->ndim = 0;
+	layout->nrow = 1;
+	for( int d=ndim-2; d>=0; --d ) {
+		long length = in->shape[d];
+		if( length == 1 ) {
+			continue;
+		}
+		layout->nrow *= length;
+		int e = layout->ndim - 1;
+		if( e < 0 &&
+		    in->strides[d]*8 == layout->irow_nbit &&
+		    out->strides[d]  == orow_nbyte ) {
+			// Extend the rows
+			layout->irow_nbit *= length;
+			orow_nbyte        *= length;
+			layout->nrow      /= length;
+		} else if( e >= 0 &&
+		           in->strides[d]  == layout->istrides[e]*layout->shape[e] &&
+		           out->strides[d] == layout->ostrides[e]*layout->shape[e] ) {
+			// Extend the innermost outer dim
+			layout->shape[e] *= length;
+		} else {
+			layout->shape[e+1]    = length;
+			layout->istrides[e+1] = in->strides[d];
+			layout->ostrides[e+1] = out->strides[d];
+			++layout->ndim;
+		}
 	}
+	return true;
 }
-// 8x 1-bit --> 8x 8-bit (signed)
-inline void unpack(uint8_t  ival,
-                   int64_t& oval,
-                   bool     byte_reverse,
-                   bool     align_msb,
-                   bool     conjugate) {
-	// .................................................ABCDEFGH.......
-	// .....................ABCD............................EFGH.......
-	// .......AB..............CD..............EF..............GH.......
-	// A.......B.......C.......D.......E.......F.......G.......H.......
-	oval = ival << 7;
-	oval = (oval | (oval << 28)) & 0x0000078000000780;
-	oval = (oval | (oval << 14)) & 0x0180018001800180;
-	oval = (oval | (oval <<  7)) & 0x8080808080808080;
-	if( byte_reverse) {
-		byteswap(oval, &oval);
-	}
-	if( !align_msb ) {
-		// >>>>>>>A>>>>>>>B>>>>>>>C>>>>>>>D
-		rshift_subwords<7,int8_t>(oval);
+
+inline void get_unpack_row_offsets(UnpackLayout const& layout,
+                                   long                row,
+                                   long*               ioffset,
+                                   long*               ooffset) {
+	*ioffset = 0;
+	*ooffset = 0;
+	// Note: Outer dims are stored innermost first
+	for( int e=0; e<layout.ndim; ++e ) {
+		long ind = row % layout.shape[e];
+		row     /= layout.shape[e];
+		*ioffset += ind*layout.istrides[e];
+		*ooffset += ind*layout.ostrides[e];
 	}
-	if( conjugate ) {
-		conjugate_subwords<int8_t>(oval);
+}
+
+// Splits the rows into chunks and unpacks them using an OpenMP team
+//   Note: The team is bound to the calling block's cores by the pipeline.
+template<typename Func>
+void foreach_chunk_cpu(BFarray const*      in,
+                       BFarray const*      out,
+                       UnpackLayout const& layout,
+                       long                ofactor,
+                       Func                func) {
+	long irow_nbyte = layout.irow_nbit / 8;
+	long nchunk_per_row = div_up(irow_nbyte, (long)BF_UNPACK_CHUNK_NBYTE);
+	long nchunk = layout.nrow * nchunk_per_row;
+	uint8_t const* idata = (uint8_t const*)in->data;
+	int8_t*        odata = (int8_t*)out->data;
+#pragma omp parallel for schedule(static) if( nchunk > 1 )
+	for( long c=0; c<nchunk; ++c ) {
+		long row   = c / nchunk_per_row;
+		long begin = (c % nchunk_per_row) * BF_UNPACK_CHUNK_NBYTE;
+		long nbyte = std::min((long)BF_UNPACK_CHUNK_NBYTE, irow_nbyte - begin);
+		long ioffset, ooffset;
+		get_unpack_row_offsets(layout, row, &ioffset, &ooffset);
+		func(idata + ioffset + begin,
+		     odata + ooffset + begin*ofactor,
+		     nbyte);
 	}
 }
 
-template<typename IType, typename OType>
+template<int NBIT>
 struct UnpackFunctor {
-	bool byte_reverse;
-	bool align_msb;
-	bool conjugate;
-	UnpackFunctor(bool byte_reverse_,
-	              bool align_msb_,
-	              bool conjugate_)
+	bool                byte_reverse;
+	UnpackTables<NBIT>  tables;
+	UnpackFunctor(bool is_signed,
+	              bool byte_reverse_,
+	              bool align_msb,
+	              bool conjugate)
 		: byte_reverse(byte_reverse_),
-		  align_msb(align_msb_),
-		  conjugate(conjugate_) {}
-	void operator()(IType ival, OType& oval) const {
-		unpack(ival, oval, byte_reverse, align_msb, conjugate);
+		  tables(is_signed, byte_reverse_, align_msb, conjugate) {}
+	void operator()(uint8_t const* in, int8_t* out, long nbyte) const {
+		unpack_bytes(in, out, nbyte, byte_reverse, tables);
 	}
 };
 
-template<typename T, typename U, typename Func, typename Size>
-void foreach_simple_cpu(T const* in,
-                        U*       out,
-                        Size     nelement,
-                        Func     func) {
-	for( Size i=0; i<nelement; ++i ) {
-		func(in[i], out[i]);
-		//std::cout << std::hex << (int)in[i] << " --> " << (int)out[i] << std::endl;
+struct ConjugateFunctor {
+	bool conjugate;
+	ConjugateFunctor(bool conjugate_) : conjugate(conjugate_) {}
+	void operator()(uint8_t const* in, int8_t* out, long nbyte) const {
+		unpack_bytes(in, out, nbyte, conjugate);
 	}
-}
+};
 
 BFstatus bfUnpack(BFarray const* in,
                   BFarray const* out,
@@ -233,71 +334,44 @@ BFstatus bfUnpack(BFarray const* in,
 	BF_ASSERT(BF_DTYPE_IS_COMPLEX(out->dtype) || !in->conjugated,
 	          BF_STATUS_INVALID_DTYPE);
 	
-	// **TODO: This does not correctly interpret strides when itemsize_nbit < 8
-	//           Need to work out how to handle strides when itemsize_bits < 8
-	//             Perhaps some way of specifying packed contiguous inner dims
-	//             Whatever solution is chosen will need to be integrated into
-	//               bf.ndarray and bf.DataType.
-	
-	// TODO: Support padded arrays
-	BF_ASSERT(is_contiguous(in),  BF_STATUS_UNSUPPORTED_STRIDE);
-	BF_ASSERT(is_contiguous(out), BF_STATUS_UNSUPPORTED_STRIDE);
-	
 	// TODO: Support CUDA space
 	BF_ASSERT(space_accessible_from(in->space, BF_SPACE_SYSTEM),
 	          BF_STATUS_UNSUPPORTED_SPACE);
 	BF_ASSERT(space_accessible_from(out->space, BF_SPACE_SYSTEM),
 	          BF_STATUS_UNSUPPORTED_SPACE);
 	
-	size_t nelement = num_contiguous_elements(in);
+	if( shape_size(in->ndim, in->shape) == 0 ) {
+		return BF_STATUS_SUCCESS;
+	}
+	// Note: Outer dims may be padded or strided (e.g., ring spans that span
+	//         multiple ringlets), but the inner dim must be contiguous.
+	UnpackLayout layout;
+	BF_ASSERT(get_unpack_layout(in, out, &layout),
+	          BF_STATUS_UNSUPPORTED_STRIDE);
+	BF_ASSERT(layout.irow_nbit % 8 == 0, BF_STATUS_INVALID_SHAPE);
+	
 	bool byteswap    = ( in->big_endian != is_big_endian());
 	bool conjugate   = (in->conjugated != out->conjugated);
 	
-#define CALL_FOREACH_SIMPLE_CPU_UNPACK(itype,otype) \
-	foreach_simple_cpu((itype*)in->data, \
-	                   (otype*)out->data, \
-	                   nelement, \
-	                   UnpackFunctor<itype,otype>(byteswap, \
-	                                              align_msb, \
-	                                              conjugate))
+#define CALL_FOREACH_CHUNK_CPU_UNPACK(nbit,is_signed) \
+	foreach_chunk_cpu(in, out, layout, 8/nbit, \
+	                  UnpackFunctor<nbit>(is_signed, \
+	                                      byteswap, \
+	                                      align_msb, \
+	                                      conjugate))
 	if( out->dtype == BF_DTYPE_I8 ||
 	           out->dtype == BF_DTYPE_CI8 ) {
-	//case BF_DTYPE_I8: {
 		switch( in->dtype ) {
 		// TODO: Work out how to properly deal with 1-bit
-		//case BF_DTYPE_CI1: nelement *= 2;
-		//case BF_DTYPE_I1: {
-		//	BF_ASSERT(nelement % 8 == 0, BF_STATUS_INVALID_SHAPE);
-		//	nelement /= 8;
-		//	CALL_FOREACH_SIMPLE_CPU_UNPACK(uint8_t,int64_t); break;
-		//}
-		case BF_DTYPE_CI2: nelement *= 2;
-		case BF_DTYPE_I2: {
-			BF_ASSERT(nelement % 4 == 0, BF_STATUS_INVALID_SHAPE);
-			nelement /= 4;
-			CALL_FOREACH_SIMPLE_CPU_UNPACK(uint8_t,int32_t);
-			break;
-		}
-		case BF_DTYPE_CI4: nelement *= 2;
-		case BF_DTYPE_I4: {
-			BF_ASSERT(nelement % 2 == 0, BF_STATUS_INVALID_SHAPE);
-			nelement /= 2;
-			CALL_FOREACH_SIMPLE_CPU_UNPACK(uint8_t,int16_t);
-			break;
-		}
-		//case BF_DTYPE_U1: {
-		//	// TODO
-		//}
-		case BF_DTYPE_U2: {
-			BF_ASSERT(nelement % 4 == 0, BF_STATUS_INVALID_SHAPE);
-			nelement /= 4;
-			CALL_FOREACH_SIMPLE_CPU_UNPACK(uint8_t,uint32_t);
-			break;
-		}
-		case BF_DTYPE_U4: {
-			BF_ASSERT(nelement % 2 == 0, BF_STATUS_INVALID_SHAPE);
-			nelement /= 2;
-			CALL_FOREACH_SIMPLE_CPU_UNPACK(uint8_t,uint16_t);
+		case BF_DTYPE_CI2:
+		case BF_DTYPE_I2: CALL_FOREACH_CHUNK_CPU_UNPACK(2, true);  break;
+		case BF_DTYPE_CI4:
+		case BF_DTYPE_I4: CALL_FOREACH_CHUNK_CPU_UNPACK(4, true);  break;
+		case BF_DTYPE_U2: CALL_FOREACH_CHUNK_CPU_UNPACK(2, false); break;
+		case BF_DTYPE_U4: CALL_FOREACH_CHUNK_CPU_UNPACK(4, false); break;
+		case BF_DTYPE_CI8:
+		case BF_DTYPE_I8: {
+			foreach_chunk_cpu(in, out, layout, 1, ConjugateFunctor(conjugate));
 			break;
 		}
 		default: BF_FAIL("Supported bfUnpack input dtype", BF_STATUS_UNSUPPORTED_DTYPE);
@@ -305,6 +379,6 @@ BFstatus bfUnpack(BFarray const* in,
 	} else {
 		BF_FAIL("Supported bfUnpack output dtype", BF_STATUS_UNSUPPORTED_DTYPE);
 	}
-#undef CALL_FOREACH_SIMPLE_CPU_UNPACK
+#undef CALL_FOREACH_CHUNK_CPU_UNPACK
 	return BF_STATUS_SUCCESS;
 }
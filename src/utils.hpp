@@ -213,6 +213,30 @@ inline bool is_contiguous(const BFarray* array) {
 	BFsize physical_size = capacity_bytes(array);
 	return logical_size == physical_size;
 }
+// Like is_contiguous, but also supports arrays with nbit < 8, whose inner dim
+//   is packed into bytes with strides in units of the packed bytes.
+inline bool is_contiguous_packed(const BFarray* array) {
+	long nbit = BF_DTYPE_NBIT(array->dtype);
+	int  ndim = array->ndim;
+	if( nbit >= 8 ) {
+		return is_contiguous(array);
+	}
+	long inner_len = array->shape[ndim-1];
+	if( inner_len > 1 && array->strides[ndim-1] != 1 ) {
+		return false;
+	}
+	long logical_nbit = inner_len * nbit;
+	for( int d=ndim-2; d>=0; --d ) {
+		if( array->shape[d] == 1 ) {
+			continue;
+		}
+		if( array->strides[d]*8 != logical_nbit ) {
+			return false;
+		}
+		logical_nbit *= array->shape[d];
+	}
+	return true;
+}
 inline BFsize num_contiguous_elements(const BFarray* array ) {
 	// Assumes array is contiguous
 	return capacity_bytes(array) / BF_DTYPE_NBYTE(array->dtype);
@@ -28,11 +28,14 @@
 """Test all aspects of `bifrost.blocks.accumulate`"""
 
 import unittest
+import numpy as np
 import bifrost as bf
 
 import bifrost.pipeline as bfp
 import bifrost.blocks as blocks
 
+from test_pipeline_cpu import NumpySourceBlock, GatherSinkBlock
+
 
 class CallbackBlock(blocks.CopyBlock):
     """Testing-only block which calls user-defined
@@ -96,3 +99,30 @@ class TestAccumulateBlock(unittest.TestCase):
             call_data = CallbackBlock(
                     accumulated, self.check_sequence_after, self.check_data_after)
             pipeline.run()
+
+class TestCpuAccumulateBlock(unittest.TestCase):
+    def setUp(self):
+        """Create settings shared between tests"""
+        self.gulp_nframe = 101
+    def run_cpu_accumulate_test(self, idata, dtype, nframe, odtype):
+        """Check accumulation in system space against numpy"""
+        with bfp.Pipeline() as pipeline:
+            data = NumpySourceBlock(idata, self.gulp_nframe, dtype)
+            accumulated = blocks.accumulate(data, nframe, odtype)
+            sink = GatherSinkBlock(accumulated)
+            pipeline.run()
+        odata = np.concatenate(sink.result)
+        nout = idata.shape[0] // nframe
+        known = idata[:nout*nframe].reshape((nout, nframe) + idata.shape[1:]).sum(axis=1)
+        self.assertEqual(odata.shape, known.shape)
+        np.testing.assert_allclose(odata, known, rtol=1e-5)
+    def test_cpu_accumulate(self):
+        """Check that partial sums are carried across gulps"""
+        idata = np.random.normal(size=(1000, 2, 3)).astype(np.float32)
+        for nframe in [1, 7, 101, 250]:
+            self.run_cpu_accumulate_test(idata, 'f32', nframe, None)
+    def test_cpu_accumulate_cast(self):
+        """Check accumulating integers to a different output dtype"""
+        idata = np.random.randint(0, 16, size=(1000, 1, 2)).astype(np.uint8)
+        self.run_cpu_accumulate_test(idata, 'u8', 16, 'u8')
+        self.run_cpu_accumulate_test(idata, 'u8', 16, 'f64')
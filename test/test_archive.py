@@ -0,0 +1,144 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import bifrost as bf
+import bifrost.bitshuffle
+from bifrost.blocks import read_archive, write_archive
+from bifrost.blocks.archive import ArchiveFile, ArchiveSourceBlock
+
+from test_pipeline_cpu import NumpySourceBlock, GatherSinkBlock
+from test_pipeline_cpu import notify_on_sequence, wait_for_sinks_before_writing
+
+class BitshuffleTest(unittest.TestCase):
+	def test_roundtrip(self):
+		for itemsize in [1, 2, 4, 8, 3]:
+			for nbyte in [0, itemsize * 7, itemsize * 8, 100000 // itemsize * itemsize]:
+				idata = np.random.randint(0, 256, size=nbyte).astype(np.uint8)
+				shuffled = np.empty_like(idata)
+				odata = np.empty_like(idata)
+				bf.bitshuffle.bitshuffle(idata, shuffled, itemsize)
+				bf.bitshuffle.bitunshuffle(shuffled, odata, itemsize)
+				np.testing.assert_equal(odata, idata)
+	def test_planes(self):
+		# Each 8 kB block of ones holds one bit plane of all ones
+		idata = np.ones(4096, dtype=np.int32).view(np.uint8)
+		odata = np.empty_like(idata)
+		bf.bitshuffle.bitshuffle(idata, odata, 4)
+		planes = odata.reshape(2, 32, 2048 // 8)
+		self.assertEqual((planes == 255).all(axis=2).sum(), 2)
+		self.assertEqual((planes == 0).all(axis=2).sum(), 62)
+
+class ArchiveTest(unittest.TestCase):
+	def setUp(self):
+		self.path = tempfile.mkdtemp(prefix='bf_test_archive_')
+		np.random.seed(1234)
+	def tearDown(self):
+		shutil.rmtree(self.path)
+	def archive(self, idata, gulp_nframe, **kwargs):
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, gulp_nframe)
+			sink = notify_on_sequence(write_archive(data, self.path, **kwargs))
+			pipeline.run()
+		return sink
+	def read(self, gulp_nframe, nthread=2):
+		with bf.Pipeline() as pipeline:
+			filenames = sorted(os.listdir(self.path))
+			filenames = [os.path.join(self.path, name) for name in filenames]
+			data = wait_for_sinks_before_writing(
+				ArchiveSourceBlock(filenames, gulp_nframe, nthread))
+			sink = GatherSinkBlock(data)
+			pipeline.run()
+		return np.concatenate(sink.result)
+	def archive_file(self):
+		return ArchiveFile(os.path.join(self.path, 'sequence000000.bfarc'))
+	def test_roundtrip(self):
+		idata = np.random.normal(size=(1000, 2, 3)).astype(np.float32)
+		# Note: Each span of 64 frames is split into chunks of 41 frames
+		self.archive(idata, 64, chunk_nbyte=1000, nthread=3)
+		with self.archive_file() as archive:
+			self.assertEqual(archive.header['name'], 'array')
+			self.assertEqual(archive.header['_tensor']['shape'], [-1, 2, 3])
+			self.assertEqual(archive.nframe, 1000)
+			offsets = [entry[0] for entry in archive.index]
+			self.assertEqual(offsets[:4], [0, 41, 64, 105])
+		# Note: The read gulp size need not match the chunk size
+		np.testing.assert_equal(self.read(100), idata)
+		np.testing.assert_equal(self.read(7, nthread=1), idata)
+	def test_compression(self):
+		# Quantised noise, with mostly-constant high bits
+		idata = np.round(np.random.normal(64, 4, size=(2000, 256)))
+		idata = idata.astype(np.float32)
+		sink = self.archive(idata, 500, chunk_nbyte=1 << 16, nthread=2)
+		with self.archive_file() as archive:
+			self.assertEqual(archive.nbyte, idata.nbytes)
+			self.assertEqual(archive.nbyte_compressed, sink.nbyte_compressed)
+		self.assertAlmostEqual(sink.compression_ratio,
+		                       float(idata.nbytes) / sink.nbyte_compressed)
+		self.assertGreater(sink.compression_ratio, 4)
+		self.assertGreater(sink.mbps_per_thread, 0)
+		# Bit-shuffling makes the data more compressible
+		shutil.rmtree(self.path)
+		os.mkdir(self.path)
+		unshuffled = self.archive(idata, 500, chunk_nbyte=1 << 16,
+		                          bitshuffle=False)
+		self.assertGreater(sink.compression_ratio,
+		                   1.1 * unshuffled.compression_ratio)
+		np.testing.assert_equal(self.read(300), idata)
+	def test_complex_uncompressed(self):
+		shape = (500, 4)
+		idata = (np.random.normal(size=shape) +
+		         1j * np.random.normal(size=shape)).astype(np.complex64)
+		self.archive(idata, 48, codec='none', bitshuffle=False, nthread=1)
+		with self.archive_file() as archive:
+			self.assertEqual(archive.nbyte_compressed, idata.nbytes)
+		np.testing.assert_equal(self.read(32), idata)
+	def test_missing_index(self):
+		idata = np.arange(1000 * 6, dtype=np.float32).reshape((1000, 2, 3))
+		self.archive(idata, 100, chunk_nbyte=4800)
+		# Remove the index and truncate the final chunk, as if the pipeline
+		#   were killed while writing it
+		filename = os.path.join(self.path, 'sequence000000.bfarc')
+		with self.archive_file() as archive:
+			last_pos = archive.index[-1][4]
+		with open(filename, 'r+b') as f:
+			f.truncate(last_pos + 20)
+		with self.archive_file() as archive:
+			self.assertEqual(archive.nframe, 900)
+		np.testing.assert_equal(self.read(64), idata[:900])
+	def test_read_directory(self):
+		idata = np.arange(100, dtype=np.float32).reshape((100, 1))
+		self.archive(idata, 10)
+		with bf.Pipeline() as pipeline:
+			block = read_archive(self.path, 10)
+		self.assertEqual(block.sourcenames,
+		                 [os.path.join(self.path, 'sequence000000.bfarc')])
@@ -0,0 +1,157 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import glob
+import os
+import shutil
+import tempfile
+import numpy as np
+import bifrost as bf
+import bifrost.dedisperse
+import bifrost.pipeline as bfp
+import bifrost.sigproc2 as sigproc
+from bifrost.blocks import dedisperse, write_sigproc
+
+from test_pipeline_cpu import NumpySourceBlock, GatherSinkBlock, notify_on_sequence
+from test_fold import TensorSourceBlock, HeaderGatherSinkBlock, \
+                      filterbank_tensor
+
+KDM = 4.148741601e3
+
+def dedisperse_known(idata, delays, ntime_out):
+	"""Returns the brute-force dedispersion of idata [chan, time]"""
+	ndm, nchan = delays.shape
+	out = np.zeros((ndm, ntime_out))
+	for d in xrange(ndm):
+		for c in xrange(nchan):
+			out[d] += idata[c, delays[d, c]:delays[d, c] + ntime_out]
+	return out
+
+def brute_force_delays(freqs, dms, dt):
+	kdelay = KDM / dt * (freqs**-2 - freqs.max()**-2)
+	return np.round(dms[:, None] * kdelay[None, :]).astype(int)
+
+class DedisperseTest(unittest.TestCase):
+	def setUp(self):
+		np.random.seed(1234)
+	def run_dedisperse_test(self, nchan, ntime, ndm, max_delay):
+		idata = np.random.normal(size=(nchan, ntime)).astype(np.float32)
+		delays = np.random.randint(0, max_delay + 1, size=(ndm, nchan))
+		delays = delays.astype(np.int32)
+		known = dedisperse_known(idata, delays, ntime - max_delay)
+		odata = bf.ndarray(shape=(ndm, ntime - max_delay), dtype='f32')
+		bf.dedisperse.dedisperse(idata, delays, odata)
+		np.testing.assert_allclose(np.array(odata), known, atol=1e-4)
+	def test_dedisperse(self):
+		self.run_dedisperse_test(16, 100, 8, 20)
+		self.run_dedisperse_test(3, 50, 1, 0)
+	def test_large(self):
+		# Note: Covers the multi-threaded, blocked code path
+		self.run_dedisperse_test(64, 5000, 16, 300)
+	def test_strided(self):
+		idata = np.random.normal(size=(200, 2, 10)).astype(np.float32)
+		delays = np.random.randint(0, 51, size=(4, 10)).astype(np.int32)
+		known = dedisperse_known(idata[:, 1, :].T, delays, 150)
+		odata = bf.ndarray(shape=(4, 150, 2), dtype='f32')
+		bf.dedisperse.dedisperse(bf.asarray(idata)[:, 1, :].T, delays,
+		                         odata[..., 0])
+		np.testing.assert_allclose(np.array(odata[..., 0]), known, atol=1e-4)
+	def test_invalid_delays(self):
+		idata = np.zeros((4, 100), dtype=np.float32)
+		delays = np.full((2, 4), 11, dtype=np.int32)
+		odata = bf.ndarray(shape=(2, 90), dtype='f32')
+		with self.assertRaises(RuntimeError):
+			bf.dedisperse.dedisperse(idata, delays, odata)
+	def run_block(self, idata, tensor, gulp_nframe, *args, **kwargs):
+		with bfp.Pipeline() as pipeline:
+			data = TensorSourceBlock(idata, gulp_nframe, tensor)
+			data = dedisperse(data, *args, **kwargs)
+			sink = HeaderGatherSinkBlock(data)
+			pipeline.run()
+		return sink.header, np.concatenate(sink.result, axis=1)
+	def test_brute_force(self):
+		ntime, npol, nchan = 3000, 2, 32
+		dt, f0, df = 1e-3, 1500., -10.
+		idata = np.random.normal(size=(ntime, npol, nchan))
+		idata = idata.astype(np.float32)
+		# Note: One channel per subband is exact brute-force dedispersion
+		header, result = self.run_block(idata, filterbank_tensor(dt, f0, df),
+		                                500, 40., nsubband=nchan)
+		tensor = header['_tensor']
+		ndm = tensor['shape'][0]
+		dm_step = tensor['scales'][0][1]
+		self.assertEqual(tensor['labels'], ['dispersion', 'time', 'pol'])
+		self.assertEqual(ndm, int(np.ceil(40. / dm_step)))
+		freqs = f0 + df * np.arange(nchan)
+		delays = brute_force_delays(freqs, dm_step * np.arange(ndm), dt)
+		nout = ntime - delays.max()
+		self.assertEqual(result.shape, (ndm, nout, npol))
+		for p in xrange(npol):
+			known = dedisperse_known(idata[:, p, :].T, delays, nout)
+			np.testing.assert_allclose(result[..., p], known, atol=1e-4)
+	def test_subband(self):
+		ntime, nchan = 4000, 256
+		dt, f0, df = 5e-4, 300., 0.5
+		dm, t_pulse = 23.4, 0.2
+		freqs = f0 + df * np.arange(nchan)
+		delays = KDM * dm * (freqs**-2 - freqs.max()**-2)
+		idata = np.random.normal(size=(ntime, 1, nchan)).astype(np.float32)
+		pulse = np.round((t_pulse + delays) / dt).astype(int)
+		idata[pulse, 0, np.arange(nchan)] += 3.
+		header, result = self.run_block(idata, filterbank_tensor(dt, f0, df),
+		                                1000, 50., 10., nsubband=16)
+		dm0, dm_step = header['_tensor']['scales'][0]
+		self.assertEqual(dm0, 10.)
+		d, t = np.unravel_index(result[..., 0].argmax(), result.shape[:2])
+		self.assertAlmostEqual(dm0 + d * dm_step, dm, delta=dm_step)
+		self.assertEqual(t, int(round(t_pulse / dt)))
+		# Most of the pulse's power is recovered
+		self.assertGreater(result[d, t, 0], 0.8 * 3 * nchan)
+	def test_write_sigproc(self):
+		ntime, nchan = 1000, 16
+		idata = np.random.normal(size=(ntime, 1, nchan)).astype(np.float32)
+		path = tempfile.mkdtemp()
+		try:
+			with bfp.Pipeline() as pipeline:
+				data = TensorSourceBlock(idata, 250,
+				                         filterbank_tensor(1e-3, 1400., -1.))
+				data = dedisperse(data, 100., dm_step=25.)
+				notify_on_sequence(write_sigproc(data, path=path))
+				pipeline.run()
+			filenames = sorted(glob.glob(os.path.join(path, '*.tim')))
+			self.assertEqual(len(filenames), 4)
+			with open(filenames[-1], 'rb') as f:
+				hdr = sigproc._read_header(f)
+				series = np.fromfile(f, dtype=np.float32)
+			self.assertEqual(hdr['refdm'], 75.)
+			freqs = 1400. - np.arange(nchan)
+			delays = brute_force_delays(freqs, np.arange(4) * 25., 1e-3)
+			self.assertEqual(series.size, ntime - delays.max())
+		finally:
+			shutil.rmtree(path)
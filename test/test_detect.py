@@ -0,0 +1,92 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import numpy as np
+import bifrost as bf
+import bifrost.detect
+from bifrost.DataType import ci8
+
+def detect_known(idata, mode, axis, factor):
+	"""Returns the products of complex idata integrated along axis 0"""
+	if mode == 'scalar':
+		products = np.abs(idata)**2
+	else:
+		x = np.take(idata, 0, axis=axis)
+		y = np.take(idata, 1, axis=axis)
+		xx = np.abs(x)**2
+		yy = np.abs(y)**2
+		xy = x * y.conj()
+		if mode == 'jones':
+			products = np.stack([xx + 1j*yy, xy], axis=axis)
+		else:
+			products = np.stack([xx + yy, xx - yy, 2*xy.real, -2*xy.imag],
+			                    axis=axis)
+	shape = products.shape
+	return products.reshape((shape[0] // factor, factor) + shape[1:]).sum(axis=1)
+
+class DetectTest(unittest.TestCase):
+	def run_detect_test(self, shape, mode, axis, factor):
+		idata = (np.random.normal(size=shape) +
+		         1j*np.random.normal(size=shape)).astype(np.complex64)
+		known = detect_known(idata, mode, axis, factor)
+		odtype = np.complex64 if mode == 'jones' else np.float32
+		odata = bf.ndarray(shape=known.shape, dtype=odtype)
+		bf.detect.detect(bf.asarray(idata), odata, mode,
+		                 None if mode == 'scalar' else axis)
+		np.testing.assert_allclose(np.array(odata), known, rtol=1e-4, atol=1e-4)
+	def test_stokes(self):
+		self.run_detect_test((40, 2, 33), 'stokes', 1, 8)
+		self.run_detect_test((40, 33, 2), 'stokes', 2, 5)
+	def test_jones(self):
+		self.run_detect_test((40, 2, 33), 'jones', 1, 8)
+		self.run_detect_test((40, 33, 2), 'jones', 2, 1)
+	def test_scalar(self):
+		self.run_detect_test((40, 2, 33), 'scalar', 1, 4)
+	def test_large(self):
+		# Note: Covers the multi-threaded, chunked code path
+		self.run_detect_test((16, 2, 10000), 'stokes', 1, 4)
+	def test_ci8(self):
+		ints = np.random.randint(-64, 64, size=(8, 2, 3, 2)).astype(np.int8)
+		idata = bf.ndarray(ints.view(ci8)[..., 0], dtype='ci8')
+		odata = bf.ndarray(shape=(2, 4, 3), dtype='f32')
+		bf.detect.detect(idata, odata, 'stokes', 1)
+		known = detect_known(ints[..., 0] + 1j*ints[..., 1], 'stokes', 1, 4)
+		np.testing.assert_allclose(np.array(odata), known, rtol=1e-6)
+	def test_accumulate(self):
+		idata = (np.random.normal(size=(8, 2, 5)) +
+		         1j*np.random.normal(size=(8, 2, 5))).astype(np.complex64)
+		odata = bf.asarray(np.ones((1, 2, 5), dtype=np.complex64))
+		bf.detect.detect(bf.asarray(idata), odata, 'jones', 1, accumulate=True)
+		known = 1 + detect_known(idata, 'jones', 1, 8)
+		np.testing.assert_allclose(np.array(odata), known, rtol=1e-5)
+	def test_invalid_shape(self):
+		idata = bf.ndarray(shape=(8, 2, 5), dtype='cf32')
+		odata = bf.ndarray(shape=(2, 2, 5), dtype='f32')
+		self.assertRaises(RuntimeError, bf.detect.detect,
+		                  idata, odata, 'stokes', 1)
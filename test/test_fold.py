@@ -0,0 +1,215 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import glob
+import os
+import shutil
+import tempfile
+import numpy as np
+import bifrost as bf
+import bifrost.fold
+import bifrost.pipeline as bfp
+import bifrost.sigproc2 as sigproc
+from bifrost.blocks import fold, write_sigproc
+
+from test_pipeline_cpu import NumpySourceBlock, GatherSinkBlock, notify_on_sequence
+
+def fold_known(idata, phase, dphase, nbin):
+	"""Returns the sum and count of the samples in each phase bin"""
+	ntime, npol, nchan = idata.shape
+	phases = phase[None, :] + np.arange(ntime)[:, None] * dphase
+	bins = np.floor((phases % 1.) * nbin).astype(int)
+	out = np.zeros((npol, nchan, nbin))
+	hits = np.zeros((nchan, nbin), dtype=int)
+	chans = np.arange(nchan)[None, :].repeat(ntime, axis=0)
+	for p in xrange(npol):
+		np.add.at(out[p], (chans, bins), idata[:, p, :])
+	np.add.at(hits, (chans, bins), 1)
+	return out, hits
+
+class TensorSourceBlock(NumpySourceBlock):
+	"""Testing-only block which streams a numpy array with the given tensor
+	    labels, scales and units"""
+	def __init__(self, array, gulp_nframe, tensor, *args, **kwargs):
+		super(TensorSourceBlock, self).__init__(array, gulp_nframe,
+		                                        *args, **kwargs)
+		self.tensor = tensor
+	def on_sequence(self, reader, sourcename):
+		ohdrs = super(TensorSourceBlock, self).on_sequence(reader, sourcename)
+		ohdrs[0]['_tensor'].update(self.tensor)
+		return ohdrs
+
+class HeaderGatherSinkBlock(GatherSinkBlock):
+	"""Testing-only block which also keeps the sequence header"""
+	def on_sequence(self, iseq):
+		self.header = iseq.header
+
+def filterbank_tensor(dt, f0, df):
+	return {'labels': ['time', 'pol', 'freq'],
+	        'scales': [[0, dt], None, [f0, df]],
+	        'units':  ['s', None, 'MHz']}
+
+class FoldTest(unittest.TestCase):
+	def setUp(self):
+		np.random.seed(1234)
+	def run_fold_test(self, shape, nbin, dphase):
+		idata = np.random.normal(size=shape).astype(np.float32)
+		phase = np.random.uniform(-2, 2, size=shape[2])
+		known, known_hits = fold_known(idata, phase, dphase, nbin)
+		odata = bf.zeros(shape=(shape[1], shape[2], nbin), dtype='f32')
+		hits  = bf.zeros(shape=(shape[2], nbin), dtype='u32')
+		bf.fold.fold(idata, phase, dphase, odata, hits)
+		np.testing.assert_allclose(np.array(odata), known, atol=1e-4)
+		np.testing.assert_equal(np.array(hits), known_hits)
+	def test_fold(self):
+		self.run_fold_test((1000, 1, 16), 32, 0.0123)
+		self.run_fold_test((500, 2, 7), 10, 0.731)
+		self.run_fold_test((300, 2, 3), 8, 1.37)
+	def test_large(self):
+		# Note: Covers the multi-threaded, chunked code path
+		self.run_fold_test((200, 2, 1000), 64, 0.01)
+	def test_strided(self):
+		# A [dispersion, time, pol] array folded without a copy
+		idata = np.random.normal(size=(5, 400, 2)).astype(np.float32)
+		phase = np.linspace(0, 1, 5)
+		known, _ = fold_known(idata.transpose(1, 2, 0), phase, 0.0513, 16)
+		odata = bf.zeros(shape=(2, 5, 16), dtype='f32')
+		bf.fold.fold(bf.asarray(idata).transpose(1, 2, 0), phase, 0.0513,
+		             odata)
+		np.testing.assert_allclose(np.array(odata), known, atol=1e-4)
+	def test_block(self):
+		ntime, nchan, nbin = 3000, 8, 25
+		dt, period, dm = 1e-3, 0.04973, 17.3
+		f0, df = 400., 10.
+		subint = 1.
+		# A dispersed pulse train with a duty cycle of 2 bins
+		freqs = f0 + df * np.arange(nchan)
+		delays = 4.148741601e3 * dm * (freqs**-2 - freqs[-1]**-2)
+		times = np.arange(ntime)[:, None] * dt - delays[None, :]
+		pulses = (((times / period) % 1.) < 2. / nbin).astype(np.float32)
+		idata = pulses[:, None, :] + \
+		        0.1 * np.random.normal(size=(ntime, 1, nchan))
+		idata = idata.astype(np.float32)
+		gulp_nframe = 384
+		with bfp.Pipeline() as pipeline:
+			data = TensorSourceBlock(idata, gulp_nframe,
+			                         filterbank_tensor(dt, f0, df))
+			data = fold(data, period, nbin, dm, subint)
+			sink = HeaderGatherSinkBlock(data)
+			pipeline.run()
+		header = sink.header
+		tensor = header['_tensor']
+		self.assertEqual(tensor['shape'], [-1, 1, nchan, nbin])
+		self.assertEqual(tensor['labels'], ['time', 'pol', 'freq', 'phase'])
+		self.assertEqual(tensor['scales'][0], [0, dt * 1000])
+		self.assertEqual(header['refdm'], dm)
+		self.assertEqual(header['npuls'], 20)
+		result = np.concatenate(sink.result)
+		self.assertEqual(result.shape, (3, 1, nchan, nbin))
+		for s in xrange(3):
+			sub = idata[s*1000:(s+1)*1000]
+			phase = ((s * 1000 * dt - delays) / period) % 1.
+			known, hits = fold_known(sub, phase, dt / period, nbin)
+			np.testing.assert_allclose(result[s], known / hits, atol=1e-5)
+		# The pulse is aligned in all channels
+		np.testing.assert_equal(result.argmax(axis=-1) <= 1, True)
+	def test_dispersion_input(self):
+		ndm, ntime, npol, nbin = 4, 1000, 2, 16
+		idata = np.random.normal(size=(ndm, ntime, npol)).astype(np.float32)
+		# Note: The source streams [time, ...] arrays, so the axes are
+		#         permuted and folded in [time, pol, dispersion] order
+		with bfp.Pipeline() as pipeline:
+			data = TensorSourceBlock(idata.transpose(1, 0, 2).copy(), 100,
+			                         {'labels': ['time', 'dispersion', 'pol'],
+			                          'scales': [[0, 1e-3], [0, 1.], None],
+			                          'units':  ['s', 'pc cm^-3', None]})
+			data = fold(data, 0.016, nbin, subint=0.5)
+			sink = HeaderGatherSinkBlock(data)
+			pipeline.run()
+		tensor = sink.header['_tensor']
+		self.assertEqual(tensor['labels'],
+		                 ['time', 'pol', 'dispersion', 'phase'])
+		result = np.concatenate(sink.result)
+		self.assertEqual(result.shape, (2, npol, ndm, nbin))
+		known, hits = fold_known(idata[:, :500].transpose(1, 2, 0),
+		                         np.zeros(ndm), 1e-3 / 0.016, nbin)
+		np.testing.assert_allclose(result[0], known / hits, atol=1e-5)
+	def test_write_sigproc(self):
+		ntime, nchan, nbin = 2000, 4, 10
+		idata = np.random.normal(size=(ntime, 2, nchan)).astype(np.float32)
+		path = tempfile.mkdtemp()
+		try:
+			with bfp.Pipeline() as pipeline:
+				data = TensorSourceBlock(idata, 250,
+				                         filterbank_tensor(1e-3, 1400., -1.))
+				data = fold(data, 0.1, nbin, 15., subint=1.)
+				notify_on_sequence(write_sigproc(data, path=path))
+				pipeline.run()
+			filenames = sorted(glob.glob(os.path.join(path, '*.tim')))
+			self.assertEqual(len(filenames), 2)
+			with open(filenames[0], 'rb') as f:
+				hdr = sigproc._read_header(f)
+				profile = np.fromfile(f, dtype=np.float32)
+			self.assertEqual(hdr['nbins'],  nbin)
+			self.assertEqual(hdr['nchans'], nchan)
+			self.assertEqual(hdr['nifs'],   2)
+			self.assertEqual(hdr['refdm'],  15.)
+			self.assertEqual(hdr['fch1'],   1400.)
+			self.assertEqual(profile.size, 2 * nchan * nbin)
+		finally:
+			shutil.rmtree(path)
+	def test_write_sigproc_dispersion(self):
+		ndm, ntime, npol, nbin = 3, 1000, 2, 8
+		idata = np.random.normal(size=(ntime, ndm, npol)).astype(np.float32)
+		path = tempfile.mkdtemp()
+		try:
+			with bfp.Pipeline() as pipeline:
+				data = TensorSourceBlock(idata, 100,
+				                         {'labels': ['time', 'dispersion', 'pol'],
+				                          'scales': [[0, 1e-3], [10., 5.], None],
+				                          'units':  ['s', 'pc cm^-3', None]})
+				data = fold(data, 0.016, nbin, subint=0.5)
+				sink = HeaderGatherSinkBlock(data)
+				notify_on_sequence(write_sigproc(data, path=path))
+				pipeline.run()
+			result = np.concatenate(sink.result)
+			filenames = sorted(glob.glob(os.path.join(path, '*.tim')))
+			self.assertEqual(len(filenames), 2 * ndm)
+			# Note: Files are named by DM and then time
+			for d in xrange(ndm):
+				with open(filenames[2 * d], 'rb') as f:
+					hdr = sigproc._read_header(f)
+					profile = np.fromfile(f, dtype=np.float32)
+				self.assertEqual(hdr['nbins'],  nbin)
+				self.assertEqual(hdr['nchans'], 1)
+				self.assertEqual(hdr['nifs'],   npol)
+				self.assertEqual(hdr['refdm'],  10. + 5. * d)
+				np.testing.assert_equal(profile, result[0, :, d].ravel())
+		finally:
+			shutil.rmtree(path)
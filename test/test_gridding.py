@@ -0,0 +1,138 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import numpy as np
+import bifrost as bf
+import bifrost.gridding
+import bifrost.pipeline as bfp
+from bifrost.blocks import grid_visibilities
+
+from test_fold import TensorSourceBlock, HeaderGatherSinkBlock
+
+def grid_known(vis, uv, kernel, ngrid):
+	"""Returns the visibilities vis [baseline, chan, pol] at uv (in cells)
+	gridded one at a time onto a [pol, v, u] grid"""
+	noversample, support = kernel.shape
+	npol = vis.shape[2]
+	grid = np.zeros((npol, ngrid + 2 * support, ngrid + 2 * support),
+	                dtype=np.complex128)
+	for b, c in np.ndindex(*vis.shape[:2]):
+		u, v = uv[b, c]
+		if not np.isfinite(u) or not np.isfinite(v):
+			continue
+		iu, iv = int(np.floor(u)), int(np.floor(v))
+		ox = int((u - iu) * noversample + 0.5)
+		oy = int((v - iv) * noversample + 0.5)
+		iu, ox = (iu + 1, 0) if ox == noversample else (iu, ox)
+		iv, oy = (iv + 1, 0) if oy == noversample else (iv, oy)
+		col0 = iu - (support - 1) // 2 + support
+		row0 = iv - (support - 1) // 2 + support
+		if not (0 <= col0 < ngrid + support and 0 <= row0 < ngrid + support):
+			continue
+		weights = np.outer(kernel[oy], kernel[ox])
+		grid[:, row0:row0 + support, col0:col0 + support] += \
+			vis[b, c][:, None, None] * weights
+	# Note: Cells outside the grid are dropped
+	return grid[:, support:-support, support:-support]
+
+class GriddingTest(unittest.TestCase):
+	def setUp(self):
+		np.random.seed(1234)
+	def run_grid_test(self, nbaseline, nchan, npol, ngrid, support):
+		shape = (nbaseline, nchan, npol)
+		vis = np.random.normal(size=shape) + 1j * np.random.normal(size=shape)
+		vis = vis.astype(np.complex64)
+		# Note: Includes visibilities that fall partly off the grid
+		uv = np.random.uniform(-3, ngrid + 2, size=(nbaseline, nchan, 2))
+		uv = uv.astype(np.float32)
+		kernel = bf.gridding.kaiser_bessel_kernel(support, 16)
+		grid = bf.ndarray(shape=(npol, ngrid, ngrid), dtype='cf32')
+		bf.gridding.grid(vis, uv, kernel, grid)
+		known = grid_known(vis, uv, kernel, ngrid)
+		np.testing.assert_allclose(np.array(grid), known, rtol=1e-4,
+		                           atol=1e-4)
+		return vis, uv, kernel, grid, known
+	def test_grid(self):
+		self.run_grid_test(20, 8, 2, 64, 7)
+		self.run_grid_test(5, 3, 1, 20, 4)
+		self.run_grid_test(1, 1, 1, 10, 1)
+	def test_large(self):
+		# Note: Covers the multi-threaded, multi-strip code path
+		self.run_grid_test(100, 64, 2, 256, 8)
+	def test_accumulate_and_flags(self):
+		vis, uv, kernel, grid, known = self.run_grid_test(10, 4, 2, 32, 5)
+		uv[::2, 1] = np.nan
+		bf.gridding.grid(vis, uv, kernel, grid, accumulate=True)
+		known += grid_known(vis, uv, kernel, 32)
+		np.testing.assert_allclose(np.array(grid), known, rtol=1e-4,
+		                           atol=1e-4)
+	def test_kernel(self):
+		kernel = bf.gridding.kaiser_bessel_kernel(7, 8)
+		self.assertEqual(kernel.shape, (8, 7))
+		np.testing.assert_allclose(kernel.sum(axis=1), 1, rtol=1e-6)
+		# With no sub-cell offset, the kernel peaks at the centre cell
+		self.assertEqual(kernel[0].argmax(), 3)
+		np.testing.assert_allclose(kernel[0], kernel[0][::-1], rtol=1e-6)
+	def test_block(self):
+		# Point sources observed by random baselines, imaged by an inverse FFT
+		nbaseline, nchan, ngrid, cell = 200, 4, 128, 2.
+		freqs = 150e6 + 1e6 * np.arange(nchan)
+		uvw = np.random.uniform(-40, 40, size=(nbaseline, 3))
+		u = uvw[:, 0, None] * freqs / 299792458.
+		v = uvw[:, 1, None] * freqs / 299792458.
+		# Source 1 is at pixel (l,m) = (5,-3), source 2 is on the pol axis
+		l, m = 5. / (ngrid * cell), -3. / (ngrid * cell)
+		idata = np.zeros((3, nchan, nbaseline, 2), dtype=np.complex64)
+		idata[..., 0] = np.exp(-2j * np.pi * (u * l + v * m)).T
+		idata[..., 1] = 2.
+		idata[1] *= 3.
+		tensor = {'labels': ['time', 'freq', 'baseline', 'pol'],
+		          'scales': [[0, 1], [150., 1.], None, None],
+		          'units':  ['s', 'MHz', None, None]}
+		with bfp.Pipeline() as pipeline:
+			data = TensorSourceBlock(idata, 2, tensor)
+			data = grid_visibilities(data, ngrid, cell, uvw=uvw)
+			sink = HeaderGatherSinkBlock(data)
+			pipeline.run()
+		grids = np.concatenate(sink.result)
+		self.assertEqual(grids.shape, (3, 2, ngrid, ngrid))
+		otensor = sink.header['_tensor']
+		self.assertEqual(otensor['labels'], ['time', 'pol', 'v', 'u'])
+		self.assertEqual(otensor['scales'][2], [-ngrid // 2 * cell, cell])
+		# Each visibility is gridded with unit weight
+		np.testing.assert_allclose(grids[:, 1].sum(axis=(1, 2)),
+		                           [2. * nbaseline * nchan,
+		                            6. * nbaseline * nchan,
+		                            2. * nbaseline * nchan], rtol=1e-4)
+		for t in xrange(3):
+			image = np.abs(np.fft.ifft2(grids[t, 0]))
+			self.assertEqual(np.unravel_index(image.argmax(), image.shape),
+			                 (-3 % ngrid, 5))
+			image = np.abs(np.fft.ifft2(grids[t, 1]))
+			self.assertEqual(image.argmax(), 0)
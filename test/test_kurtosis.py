@@ -0,0 +1,124 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import os
+import numpy as np
+import bifrost as bf
+import bifrost.kurtosis
+from bifrost.blocks import spectral_kurtosis
+
+from test_pipeline_cpu import NumpySourceBlock, GatherSinkBlock
+
+def kurtosis_known(idata, axis, m, nd=1.):
+	"""Returns the spectral kurtosis of windows of m samples along axis"""
+	shape = idata.shape
+	windows = idata.reshape(shape[:axis] + (shape[axis] // m, m) +
+	                        shape[axis+1:]).astype(np.float64)
+	s1 = windows.sum(axis=axis+1)
+	s2 = (windows**2).sum(axis=axis+1)
+	return (m*nd + 1) / (m - 1) * (m*s2 / s1**2 - 1)
+
+class KurtosisTest(unittest.TestCase):
+	def setUp(self):
+		np.random.seed(1234)
+	def run_kurtosis_test(self, shape, axis, m):
+		idata = np.random.exponential(size=shape).astype(np.float32)
+		known = kurtosis_known(idata, axis, m)
+		sk_shape = list(shape)
+		sk_shape[axis] //= m
+		sk = bf.ndarray(shape=sk_shape, dtype='f32')
+		bf.kurtosis.spectral_kurtosis(idata, sk)
+		np.testing.assert_allclose(np.array(sk), known, rtol=1e-5)
+	def test_kurtosis(self):
+		self.run_kurtosis_test((64, 33), 0, 16)
+		self.run_kurtosis_test((2, 64, 33), 1, 8)
+		self.run_kurtosis_test((33, 64), 1, 32)
+	def test_large(self):
+		# Note: Covers the multi-threaded, chunked code path
+		self.run_kurtosis_test((32, 10000), 0, 16)
+	def test_statistics(self):
+		m = 256
+		idata = np.random.exponential(size=(m*100, 400)).astype(np.float32)
+		sk = bf.ndarray(shape=(100, 400), dtype='f32')
+		bf.kurtosis.spectral_kurtosis(idata, sk)
+		lower, upper = bf.kurtosis.spectral_kurtosis_bounds(m)
+		self.assertAlmostEqual(np.array(sk).mean(), 1, places=2)
+		self.assertAlmostEqual(np.array(sk).std(), (upper - 1) / 3, places=2)
+	def test_flagging(self):
+		m = 64
+		idata = np.random.exponential(size=(4*m, 8)).astype(np.float32)
+		idata[:, 2] = 5       # Constant tone
+		idata[m+7, 5] = 1000  # Impulse
+		odata = bf.ndarray(shape=idata.shape, dtype='f32')
+		sk = bf.ndarray(shape=(4, 8), dtype='f32')
+		bf.kurtosis.spectral_kurtosis(idata, sk, odata, lower=0.5, upper=2.,
+		                              replacement=-1)
+		flagged = np.zeros((4, 8), dtype=bool)
+		flagged[:, 2] = True
+		flagged[1, 5] = True
+		np.testing.assert_equal((np.array(sk) < 0.5) | (np.array(sk) > 2.),
+		                        flagged)
+		known = np.where(np.repeat(flagged, m, axis=0), -1, idata)
+		np.testing.assert_equal(np.array(odata), known)
+	def test_in_place(self):
+		idata = np.random.exponential(size=(64, 8)).astype(np.float32)
+		idata[:32, 3] = 7
+		data = bf.asarray(idata.copy())
+		sk = bf.ndarray(shape=(2, 8), dtype='f32')
+		bf.kurtosis.spectral_kurtosis(data, sk, data)
+		known = idata.copy()
+		known[:32, 3] = 0
+		np.testing.assert_equal(np.array(data), known)
+	def test_invalid_shape(self):
+		idata = bf.ndarray(shape=(64, 8), dtype='f32')
+		sk = bf.ndarray(shape=(64, 8), dtype='f32')
+		self.assertRaises(RuntimeError, bf.kurtosis.spectral_kurtosis,
+		                  idata, sk, lower=0.5, upper=2.)
+		self.assertRaises(ValueError, bf.kurtosis.spectral_kurtosis_bounds, 1)
+	def test_block(self):
+		m = 32
+		idata = np.random.exponential(size=(20*m, 16)).astype(np.float32)
+		idata[3*m:5*m, 4] = 2                 # Intermittent tone
+		idata[9*m:10*m, :] += 100 * (np.arange(m) == 3)[:, None]  # Impulse
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, 4*m)
+			flagger = spectral_kurtosis(data, m, lower=0.2, upper=4.)
+			sink = GatherSinkBlock(flagger)
+			pipeline.run()
+			proclogs = bf.proclog.load_by_pid(os.getpid())
+		odata = np.concatenate(sink.result)
+		flagged = np.zeros((20, 16), dtype=bool)
+		flagged[3:5, 4] = True
+		flagged[9, :] = True
+		np.testing.assert_equal(odata, np.where(np.repeat(flagged, m, axis=0),
+		                                        0, idata))
+		# The last gulp holds windows 16-19, none of which are flagged
+		self.assertEqual(flagger.flagged_fraction, 0)
+		self.assertEqual(int(proclogs[flagger.name]['kurtosis']['nwindow']),
+		                 4*16)
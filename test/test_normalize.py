@@ -0,0 +1,118 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import numpy as np
+import bifrost as bf
+import bifrost.normalize
+import bifrost.pipeline as bfp
+from bifrost.blocks import normalize
+
+from test_pipeline_cpu import NumpySourceBlock, GatherSinkBlock
+
+def normalize_known(idata, center, scale, alpha):
+	"""Returns the running mean/variance normalisation of idata [time, series]"""
+	center = center.astype(np.float64)
+	var = scale.astype(np.float64)**2
+	odata = np.zeros(idata.shape)
+	for t in xrange(idata.shape[0]):
+		dev = idata[t] - center
+		odata[t] = dev / np.sqrt(var)
+		center += alpha * dev
+		var += alpha * (dev**2 - var)
+	return odata, center, np.sqrt(var)
+
+class NormalizeTest(unittest.TestCase):
+	def setUp(self):
+		np.random.seed(1234)
+	def test_mean(self):
+		idata = np.random.normal(3, 2, size=(500, 300)).astype(np.float32)
+		center = np.full(300, 2, dtype=np.float32)
+		scale = np.full(300, 1, dtype=np.float32)
+		known, known_center, known_scale = normalize_known(idata, center,
+		                                                   scale, 0.01)
+		odata = bf.ndarray(shape=idata.shape, dtype='f32')
+		bf.normalize.running_normalize(idata, odata, center, scale, 0.01,
+		                               robust=False)
+		np.testing.assert_allclose(np.array(odata), known, rtol=1e-3,
+		                           atol=1e-3)
+		np.testing.assert_allclose(center, known_center, rtol=1e-4)
+		np.testing.assert_allclose(scale, known_scale, rtol=1e-4)
+	def test_robust(self):
+		# A drifting baseline with a changing RMS and strong impulses
+		ntime, nseries = 20000, 8
+		t = np.arange(ntime)[:, None]
+		baseline = 10 + 5 * np.sin(2 * np.pi * t / ntime)
+		rms = np.linspace(1, 3, nseries)[None, :]
+		idata = baseline + rms * np.random.normal(size=(ntime, nseries))
+		idata[::50] += 100.
+		idata = idata.astype(np.float32)
+		center = np.full(nseries, 10, dtype=np.float32)
+		scale = np.array(rms[0], dtype=np.float32)
+		bf.normalize.running_normalize(idata, idata, center, scale, 0.005)
+		clean = np.array(idata[5000:])
+		clean = np.delete(clean, np.s_[::50], axis=0)
+		self.assertAlmostEqual(np.median(clean), 0, delta=0.1)
+		self.assertAlmostEqual(clean.std(), 1, delta=0.1)
+		np.testing.assert_allclose(scale, rms[0], rtol=0.15)
+	def test_zero_scale(self):
+		idata = np.ones((10, 3), dtype=np.float32)
+		center = np.ones(3, dtype=np.float32)
+		scale = np.zeros(3, dtype=np.float32)
+		odata = bf.ndarray(shape=idata.shape, dtype='f32')
+		bf.normalize.running_normalize(idata, odata, center, scale, 0.1)
+		np.testing.assert_equal(np.array(odata), 0)
+	def run_block_test(self, robust):
+		idata = np.random.normal(7, 3, size=(3000, 2, 50)).astype(np.float32)
+		gulp_nframe = 256
+		with bfp.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, gulp_nframe)
+			data = normalize(data, 100, robust)
+			sink = GatherSinkBlock(data)
+			pipeline.run()
+		result = np.concatenate(sink.result)
+		# The estimates are carried across gulps
+		first = idata[:gulp_nframe]
+		if robust:
+			center = np.median(first, axis=0)
+			scale = 1.4826 * np.median(np.abs(first - center), axis=0)
+		else:
+			center, scale = first.mean(axis=0), first.std(axis=0)
+		center = center.astype(np.float32).reshape(-1)
+		scale = scale.astype(np.float32).reshape(-1)
+		known = bf.ndarray(shape=(3000, 100), dtype='f32')
+		bf.normalize.running_normalize(idata.reshape(3000, 100), known,
+		                               center, scale, 0.01, robust)
+		np.testing.assert_allclose(result.reshape(3000, 100), known,
+		                           rtol=1e-5, atol=1e-5)
+		self.assertAlmostEqual(result.mean(), 0, delta=0.05)
+		self.assertAlmostEqual(result.std(), 1, delta=0.05)
+	def test_block(self):
+		self.run_block_test(True)
+	def test_block_mean(self):
+		self.run_block_test(False)
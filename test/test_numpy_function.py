@@ -0,0 +1,103 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import threading
+import numpy as np
+import bifrost as bf
+from bifrost.blocks import numpy_function
+
+from test_pipeline_cpu import NumpySourceBlock, GatherSinkBlock
+
+class NumpyFunctionTest(unittest.TestCase):
+	def setUp(self):
+		np.random.seed(1234)
+		self.idata = np.random.normal(size=(1000,16)).astype(np.float32)
+	def run_function(self, func, nthread=1, **kwargs):
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(self.idata, 64)
+			data = numpy_function(data, func, nthread=nthread, **kwargs)
+			sink = GatherSinkBlock(data)
+			pipeline.run()
+		return np.concatenate(sink.result)
+	def test_ufunc(self):
+		odata = self.run_function(np.negative)
+		np.testing.assert_equal(odata, -self.idata)
+	def test_zero_copy(self):
+		def scale(x, out):
+			# The output is a view of the ring's memory, not a new array
+			self.assertFalse(out.flags['OWNDATA'])
+			self.assertIs(type(out), np.ndarray)
+			np.multiply(x, 2, out=out)
+		odata = self.run_function(scale)
+		np.testing.assert_equal(odata, 2*self.idata)
+	def test_output_header(self):
+		def ohdr_func(iheaders):
+			ohdr = iheaders[0]
+			ohdr['_tensor']['dtype'] = 'f64'
+			return ohdr
+		odata = self.run_function(np.square, ohdr_func=ohdr_func)
+		self.assertEqual(odata.dtype, np.float64)
+		np.testing.assert_allclose(odata, self.idata.astype(np.float64)**2)
+	def test_multiple_inputs(self):
+		with bf.Pipeline() as pipeline:
+			a = NumpySourceBlock(self.idata, 64)
+			b = NumpySourceBlock(2*self.idata, 64)
+			data = numpy_function([a, b], np.add, noutput=1,
+			                      ohdr_func=lambda iheaders: iheaders[0])
+			sink = GatherSinkBlock(data)
+			pipeline.run()
+		np.testing.assert_allclose(np.concatenate(sink.result), 3*self.idata)
+	def test_multiple_outputs(self):
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(self.idata, 64)
+			data = numpy_function(data, np.modf, noutput=2,
+			                      ohdr_func=lambda iheaders: iheaders*2)
+			frac, whole = data.orings
+			frac_sink  = GatherSinkBlock(frac)
+			whole_sink = GatherSinkBlock(whole)
+			pipeline.run()
+		frac_expected, whole_expected = np.modf(self.idata)
+		np.testing.assert_equal(np.concatenate(frac_sink.result), frac_expected)
+		np.testing.assert_equal(np.concatenate(whole_sink.result), whole_expected)
+	def test_thread_pool(self):
+		thread_ids = set()
+		def negative(x, out):
+			thread_ids.add(threading.current_thread().ident)
+			np.negative(x, out=out)
+		odata = self.run_function(negative, nthread=4)
+		np.testing.assert_equal(odata, -self.idata)
+		self.assertGreater(len(thread_ids), 1)
+		# The pool's threads are joined at the end of the sequence
+		alive_ids = set(thread.ident for thread in threading.enumerate())
+		self.assertFalse(thread_ids & alive_ids)
+	def test_mismatched_outputs(self):
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(self.idata, 64)
+			with self.assertRaises(ValueError):
+				numpy_function(data, np.modf, noutput=2)
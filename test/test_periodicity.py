@@ -0,0 +1,131 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import numpy as np
+import bifrost as bf
+import bifrost.harmonic
+import bifrost.pipeline as bfp
+from bifrost.blocks import periodicity_search
+
+from test_fold import TensorSourceBlock, HeaderGatherSinkBlock
+
+def harmonic_sum_known(power, max_nharmonic):
+	"""Returns the peak significance and harmonic count of each fundamental"""
+	nbatch, nfreq = power.shape
+	best = np.full((nbatch, nfreq), -np.inf)
+	hbest = np.zeros((nbatch, nfreq), dtype=int)
+	h = 1
+	while h <= max_nharmonic:
+		for k in xrange(nfreq):
+			if k * h >= nfreq:
+				break
+			s = power[:, k*np.arange(1, h+1)].astype(np.float64).sum(axis=1)
+			sigma = ((s / h)**(1/3.) - (1 - 1./(9*h))) * np.sqrt(9*h)
+			better = sigma > best[:, k]
+			best[better, k] = sigma[better]
+			hbest[better, k] = h
+		h *= 2
+	return best, hbest
+
+class PeriodicityTest(unittest.TestCase):
+	def setUp(self):
+		np.random.seed(1234)
+	def run_harmonic_test(self, shape, max_nharmonic):
+		power = np.random.exponential(size=shape).astype(np.float32)
+		sigma = bf.ndarray(shape=shape, dtype='f32')
+		nharmonic = bf.ndarray(shape=shape, dtype='i32')
+		bf.harmonic.harmonic_sum(power, sigma, nharmonic, max_nharmonic)
+		known, known_nharmonic = harmonic_sum_known(power, max_nharmonic)
+		np.testing.assert_allclose(np.array(sigma), known, rtol=1e-4,
+		                           atol=1e-4)
+		np.testing.assert_equal(np.array(nharmonic), known_nharmonic)
+	def test_harmonic_sum(self):
+		self.run_harmonic_test((3, 100), 16)
+		self.run_harmonic_test((2, 37), 4)
+		self.run_harmonic_test((1, 50), 1)
+	def test_large(self):
+		# Note: Covers the multi-threaded, blocked code path
+		self.run_harmonic_test((2, 3000), 32)
+	def test_noise_statistics(self):
+		power = np.random.exponential(size=(4, 100000)).astype(np.float32)
+		sigma = bf.ndarray(shape=power.shape, dtype='f32')
+		bf.harmonic.harmonic_sum(power, sigma, max_nharmonic=1)
+		self.assertAlmostEqual(np.array(sigma).mean(), 0, places=1)
+		self.assertAlmostEqual(np.array(sigma).std(), 1, places=1)
+	def test_invalid_nharmonic(self):
+		power = np.ones((1, 10), dtype=np.float32)
+		sigma = bf.ndarray(shape=(1, 10), dtype='f32')
+		with self.assertRaises(RuntimeError):
+			bf.harmonic.harmonic_sum(power, sigma, max_nharmonic=3)
+	def test_block(self):
+		ndm, nfft, nsegment = 4, 8192, 2
+		dt, period = 1e-3, 0.1237
+		ntime = nfft * nsegment + 100
+		idata = np.random.normal(size=(ntime, ndm, 1)).astype(np.float32)
+		# A pulse train with a 10% duty cycle, which has several harmonics
+		t = np.arange(ntime) * dt
+		idata[:, 2, 0] += 1.5 * (((t / period) % 1.) < 0.1)
+		tensor = {'labels': ['time', 'dispersion', 'pol'],
+		          'scales': [[50., dt], [0., 2.], None],
+		          'units':  ['s', 'pc cm^-3', None]}
+		with bfp.Pipeline() as pipeline:
+			data = TensorSourceBlock(idata, 1000, tensor)
+			data = periodicity_search(data, nfft, 16, ncandidate=3)
+			sink = HeaderGatherSinkBlock(data)
+			pipeline.run()
+		header = sink.header
+		self.assertEqual(header['candidate_properties'],
+		                 ['dm', 'time', 'frequency', 'nharmonic', 'sigma'])
+		cands = np.concatenate(sink.result)
+		self.assertEqual(cands.shape, (nsegment * ndm * 3, 5))
+		for s in xrange(nsegment):
+			segment = cands[s*ndm*3:(s+1)*ndm*3]
+			np.testing.assert_equal(segment[:, 1], 50. + s * nfft * dt)
+			np.testing.assert_equal(segment[:, 0],
+			                        np.repeat(2. * np.arange(ndm), 3))
+			# Note: Sub-harmonics of the signal may also be detected
+			pulsar = segment[6:9]
+			found = np.abs(pulsar[:, 2] - 1. / period) <= 1. / (nfft * dt)
+			self.assertTrue(found.any())
+			self.assertGreater(pulsar[found, 3].max(), 1)
+			self.assertGreater(pulsar[found, 4].max(), 10)
+			# The other DM trials contain only noise
+			noise = np.delete(segment[:, 4], [6, 7, 8])
+			self.assertLess(noise.max(), 6)
+	def test_threshold(self):
+		idata = np.random.normal(size=(4096, 2)).astype(np.float32)
+		tensor = {'labels': ['time', 'dispersion'],
+		          'scales': [[0., 1e-3], [0., 1.]],
+		          'units':  ['s', 'pc cm^-3']}
+		with bfp.Pipeline() as pipeline:
+			data = TensorSourceBlock(idata, 1024, tensor)
+			data = periodicity_search(data, 4096, threshold=8.)
+			sink = HeaderGatherSinkBlock(data)
+			pipeline.run()
+		self.assertEqual(sum(len(r) for r in sink.result), 0)
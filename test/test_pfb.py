@@ -0,0 +1,172 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import numpy as np
+import bifrost as bf
+import bifrost.pfb
+import bifrost.pipeline as bfp
+import bifrost.views
+from bifrost.blocks import pfb
+
+from test_pipeline_cpu import NumpySourceBlock, GatherSinkBlock
+from test_fold import TensorSourceBlock, HeaderGatherSinkBlock
+
+def pfb_fir_known(idata, coeffs):
+	"""Returns the FIR stage of a PFB applied to idata [time, branch, ...]"""
+	ntap = coeffs.shape[0]
+	nout = idata.shape[0] - ntap + 1
+	coeffs = coeffs.reshape(coeffs.shape + (1,) * (idata.ndim - 2))
+	return sum(coeffs[p] * idata[p:p + nout] for p in xrange(ntap))
+
+def prototype_known(nbranch, ntap, window):
+	"""Returns the windowed-sinc PFB filter with unit DC gain per branch"""
+	n = ntap * nbranch
+	x = (np.arange(n) - (n - 1) / 2.) / nbranch
+	h = np.sinc(x) * getattr(np, window)(n)
+	return (h * nbranch / h.sum()).reshape(ntap, nbranch)
+
+class PfbTest(unittest.TestCase):
+	def setUp(self):
+		np.random.seed(1234)
+	def run_fir_test(self, shape, ntap, dtype):
+		idata = np.random.normal(size=shape).astype(np.float32)
+		if dtype == 'cf32':
+			idata = idata + 1j * np.random.normal(size=shape)
+			idata = idata.astype(np.complex64)
+		coeffs = np.random.normal(size=(ntap, shape[1])).astype(np.float32)
+		odata = bf.ndarray(shape=(shape[0] - ntap + 1,) + shape[1:],
+		                   dtype=dtype)
+		bf.pfb.pfb_fir(idata, coeffs, odata)
+		np.testing.assert_allclose(np.array(odata),
+		                           pfb_fir_known(idata, coeffs),
+		                           rtol=1e-4, atol=1e-4)
+	def test_fir(self):
+		self.run_fir_test((100, 64, 2), 4, 'f32')
+		self.run_fir_test((20, 7, 3), 8, 'f32')
+		self.run_fir_test((10, 16, 1), 1, 'cf32')
+	def test_fir_large(self):
+		# Note: Covers the multi-threaded, chunked code path
+		self.run_fir_test((600, 512, 1), 4, 'cf32')
+		self.run_fir_test((50, 3000, 1), 4, 'f32')
+	def test_fir_strided(self):
+		# Filtering [time, pol, branch] data without a copy
+		idata = np.random.normal(size=(100, 2, 32)).astype(np.float32)
+		coeffs = np.random.normal(size=(4, 32)).astype(np.float32)
+		odata = bf.ndarray(shape=(97, 2, 32), dtype='f32')
+		bf.pfb.pfb_fir(idata.transpose(0, 2, 1), coeffs,
+		               odata.transpose(0, 2, 1))
+		known = pfb_fir_known(idata.transpose(0, 2, 1), coeffs)
+		np.testing.assert_allclose(np.array(odata).transpose(0, 2, 1), known,
+		                           rtol=1e-4, atol=1e-4)
+	def run_block_test(self, idata, gulp_nframe, ntap, **kwargs):
+		with bfp.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, gulp_nframe)
+			data = pfb(data, 'dim1', ntap, **kwargs)
+			sink = HeaderGatherSinkBlock(data)
+			pipeline.run()
+		return np.concatenate(sink.result), sink.header
+	def test_block(self):
+		nbranch, ntap = 64, 4
+		idata = np.random.normal(size=(1000, nbranch, 2)).astype(np.float32)
+		result, header = self.run_block_test(idata, 100, ntap)
+		coeffs = prototype_known(nbranch, ntap, 'hamming')
+		known = np.fft.rfft(pfb_fir_known(idata, coeffs), axis=1)
+		# Note: The taps overlap across gulps
+		self.assertEqual(result.shape, (1000 - ntap + 1, nbranch // 2 + 1, 2))
+		np.testing.assert_allclose(result, known, rtol=1e-3, atol=1e-3)
+		otensor = header['_tensor']
+		self.assertEqual(otensor['dtype'], 'cf32')
+		self.assertEqual(otensor['shape'], [-1, nbranch // 2 + 1, 2])
+		self.assertAlmostEqual(otensor['scales'][1][1], 1. / nbranch)
+	def test_block_complex(self):
+		nbranch, ntap = 32, 8
+		idata = np.random.normal(size=(500, nbranch)) + \
+		        1j * np.random.normal(size=(500, nbranch))
+		idata = idata.astype(np.complex64)
+		result, _ = self.run_block_test(idata, 64, ntap, window='blackman',
+		                                apply_fftshift=True)
+		coeffs = prototype_known(nbranch, ntap, 'blackman')
+		known = np.fft.fftshift(np.fft.fft(pfb_fir_known(idata, coeffs),
+		                                   axis=1), axes=1)
+		np.testing.assert_allclose(result, known, rtol=1e-3, atol=1e-3)
+		# Without the transform, the filtered frames are output
+		result, header = self.run_block_test(idata, 64, ntap, fft=False,
+		                                     window='blackman',
+		                                     axis_label='branch')
+		np.testing.assert_allclose(result, pfb_fir_known(idata, coeffs),
+		                           rtol=1e-4, atol=1e-4)
+		self.assertEqual(header['_tensor']['labels'], ['time', 'branch'])
+	def test_invalid_arguments(self):
+		def on_sequence(block, dtype, labels):
+			"""Returns the header the block makes for the given input"""
+			class Sequence(object):
+				header = {'gulp_nframe': 64,
+				          '_tensor': {'dtype':  dtype,
+				                      'shape':  [-1 if label == 'time' else 32
+				                                 for label in labels],
+				                      'labels': labels}}
+			return block.on_sequence(Sequence())
+		with bfp.Pipeline() as pipeline:
+			data = NumpySourceBlock(np.zeros((64, 32), np.float32), 64)
+			self.assertRaises(ValueError, pfb, data, 'dim1', fft=False,
+			                  apply_fftshift=True)
+			block = pfb(data, 'branch')
+			self.assertRaises(ValueError, on_sequence, block, 'f32',
+			                  ['branch', 'time'])
+			block = pfb(data, 'branch', apply_fftshift=True)
+			self.assertRaises(ValueError, on_sequence, block, 'f32',
+			                  ['time', 'branch'])
+			on_sequence(block, 'cf32', ['time', 'branch'])
+	def test_leakage(self):
+		# A complex tone between two channels, split from a stream of samples
+		nbranch, ntap, nframe = 64, 4, 256
+		t = np.arange(nframe * nbranch)
+		idata = np.exp(2j * np.pi * 10.5 / nbranch * t).astype(np.complex64)
+		idata = idata.reshape(nframe * nbranch, 1)
+		with bfp.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, 32 * nbranch)
+			data = bf.views.split_axis(data, 'time', nbranch, label='fine')
+			data = pfb(data, 'fine', ntap, axis_label='freq')
+			sink = HeaderGatherSinkBlock(data)
+			pipeline.run()
+		power = np.abs(np.concatenate(sink.result)[:, :, 0])**2
+		self.assertEqual(sink.header['_tensor']['labels'],
+		                 ['time', 'freq', 'dim1'])
+		self.assertEqual(power.shape, (nframe - ntap + 1, nbranch))
+		power = power.mean(axis=0)
+		fft_power = np.abs(np.fft.fft(idata.reshape(nframe, nbranch),
+		                              axis=1))**2
+		fft_power = fft_power.mean(axis=0)
+		# The tone is split between its neighbouring channels, and the far
+		#   channels are suppressed far more than by a plain FFT
+		self.assertGreater(power[10], 0.2 * power.max())
+		self.assertGreater(power[11], 0.2 * power.max())
+		far = np.r_[0:5, 17:nbranch]
+		self.assertLess(power[far].max() / power.max(), 1e-6)
+		self.assertGreater(fft_power[far].max() / fft_power.max(), 1e-3)
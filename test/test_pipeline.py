@@ -30,23 +30,11 @@ import unittest
 import bifrost as bf
 
 from bifrost.blocks.sigproc   import read_sigproc
-from bifrost.blocks.copy      import copy, CopyBlock
+from bifrost.blocks.copy      import copy
 from bifrost.blocks.transpose import transpose
 from bifrost.blocks.fdmt      import fdmt
 
-class CallbackBlock(CopyBlock):
-        """Testing-only block which calls user-defined
-            functions on sequence and on data"""
-	def __init__(self, iring, seq_callback, data_callback, *args, **kwargs):
-		super(CallbackBlock, self).__init__(iring, *args, **kwargs)
-		self.seq_callback  = seq_callback
-		self.data_callback = data_callback
-	def on_sequence(self, iseq):
-		self.seq_callback(iseq)
-		return super(CallbackBlock, self).on_sequence(iseq)
-	def on_data(self, ispan, ospan):
-		self.data_callback(ispan, ospan)
-		return super(CallbackBlock, self).on_data(ispan, ospan)
+from test_pipeline_cpu import CallbackBlock
 
 class PipelineTest(unittest.TestCase):
 	def setUp(self):
@@ -106,4 +94,3 @@ class PipelineTest(unittest.TestCase):
 			data = transpose(data, ['time', 'pol', 'dispersion'])
 			data = copy(data, space='cuda_host')
 			pipeline.run()
-	
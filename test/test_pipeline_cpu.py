@@ -0,0 +1,330 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import os
+import time
+import json
+import threading
+import numpy as np
+import bifrost as bf
+import bifrost.pipeline as bfp
+
+from bifrost.blocks.copy      import copy, CopyBlock
+from bifrost.blocks.scrunch   import scrunch
+from bifrost.blocks.quantize  import quantize
+from bifrost.blocks.reduce    import reduce
+from bifrost.blocks.detect    import detect_integrate
+
+class CallbackBlock(CopyBlock):
+        """Testing-only block which calls user-defined
+            functions on sequence and on data"""
+	def __init__(self, iring, seq_callback, data_callback, *args, **kwargs):
+		super(CallbackBlock, self).__init__(iring, *args, **kwargs)
+		self.seq_callback  = seq_callback
+		self.data_callback = data_callback
+	def on_sequence(self, iseq):
+		self.seq_callback(iseq)
+		return super(CallbackBlock, self).on_sequence(iseq)
+	def on_data(self, ispan, ospan):
+		self.data_callback(ispan, ospan)
+		return super(CallbackBlock, self).on_data(ispan, ospan)
+
+def notify_on_sequence(block):
+	"""Makes block set its sequence_started event when it opens its input
+	    sequences, and returns it"""
+	block.sequence_started = threading.Event()
+	on_sequence = block.on_sequence
+	def on_sequence_and_notify(*args, **kwargs):
+		block.sequence_started.set()
+		return on_sequence(*args, **kwargs)
+	block.on_sequence = on_sequence_and_notify
+	return block
+
+def wait_for_sinks(source, timeout=10.):
+	"""Waits until every block in source's pipeline that has a
+	    sequence_started event has opened its input sequences. Each block
+	    opens its input sequences before it begins its output ones, so every
+	    block upstream of those sinks is then reading the source's data."""
+	# Note: The timeout only stops a failing test from hanging
+	stop_time = time.time() + timeout
+	for block in source.pipeline.blocks:
+		if hasattr(block, 'sequence_started'):
+			block.sequence_started.wait(max(stop_time - time.time(), 0.))
+
+def wait_for_sinks_before_writing(source):
+	"""Makes source call wait_for_sinks after beginning its sequences, and
+	    returns it"""
+	begin_sequences = source.begin_sequences
+	def begin_sequences_and_wait(*args, **kwargs):
+		oseqs = begin_sequences(*args, **kwargs)
+		wait_for_sinks(source)
+		return oseqs
+	source.begin_sequences = begin_sequences_and_wait
+	return source
+
+class NumpySourceBlock(bfp.SourceBlock):
+	"""Testing-only block which streams a numpy array with shape
+	    [time, ...] as a single sequence (of dtype f32 or cf32 by default)"""
+	def __init__(self, array, gulp_nframe, dtype=None, *args, **kwargs):
+		super(NumpySourceBlock, self).__init__(['array'], gulp_nframe,
+		                                       *args, **kwargs)
+		self.array = array
+		if dtype is None:
+			dtype = 'cf32' if np.iscomplexobj(array) else 'f32'
+		self.dtype = dtype
+	def create_reader(self, sourcename):
+		self.offset = 0
+		return open('/dev/null', 'r')
+	def on_sequence(self, reader, sourcename):
+		ndim = self.array.ndim
+		return [{'name': sourcename,
+		         '_tensor': {'dtype':  self.dtype,
+		                     'shape':  [-1] + list(self.array.shape[1:]),
+		                     'labels': ['time'] + ['dim%i' % i for i in xrange(1, ndim)],
+		                     'scales': [[0, 1]] * ndim,
+		                     'units':  [None] * ndim}}]
+	def begin_sequences(self, *args, **kwargs):
+		oseqs = super(NumpySourceBlock, self).begin_sequences(*args, **kwargs)
+		wait_for_sinks(self)
+		return oseqs
+	def on_data(self, reader, ospans):
+		chunk = self.array[self.offset:self.offset+ospans[0].nframe]
+		ospans[0].data[:len(chunk)] = chunk
+		self.offset += len(chunk)
+		return [len(chunk)]
+
+class GatherSinkBlock(bfp.SinkBlock):
+	"""Testing-only block which collects all data it receives"""
+	def __init__(self, iring, *args, **kwargs):
+		super(GatherSinkBlock, self).__init__(iring, *args, **kwargs)
+		self.result = []
+		notify_on_sequence(self)
+	def on_sequence(self, iseq):
+		pass
+	def on_data(self, ispan):
+		self.result.append(ispan.data.copy())
+
+class SlowGatherSinkBlock(GatherSinkBlock):
+	"""Testing-only block which collects all data it receives, slowly"""
+	def on_data(self, ispan):
+		time.sleep(0.01)
+		super(SlowGatherSinkBlock, self).on_data(ispan)
+
+class HoldLastFrameBlock(CopyBlock):
+	"""Testing-only block which holds back the last frame of each gulp until
+	    the next gulp, or until the end of the sequence"""
+	def on_sequence(self, iseq):
+		self.held = None
+		return super(HoldLastFrameBlock, self).on_sequence(iseq)
+	def on_data(self, ispan, ospan):
+		idata = ispan.data.view(np.ndarray)
+		odata = ospan.data.view(np.ndarray)
+		nheld = 0 if self.held is None else 1
+		odata[:nheld] = self.held
+		odata[nheld:nheld+ispan.nframe-1] = idata[:-1]
+		self.held = idata[-1].copy()
+		return nheld + ispan.nframe - 1
+	def define_flush_nframes(self):
+		return 0 if self.held is None else 1
+	def on_flush(self, ospan):
+		ospan.data.view(np.ndarray)[0] = self.held
+		self.held = None
+
+class CpuPipelineTest(unittest.TestCase):
+	"""Pipeline tests that need neither a GPU nor test data"""
+	def test_fused_chain(self):
+		gulp_nframe = 16
+		idata = np.arange(100*3, dtype=np.float32).reshape((100,3))
+		def check_data(ispan, ospan):
+			self.assertLessEqual(ispan.nframe, gulp_nframe // 4)
+			self.assertEqual(ispan.data.shape, (ispan.nframe,3))
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, gulp_nframe)
+			with bf.block_scope(fuse=True):
+				data = copy(data)
+				data = scrunch(data, 4)
+				data = CallbackBlock(data, lambda seq: None, check_data)
+			sink = GatherSinkBlock(data)
+			runners = pipeline._get_runners()
+			self.assertEqual(len(runners), 3)
+			self.assertIsInstance(runners[1], bfp.FusedBlockChain)
+			self.assertEqual(len(runners[1].blocks), 3)
+			pipeline.run()
+		odata = np.concatenate(sink.result)
+		np.testing.assert_allclose(odata, idata.reshape((25,4,3)).mean(axis=1))
+	def test_flush(self):
+		idata = np.arange(100*3, dtype=np.float32).reshape((100,3))
+		for fuse in [False, True]:
+			with bf.Pipeline() as pipeline:
+				data = NumpySourceBlock(idata, 16)
+				with bf.block_scope(fuse=fuse):
+					data = copy(data)
+					data = HoldLastFrameBlock(data)
+					data = copy(data)
+				sink = GatherSinkBlock(data)
+				pipeline.run()
+			np.testing.assert_equal(np.concatenate(sink.result), idata)
+	def test_tune(self):
+		idata = np.arange(4096*3, dtype=np.float32).reshape((4096,3))
+		def build():
+			data = NumpySourceBlock(idata, 64)
+			data = copy(data)
+			GatherSinkBlock(data)
+		config = bf.tuning.tune(build, gulp_nframes=[32, 128],
+		                        buffer_factors=[1, 2])
+		with bf.Pipeline() as pipeline:
+			build()
+			names = [block.name for block in pipeline.blocks]
+			# Note: Readers only get a buffer_factor if buffering was faster
+			self.assertTrue(set(config.keys()).issubset(names))
+			self.assertIn(config[names[0]]['gulp_nframe'], [32, 128])
+			pipeline.run(config=config)
+		self.assertEqual(pipeline.blocks[0].gulp_nframe,
+		                 config[names[0]]['gulp_nframe'])
+		odata = np.concatenate(pipeline.blocks[-1].result)
+		np.testing.assert_equal(odata, idata)
+	def test_trace(self):
+		idata = np.arange(256*4, dtype=np.float32).reshape((256,4))
+		filename = 'test_pipeline_trace.json'
+		bf.tracing.enable(filename)
+		try:
+			with bf.Pipeline() as pipeline:
+				data = NumpySourceBlock(idata, 32)
+				data = copy(data)
+				sink = GatherSinkBlock(data)
+				pipeline.run()
+		finally:
+			bf.tracing.disable()
+		with open(filename, 'r') as f:
+			events = json.load(f)['traceEvents']
+		os.remove(filename)
+		thread_names = [event['args']['name'] for event in events
+		                if event['ph'] == 'M']
+		self.assertEqual(sorted(thread_names),
+		                 sorted([block.name for block in pipeline.blocks]))
+		sink_events = [event for event in events
+		               if event['ph'] == 'X' and event['cat'] == sink.name]
+		for stage in ['acquire', 'reserve', 'process', 'commit']:
+			offsets = [event['args']['frame_offset'] for event in sink_events
+			           if event['name'] == stage]
+			self.assertEqual(offsets, range(0, 256, 32))
+		for event in events:
+			if event['ph'] == 'X':
+				self.assertGreaterEqual(event['dur'], 0)
+	def test_quantize_auto_scale(self):
+		rms = np.array([1., 10., 100.], dtype=np.float32)
+		idata = np.random.normal(0, 1, size=(4096,3)).astype(np.float32) * rms
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, 256)
+			qblock = quantize(data, 'i8', scale='auto', axis='dim1')
+			sink = GatherSinkBlock(qblock)
+			pipeline.run()
+		np.testing.assert_allclose(qblock.scales, qblock.target_rms / rms,
+		                           rtol=0.1)
+		odata = np.concatenate(sink.result).astype(np.float32)
+		np.testing.assert_allclose(odata.std(axis=0), qblock.target_rms,
+		                           rtol=0.1)
+		self.assertEqual(qblock.clip_fraction.shape, (3,))
+	def test_reduce(self):
+		idata = np.random.normal(size=(1000,6,4)).astype(np.float32)
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, 80)
+			time_sink = GatherSinkBlock(reduce(data, 'time', 8, op='max'))
+			dim1_sink = GatherSinkBlock(reduce(data, 'dim1', 3, op='pwrmean'))
+			pipeline.run()
+		np.testing.assert_allclose(np.concatenate(time_sink.result),
+		                           idata.reshape((125,8,6,4)).max(axis=1))
+		np.testing.assert_allclose(np.concatenate(dim1_sink.result),
+		                           (idata**2).reshape((1000,2,3,4)).mean(axis=2),
+		                           rtol=1e-5)
+	def test_reduce_partial_frame(self):
+		# Note: The last gulp has 43 frames, which leaves 3 frames over
+		idata = np.random.normal(size=(1003,6)).astype(np.float32)
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, 80)
+			sink = GatherSinkBlock(reduce(data, 'time', 8))
+			pipeline.run()
+		np.testing.assert_allclose(np.concatenate(sink.result),
+		                           idata[:1000].reshape((125,8,6)).sum(axis=1),
+		                           rtol=1e-5)
+		# Note: The last gulp has fewer frames than the reduce factor
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata[:965], 80)
+			sink = GatherSinkBlock(reduce(data, 'time', 8))
+			pipeline.run()
+		self.assertEqual(sum(len(chunk) for chunk in sink.result), 120)
+	def test_detect_integrate(self):
+		shape = (1000,2,8)
+		idata = (np.random.normal(size=shape) +
+		         1j*np.random.normal(size=shape)).astype(np.complex64)
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, 96)
+			sink = GatherSinkBlock(detect_integrate(data, 'stokes', 10, axis='dim1'))
+			pipeline.run()
+		x, y = idata[:,0], idata[:,1]
+		xx, yy, xy = np.abs(x)**2, np.abs(y)**2, x*y.conj()
+		known = np.stack([xx + yy, xx - yy, 2*xy.real, -2*xy.imag], axis=1)
+		known = known.reshape((100,10,4,8)).sum(axis=1)
+		np.testing.assert_allclose(np.concatenate(sink.result), known,
+		                           rtol=1e-4, atol=1e-4)
+	def test_spill(self):
+		idata = np.arange(4096*4, dtype=np.float32).reshape((4096,4))
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, 64)
+			data.orings[0].enable_spill('test_pipeline_spill.dat')
+			# Note: The unguaranteed sink falls far behind the source, but
+			#         catches up from the spill file instead of losing data.
+			sink = SlowGatherSinkBlock(data, guarantee=False)
+			pipeline.run()
+			spill_info = data.orings[0].spill_info
+			proclogs = bf.proclog.load_by_pid(os.getpid())
+			data.orings[0].disable_spill()
+		np.testing.assert_equal(np.concatenate(sink.result), idata)
+		self.assertGreater(spill_info['nbyte_recovered'], 0)
+		self.assertEqual(spill_info['nbyte_stored'], 0)
+		self.assertIn('reader_lag', proclogs[sink.name]['spill0'])
+	def test_skip_to_latest(self):
+		idata = np.arange(4096*4, dtype=np.float32).reshape((4096,4))
+		with bf.Pipeline() as pipeline:
+			data = NumpySourceBlock(idata, 64)
+			# Note: The monitoring sink falls behind the source, so it skips
+			#         ahead to the latest data instead of reading every gulp.
+			monitor = SlowGatherSinkBlock(data, skip_to_latest=True)
+			sink = GatherSinkBlock(data)
+			pipeline.run()
+			proclogs = bf.proclog.load_by_pid(os.getpid())
+		np.testing.assert_equal(np.concatenate(sink.result), idata)
+		self.assertFalse(monitor.guarantee)
+		nframe_read = sum(len(chunk) for chunk in monitor.result)
+		self.assertLess(nframe_read, len(idata))
+		np.testing.assert_equal(monitor.result[-1], idata[-64:])
+		latest = proclogs[monitor.name]['latest0']
+		self.assertEqual(int(latest['nframe_read']), nframe_read)
+		self.assertEqual(int(latest['nframe_read']) +
+		                 int(latest['nframe_skipped']), len(idata))
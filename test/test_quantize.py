@@ -50,3 +50,56 @@ class QuantizeTest(unittest.TestCase):
 		self.run_quantize_from_cf32_test('ci16')
 	def test_cf32_to_ci32(self):
 		self.run_quantize_from_cf32_test('ci32')
+	def test_cf32_to_ci4(self):
+		iarray = bf.ndarray([[0.4+0.5j, 1.4-1.6j],
+		                     [6.6+9.0j, -9.0-6.6j]],
+		                    dtype='cf32')
+		oarray = bf.ndarray(shape=iarray.shape, dtype='ci4')
+		bf.quantize.quantize(iarray, oarray)
+		# Note: The real part is packed into the most significant bits
+		np.testing.assert_equal(oarray.view(np.uint8),
+		                        [[0x00, 0x1E], [0x77, 0x99]])
+	def test_cf32_to_ci2(self):
+		iarray = bf.ndarray([0.4-0.6j, 3.-3.j, 0.+0.6j, 0.5-1.5j],
+		                    dtype='cf32')
+		oarray = bf.ndarray(shape=iarray.shape, dtype='ci2')
+		bf.quantize.quantize(iarray, oarray)
+		# 0,-1,1,-1 and 0,1,0,-1
+		np.testing.assert_equal(oarray.view(np.uint8), [0x37, 0x13])
+	def test_f32_to_i8_large(self):
+		# Note: Covers the multi-threaded code path
+		iarray = np.random.normal(0, 64, size=(7, 100003)).astype(np.float32)
+		oarray = bf.ndarray(shape=iarray.shape, dtype='i8')
+		bf.quantize.quantize(bf.asarray(iarray), oarray, scale=0.5)
+		np.testing.assert_equal(np.array(oarray),
+		                        np.clip(np.rint(iarray * 0.5), -127, 127))
+	def run_quantize_channels_test(self, shape, axis):
+		nchan = shape[axis]
+		chan_shape = [1] * len(shape)
+		chan_shape[axis] = nchan
+		rms = np.arange(1, nchan + 1).reshape(chan_shape)
+		iarray = (np.random.normal(0, 1, size=shape) * rms).astype(np.float32)
+		scales = 16. / np.arange(1, nchan + 1)
+		oarray = bf.ndarray(shape=shape, dtype='i8')
+		sumsq = np.zeros(nchan, dtype=np.float64)
+		nclip = np.zeros(nchan, dtype=np.uint64)
+		bf.quantize.quantize(bf.asarray(iarray), oarray, scales, axis,
+		                     sumsq, nclip)
+		scaled = iarray * scales.reshape(chan_shape)
+		other_axes = tuple(d for d in range(len(shape)) if d != axis)
+		np.testing.assert_equal(np.array(oarray),
+		                        np.clip(np.rint(scaled), -127, 127))
+		np.testing.assert_allclose(sumsq, (iarray.astype(np.float64)**2).sum(axis=other_axes),
+		                           rtol=1e-4)
+		np.testing.assert_equal(nclip, (np.abs(scaled) >= 127.5).sum(axis=other_axes))
+	def test_quantize_channels_inner_axis(self):
+		self.run_quantize_channels_test((4096, 2, 16), 2)
+	def test_quantize_channels_outer_axis(self):
+		self.run_quantize_channels_test((8, 4, 1000), 1)
+	def test_empty(self):
+		iarray = bf.ndarray(np.zeros((0, 4), np.float32))
+		oarray = bf.ndarray(shape=(0, 4), dtype='i8')
+		bf.quantize.quantize(iarray, oarray, 1.)
+		sumsq = np.zeros(4, dtype=np.float64)
+		bf.quantize.quantize(iarray, oarray, np.ones(4), 1, sumsq)
+		np.testing.assert_equal(sumsq, 0)
@@ -0,0 +1,109 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import unittest
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import bifrost as bf
+from bifrost.blocks import read_recording, write_recording
+from bifrost.blocks.recording import RecordingFile, RecordingSourceBlock
+
+from test_pipeline_cpu import NumpySourceBlock, GatherSinkBlock
+from test_pipeline_cpu import notify_on_sequence, wait_for_sinks_before_writing
+
+class SlowNumpySourceBlock(NumpySourceBlock):
+	"""Testing-only block which streams a numpy array at a fixed gulp rate"""
+	def on_data(self, reader, ospans):
+		time.sleep(0.05)
+		return super(SlowNumpySourceBlock, self).on_data(reader, ospans)
+
+class RecordingTest(unittest.TestCase):
+	def setUp(self):
+		self.path = tempfile.mkdtemp(prefix='bf_test_recording_')
+	def tearDown(self):
+		shutil.rmtree(self.path)
+	def record(self, idata, gulp_nframe, source=NumpySourceBlock):
+		with bf.Pipeline() as pipeline:
+			data = source(idata, gulp_nframe)
+			notify_on_sequence(write_recording(data, self.path))
+			sink = GatherSinkBlock(data)
+			pipeline.run()
+		return sink
+	def replay(self, gulp_nframe, rate=None):
+		with bf.Pipeline() as pipeline:
+			filenames = sorted(os.listdir(self.path))
+			filenames = [os.path.join(self.path, name) for name in filenames]
+			data = wait_for_sinks_before_writing(
+				RecordingSourceBlock(filenames, gulp_nframe, rate))
+			sink = GatherSinkBlock(data)
+			start_time = time.time()
+			pipeline.run()
+			run_time = time.time() - start_time
+		return np.concatenate(sink.result), run_time
+	def test_index(self):
+		idata = np.arange(1000*6, dtype=np.float32).reshape((1000,2,3))
+		self.record(idata, 64)
+		filename = os.path.join(self.path, 'sequence000000.bfrec')
+		with RecordingFile(filename) as recording:
+			self.assertEqual(recording.header['name'], 'array')
+			self.assertEqual(recording.header['_tensor']['shape'], [-1,2,3])
+			self.assertEqual(recording.nframe, 1000)
+			self.assertEqual([offset for offset, _, _, _ in recording.index],
+			                 range(0, 1000, 64))
+	def test_read_directory(self):
+		idata = np.arange(100, dtype=np.float32).reshape((100,1))
+		self.record(idata, 10)
+		with bf.Pipeline() as pipeline:
+			block = read_recording(self.path, 10)
+		self.assertEqual(block.sourcenames,
+		                 [os.path.join(self.path, 'sequence000000.bfrec')])
+	def test_replay(self):
+		idata = np.arange(1000*6, dtype=np.float32).reshape((1000,2,3))
+		self.record(idata, 64)
+		# Note: The replay gulp size need not match the recorded span size
+		odata, _ = self.replay(100)
+		np.testing.assert_equal(odata, idata)
+	def test_replay_complex(self):
+		shape = (500,4)
+		idata = (np.random.normal(size=shape) +
+		         1j*np.random.normal(size=shape)).astype(np.complex64)
+		self.record(idata, 48)
+		odata, _ = self.replay(32)
+		np.testing.assert_equal(odata, idata)
+	def test_replay_rate(self):
+		idata = np.arange(8*16*4, dtype=np.float32).reshape((8*16,4))
+		self.record(idata, 16, source=SlowNumpySourceBlock)
+		odata, fast_time = self.replay(16)
+		np.testing.assert_equal(odata, idata)
+		odata, paced_time = self.replay(16, rate=1.0)
+		np.testing.assert_equal(odata, idata)
+		# The 8 gulps were captured 0.05s apart
+		self.assertGreater(paced_time, 0.3)
+		self.assertLess(fast_time, paced_time)
@@ -0,0 +1,106 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import numpy as np
+import bifrost as bf
+import bifrost.reduce
+
+NP_OPS = {'sum': np.sum, 'mean': np.mean, 'min': np.min, 'max': np.max}
+
+class ReduceTest(unittest.TestCase):
+	def run_reduce_test(self, shape, axis, factor, op, dtype=np.float32):
+		idata = np.random.normal(0, 10, size=shape)
+		if np.issubdtype(dtype, np.complexfloating):
+			idata = idata + 1j*np.random.normal(0, 10, size=shape)
+		idata = idata.astype(dtype)
+		oshape = list(shape)
+		oshape[axis] //= factor
+		if op.startswith('pwr'):
+			odtype = np.float32
+			known = np.abs(idata.astype(np.complex128))**2
+			np_op = NP_OPS[op[3:]]
+		else:
+			odtype = np.complex64 if np.iscomplexobj(idata) else np.float32
+			known = idata.astype(np.complex128 if odtype == np.complex64 else np.float64)
+			np_op = NP_OPS[op]
+		known = np_op(known.reshape(shape[:axis] + (shape[axis] // factor, factor) +
+		                            shape[axis+1:]), axis=axis+1)
+		odata = bf.ndarray(shape=oshape, dtype=odtype)
+		bf.reduce.reduce(bf.asarray(idata), odata, op)
+		np.testing.assert_allclose(np.array(odata), known, rtol=1e-4, atol=1e-3)
+	def test_reduce_ops(self):
+		for op in ['sum', 'mean', 'min', 'max',
+		           'pwrsum', 'pwrmean', 'pwrmin', 'pwrmax']:
+			self.run_reduce_test((64, 3, 17), 0, 8, op)
+	def test_reduce_inner_axis(self):
+		self.run_reduce_test((5, 3, 96), 2, 4, 'mean')
+	def test_reduce_middle_axis(self):
+		self.run_reduce_test((5, 12, 7), 1, 3, 'max')
+	def test_reduce_whole_axis(self):
+		self.run_reduce_test((6, 4, 5), 1, 4, 'sum')
+	def test_reduce_large(self):
+		# Note: Covers the multi-threaded, chunked code path
+		self.run_reduce_test((16, 3, 10000), 0, 4, 'sum')
+	def test_reduce_complex(self):
+		self.run_reduce_test((32, 2, 9), 0, 4, 'mean', np.complex64)
+		self.run_reduce_test((32, 2, 9), 2, 3, 'sum', np.complex64)
+		self.run_reduce_test((32, 2, 9), 0, 4, 'pwrsum', np.complex64)
+		self.run_reduce_test((32, 2, 9), 2, 3, 'pwrmax', np.complex64)
+	def test_reduce_int8(self):
+		idata = np.arange(-64, 64, dtype=np.int8).reshape((16, 8))
+		odata = bf.ndarray(shape=(4, 8), dtype='f32')
+		bf.reduce.reduce(bf.asarray(idata), odata, 'pwrsum')
+		known = (idata.astype(np.float32)**2).reshape((4, 4, 8)).sum(axis=1)
+		np.testing.assert_equal(np.array(odata), known)
+	def test_reduce_strided(self):
+		idata = np.random.normal(size=(12, 6, 20)).astype(np.float32)
+		odata = bf.ndarray(shape=(12, 6, 10), dtype='f32')
+		bf.reduce.reduce(bf.asarray(idata)[:, 1:5, :], odata[:, 1:5, :5], 'mean')
+		known = idata[:, 1:5, :].reshape((12, 4, 5, 4)).mean(axis=3)
+		np.testing.assert_allclose(np.array(odata)[:, 1:5, :5], known, rtol=1e-5, atol=1e-6)
+	def test_reduce_accumulate(self):
+		idata = np.random.normal(size=(8, 5)).astype(np.float32)
+		odata = bf.asarray(np.ones((2, 5), dtype=np.float32))
+		bf.reduce.reduce(bf.asarray(idata), odata, 'sum', accumulate=True)
+		known = 1 + idata.reshape((2, 4, 5)).sum(axis=1)
+		np.testing.assert_allclose(np.array(odata), known, rtol=1e-5)
+		odata = bf.asarray(np.zeros((2, 5), dtype=np.float32))
+		bf.reduce.reduce(bf.asarray(idata), odata, 'max', accumulate=True)
+		known = np.maximum(0, idata.reshape((2, 4, 5)).max(axis=1))
+		np.testing.assert_equal(np.array(odata), known)
+		self.assertRaises(RuntimeError, bf.reduce.reduce,
+		                  bf.asarray(idata), odata, 'mean', True)
+	def test_reduce_invalid_shape(self):
+		idata = bf.ndarray(shape=(12, 6), dtype='f32')
+		odata = bf.ndarray(shape=(5, 6), dtype='f32')
+		self.assertRaises(RuntimeError, bf.reduce.reduce, idata, odata)
+		# Note: A zero-length input axis cannot be reduced to a non-zero one
+		idata = bf.ndarray(shape=(0, 6), dtype='f32')
+		odata = bf.ndarray(shape=(2, 6), dtype='f32')
+		self.assertRaises(RuntimeError, bf.reduce.reduce, idata, odata)
@@ -0,0 +1,205 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import os
+import numpy as np
+import bifrost as bf
+from bifrost.ring2 import Ring
+
+class RingTest(unittest.TestCase):
+	def write_and_read(self, nframe=5000, nchan=13, gulp_nframe=39):
+		"""Streams data through a ring, reading back each span as soon as it
+		is written, and returns the ring"""
+		# Note: Gulps of 39*13 frames do not divide the (power-of-2) ring
+		#         size, so spans regularly wrap around the end of the buffer.
+		idata = np.arange(nframe*nchan, dtype=np.float32).reshape((nframe,nchan))
+		ring = Ring(space='system')
+		header = {'name': 'test', 'time_tag': 0, 'gulp_nframe': gulp_nframe,
+		          '_tensor': {'dtype': 'f32', 'shape': [-1, nchan]}}
+		with ring.begin_writing() as writer:
+			with writer.begin_sequence(header, 3*gulp_nframe) as oseq:
+				with ring.open_earliest_sequence() as iseq:
+					for offset in xrange(0, nframe, gulp_nframe):
+						chunk = idata[offset:offset+gulp_nframe]
+						with oseq.reserve(len(chunk)) as ospan:
+							ospan.data[...] = chunk
+						with iseq.acquire(offset, len(chunk)) as ispan:
+							np.testing.assert_equal(ispan.data, chunk)
+		return ring
+	def test_mirrored(self):
+		ring = self.write_and_read()
+		self.assertTrue(ring.mirrored)
+		# The second half of the buffer maps the same memory as the first
+		self.assertEqual(ring.nbyte, 8192)
+	def test_ghost_region(self):
+		os.environ['BIFROST_RING_MIRROR'] = '0'
+		try:
+			ring = self.write_and_read()
+		finally:
+			del os.environ['BIFROST_RING_MIRROR']
+		self.assertFalse(ring.mirrored)
+	def write_and_lag(self, lag_ngulp, max_nbyte=0, nringlet=1,
+	                  nframe=1989, nchan=13, gulp_nframe=39):
+		"""Streams data through a ring with spilling enabled while an
+		unguaranteed reader lags lag_ngulp gulps behind the writer, and
+		returns the spans the reader received and the spill statistics"""
+		idata = np.arange(nringlet*nframe*nchan, dtype=np.float32)
+		idata = idata.reshape((nringlet,nframe,nchan))
+		spill_path = '/tmp/bifrost_test_ring_spill.dat'
+		ring = Ring(space='system')
+		ring.enable_spill(spill_path, max_nbyte)
+		header = {'name': 'test', 'time_tag': 0, 'gulp_nframe': gulp_nframe,
+		          '_tensor': {'dtype': 'f32', 'shape': [nringlet, -1, nchan]}}
+		offsets = range(0, nframe, gulp_nframe)
+		received = []
+		def read_gulp(iseq, offset):
+			with iseq.acquire(offset, gulp_nframe) as ispan:
+				begin = ispan.frame_offset
+				received.append((begin, ispan.nframe))
+				np.testing.assert_equal(
+					ispan.data, idata[:,begin:begin+ispan.nframe])
+		with ring.begin_writing() as writer:
+			with writer.begin_sequence(header, 3*gulp_nframe) as oseq:
+				with ring.open_earliest_sequence(guarantee=False) as iseq:
+					for i, offset in enumerate(offsets):
+						with oseq.reserve(gulp_nframe) as ospan:
+							ospan.data[...] = idata[:,offset:offset+gulp_nframe]
+						if i >= lag_ngulp:
+							read_gulp(iseq, offsets[i-lag_ngulp])
+					spill_info = ring.spill_info
+					for offset in offsets[len(offsets)-lag_ngulp:]:
+						read_gulp(iseq, offset)
+		final_spill_info = ring.spill_info
+		ring.disable_spill()
+		self.assertFalse(os.path.exists(spill_path))
+		# Everything spilled has been read, so the spill file is empty
+		self.assertEqual(final_spill_info['nbyte_stored'], 0)
+		return received, spill_info
+	def check_spill(self, nringlet=1):
+		received, spill_info = self.write_and_lag(10, nringlet=nringlet)
+		# The reader lags beyond the ring's capacity yet misses nothing
+		self.assertEqual(received, [(offset, 39)
+		                            for offset in xrange(0, 1989, 39)])
+		self.assertGreater(spill_info['nbyte_spilled'], 0)
+		self.assertGreater(spill_info['nbyte_recovered'], 0)
+		self.assertEqual(spill_info['nbyte_dropped'], 0)
+		self.assertEqual(spill_info['reader_lag'], 10*39*13*4)
+	def test_spill(self):
+		self.check_spill()
+	def test_spill_ringlets(self):
+		self.check_spill(nringlet=2)
+	def test_spill_ghost_region(self):
+		os.environ['BIFROST_RING_MIRROR'] = '0'
+		try:
+			self.check_spill()
+		finally:
+			del os.environ['BIFROST_RING_MIRROR']
+	def test_spill_max_nbyte(self):
+		# Note: Frames of 16 channels divide the ring size, which keeps the
+		#         partially-overwritten spans that are returned frame-aligned.
+		received, spill_info = self.write_and_lag(10, max_nbyte=4*39*16*4,
+		                                          nchan=16)
+		# Only part of the lagging data fits on disk
+		self.assertGreater(spill_info['nbyte_dropped'], 0)
+		self.assertLess(sum(nframe for _, nframe in received), 1989)
+	def test_no_lag(self):
+		received, spill_info = self.write_and_lag(0)
+		self.assertEqual(spill_info['nbyte_spilled'], 0)
+	def write_sequences(self, nsequence=100, nframe=2, nchan=4):
+		"""Writes many short sequences with time_tags 1000, 1010, ... and
+		frame times (in ms) starting at each time_tag, and returns the ring"""
+		ring = Ring(space='system')
+		with ring.begin_writing() as writer:
+			for i in xrange(nsequence):
+				time_tag = 1000 + 10*i
+				header = {'name': 'seq%i' % i, 'time_tag': time_tag,
+				          'gulp_nframe': nframe,
+				          '_tensor': {'dtype': 'f32', 'shape': [-1, nchan],
+				                      'scales': [[time_tag, 5], [0, 1]],
+				                      'units': ['ms', None]}}
+				with writer.begin_sequence(header, nsequence*nframe) as oseq:
+					with oseq.reserve(nframe) as ospan:
+						ospan.data[...] = np.arange(nframe)[:,None] + 100*i
+		return ring
+	def test_open_sequence_at(self):
+		ring = self.write_sequences()
+		with ring.open_sequence_at(1550) as iseq:
+			self.assertEqual(iseq.name, 'seq55')
+		with ring.open_sequence_at(1555) as iseq:
+			self.assertEqual(iseq.name, 'seq55')
+			self.assertEqual(iseq.time_tag, 1550)
+		with self.assertRaises(RuntimeError):
+			ring.open_sequence_at(999)
+	def test_open_sequence_before(self):
+		ring = self.write_sequences()
+		with ring.open_sequence_before(1550) as iseq:
+			self.assertEqual(iseq.name, 'seq54')
+		with ring.open_sequence_before(1555) as iseq:
+			self.assertEqual(iseq.name, 'seq55')
+		with self.assertRaises(RuntimeError):
+			ring.open_sequence_before(1000)
+	def test_read_at_time(self):
+		ring = self.write_sequences()
+		for iseq in ring.read(whence='at', time_tag=1555):
+			self.assertEqual(iseq.name, 'seq55')
+			offset = iseq.frame_offset_at(1555)
+			self.assertEqual(offset, 1)
+			self.assertEqual(iseq.frame_offset_at(1.550, units='s'), 0)
+			with iseq.acquire(offset, 1) as ispan:
+				np.testing.assert_equal(ispan.data, 5501)
+			break
+	def test_read_latest(self, nchan=4, gulp_nframe=10):
+		idata = np.arange(9*gulp_nframe*nchan, dtype=np.float32)
+		idata = idata.reshape((9*gulp_nframe,nchan))
+		ring = Ring(space='system')
+		header = {'name': 'test', 'time_tag': 0, 'gulp_nframe': gulp_nframe,
+		          '_tensor': {'dtype': 'f32', 'shape': [-1, nchan]}}
+		with ring.begin_writing() as writer:
+			oseq = writer.begin_sequence(header, 10*gulp_nframe)
+			self.offset = 0
+			def write(ngulp):
+				for i in xrange(ngulp):
+					with oseq.reserve(gulp_nframe) as ospan:
+						ospan.data[...] = idata[self.offset:self.offset+gulp_nframe]
+					self.offset += gulp_nframe
+			with ring.open_earliest_sequence(guarantee=False) as iseq:
+				spans = iseq.read_latest(gulp_nframe)
+				for ngulp, frame_offset, nframe_skipped in [(5, 40, 40),
+				                                            (1, 50, 0),
+				                                            (3, 80, 20)]:
+					write(ngulp)
+					self.assertEqual(iseq.size, self.offset*nchan*4)
+					ispan = next(spans)
+					self.assertEqual(ispan.frame_offset,   frame_offset)
+					self.assertEqual(ispan.nframe_skipped, nframe_skipped)
+					np.testing.assert_equal(
+						ispan.data, idata[frame_offset:frame_offset+gulp_nframe])
+				oseq.end()
+				with self.assertRaises(StopIteration):
+					next(spans)
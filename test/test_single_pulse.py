@@ -0,0 +1,153 @@
+
+# Copyright (c) 2016, The Bifrost Authors. All rights reserved.
+# Copyright (c) 2016, NVIDIA CORPORATION. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+# * Neither the name of The Bifrost Authors nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS ``AS IS'' AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE COPYRIGHT OWNER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY
+# OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+import numpy as np
+import bifrost as bf
+import bifrost.boxcar
+import bifrost.pipeline as bfp
+from bifrost.blocks import single_pulse_search
+
+from test_pipeline_cpu import GatherSinkBlock
+from test_fold import TensorSourceBlock, HeaderGatherSinkBlock
+
+def boxcar_known(idata, widths, ntime_out):
+	"""Returns the peak S/N and width index of each boxcar start"""
+	idata = idata.astype(np.float64)
+	median = np.median(idata, axis=1)[:, None]
+	sigma = 1.4826 * np.median(np.abs(idata - median), axis=1)[:, None]
+	sums = np.array([[[row[t:t+w].sum() for t in xrange(ntime_out)]
+	                  for row in idata - median] for w in widths])
+	snrs = sums / (sigma * np.sqrt(np.array(widths))[:, None, None])
+	return snrs.max(axis=0), snrs.argmax(axis=0)
+
+class SinglePulseTest(unittest.TestCase):
+	def setUp(self):
+		np.random.seed(1234)
+	def test_boxcar(self):
+		widths = [1, 3, 8]
+		idata = np.random.normal(size=(5, 107)).astype(np.float32)
+		idata[2, 40:43] += 3.
+		snr = bf.ndarray(shape=(5, 100), dtype='f32')
+		iwidth = bf.ndarray(shape=(5, 100), dtype='i32')
+		bf.boxcar.boxcar_filter(idata, np.array(widths, dtype=np.int32),
+		                        snr, iwidth)
+		known, known_iwidth = boxcar_known(idata, widths, 100)
+		np.testing.assert_allclose(np.array(snr), known, rtol=1e-4,
+		                           atol=1e-4)
+		self.assertEqual(snr[2].argmax(), 40)
+		self.assertEqual(iwidth[2, 40], 1)
+		np.testing.assert_equal(np.array(iwidth)[known > 2],
+		                        known_iwidth[known > 2])
+	def test_large(self):
+		# Note: Covers the multi-threaded code path
+		idata = np.random.normal(size=(300, 2000)).astype(np.float32)
+		widths = np.array([1, 16], dtype=np.int32)
+		snr = bf.ndarray(shape=(300, 1985), dtype='f32')
+		bf.boxcar.boxcar_filter(idata, widths, snr)
+		known, _ = boxcar_known(idata[::50], widths, 1985)
+		np.testing.assert_allclose(np.array(snr)[::50], known, rtol=1e-4,
+		                           atol=1e-4)
+	def test_constant(self):
+		idata = np.ones((2, 10), dtype=np.float32)
+		snr = bf.ndarray(shape=(2, 9), dtype='f32')
+		bf.boxcar.boxcar_filter(idata, np.array([2], dtype=np.int32), snr)
+		np.testing.assert_equal(np.array(snr), 0)
+	def test_invalid_width(self):
+		idata = np.zeros((2, 10), dtype=np.float32)
+		snr = bf.ndarray(shape=(2, 9), dtype='f32')
+		with self.assertRaises(RuntimeError):
+			bf.boxcar.boxcar_filter(idata, np.array([3], dtype=np.int32),
+			                        snr)
+	def run_search(self, idata, labels, gulp_nframe, **kwargs):
+		tensor = {'labels': labels,
+		          'scales': [[100., 1e-3], [10., 0.5], None][:idata.ndim],
+		          'units':  ['s', 'pc cm^-3', None][:idata.ndim]}
+		if labels[0] == 'dispersion':
+			tensor['scales'][:2] = tensor['scales'][1::-1]
+			tensor['units'][:2]  = tensor['units'][1::-1]
+		with bfp.Pipeline() as pipeline:
+			data = TensorSourceBlock(idata, gulp_nframe, tensor)
+			data = single_pulse_search(data, **kwargs)
+			sink = HeaderGatherSinkBlock(data)
+			pipeline.run()
+		return sink.header, np.concatenate(sink.result)
+	def test_block(self):
+		ntime, ndm = 4000, 16
+		idata = np.random.normal(size=(ntime, ndm, 1)).astype(np.float32)
+		# Pulses of (dm, sample, width); the second straddles a gulp boundary
+		pulses = [(3, 500, 4), (9, 1022, 8), (12, 3100, 1)]
+		for d, t, w in pulses:
+			idata[t:t+w, d, 0] += 10. / np.sqrt(w)
+			# Note: The pulse is weaker at neighbouring DMs
+			idata[t:t+w, d+1, 0] += 5. / np.sqrt(w)
+		header, cands = self.run_search(idata, ['time', 'dispersion', 'pol'],
+		                                1024, threshold=7.)
+		self.assertEqual(header['candidate_properties'],
+		                 ['dm', 'time', 'width', 'snr'])
+		self.assertEqual(header['candidate_units'],
+		                 ['pc cm^-3', 's', 's', None])
+		self.assertEqual(header['_tensor']['labels'],
+		                 ['candidate', 'property'])
+		self.assertEqual(cands.shape, (3, 4))
+		for cand, (d, t, w) in zip(cands, pulses):
+			self.assertAlmostEqual(cand[0], 10. + 0.5 * d)
+			self.assertAlmostEqual(cand[1], 100. + 1e-3 * t)
+			self.assertAlmostEqual(cand[2], 1e-3 * w)
+			self.assertGreater(cand[3], 9.)
+	def test_end_of_sequence(self):
+		ntime, ndm = 2000, 8
+		idata = np.random.normal(size=(ntime, ndm)).astype(np.float32)
+		# Note: This is the last sample that the widest boxcar can cover
+		idata[ntime - 64, 5] += 20.
+		header, cands = self.run_search(idata, ['time', 'dispersion'], 1000)
+		cand = cands[cands[:, 3].argmax()]
+		self.assertAlmostEqual(cand[0], 10. + 0.5 * 5)
+		self.assertAlmostEqual(cand[1], 100. + 1e-3 * (ntime - 64))
+		self.assertGreater(cand[3], 15.)
+	def test_end_of_sequence_whole_gulps(self):
+		ntime, ndm = 2000, 8
+		idata = np.random.normal(size=(ntime, ndm)).astype(np.float32)
+		# Note: With widths=[1] the gulps do not overlap, so the last one is
+		#         not cut short
+		idata[ntime - 1, 5] += 20.
+		header, cands = self.run_search(idata, ['time', 'dispersion'], 1000,
+		                                widths=[1])
+		cand = cands[cands[:, 3].argmax()]
+		self.assertAlmostEqual(cand[0], 10. + 0.5 * 5)
+		self.assertAlmostEqual(cand[1], 100. + 1e-3 * (ntime - 1))
+		self.assertGreater(cand[3], 15.)
+	def test_max_ncandidate(self):
+		ntime, ndm = 1000, 8
+		idata = np.random.normal(size=(ntime, ndm)).astype(np.float32)
+		for d in xrange(ndm):
+			idata[100 + 10*d, d] += 10. + 3*d
+		header, cands = self.run_search(idata, ['time', 'dispersion'], 1000,
+		                                widths=[1], max_ncandidate=3)
+		self.assertEqual(cands.shape, (3, 4))
+		np.testing.assert_allclose(cands[:, 0], 10. + 0.5 * np.arange(5, 8))
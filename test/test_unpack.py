@@ -30,6 +30,7 @@ import unittest
 import numpy as np
 import bifrost as bf
 import bifrost.unpack
+from bifrost.DataType import ci4
 
 class UnpackTest(unittest.TestCase):
 	def run_unpack_to_ci8_test(self, iarray):
@@ -64,3 +65,37 @@ class UnpackTest(unittest.TestCase):
 		                     [(0x87,),(0xA5,)]],
 		                    dtype='ci4')
 		self.run_unpack_to_ci8_test(iarray.byteswap().conj())
+	def run_unpack_random_ci4_test(self, shape, islice=None, oslice=None):
+		packed = np.random.randint(0, 256, size=shape).astype(np.uint8)
+		re = (packed.astype(np.int8) << 4) >> 4
+		im = packed.astype(np.int8) >> 4
+		ibuf = bf.ndarray(packed.view(ci4), dtype='ci4')
+		iarray = ibuf if islice is None else ibuf[islice]
+		if oslice is None:
+			oarray = bf.ndarray(shape=iarray.shape, dtype='ci8')
+		else:
+			oarray = bf.ndarray(shape=shape, dtype='ci8')[oslice]
+		bf.unpack.unpack(iarray, oarray)
+		oarray = np.array(oarray).view(np.int8).reshape(oarray.shape + (2,))
+		islice = islice or Ellipsis
+		np.testing.assert_equal(oarray[...,0], re[islice])
+		np.testing.assert_equal(oarray[...,1], im[islice])
+	def test_ci4_to_ci8_large(self):
+		# Note: Covers the vectorized, tail and multi-threaded code paths
+		self.run_unpack_random_ci4_test((3, 65537))
+	def test_ci4_to_ci8_padded(self):
+		self.run_unpack_random_ci4_test((5, 4, 37), islice=np.s_[:, :3, :])
+	def test_ci4_to_ci8_strided_output(self):
+		self.run_unpack_random_ci4_test((4, 6, 40), islice=np.s_[:, 1:4],
+		                                oslice=np.s_[:, 2:5])
+	def test_ci8_conjugate(self):
+		iarray = bf.ndarray([[(0, 1), (2, 3)],
+		                     [(4, 5), (6, 7)],
+		                     [(-8, -7), (-6, -5)]],
+		                    dtype='ci8')
+		oarray = bf.ndarray(shape=iarray.shape, dtype='ci8')
+		bf.unpack.unpack(iarray.conj(), oarray)
+		np.testing.assert_equal(oarray.view(np.int8)[...,1::2],
+		                        -iarray.view(np.int8)[...,1::2])
+		np.testing.assert_equal(oarray.view(np.int8)[...,0::2],
+		                        iarray.view(np.int8)[...,0::2])
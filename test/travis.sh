@@ -1,4 +1,7 @@
 #!/bin/bash
 # This file runs CPU-safe tests for travis-ci
 ./download_test_data.sh
-python -m unittest test_block test_sigproc test_resizing test_quantize test_unpack test_print_header
+python -m unittest test_block test_sigproc test_resizing test_quantize test_unpack test_print_header \
+    test_reduce test_detect test_kurtosis test_fold test_dedisperse test_single_pulse test_periodicity \
+    test_normalize test_pfb test_gridding test_recording test_archive test_numpy_function test_ring \
+    test_pipeline_cpu test_accumulate.TestCpuAccumulateBlock
@@ -0,0 +1,424 @@
+"""
+# benchmark_blocks.py
+
+This benchmark runs a set of standard CPU pipelines built from bifrost.blocks,
+fed by an in-memory synthetic source so that no test data is needed. For each
+pipeline, gulp size and OpenMP thread count it measures the throughput (GB/s of
+source data) and the per-gulp latency of every block, and writes the results to
+a JSON file. Passing a previous results file via --baseline flags any
+configuration whose throughput has dropped by more than --tolerance. Passing a
+directory written by bifrost.blocks.write_recording via --recording replays
+that (real) traffic as fast as possible in place of the synthetic source.
+
+    python benchmark_blocks.py -o results.json
+    python benchmark_blocks.py -o new.json --baseline results.json
+    python benchmark_blocks.py -p copy,scrunch --recording capture/
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import multiprocessing
+import numpy as np
+
+import bifrost as bf
+import bifrost.pipeline as bfp
+import bifrost.tracing
+from bifrost import blocks
+from bifrost.blocks import BinaryFileReadBlock, BinaryFileWriteBlock
+from bifrost.blocks.recording import RecordingFile, RECORDING_EXTENSION
+
+
+class SyntheticSourceBlock(bfp.SourceBlock):
+    """ Source block that streams random data from memory
+
+    Args:
+        nframe (int): Total number of frames to produce
+        nchan (int): Number of frequency channels per frame
+        gulp_nframe (int): Number of frames per gulp
+        dtype (str): bifrost dtype of the data, e.g. f32 or cf32
+        npol (int): Number of polarisations per frame
+    """
+    def __init__(self, nframe, nchan, gulp_nframe, dtype='f32', npol=1,
+                 *args, **kwargs):
+        super(SyntheticSourceBlock, self).__init__(['synthetic'], gulp_nframe,
+                                                   *args, **kwargs)
+        self.nframe = nframe
+        self.nchan  = nchan
+        self.npol   = npol
+        self.dtype  = dtype
+        shape = (gulp_nframe, npol, nchan)
+        data = np.random.normal(0, 8, size=shape).astype(np.float32)
+        if dtype.startswith('c'):
+            data = data + 1j * np.random.normal(0, 8, size=shape).astype(np.float32)
+        self.gulp_data = data
+        self.nframe_sent = 0
+
+    def create_reader(self, sourcename):
+        self.nframe_sent = 0
+        return open(os.devnull, 'r')
+
+    def on_sequence(self, ireader, sourcename):
+        ohdr = {'name': sourcename,
+                'source_name': 'synthetic',
+                '_tensor': {
+                    'dtype':  self.dtype,
+                    'shape':  [-1, self.npol, self.nchan],
+                    'labels': ['time', 'pol', 'freq'],
+                    'scales': [(1.5e9, 1e-3), None, (1400., -0.1)],
+                    'units':  ['s', None, 'MHz']}}
+        return [ohdr]
+
+    def on_data(self, reader, ospans):
+        ospan = ospans[0]
+        nframe = min(ospan.nframe, self.nframe - self.nframe_sent)
+        ospan.data[:nframe] = self.gulp_data[:nframe]
+        self.nframe_sent += nframe
+        return [nframe]
+
+
+class NullSinkBlock(bfp.SinkBlock):
+    """ Sink block that reads and discards its input """
+    def on_sequence(self, iseq):
+        pass
+
+    def on_data(self, ispan):
+        pass
+
+
+def _sigproc_file(tmpdir):
+    return os.path.join(tmpdir, 'synthetic.fil')
+
+
+def _binary_file(tmpdir):
+    return os.path.join(tmpdir, 'synthetic.bin')
+
+
+def _archive_dir(tmpdir, name):
+    path = os.path.join(tmpdir, name)
+    if not os.path.exists(path):
+        os.mkdir(path)
+    return path
+
+
+# Each benchmark is (source dtype, setup function, pipeline function). The setup
+#   function prepares any input files; the pipeline function builds the blocks
+#   downstream of the synthetic source (or replaces it) given the thread cores.
+def _setup_none(args, tmpdir):
+    pass
+
+
+def _setup_sigproc(args, tmpdir):
+    with bf.Pipeline() as pipeline:
+        data = SyntheticSourceBlock(args.nframe, args.nchan, 1024)
+        data = blocks.quantize(data, 'u8', scale=4.)
+        blocks.write_sigproc(data, path=tmpdir)
+        pipeline.run()
+
+
+def _setup_binary(args, tmpdir):
+    np.random.normal(0, 8, size=args.nframe * args.nchan).astype(
+        np.float32).tofile(_binary_file(tmpdir))
+
+
+def _setup_archive(args, tmpdir):
+    with bf.Pipeline() as pipeline:
+        data = SyntheticSourceBlock(args.nframe, args.nchan, 1024)
+        blocks.write_archive(data, _archive_dir(tmpdir, 'archive'))
+        pipeline.run()
+
+
+def _build_copy(src, cores, tmpdir):
+    NullSinkBlock(blocks.copy(src, core=cores))
+
+
+def _build_transpose(src, cores, tmpdir):
+    NullSinkBlock(blocks.transpose(src, ['pol', 'freq', 'time'], core=cores))
+
+
+def _build_scrunch(src, cores, tmpdir):
+    NullSinkBlock(blocks.scrunch(src, 4, core=cores))
+
+
+def _build_quantize_unpack(src, cores, tmpdir):
+    data = blocks.quantize(src, 'ci4', scale=4., core=cores)
+    NullSinkBlock(blocks.unpack(data, 'ci8', core=cores))
+
+
+def _scale(x, out):
+    np.multiply(x, 2, out=out)
+
+
+def _build_numpy_function(src, cores, tmpdir):
+    nthread = len(cores) if cores else 1
+    NullSinkBlock(blocks.numpy_function(src, _scale, nthread=nthread,
+                                        core=cores))
+
+
+def _build_kurtosis(src, cores, tmpdir):
+    NullSinkBlock(blocks.spectral_kurtosis(src, 64, core=cores))
+
+
+def _build_fold(src, cores, tmpdir):
+    NullSinkBlock(blocks.fold(src, 0.0337, 64, 50., subint=1., core=cores))
+
+
+def _build_dedisperse(src, cores, tmpdir):
+    NullSinkBlock(blocks.dedisperse(src, 500., core=cores))
+
+
+def _build_normalize(src, cores, tmpdir):
+    NullSinkBlock(blocks.normalize(src, 1024, core=cores))
+
+
+def _build_pfb(src, cores, tmpdir):
+    # Note: Each frame's channels are treated as the branches of the PFB
+    NullSinkBlock(blocks.pfb(src, 'freq', 4, core=cores))
+
+
+def _add_uvw(hdr):
+    nbaseline = hdr['_tensor']['shape'][1]
+    hdr['uvw'] = np.random.RandomState(0).uniform(
+        -1000., 1000., size=(nbaseline, 3)).tolist()
+    return hdr
+
+
+def _build_grid(src, cores, tmpdir):
+    # Note: Each 64 frames of channels form one integration of 64 baselines
+    data = bf.views.split_axis(src, 'time', 64, label='baseline')
+    data = bf.views.custom(data, _add_uvw)
+    NullSinkBlock(blocks.grid_visibilities(data, 256, core=cores))
+
+
+def _build_sigproc_write(src, cores, tmpdir):
+    data = blocks.quantize(src, 'u8', scale=4., core=cores)
+    blocks.write_sigproc(data, path=tmpdir)
+
+
+def _build_sigproc_read(gulp_nframe, cores, args, tmpdir):
+    NullSinkBlock(blocks.read_sigproc([_sigproc_file(tmpdir)], gulp_nframe,
+                                      core=cores))
+
+
+def _build_binary_write(src, cores, tmpdir):
+    BinaryFileWriteBlock(src, path=tmpdir, core=cores)
+
+
+def _build_binary_read(gulp_nframe, cores, args, tmpdir):
+    # Note: The binary reader fills one gulp_size-element frame per gulp
+    NullSinkBlock(BinaryFileReadBlock([_binary_file(tmpdir)],
+                                      gulp_nframe * args.nchan, 1, 'f32',
+                                      core=cores))
+
+
+def _build_archive_write(src, cores, tmpdir):
+    nthread = len(cores) if cores else 1
+    blocks.write_archive(src, _archive_dir(tmpdir, 'archive_write'),
+                         nthread=nthread, core=cores)
+
+
+def _build_archive_read(gulp_nframe, cores, args, tmpdir):
+    nthread = len(cores) if cores else 1
+    NullSinkBlock(blocks.read_archive(_archive_dir(tmpdir, 'archive'),
+                                      gulp_nframe, nthread, core=cores))
+
+
+BENCHMARKS = {
+    'copy':            ('f32',  _setup_none,    _build_copy),
+    'transpose':       ('f32',  _setup_none,    _build_transpose),
+    'scrunch':         ('f32',  _setup_none,    _build_scrunch),
+    'quantize_unpack': ('cf32', _setup_none,    _build_quantize_unpack),
+    'numpy_function':  ('f32',  _setup_none,    _build_numpy_function),
+    'kurtosis':        ('f32',  _setup_none,    _build_kurtosis),
+    'fold':            ('f32',  _setup_none,    _build_fold),
+    'dedisperse':      ('f32',  _setup_none,    _build_dedisperse),
+    'normalize':       ('f32',  _setup_none,    _build_normalize),
+    'pfb':             ('cf32', _setup_none,    _build_pfb),
+    'grid':            ('cf32', _setup_none,    _build_grid),
+    'sigproc_write':   ('f32',  _setup_none,    _build_sigproc_write),
+    'sigproc_read':    (None,   _setup_sigproc, _build_sigproc_read),
+    'binary_write':    ('f32',  _setup_none,    _build_binary_write),
+    'binary_read':     (None,   _setup_binary,  _build_binary_read),
+    'archive_write':   ('f32',  _setup_none,    _build_archive_write),
+    'archive_read':    (None,   _setup_archive, _build_archive_read),
+}
+
+
+def _block_latencies(trace_file, pipeline):
+    """ Return per-gulp process latency statistics (in ms) for each block """
+    with open(trace_file, 'r') as fh:
+        events = json.load(fh)['traceEvents']
+    latencies = {}
+    for i, block in enumerate(pipeline.blocks):
+        durations = np.array([event['dur'] for event in events
+                              if event['ph'] == 'X' and
+                              event['name'] == 'process' and
+                              event['cat'] == block.name]) / 1e3
+        if len(durations) == 0:
+            continue
+        latencies['%i_%s' % (i, block.type)] = {
+            'mean': float(durations.mean()),
+            'p50':  float(np.percentile(durations, 50)),
+            'p99':  float(np.percentile(durations, 99)),
+            'ngulp': len(durations)}
+    return latencies
+
+
+def _recording_nbyte(path):
+    """ Return the no. bytes of data in a recording directory """
+    nbyte = 0
+    for filename in glob.glob(os.path.join(path, '*' + RECORDING_EXTENSION)):
+        with RecordingFile(filename) as recording:
+            nbyte += recording.nframe * recording.nringlet * recording.frame_nbyte
+    return nbyte
+
+
+def run_benchmark(name, gulp_nframe, nthread, args, tmpdir):
+    """ Run one benchmark configuration and return its result dict """
+    dtype, _, build = BENCHMARKS[name]
+    cores = range(nthread) if nthread > 1 else None
+    trace_file = os.path.join(tmpdir, 'trace.json')
+    best = None
+    for _ in xrange(args.nrepeat):
+        bf.tracing.enable(trace_file)
+        with bf.Pipeline() as pipeline:
+            if dtype is None:
+                build(gulp_nframe, cores, args, tmpdir)
+            elif args.recording is not None:
+                src = blocks.read_recording(args.recording, gulp_nframe)
+                build(src, cores, tmpdir)
+            else:
+                src = SyntheticSourceBlock(args.nframe, args.nchan,
+                                           gulp_nframe, dtype)
+                build(src, cores, tmpdir)
+            start_time = time.time()
+            pipeline.run()
+            run_time = time.time() - start_time
+        bf.tracing.disable()
+        if best is None or run_time < best['run_time']:
+            nbyte = args.nframe * args.nchan * 4 * (2 if dtype == 'cf32' else 1)
+            if dtype is not None and args.recording is not None:
+                nbyte = _recording_nbyte(args.recording)
+            if name == 'sigproc_read':
+                nbyte = os.path.getsize(_sigproc_file(tmpdir))
+            best = {'pipeline':    name,
+                    'gulp_nframe': gulp_nframe,
+                    'nthread':     nthread,
+                    'run_time':    run_time,
+                    'gbps':        nbyte / run_time / 1e9,
+                    'latency_ms':  _block_latencies(trace_file, pipeline)}
+            if name == 'grid':
+                # Each frame holds one polarisation of one channel
+                best['vis_per_s'] = args.nframe * args.nchan / run_time
+            for block in pipeline.blocks:
+                if isinstance(block, blocks.ArchiveSinkBlock):
+                    best['compression_ratio'] = block.compression_ratio
+                    best['mbps_per_thread']   = block.mbps_per_thread
+    return best
+
+
+def _result_key(result):
+    return (result['pipeline'], result['gulp_nframe'], result['nthread'])
+
+
+def compare(results, baseline, tolerance):
+    """ Return the results whose throughput regressed relative to baseline """
+    baseline_by_key = dict((_result_key(r), r) for r in baseline['results'])
+    regressions = []
+    for result in results['results']:
+        ref = baseline_by_key.get(_result_key(result))
+        if ref is None:
+            continue
+        ratio = result['gbps'] / ref['gbps']
+        result['baseline_gbps'] = ref['gbps']
+        if ratio < 1 - tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Benchmark standard bifrost.blocks pipelines on the CPU")
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help="File to write results to")
+    parser.add_argument('-b', '--baseline', default=None,
+                        help="Previous results file to compare against")
+    parser.add_argument('-t', '--tolerance', type=float, default=0.1,
+                        help="Fractional throughput drop counted as a regression")
+    parser.add_argument('-p', '--pipelines', default=','.join(sorted(BENCHMARKS)),
+                        help="Comma-separated list of pipelines to run")
+    parser.add_argument('-g', '--gulp-nframes', default='256,1024,4096',
+                        help="Comma-separated list of gulp sizes")
+    parser.add_argument('-n', '--nthreads', default='1,2,4',
+                        help="Comma-separated list of OpenMP thread counts")
+    parser.add_argument('--nframe', type=int, default=65536,
+                        help="Number of frames streamed per run")
+    parser.add_argument('--nchan', type=int, default=1024,
+                        help="Number of channels per frame")
+    parser.add_argument('--nrepeat', type=int, default=3,
+                        help="Runs per configuration; the fastest is kept")
+    parser.add_argument('--recording', default=None,
+                        help="Directory of recorded sequences to replay in "
+                             "place of the synthetic source")
+    args = parser.parse_args(argv)
+
+    names        = args.pipelines.split(',')
+    gulp_nframes = [int(g) for g in args.gulp_nframes.split(',')]
+    nthreads     = [int(n) for n in args.nthreads.split(',')]
+    ncore = multiprocessing.cpu_count()
+    if max(nthreads) > ncore:
+        print "Skipping thread counts above the %i available cores" % ncore
+        nthreads = [n for n in nthreads if n <= ncore]
+
+    results = {'host':      socket.gethostname(),
+               'date':      time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'version':   bf.__version__,
+               'nframe':    args.nframe,
+               'nchan':     args.nchan,
+               'recording': args.recording,
+               'results':   []}
+    tmpdir = tempfile.mkdtemp(prefix='bf_benchmark_')
+    try:
+        for name in names:
+            BENCHMARKS[name][1](args, tmpdir)
+            for gulp_nframe in gulp_nframes:
+                for nthread in nthreads:
+                    result = run_benchmark(name, gulp_nframe, nthread, args, tmpdir)
+                    line = "%-16s gulp_nframe=%-6i nthread=%-3i %8.3f GB/s" % (
+                        name, gulp_nframe, nthread, result['gbps'])
+                    if 'vis_per_s' in result:
+                        line += " %10.3g vis/s" % result['vis_per_s']
+                    if 'compression_ratio' in result:
+                        line += " ratio %.3f, %.1f MB/s per thread" % (
+                            result['compression_ratio'],
+                            result['mbps_per_thread'])
+                    print line
+                    results['results'].append(result)
+    finally:
+        shutil.rmtree(tmpdir)
+
+    regressions = []
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, args.tolerance)
+        for result in regressions:
+            print "REGRESSION: %-16s gulp_nframe=%-6i nthread=%-3i %8.3f GB/s (baseline %.3f GB/s)" % (
+                result['pipeline'], result['gulp_nframe'], result['nthread'],
+                result['gbps'], result['baseline_gbps'])
+        if not regressions:
+            print "No regressions relative to %s" % args.baseline
+
+    with open(args.output, 'w') as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+    print "Results written to %s" % args.output
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
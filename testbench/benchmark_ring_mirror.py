@@ -0,0 +1,110 @@
+"""
+# benchmark_ring_mirror.py
+
+This benchmark streams data through a system-space ring, once with the buffer
+mirror-mapped in virtual memory (the default) and once with the ghost-region
+scheme (BIFROST_RING_MIRROR=0), and reports the throughput of each along with
+the volume of ghost-region copies that the mirror mapping removes.
+
+Gulp sizes are chosen so that they do not divide the (power-of-2) ring size,
+which means spans regularly wrap around the end of the buffer.
+
+    python benchmark_ring_mirror.py
+    python benchmark_ring_mirror.py --gulp-mbs 1,4,16,64 --total-gb 8
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+import bifrost as bf
+from bifrost.ring2 import Ring
+
+
+def ghost_copy_nbyte(span_sizes, ring_span, ghost_span):
+    """ Return the bytes copied to/from the ghost region of a ring with the
+    given total and contiguous spans, when the given sequence of span sizes
+    is written and then immediately read back (see src/ring_impl.cpp) """
+    nbyte = 0
+    dirty = False
+    offset = 0
+    for size in span_sizes:
+        beg = offset % ring_span
+        end = (offset + size) % ring_span
+        # Write: data that went into the ghost region is copied to the front
+        if end < beg:
+            nbyte += end
+        elif beg < ghost_span:
+            dirty = True
+        # Read: the front is copied to the ghost region if it has changed
+        if end < beg and dirty:
+            nbyte += ghost_span
+            dirty = False
+        offset += size
+    return nbyte
+
+
+def stream(gulp_nbyte, total_nbyte, buffer_factor, mirror):
+    """ Stream total_nbyte through a new ring and return (seconds, ring) """
+    if mirror:
+        os.environ.pop('BIFROST_RING_MIRROR', None)
+    else:
+        os.environ['BIFROST_RING_MIRROR'] = '0'
+    frame_nbyte = 4096
+    gulp_nframe = gulp_nbyte // frame_nbyte
+    ngulp       = total_nbyte // (gulp_nframe * frame_nbyte)
+    gulp = np.ones((gulp_nframe, frame_nbyte // 4), dtype=np.float32)
+    ring = Ring(space='system')
+    header = {'name': 'benchmark', 'time_tag': 0, 'gulp_nframe': gulp_nframe,
+              '_tensor': {'dtype': 'f32', 'shape': [-1, frame_nbyte // 4]}}
+    buf_nframe = int(np.ceil(gulp_nframe * buffer_factor))
+    with ring.begin_writing() as writer:
+        with writer.begin_sequence(header, buf_nframe) as oseq:
+            with ring.open_earliest_sequence() as iseq:
+                start = time.time()
+                for i in xrange(ngulp):
+                    with oseq.reserve(gulp_nframe) as ospan:
+                        ospan.data[...] = gulp
+                    with iseq.acquire(i * gulp_nframe, gulp_nframe) as ispan:
+                        pass
+                elapsed = time.time() - start
+    return elapsed, ring
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Compare mirror-mapped and ghost-region ring buffers")
+    parser.add_argument('-g', '--gulp-mbs', default='1,4,16,64',
+                        help="Comma-separated list of gulp sizes in MB")
+    parser.add_argument('-t', '--total-gb', type=float, default=4.,
+                        help="Volume of data streamed per run in GB")
+    parser.add_argument('-b', '--buffer-factor', type=float, default=3.,
+                        help="Ring size as a multiple of the gulp size")
+    args = parser.parse_args(argv)
+
+    print "%8s %12s %12s %18s" % ("gulp MB", "ghost GB/s", "mirror GB/s",
+                                  "copies removed GB")
+    for gulp_mb in [float(g) for g in args.gulp_mbs.split(',')]:
+        gulp_nbyte  = int(gulp_mb * 1e6) // 4096 * 4096
+        total_nbyte = int(args.total_gb * 1e9)
+        ghost_time,  ghost_ring  = stream(gulp_nbyte, total_nbyte,
+                                          args.buffer_factor, False)
+        mirror_time, mirror_ring = stream(gulp_nbyte, total_nbyte,
+                                          args.buffer_factor, True)
+        if not mirror_ring.mirrored:
+            print "Warning: Mirror mapping is not available on this system"
+        ngulp = total_nbyte // gulp_nbyte
+        streamed = ngulp * gulp_nbyte
+        # The ghost region is sized to hold one (contiguous) gulp
+        ghost_span = gulp_nbyte
+        ring_span  = ghost_ring.nbyte - ghost_span
+        copied = ghost_copy_nbyte([gulp_nbyte] * ngulp, ring_span, ghost_span)
+        print "%8.1f %12.3f %12.3f %18.3f" % (
+            gulp_mb, streamed / ghost_time / 1e9, streamed / mirror_time / 1e9,
+            copied / 1e9)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
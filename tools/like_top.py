@@ -48,6 +48,7 @@ Usage: %s [OPTIONS]
 
 Options:
 -h, --help                  Display this help information
+-b, --bottleneck            Start in the bottleneck view (toggle with 'b')
 """ % (os.path.basename(__file__), os.path.basename(__file__))
 	
 	if exitCode is not None:
@@ -60,10 +61,11 @@ def parseOptions(args):
 	config = {}
 	# Command line flags - default values
 	config['args'] = []
+	config['bottleneck'] = False
 	
 	# Read in and process the command line flags
 	try:
-		opts, args = getopt.getopt(args, "h", ["help",])
+		opts, args = getopt.getopt(args, "hb", ["help", "bottleneck"])
 	except getopt.GetoptError, err:
 		# Print help information and exit:
 		print str(err) # will print something like "option -a not recognized"
@@ -73,6 +75,8 @@ def parseOptions(args):
 	for opt, value in opts:
 		if opt in ('-h', '--help'):
 			usage(exitCode=0)
+		elif opt in ('-b', '--bottleneck'):
+			config['bottleneck'] = True
 		else:
 			assert False
 			
@@ -221,6 +225,73 @@ def _getCommandLine(pid):
 	return cmd
 
 
+def _getRingNames(log):
+	"""
+	Given the contents of a block's 'in' or 'out' ProcLog, return the list of
+	ring names that it contains.
+	"""
+	
+	return [str(log['ring%i' % i]) for i in xrange(log.get('nring', 0))]
+
+
+def _getBlockStats(contents):
+	"""
+	Given the ProcLog contents of a single process (as returned by 
+	load_by_pid), compute the busy fraction, the input (acquire) and output
+	(reserve) ring wait ratios, and the frame rate of each block.  The
+	results are returned as a dictionary keyed by block name.
+	"""
+	
+	stats = {}
+	for block in contents.keys():
+		try:
+			log = contents[block]['perf']
+			ac = max([0.0, log['acquire_time']])
+			pr = max([0.0, log['process_time']])
+			re = max([0.0, log['reserve_time']])
+			nframe = log.get('nframe', 0)
+		except KeyError:
+			continue
+			
+		total = ac + pr + re
+		if total > 0:
+			busy, inWait, outWait = pr/total, ac/total, re/total
+			rate = nframe / total
+		else:
+			busy, inWait, outWait, rate = 0.0, 0.0, 0.0, 0.0
+			
+		stats[block] = {'busy': busy, 'inWait': inWait, 'outWait': outWait, 
+					 'rate': rate, 
+					 'irings': _getRingNames(contents[block].get('in', {})), 
+					 'orings': _getRingNames(contents[block].get('out', {}))}
+	return stats
+
+
+def _findBottleneck(stats):
+	"""
+	Given the output of _getBlockStats, return the name of the critical-path 
+	block, i.e., the block that spends the largest fraction of its time 
+	processing data, and a list of the starving rings, i.e., the input rings 
+	of the block that spends the largest fraction of its time waiting to 
+	acquire data.  The block may be None and the list may be empty.
+	
+	Note:  The acquire time is only logged per block, so all of the input 
+	       rings of a multi-input block are reported as starving.
+	"""
+	
+	critical = None
+	if len(stats) > 0:
+		critical = max(stats, key=lambda x: stats[x]['busy'])
+		if stats[critical]['busy'] == 0:
+			critical = None
+			
+	starving, starveWait = [], 0.0
+	for block in stats.keys():
+		if stats[block]['irings'] and stats[block]['inWait'] > starveWait:
+			starving, starveWait = stats[block]['irings'], stats[block]['inWait']
+	return critical, starving
+
+
 def _addLine(screen, y, x, string, *args):
 	"""
 	Helper function for curses to add a line, clear the line to the end of 
@@ -249,6 +320,9 @@ def main(args):
 	
 	std = curses.A_NORMAL
 	rev = curses.A_REVERSE
+	bld = curses.A_BOLD
+	
+	bottleneck = config['bottleneck']
 	
 	poll_interval = 1.0
 	tLastPoll = 0.0
@@ -262,6 +336,8 @@ def main(args):
 			curses.flushinp()
 			if c == ord('q'):
 				break
+			elif c == ord('b'):
+				bottleneck = not bottleneck
 				
 			## Do we need to poll the system again?
 			if t-tLastPoll > poll_interval:
@@ -276,6 +352,7 @@ def main(args):
 				
 				## Load the data
 				blockList = {}
+				pathList = {}
 				for pidDir in pidDirs:
 					pid = int(os.path.basename(pidDir), 10)
 					contents = load_by_pid(pid)
@@ -284,6 +361,10 @@ def main(args):
 					if cmd == '':
 						continue
 						
+					stats = _getBlockStats(contents)
+					critical, starving = _findBottleneck(stats)
+					pathList[pid] = {'cmd': cmd, 'critical': critical, 'starving': starving}
+					
 					for block in contents.keys():
 						try:
 							log = contents[block]['bind']
@@ -300,9 +381,17 @@ def main(args):
 							ac, pr, re = 0.0, 0.0, 0.0
 							
 						blockList['%i-%s' % (pid, block)] = {'pid': pid, 'name':block, 'cmd': cmd, 'core': cr, 'acquire': ac, 'process': pr, 'reserve': re}
+						try:
+							blockList['%i-%s' % (pid, block)].update(stats[block])
+						except KeyError:
+							blockList['%i-%s' % (pid, block)].update({'busy': 0.0, 'inWait': 0.0, 'outWait': 0.0, 'rate': 0.0, 'irings': [], 'orings': []})
+						blockList['%i-%s' % (pid, block)]['critical'] = (block == critical)
 						
 				## Sort
-				order = sorted(blockList, key=lambda x: blockList[x]['process'], reverse=True)
+				if bottleneck:
+					order = sorted(blockList, key=lambda x: blockList[x]['busy'], reverse=True)
+				else:
+					order = sorted(blockList, key=lambda x: blockList[x]['process'], reverse=True)
 				
 				## Mark
 				tLastPoll = time.time()
@@ -325,25 +414,49 @@ def main(args):
 			### General - swap
 			output = 'Swap: %9ik total, %9ik used, %9ik free, %9ik cached\n' % (mem['swapTotal'], mem['swapUsed'], mem['swapFree'], mem['cached'])
 			k = _addLine(scr, k, 0, output, std)
-			### Header
-			k = _addLine(scr, k, 0, ' ', std)
-			output = '%6s  %15s  %4s  %5s  %7s  %7s  %7s  %7s  Cmd' % ('PID', 'Block', 'Core', '%CPU', 'Total', 'Acquire', 'Process', 'Reserve')
-			csize = size[1]-len(output)
-			output += ' '*csize
-			output += '\n'
-			k = _addLine(scr, k, 0, output, rev)
-			### Data
-			for o in order:
-				d = blockList[o]
-				try:
-					c = 100.0*cpu[d['core']]['total']
-					c = '%5.1f' % c
-				except KeyError:
-					c = '%5s' % ' '
-				output = '%6i  %15s  %4i  %5s  %7.3f  %7.3f  %7.3f  %7.3f  %s' % (d['pid'], d['name'][:15], d['core'], c, d['acquire']+d['process']+d['reserve'], d['acquire'], d['process'], d['reserve'], d['cmd'][:csize+3])
-				k = _addLine(scr, k, 0, output, std)
-				if k >= size[0] - 1:
-					break
+			### Bottleneck view
+			if bottleneck:
+				k = _addLine(scr, k, 0, ' ', std)
+				output = '%6s  %15s  %4s  %5s  %5s  %5s  %9s  %10s  %10s' % ('PID', 'Block', 'Core', '%Busy', '%InW', '%OutW', 'Frames/s', 'In ring', 'Out ring')
+				csize = size[1]-len(output)
+				output += ' '*csize
+				output += '\n'
+				k = _addLine(scr, k, 0, output, rev)
+				for o in order:
+					d = blockList[o]
+					starving = pathList[d['pid']]['starving']
+					irings = ','.join(['*'+r if r in starving else r for r in d['irings']])
+					orings = ','.join(['*'+r if r in starving else r for r in d['orings']])
+					output = '%6i  %15s  %4i  %5.1f  %5.1f  %5.1f  %9.1f  %10s  %10s' % (d['pid'], d['name'][-15:], d['core'], 100.0*d['busy'], 100.0*d['inWait'], 100.0*d['outWait'], d['rate'], irings[:10], orings[:10])
+					k = _addLine(scr, k, 0, output, bld if d['critical'] else std)
+					if k >= size[0] - 1 - len(pathList):
+						break
+				### Summary of the critical path for each process
+				for pid in sorted(pathList.keys()):
+					p = pathList[pid]
+					starving = ','.join(p['starving']) if p['starving'] else None
+					output = '%6i  critical block: %s, starving ring: %s' % (pid, p['critical'], starving)
+					k = _addLine(scr, k, 0, output[:size[1]-1], std)
+			else:
+				### Header
+				k = _addLine(scr, k, 0, ' ', std)
+				output = '%6s  %15s  %4s  %5s  %7s  %7s  %7s  %7s  Cmd' % ('PID', 'Block', 'Core', '%CPU', 'Total', 'Acquire', 'Process', 'Reserve')
+				csize = size[1]-len(output)
+				output += ' '*csize
+				output += '\n'
+				k = _addLine(scr, k, 0, output, rev)
+				### Data
+				for o in order:
+					d = blockList[o]
+					try:
+						c = 100.0*cpu[d['core']]['total']
+						c = '%5.1f' % c
+					except KeyError:
+						c = '%5s' % ' '
+					output = '%6i  %15s  %4i  %5s  %7.3f  %7.3f  %7.3f  %7.3f  %s' % (d['pid'], d['name'][:15], d['core'], c, d['acquire']+d['process']+d['reserve'], d['acquire'], d['process'], d['reserve'], d['cmd'][:csize+3])
+					k = _addLine(scr, k, 0, output, std)
+					if k >= size[0] - 1:
+						break
 			### Clear to the bottom
 			scr.clrtobot()
 			### Refresh